@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+0Lith V1 — Micro-benchmark ChatHistory : journal JSONL vs JSON réécrit
+========================================================================
+Latence d'un échange (question + réponse) selon la taille de la session :
+
+- jsonl  : ChatHistory.save_messages (ajout en fin de fichier, fsync groupé)
+- legacy : ancien format (lecture + réécriture complète du .json, indent=2),
+           limité à --legacy-max messages vu son coût O(n) par ajout
+
+En fin de run : chargement complet de la session vs dernière fenêtre de
+50 messages (load_page, index d'offsets).
+
+--sessions N : historique de N sessions, list_sessions (scan des fichiers
+vs catalogue SQLite) et search_history.
+
+Usage:
+    python bench_history.py
+    python bench_history.py --messages 20000 --legacy-max 4000
+    python bench_history.py --sessions 2000
+"""
+
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from olith_history import ChatHistory
+
+REPLY = "Voici le correctif :\n```python\n" + "x = compute(y)\n" * 20 + "```"
+
+
+def _legacy_save(path: Path, message: dict) -> None:
+    data = {"session_id": path.stem, "messages": []}
+    if path.exists():
+        data = json.loads(path.read_text(encoding="utf-8"))
+    data["messages"].append({**message, "timestamp": int(time.time() * 1000)})
+    data["updated_at"] = int(time.time() * 1000)
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def _checkpoints(total: int) -> list[int]:
+    marks, n = [], 1000
+    while n < total:
+        marks.append(n)
+        n *= 2
+    return marks + [total]
+
+
+def run(messages: int, legacy_max: int, window: int = 100) -> dict:
+    report = {"jsonl": {}, "legacy": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        history = ChatHistory(root / "jsonl")
+        legacy = root / "legacy" / "s.json"
+        legacy.parent.mkdir()
+        marks = set(_checkpoints(messages))
+        timings_jsonl, timings_legacy = [], []
+        for i in range(0, messages, 2):
+            pair = [{"type": "user", "content": f"question {i}"},
+                    {"type": "agent", "content": REPLY, "agent_id": "aerolith"}]
+            t0 = time.perf_counter()
+            history.save_messages("s", pair)
+            timings_jsonl.append((time.perf_counter() - t0) * 1000)
+            if i < legacy_max:
+                t0 = time.perf_counter()
+                for m in pair:
+                    _legacy_save(legacy, m)
+                timings_legacy.append((time.perf_counter() - t0) * 1000)
+            size = i + 2
+            if size in marks:
+                report["jsonl"][size] = round(statistics.mean(timings_jsonl[-window:]), 3)
+                if size <= legacy_max:
+                    report["legacy"][size] = round(statistics.mean(timings_legacy[-window:]), 3)
+        t0 = time.perf_counter()
+        history.load_session("s")
+        report["load_full_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        t0 = time.perf_counter()
+        history.load_page("s", limit=50)
+        report["load_page_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+        history.close()
+        report["fsyncs"] = history.stats["fsyncs"]
+        report["file_mb"] = round((root / "jsonl" / "s.jsonl").stat().st_size / 2**20, 1)
+    return report
+
+
+WORDS = ("watcher", "qdrant", "ollama", "migration", "embedding", "latence", "pare-feu",
+         "scanner", "svelte", "tauri", "rust", "python", "journal", "session", "agent")
+
+
+def run_catalog(sessions: int, exchanges: int = 20, repeat: int = 5) -> dict:
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        history = ChatHistory(Path(tmp))
+        ts = 1_700_000_000_000
+        for s in range(sessions):
+            sid = f"s{s:06d}"
+            for _ in range(exchanges):
+                ts += 60_000
+                history.save_messages(sid, [
+                    {"type": "user", "content": " ".join(rng.choices(WORDS, k=12)), "timestamp": ts},
+                    {"type": "agent", "content": " ".join(rng.choices(WORDS, k=60)),
+                     "agent_id": rng.choice(["aerolith", "monolith"]), "timestamp": ts + 1},
+                ])
+
+        def timed(fn) -> float:
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                fn()
+            return round((time.perf_counter() - t0) * 1000 / repeat, 2)
+
+        report = {
+            "messages": sessions * exchanges * 2,
+            "scan_ms": timed(history._scan_sessions),
+            "catalog_all_ms": timed(history.list_sessions),
+            "catalog_page_ms": timed(lambda: history.list_sessions_page(0, 50)),
+            "search_ms": timed(lambda: history.search_history("qdrant migration")),
+            "search_filtered_ms": timed(lambda: history.search_history(
+                "watcher", agent_id="monolith", since=ts - 86_400_000)),
+        }
+        history.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coût d'un ajout selon la taille de la session")
+    parser.add_argument("--messages", type=int, default=16000)
+    parser.add_argument("--legacy-max", type=int, default=2000)
+    parser.add_argument("--sessions", type=int, default=0, help="Bench catalogue sur N sessions")
+    args = parser.parse_args()
+
+    if args.sessions:
+        report = run_catalog(args.sessions)
+        print(f"\n{args.sessions} sessions, {report['messages']} messages (ms par appel)")
+        for key in ("scan_ms", "catalog_all_ms", "catalog_page_ms", "search_ms", "search_filtered_ms"):
+            print(f"  {key:<20} {report[key]:>9.2f}")
+        return
+
+    report = run(args.messages, args.legacy_max)
+    print(f"\nms par échange (moyenne des 100 derniers), fichier final {report['file_mb']} MB, "
+          f"{report['fsyncs']} fsync")
+    print(f"  {'messages':>9} {'jsonl':>9} {'legacy':>9}")
+    for size, ms in report["jsonl"].items():
+        legacy = report["legacy"].get(size)
+        print(f"  {size:>9} {ms:>9.3f} {legacy if legacy is not None else '-':>9}")
+    print(f"\nChargement : session complète {report['load_full_ms']} ms, "
+          f"50 derniers messages {report['load_page_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
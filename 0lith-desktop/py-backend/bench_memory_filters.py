@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+0Lith V1 — Benchmark recherche filtree sur olith_memories
+===========================================================
+Collection synthetique (types, fichiers, timestamps, confiance comme les
+vraies memoires) de taille croissante ; mesure la latence p50/p95 de :
+
+- search      : recherche vectorielle du namespace (sans filtre de metadonnees)
+- shadow_24h  : shadow_thinking d'un fichier sur les dernieres 24 h
+- identity    : identity + capabilities (sans requete)
+- delete_30d  : suppression des conversations de plus de 30 jours (count + delete)
+
+Par defaut sur un Qdrant en memoire (mode embarque : pas d'index de
+payload, filtrage par parcours). Avec --url, sur un serveur Qdrant, avec et
+sans les index de ensure_payload_indexes.
+
+Usage:
+    python bench_memory_filters.py
+    python bench_memory_filters.py --sizes 10000 50000 --url http://localhost:6333
+"""
+
+import argparse
+import random
+import statistics
+import time
+import uuid
+from types import SimpleNamespace
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+from olith_memory_filters import delete_filtered, ensure_payload_indexes, memory_filter, search_filtered
+
+DIMS = 256
+COLLECTION = "olith_bench_filters"
+DAY = 86400
+TYPES = [("conversation", 0.5), ("shadow_thinking", 0.3), ("prediction_feedback", 0.1),
+         ("agent_learned", 0.08), ("identity", 0.01), ("capabilities", 0.01)]
+NAMESPACES = ["hodolith", "monolith", "aerolith", "cryolith", "pyrolith", "shared"]
+
+
+class _Embedder:
+    def __init__(self, rng):
+        self.rng = rng
+
+    def embed(self, text, memory_action=None):
+        return self.rng.normal(size=DIMS).astype(np.float32).tolist()
+
+
+def populate(client, size: int, now: float, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    names, weights = zip(*TYPES)
+    for start in range(0, size, 1000):
+        n = min(1000, size - start)
+        vectors = np_rng.normal(size=(n, DIMS)).astype(np.float32)
+        points = []
+        for vector in vectors:
+            type_ = rng.choices(names, weights)[0]
+            payload = {
+                "data": f"memoire {type_}",
+                "user_id": "hodolith" if type_ == "shadow_thinking" else rng.choice(NAMESPACES),
+                "type": type_,
+                "timestamp": now - rng.uniform(0, 90) * DAY,
+            }
+            if type_ == "shadow_thinking":
+                payload["file_path"] = f"src/module_{rng.randrange(200)}.py"
+                payload["confidence_score"] = round(rng.random(), 2)
+            points.append(models.PointStruct(id=str(uuid.uuid4()), vector=vector.tolist(), payload=payload))
+        client.upsert(COLLECTION, points, wait=True)
+
+
+def _timed(fn, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    timings.sort()
+    return {"p50_ms": round(statistics.median(timings), 2),
+            "p95_ms": round(timings[min(len(timings) - 1, int(0.95 * len(timings)))], 2)}
+
+
+def run(client, size: int, repeat: int, indexed: bool, seed: int = 0) -> dict:
+    now = time.time()
+    if client.collection_exists(COLLECTION):
+        client.delete_collection(COLLECTION)
+    client.create_collection(COLLECTION, vectors_config=models.VectorParams(size=DIMS, distance=models.Distance.COSINE))
+    populate(client, size, now, seed)
+    if indexed:
+        ensure_payload_indexes(client, COLLECTION)
+    memory = SimpleNamespace(
+        vector_store=SimpleNamespace(client=client, collection_name=COLLECTION),
+        embedding_model=_Embedder(np.random.default_rng(seed + 1)),
+    )
+    rng = random.Random(seed + 2)
+    report = {
+        "search": _timed(lambda: search_filtered(memory, "q", limit=5, user_id="hodolith"), repeat),
+        "shadow_24h": _timed(lambda: search_filtered(
+            memory, "q", limit=5, user_id="hodolith", types="shadow_thinking",
+            file_path=f"src/module_{rng.randrange(200)}.py", since=now - DAY), repeat),
+        "identity": _timed(lambda: search_filtered(
+            memory, None, limit=20, types=["identity", "capabilities"]), repeat),
+    }
+    flt = memory_filter(types="conversation", before=now - 30 * DAY)
+    expected = client.count(COLLECTION, count_filter=flt, exact=True).count
+    t0 = time.perf_counter()
+    deleted = delete_filtered(memory, types="conversation", before=now - 30 * DAY)["deleted"]
+    report["delete_30d"] = {"ms": round((time.perf_counter() - t0) * 1000, 2), "deleted": deleted}
+    assert deleted == expected
+    client.delete_collection(COLLECTION)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence de recherche filtree selon la taille")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--url", help="serveur Qdrant (sinon Qdrant en memoire)")
+    args = parser.parse_args()
+
+    client = QdrantClient(url=args.url) if args.url else QdrantClient(":memory:")
+    variants = [("indexed", True), ("no index", False)] if args.url else [("embedded", False)]
+    for size in args.sizes:
+        print(f"\n{size:,} memoires")
+        for label, indexed in variants:
+            report = run(client, size, args.repeat, indexed)
+            cells = "  ".join(f"{k} {v['p50_ms']}/{v['p95_ms']}" for k, v in report.items() if "p50_ms" in v)
+            delete = report["delete_30d"]
+            print(f"  {label:<9} p50/p95 ms : {cells}  |  delete_30d {delete['ms']} ms ({delete['deleted']} pts)")
+
+
+if __name__ == "__main__":
+    main()
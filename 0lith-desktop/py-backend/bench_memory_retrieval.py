@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+0Lith V1 — Benchmark recherche memoire : vecteurs seuls vs hybride (BM25 + RRF)
+================================================================================
+Corpus synthetique hors ligne (pas d'Ollama ni de Qdrant) : chaque memoire
+appartient a un sujet (vecteur du sujet + bruit) et cite un identifiant
+unique (fichier, CVE, fonction, port). Les requetes visent une memoire par
+son identifiant, avec le vecteur du sujet seulement : c'est le cas ou la
+similarite vectorielle echoue.
+
+Mesure recall@k et latence (p50/p95) : vecteurs (force brute numpy),
+lexical (BM25) et hybride (fusion RRF des deux).
+
+Usage:
+    python bench_memory_retrieval.py
+    python bench_memory_retrieval.py --sizes 10000 100000 --queries 500 --k 5
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+
+from olith_lexical import LexicalIndex, fuse_results
+
+DIMS = 64
+TOPICS = [
+    "scan reseau du serveur", "revue de code python", "analyse de logs apache",
+    "configuration du pare-feu", "pentest de l'application web", "durcissement ssh",
+    "incident de ransomware", "pipeline de build", "audit des dependances",
+    "fuite de credentials", "monitoring des agents", "planning de la semaine",
+]
+TEMPLATES = [
+    "Vu {ident} pendant {topic}.",
+    "{topic} : probleme lie a {ident}.",
+    "Note sur {ident} ({topic}).",
+    "Pendant {topic}, {ident} a ete signale.",
+]
+
+
+def _identifier(i: int, rng: random.Random) -> str:
+    kind = i % 4
+    if kind == 0:
+        return f"module_{i}_{rng.choice(['core', 'auth', 'net', 'db'])}.py"
+    if kind == 1:
+        return f"CVE-20{20 + i % 6}-{10000 + i}"
+    if kind == 2:
+        return f"handle_{rng.choice(['login', 'upload', 'parse', 'sync'])}_{i}()"
+    return f"port {20000 + i}"
+
+
+def build_corpus(size: int, seed: int = 0):
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    topic_vecs = np_rng.normal(size=(len(TOPICS), DIMS)).astype(np.float32)
+    texts, idents, topics = [], [], []
+    for i in range(size):
+        topic = i % len(TOPICS)
+        ident = _identifier(i, rng)
+        texts.append(rng.choice(TEMPLATES).format(ident=ident, topic=TOPICS[topic]))
+        idents.append(ident)
+        topics.append(topic)
+    vectors = topic_vecs[topics] + 0.35 * np_rng.normal(size=(size, DIMS)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return texts, idents, np.array(topics), vectors, topic_vecs
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(size: int, n_queries: int, k: int, seed: int = 0) -> dict:
+    texts, idents, topics, vectors, topic_vecs = build_corpus(size, seed)
+    np_rng = np.random.default_rng(seed + 1)
+
+    t0 = time.perf_counter()
+    index = LexicalIndex()
+    for i, text in enumerate(texts):
+        index.add(i, "monolith", text)
+    build_s = time.perf_counter() - t0
+
+    rng = random.Random(seed + 2)
+    targets = rng.sample(range(size), min(n_queries, size))
+    hits = {"vector": 0, "lexical": 0, "hybrid": 0}
+    latency = {"vector": [], "lexical": [], "hybrid": []}
+    for target in targets:
+        query = f"Que sait-on de {idents[target]} ?"
+        qvec = topic_vecs[topics[target]] + 0.35 * np_rng.normal(size=DIMS).astype(np.float32)
+        qvec /= np.linalg.norm(qvec)
+
+        t0 = time.perf_counter()
+        scores = vectors @ qvec
+        top = np.argpartition(-scores, k)[:k]
+        top = top[np.argsort(-scores[top])]
+        vector_hits = [{"id": str(i), "memory": texts[i]} for i in top]
+        t_vec = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        lexical_hits = index.search(query, "monolith", k)
+        t_lex = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        fused = fuse_results(vector_hits, lexical_hits, k)
+        t_fuse = time.perf_counter() - t0
+
+        key = str(target)
+        hits["vector"] += key in {h["id"] for h in vector_hits}
+        hits["lexical"] += key in {h["id"] for h in lexical_hits}
+        hits["hybrid"] += key in {h["id"] for h in fused}
+        latency["vector"].append(t_vec * 1000)
+        latency["lexical"].append(t_lex * 1000)
+        # Vecteurs et BM25 en sequence (pire cas : pas de parallelisme)
+        latency["hybrid"].append((t_vec + t_lex + t_fuse) * 1000)
+
+    return {
+        "size": size,
+        "index_build_s": round(build_s, 2),
+        "modes": {
+            mode: {
+                "recall": hits[mode] / len(targets),
+                "p50_ms": round(statistics.median(latency[mode]), 3),
+                "p95_ms": round(_percentile(latency[mode], 0.95), 3),
+            }
+            for mode in hits
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k / latence : vecteurs vs hybride")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        report = run(size, args.queries, args.k, args.seed)
+        print(f"\n{size:,} memoires (index BM25 construit en {report['index_build_s']}s)")
+        print(f"  {'mode':<8} {'recall@' + str(args.k):>9} {'p50 ms':>9} {'p95 ms':>9}")
+        for mode, r in report["modes"].items():
+            print(f"  {mode:<8} {r['recall']:>9.3f} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
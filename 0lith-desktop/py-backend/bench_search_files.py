@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+0Lith V1 — Micro-benchmark search_files : parcours complet vs index trigrammes
+================================================================================
+Arbre synthetique de --files fichiers source (identifiants aleatoires +
+quelques marqueurs rares), puis pour chaque motif :
+
+- scan    : tool_search_files sans index (os.walk + lecture de chaque fichier)
+- indexed : tool_search_files avec ProjectIndex + TrigramIndex (seuls les
+            fichiers candidats sont lus)
+
+En fin de run : construction de l'index, taille sur disque, et latence d'une
+recherche juste apres modification d'un fichier (surcouche incrementale).
+Temps : mediane sur --repeat appels.
+
+Usage:
+    python bench_search_files.py
+    python bench_search_files.py --files 20000 --repeat 5
+"""
+
+import argparse
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import olith_project_index
+from olith_project_index import open_project_index
+from olith_tools import tool_search_files
+
+WORDS = ("config", "handler", "request", "buffer", "router", "session", "memory", "agent",
+         "vector", "client", "stream", "parse", "render", "token", "cache", "index")
+
+PATTERNS = (
+    ("literal rare", "needle_[0-9]+_marker"),
+    ("literal frequent", "def handler_"),
+    ("alternation", "(class Vector|def render_stream)"),
+    ("no trigram", r"\w+\d{3}\b"),
+)
+
+
+def _generate(root: Path, files: int, rng: random.Random) -> None:
+    per_dir = 200
+    for i in range(files):
+        d = root / f"pkg{i // per_dir // 50:03d}" / f"mod{i // per_dir:04d}"
+        if i % per_dir == 0:
+            d.mkdir(parents=True, exist_ok=True)
+        lines = []
+        for _ in range(rng.randint(10, 60)):
+            a, b = rng.choice(WORDS), rng.choice(WORDS)
+            lines.append(f"def {a}_{b}(x):\n    return {b}.{a}(x)  # {rng.choice(WORDS)}")
+        if i % 10_000 == 7:
+            lines.append(f"needle_{i}_marker = True")
+        (d / f"f{i:06d}.py").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def _timed(fn, repeat: int) -> tuple[float, dict]:
+    """Mediane sur repeat appels (ms)."""
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return round(statistics.median(timings), 1), result
+
+
+def run(files: int, repeat: int) -> dict:
+    rng = random.Random(0)
+    project = Path(tempfile.mkdtemp(prefix="olith_bench_", dir=str(Path.home())))
+    store = Path(tempfile.mkdtemp())
+    report = {"patterns": []}
+    try:
+        t0 = time.perf_counter()
+        _generate(project, files, rng)
+        report["generate_s"] = round(time.perf_counter() - t0, 1)
+        root = str(project)
+        with patch.object(olith_project_index, "PROJECT_INDEX_DIR", store), \
+                patch.object(olith_project_index, "_active", None):
+            scans = {p: _timed(lambda: tool_search_files(p, root), 1) for _, p in PATTERNS}
+
+            t0 = time.perf_counter()
+            index = open_project_index(project, background=False)
+            report["build_s"] = round(time.perf_counter() - t0, 1)
+            stats = index.stats()
+            report["index_mb"] = round(stats["index_bytes"] / 2**20, 1)
+            try:
+                report["first_ms"], _ = _timed(lambda: tool_search_files("needle_0_marker", root), 1)
+                for label, p in PATTERNS:
+                    ms, result = _timed(lambda: tool_search_files(p, root), repeat)
+                    scan_ms, scanned = scans[p]
+                    assert result["total"] == scanned["total"], (p, result["total"], scanned["total"])
+                    report["patterns"].append((label, p, scanned["total"], scan_ms, ms))
+
+                def _edit_and_search(counter=iter(range(10**6))):
+                    i = next(counter)
+                    target = project / "pkg000" / "mod0000" / f"f{i:06d}.py"
+                    target.write_text(f"fresh_needle_edit_{i} = 1\n", encoding="utf-8")
+                    index.touch(target)
+                    return tool_search_files(f"fresh_needle_edit_{i}", root)
+
+                report["after_edit_ms"], result = _timed(_edit_and_search, max(repeat, 5))
+                assert result["total"] == 1
+            finally:
+                index.close()
+    finally:
+        shutil.rmtree(project, ignore_errors=True)
+        shutil.rmtree(store, ignore_errors=True)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="search_files : scan complet vs index trigrammes")
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    report = run(args.files, args.repeat)
+    print(f"\n{args.files} fichiers (generation {report['generate_s']} s), "
+          f"index construit en {report['build_s']} s, {report['index_mb']} MB, "
+          f"premiere requete {report['first_ms']} ms")
+    print(f"  {'motif':<18} {'resultats':>9} {'scan ms':>10} {'index ms':>10} {'gain':>7}")
+    for label, _, total, scan_ms, ms in report["patterns"]:
+        print(f"  {label:<18} {total:>9} {scan_ms:>10.1f} {ms:>10.1f} {scan_ms / max(ms, 0.1):>6.1f}x")
+    print(f"\nModification d'un fichier + recherche : {report['after_edit_ms']} ms")
+
+
+if __name__ == "__main__":
+    main()
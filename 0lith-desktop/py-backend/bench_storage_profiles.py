@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+0Lith V1 — Benchmark profils de stockage (RAM, latence, recall@10)
+====================================================================
+Compare les profils de STORAGE_PROFILES (olith_memory_init) sur des
+vecteurs synthetiques de 1024 dimensions (groupes thematiques + bruit,
+comme les embeddings Qwen3) :
+
+- Hors ligne (par defaut) : simulation numpy des encodages. RAM = ce qui
+  reste en memoire (float32, codes int8 ou bits) ; les originaux "on_disk"
+  sont dans un fichier mmap et seuls les candidats re-notes sont lus.
+  Recherche exacte sur les codes puis rescoring de k x oversampling
+  candidats. Latence indicative (numpy n'a pas de produit int8 SIMD).
+- --url : sur un serveur Qdrant, collection creee au profil (HNSW,
+  quantization, mmap), recherche avec profile_search_params ; la RAM n'est
+  pas mesuree cote client.
+
+Recall@10 contre la recherche exacte float32.
+
+Usage:
+    python bench_storage_profiles.py
+    python bench_storage_profiles.py --sizes 10000 50000 --queries 200
+    python bench_storage_profiles.py --url http://localhost:6333
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from olith_memory_init import STORAGE_PROFILES, profile_collection_params, profile_search_params, storage_profile
+
+DIMS = 1024
+K = 10
+CHUNK = 8192
+
+
+def make_vectors(n: int, n_queries: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(64, DIMS)).astype(np.float32)
+    data = centers[rng.integers(0, 64, n)] + 0.8 * rng.normal(size=(n, DIMS)).astype(np.float32)
+    queries = centers[rng.integers(0, 64, n_queries)] + 0.8 * rng.normal(size=(n_queries, DIMS)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return data, queries
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+class _Encoded:
+    """Index simule d'un profil : codes en RAM + originaux (RAM ou mmap)."""
+
+    def __init__(self, data: np.ndarray, profile: dict, tmpdir: str):
+        self.profile = profile
+        self.quant = profile["quantization"]
+        if profile["on_disk"]:
+            path = os.path.join(tmpdir, f"{profile['name']}.f32")
+            data.tofile(path)
+            self.originals = np.memmap(path, dtype=np.float32, mode="r", shape=data.shape)
+        else:
+            self.originals = data
+        if self.quant == "int8":
+            self.scale = float(np.quantile(np.abs(data), 0.99)) / 127
+            self.codes = np.clip(np.round(data / self.scale), -127, 127).astype(np.int8)
+        elif self.quant == "binary":
+            self.codes = np.packbits(data > 0, axis=1).view(np.uint64)
+
+    def ram_bytes(self) -> int:
+        resident = 0 if self.profile["on_disk"] else self.originals.nbytes
+        return resident + (self.codes.nbytes if self.quant else 0)
+
+    def search(self, query: np.ndarray, k: int) -> np.ndarray:
+        if not self.quant:
+            return _top(np.asarray(self.originals @ query), k)
+        if self.quant == "int8":
+            q = np.clip(np.round(query / self.scale), -127, 127).astype(np.float32)
+            approx = np.concatenate([
+                self.codes[i:i + CHUNK].astype(np.float32) @ q for i in range(0, len(self.codes), CHUNK)
+            ])
+        else:
+            qbits = np.packbits(query > 0).view(np.uint64)
+            approx = -np.bitwise_count(self.codes ^ qbits).sum(axis=1).astype(np.float32)
+        candidates = _top(approx, int(k * self.profile["oversampling"]))
+        rescored = np.asarray(self.originals[np.sort(candidates)]) @ query
+        return np.sort(candidates)[_top(rescored, k)]
+
+
+def _report(found: list[np.ndarray], exact: list[np.ndarray], timings: list[float]) -> dict:
+    recall = statistics.mean(len(set(f.tolist()) & set(e.tolist())) / len(e) for f, e in zip(found, exact))
+    timings = sorted(timings)
+    return {
+        "recall": round(recall, 3),
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(timings[min(len(timings) - 1, int(0.95 * len(timings)))], 2),
+    }
+
+
+def run_offline(data, queries, exact) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name in STORAGE_PROFILES:
+            index = _Encoded(data, storage_profile(name), tmpdir)
+            found, timings = [], []
+            for query in queries:
+                t0 = time.perf_counter()
+                found.append(index.search(query, K))
+                timings.append((time.perf_counter() - t0) * 1000)
+            results[name] = {"ram_mb": round(index.ram_bytes() / 2**20, 1), **_report(found, exact, timings)}
+            del index
+    return results
+
+
+def run_server(url: str, data, queries, exact) -> dict:
+    from qdrant_client import QdrantClient, models
+
+    client = QdrantClient(url=url, timeout=300)
+    collection = "olith_bench_profiles"
+    results = {}
+    for name in STORAGE_PROFILES:
+        profile = storage_profile(name)
+        params = profile_collection_params(profile)
+        if client.collection_exists(collection):
+            client.delete_collection(collection)
+        client.create_collection(
+            collection,
+            vectors_config=models.VectorParams(size=DIMS, distance=models.Distance.COSINE, on_disk=params["on_disk"]),
+            hnsw_config=params["hnsw_config"],
+            quantization_config=params["quantization_config"],
+        )
+        client.upload_collection(collection, vectors=data, ids=range(len(data)), batch_size=512)
+        while client.get_collection(collection).status != models.CollectionStatus.GREEN:
+            time.sleep(0.5)
+        search_params = profile_search_params(profile)
+        found, timings = [], []
+        for query in queries:
+            t0 = time.perf_counter()
+            points = client.query_points(collection, query=query.tolist(), limit=K, search_params=search_params).points
+            timings.append((time.perf_counter() - t0) * 1000)
+            found.append(np.array([p.id for p in points]))
+        results[name] = {"ram_mb": None, **_report(found, exact, timings)}
+    client.delete_collection(collection)
+    client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAM / latence / recall@10 par profil de stockage")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--url", help="serveur Qdrant (sinon simulation numpy hors ligne)")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        data, queries = make_vectors(size, args.queries)
+        exact = [_top(data @ q, K) for q in queries]
+        results = run_server(args.url, data, queries, exact) if args.url else run_offline(data, queries, exact)
+        print(f"\n{size:,} vecteurs x {DIMS} ({'Qdrant ' + args.url if args.url else 'simulation numpy'})")
+        print(f"  {'profil':<8} {'RAM MB':>8} {'recall@10':>10} {'p50 ms':>8} {'p95 ms':>8}")
+        for name, r in results.items():
+            ram = f"{r['ram_mb']:>8}" if r["ram_mb"] is not None else f"{'n/a':>8}"
+            print(f"  {name:<8} {ram} {r['recall']:>10.3f} {r['p50_ms']:>8} {r['p95_ms']:>8}")
+
+
+if __name__ == "__main__":
+    main()
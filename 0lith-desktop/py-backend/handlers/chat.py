@@ -1,54 +1,115 @@
+import time
+
+from olith_history import PAGE_SIZE
 from olith_memory_init import AGENTS
 from olith_shared import log_info, log_warn
-from olith_agents import route_hodolith, run_agent_loop, conversation_history
+from olith_ollama import CancelToken
+from olith_agents import route_message, run_agent_loop, conversation_history, plan_num_ctx, MemoryPrefetch
+from olith_residency import get_residency
 
+# Agents que le routage peut choisir (namespaces memoire pre-interroges)
+ROUTABLE_AGENTS = [aid for aid in AGENTS if aid != "hodolith"]
+
+
+def accept_cancellable(backend, request: dict) -> None:
+    """Jeton d'annulation cree a l'acceptation (avant la file exclusive) :
+    un cancel envoye pendant l'attente atteint aussi cette requete."""
+    _request_token(backend, request)
 
-def cmd_chat(backend, request: dict, emit) -> dict:
-    """Serialized via _chat_lock to avoid conversation_history and VRAM conflicts."""
-    if not backend._chat_lock.acquire(blocking=False):
-        log_info("chat", "Waiting for previous chat to finish...")
-        backend._chat_lock.acquire()
 
-    backend._cancel_event.clear()
+def _request_token(backend, request: dict) -> CancelToken:
+    token = request.get("_cancel_token")
+    if token is None:
+        token = CancelToken()
+        request["_cancel_token"] = token
+        with backend._cancel_lock:
+            backend._cancel_tokens.append(token)
+    return token
 
+
+def _release_token(backend, token: CancelToken) -> None:
+    with backend._cancel_lock:
+        if token in backend._cancel_tokens:
+            backend._cancel_tokens.remove(token)
+
+
+def cmd_chat(backend, request: dict, emit) -> dict:
+    """Serialized via _chat_lock to avoid conversation_history and VRAM conflicts."""
+    token = _request_token(backend, request)
     try:
-        return _cmd_chat_inner(backend, request, emit)
+        if not backend._chat_lock.acquire(blocking=False):
+            log_info("chat", "Waiting for previous chat to finish...")
+            backend._chat_lock.acquire()
+
+        try:
+            if token.is_set():
+                log_info("chat", "Cancelled before start")
+                return {"response": "", "cancelled": True}
+            return _cmd_chat_inner(backend, request, emit, token)
+        finally:
+            backend._chat_lock.release()
     finally:
-        backend._chat_lock.release()
+        _release_token(backend, token)
 
 
-def _cmd_chat_inner(backend, request: dict, emit) -> dict:
+def _cmd_chat_inner(backend, request: dict, emit, cancel_event: CancelToken) -> dict:
+    t_request = time.perf_counter()
     message = request.get("message", "").strip()
     if not message:
         return {"message": "Empty message", "status": "error"}
 
     agent_id = request.get("agent_id")
     route_reason = None
+    route = None
+    timing = {"ttft_ms": None}
+
+    def _emit(event: dict) -> None:
+        if timing["ttft_ms"] is None and event.get("status") == "streaming":
+            timing["ttft_ms"] = _ms_since(t_request)
+        if emit:
+            emit(event)
 
     if not backend.memory:
         backend._init_memory_lazy()
 
+    # Recherche memoire en parallele du routage : shared + chaque agent candidat
+    prefetch = None
+    if backend.memory:
+        prefetch = MemoryPrefetch(backend.memory, message, [agent_id] if agent_id else ROUTABLE_AGENTS)
+
     if not agent_id:
-        route = route_hodolith(message)
+        t_route = time.perf_counter()
+        route = route_message(message)
         agent_id = route["route"]
         route_reason = route.get("reason", "")
+        timing["route_ms"] = _ms_since(t_route)
 
     if agent_id not in AGENTS:
         return {"message": f"Unknown agent: {agent_id}", "status": "error"}
 
+    # Charge le modele (avec le num_ctx de son premier appel) pendant la
+    # recherche memoire de run_agent_loop
+    preload = get_residency().preload_async(agent_id, cancel_event, plan_num_ctx(agent_id, message))
+    if preload:
+        backend._track_thread(preload)
+
     result = run_agent_loop(
         agent_id=agent_id,
         message=message,
         memory=backend.memory,
         project_root=backend.project_root,
-        emit=emit,
+        emit=_emit,
         route_reason=route_reason,
-        cancel_event=backend._cancel_event,
+        cancel_event=cancel_event,
+        memories=prefetch.for_agent(agent_id) if prefetch else None,
     )
 
-    bg_thread = result.pop("_thread", None)
-    if bg_thread:
-        backend._track_thread(bg_thread)
+    if route is not None:
+        result["routing"] = {k: route.get(k) for k in ("method", "latency_ms", "margin", "similarity")}
+    if prefetch is not None:
+        timing.update(prefetch.stats())
+    timing["total_ms"] = _ms_since(t_request)
+    result["timing"] = timing
 
     try:
         from olith_tasks import resolve_completed
@@ -56,39 +117,52 @@ def _cmd_chat_inner(backend, request: dict, emit) -> dict:
     except Exception as e:
         log_warn("tasks", f"resolve_completed failed: {e}")
 
-    if not result.get("cancelled"):
+    if not result.get("cancelled") and result.get("status") != "error":
         sid = backend.history.current_session or backend.history.new_session()
-        backend.history.save_message(sid, {"type": "user", "content": message})
-        backend.history.save_message(sid, {
-            "type": "agent",
-            "content": result.get("response", ""),
-            "agent_id": result.get("agent_id"),
-            "agent_name": result.get("agent_name"),
-        })
+        # Un seul ajout au journal pour la question et la reponse
+        backend.history.save_messages(sid, [
+            {"type": "user", "content": message},
+            {
+                "type": "agent",
+                "content": result.get("response", ""),
+                "agent_id": result.get("agent_id"),
+                "agent_name": result.get("agent_name"),
+            },
+        ])
         result["session_id"] = sid
 
     return result
 
 
+def _ms_since(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 1)
+
+
 def cmd_cancel(backend, request: dict) -> dict:
-    backend._cancel_event.set()
+    # Requete en cours et requetes encore en file
+    with backend._cancel_lock:
+        tokens = list(backend._cancel_tokens)
+    for token in tokens:
+        token.set()
     log_info("chat", "Cancel requested")
     return {"message": "Cancelled"}
 
 
 def cmd_arena(backend, request: dict, emit) -> dict:
     """Serialized via _chat_lock (exclusive with cmd_chat)."""
-    if not backend._chat_lock.acquire(blocking=False):
-        log_info("arena", "Waiting for previous session to finish...")
-        backend._chat_lock.acquire()
-
-    backend._cancel_event.clear()
-
+    token = _request_token(backend, request)
     try:
-        from olith_arena import run_arena_sql_injection
-        return run_arena_sql_injection(emit, backend._cancel_event)
+        if not backend._chat_lock.acquire(blocking=False):
+            log_info("arena", "Waiting for previous session to finish...")
+            backend._chat_lock.acquire()
+
+        try:
+            from olith_arena import run_arena_sql_injection
+            return run_arena_sql_injection(emit, token)
+        finally:
+            backend._chat_lock.release()
     finally:
-        backend._chat_lock.release()
+        _release_token(backend, token)
 
 
 def cmd_clear_history(backend, request: dict) -> dict:
@@ -98,17 +172,63 @@ def cmd_clear_history(backend, request: dict) -> dict:
 
 
 def cmd_list_sessions(backend, request: dict) -> dict:
-    return {"sessions": backend.history.list_sessions()}
+    """Sessions paginees (offset/limit) ; sans limit, toutes les sessions."""
+    offset = max(int(request.get("offset", 0)), 0)
+    limit = request.get("limit")
+    limit = max(int(limit), 1) if limit is not None else None
+    page = backend.history.list_sessions_page(offset, limit)
+    return {**page, "offset": offset, "limit": limit}
+
+
+def cmd_search_history(backend, request: dict) -> dict:
+    """Recherche plein texte dans l'historique : query + filtres agent / dates (ms)."""
+    query = request.get("query", "").strip()
+    if not query:
+        return {"message": "Missing query", "status": "error"}
+    results = backend.history.search_history(
+        query,
+        agent_id=request.get("agent_id") or None,
+        since=request.get("since"),
+        until=request.get("until"),
+        limit=min(max(int(request.get("limit", 20)), 1), 100),
+    )
+    return {"query": query, "results": results}
+
 
+def cmd_load_session(backend, request: dict, emit) -> dict:
+    """Session complete, ou par fenetres (la plus recente d'abord) :
 
-def cmd_load_session(backend, request: dict) -> dict:
+    - limit (+ before) : une fenetre ; "cursor" de la reponse = before suivant
+    - stream           : toutes les fenetres emises en events "streaming",
+                         la reponse finale ne porte que le total
+    """
     session_id = request.get("session_id", "")
     if not session_id:
         return {"message": "Missing session_id", "status": "error"}
-    messages = backend.history.load_session(session_id)
+    history = backend.history
+
+    if request.get("stream"):
+        limit = max(int(request.get("limit") or PAGE_SIZE), 1)
+        sent = 0
+        for page in history.iter_pages(session_id, limit, request.get("before")):
+            emit({"status": "streaming", "session_id": session_id, **page})
+            sent += len(page["messages"])
+        if not sent:
+            return {"messages": [], "message": f"Session '{session_id}' not found or empty"}
+        history._current_session = session_id
+        return {"session_id": session_id, "messages": [], "streamed": sent}
+
+    if request.get("limit") is not None:
+        page = history.load_page(session_id, request.get("before"), max(int(request["limit"]), 1))
+        if not page["total"]:
+            return {"messages": [], "message": f"Session '{session_id}' not found or empty"}
+        history._current_session = session_id
+        return {"session_id": session_id, **page}
+
+    messages = history.load_session(session_id)
     if not messages:
         return {"messages": [], "message": f"Session '{session_id}' not found or empty"}
-    backend.history._current_session = session_id
+    history._current_session = session_id
     return {"session_id": session_id, "messages": messages}
 
 
@@ -1,5 +1,6 @@
 from pathlib import Path
 
+from olith_project_index import open_project_index
 from olith_shared import log_info
 from olith_tools import tool_read_file, tool_list_files, tool_search_files
 
@@ -13,7 +14,13 @@ def cmd_set_project_root(backend, request: dict) -> dict:
         return {"message": f"Répertoire introuvable: {path}", "status": "error"}
     backend.project_root = str(p)
     log_info("project", f"Project root set: {backend.project_root}")
-    return {"project_root": backend.project_root, "message": f"Projet ouvert: {backend.project_root}"}
+    # Charge depuis le disque, sinon construit en arriere-plan (parcours direct d'ici la)
+    index = open_project_index(p)
+    return {
+        "project_root": backend.project_root,
+        "message": f"Projet ouvert: {backend.project_root}",
+        "index": index.stats() if index is not None else None,
+    }
 
 
 def cmd_read_file(backend, request: dict) -> dict:
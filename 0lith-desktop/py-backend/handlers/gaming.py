@@ -1,5 +1,6 @@
 from olith_shared import log_warn
 from olith_ollama import get_loaded_models, start_ollama, stop_ollama
+from olith_residency import get_residency
 
 
 def cmd_gaming_mode(backend, request: dict) -> dict:
@@ -14,6 +15,7 @@ def cmd_gaming_mode(backend, request: dict) -> dict:
         except Exception as e:
             log_warn("gaming", f"Failed to count loaded models: {e}")
         stop_ollama()
+        get_residency().reset()
     else:
         backend.ollama_proc = start_ollama()
 
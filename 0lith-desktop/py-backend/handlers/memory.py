@@ -1,9 +1,12 @@
 import copy
-import threading
 
 from olith_memory_init import AGENTS, MEM0_CONFIG
 from olith_shared import log_info, log_warn, log_error, extract_memories, memory_text
 from olith_agents import conversation_history
+from olith_memory_queue import enqueue_memory, PRIORITY_HIGH
+from olith_memory_filters import search_filtered
+
+SEARCH_FILTERS = ("types", "agent_id", "file_path", "since", "before", "min_confidence")
 
 
 def cmd_memory_init(backend, request: dict) -> dict:
@@ -20,32 +23,32 @@ def cmd_memory_init(backend, request: dict) -> dict:
         return {"message": "Memory initialization failed", "status": "error"}
 
     try:
-        from olith_memory_init import (
-            register_agent_identities,
-            register_agent_relations,
-            register_sparring_protocol,
-        )
-        register_agent_identities(backend.memory, verbose=False)
-        register_agent_relations(backend.memory, verbose=False)
-        register_sparring_protocol(backend.memory, verbose=False)
+        # Idempotent : seules les memoires absentes sont embeddees et ajoutees
+        from olith_memory_init import bootstrap_memories
+        report = bootstrap_memories(backend.memory)
     except Exception as e:
         log_error("memory_init", f"Registration failed: {e}")
         return {"message": f"Registration failed: {e}", "status": "error"}
 
+    log_info("memory_init", f"{report['added']} added, {report['skipped']} already present "
+                            f"in {report['total_ms']} ms")
     return {
         "message": "Memory initialized successfully",
         "agents_registered": len(AGENTS),
         "relations_registered": True,
         "sparring_protocol": True,
         "graph_enabled": use_graph,
+        "bootstrap": report,
     }
 
 
 def cmd_search(backend, request: dict) -> dict:
     query = request.get("query", "").strip()
     agent_id = request.get("agent_id", "")
+    # Filtres optionnels : types, file_path, since, before, min_confidence
+    filters = {k: v for k, v in (request.get("filters") or {}).items() if k in SEARCH_FILTERS}
 
-    if not query:
+    if not query and not filters:
         return {"results": [], "message": "Empty query"}
     if not agent_id or agent_id not in AGENTS:
         return {"results": [], "message": f"Invalid agent_id: {agent_id}"}
@@ -53,7 +56,9 @@ def cmd_search(backend, request: dict) -> dict:
         return {"results": [], "message": "Memory not initialized. Run memory_init first."}
 
     try:
-        results = backend.memory.search(query, user_id=agent_id, limit=5)
+        # Meme chemin avec ou sans filtre : SearchParams du profil de stockage
+        results = search_filtered(backend.memory, query or None, limit=request.get("limit", 5),
+                                  user_id=agent_id, **filters)
     except Exception as e:
         log_warn("search", f"Mem0 search failed: {e}")
         return {"results": [], "message": f"Search failed: {e}"}
@@ -86,22 +91,15 @@ def cmd_feedback(backend, request: dict) -> dict:
     else:
         text = f"User disliked response: {reason or 'no reason given'}. Response excerpt: {content[:200]} /no_think"
 
-    try:
-        def _store():
-            try:
-                backend.memory.add(text, user_id=agent_id, metadata={
-                    "type": "chat_feedback",
-                    "rating": rating,
-                    "reason": reason,
-                })
-                log_info("feedback", f"{rating} for {agent_id}" + (f": {reason}" if reason else ""))
-            except Exception as e:
-                log_error("feedback", f"Failed to store: {e}")
-        threading.Thread(target=_store, daemon=True).start()
-    except Exception as e:
-        log_error("feedback", f"Failed: {e}")
-        return {"stored": False, "message": str(e)}
-
+    queued = enqueue_memory(backend.memory, text, agent_id, metadata={
+        "type": "chat_feedback",
+        "rating": rating,
+        "reason": reason,
+    }, priority=PRIORITY_HIGH)
+    if not queued:
+        log_error("feedback", "Memory write queue full")
+        return {"stored": False, "message": "Memory write queue full"}
+    log_info("feedback", f"{rating} for {agent_id}" + (f": {reason}" if reason else ""))
     return {"stored": True}
 
 
@@ -119,7 +117,8 @@ def cmd_clear_memories(backend, request: dict) -> dict:
     cleared = []
     for aid in targets:
         try:
-            backend.memory.delete_all(user_id=aid)
+            with backend._memory_write_lock:
+                backend.memory.delete_all(user_id=aid)
             cleared.append(aid)
             log_info("memory", f"Memories cleared for {aid}")
         except Exception as e:
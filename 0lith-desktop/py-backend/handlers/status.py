@@ -1,12 +1,55 @@
-from olith_memory_init import AGENTS, OLLAMA_URL, PYROLITH_URL, check_service, check_qdrant_embedded, check_ollama_model
-from olith_ollama import get_loaded_models
-from olith_tools import tool_system_info
+from olith_memory_init import AGENTS, OLLAMA_URL, PYROLITH_URL, check_service, check_qdrant, check_ollama_model
+from olith_ollama import get_loaded_models, get_abort_stats
+from olith_response_cache import get_response_cache_stats
+from olith_memory_queue import get_memory_queue_stats
+from olith_embed_cache import get_embed_cache_stats
+from olith_memory_compactor import get_memory_compactor_stats
+from olith_lexical import get_lexical_stats
+from olith_project_index import get_project_index_stats
+from olith_memory_service import MemoryClient, probe_memory_service
+from olith_tools import tool_system_info, tool_cache
 from olith_agents import AGENT_COLORS, AGENT_EMOJIS
+from olith_residency import get_residency
+from ipc.protocol import stream_stats
+
+
+def _qdrant_ok(backend) -> bool:
+    """Qdrant health (server or embedded) without blocking the fast-startup path.
+
+    While the warm-up thread runs, report its cached probe instead of
+    importing qdrant_client here. Once Mem0 is up it owns the storage lock,
+    so a fresh client would fail — the live instance is the proof.
+    """
+    if backend.memory is not None:
+        ping = getattr(backend.memory, "ping", None)
+        if ping is None:
+            return True
+        try:
+            return bool(ping().get("qdrant"))   # service memoire : un aller-retour local
+        except OSError:
+            return False
+    if backend.warming:
+        return bool(backend.qdrant_ok)
+    # Le service memoire detient le verrou du dossier : lui demander
+    info = probe_memory_service()
+    if info is not None:
+        return bool(info.get("qdrant")) or not info.get("ready")
+    return check_qdrant()
+
+
+def _memory_service_stats(backend) -> dict:
+    if not isinstance(backend.memory, MemoryClient):
+        return {}
+    try:
+        return backend.memory.stats()
+    except (OSError, RuntimeError):
+        return {}
 
 
 def cmd_status(backend, request: dict) -> dict:
+    from olith_router import get_router_stats
     if backend.gaming_mode:
-        qdrant_ok = check_qdrant_embedded()
+        qdrant_ok = _qdrant_ok(backend)
         return {
             "ollama": False,
             "qdrant": qdrant_ok,
@@ -19,7 +62,7 @@ def cmd_status(backend, request: dict) -> dict:
         }
 
     ollama_ok = check_service("Ollama", OLLAMA_URL)
-    qdrant_ok = check_qdrant_embedded()
+    qdrant_ok = _qdrant_ok(backend)
     pyrolith_ok = check_service("Pyrolith", f"{PYROLITH_URL}/api/tags")
 
     models = {}
@@ -40,6 +83,20 @@ def cmd_status(backend, request: dict) -> dict:
         "models": models,
         "loaded_models": loaded_models,
         "vram_used_gb": vram_used_gb,
+        "starting": backend.warming,
+        "ollama_starting": backend.ollama_starting,
+        "cancellation": get_abort_stats(),
+        "streaming": stream_stats(),
+        "routing": get_router_stats(),
+        "residency": get_residency().stats(),
+        "llm_cache": get_response_cache_stats(),
+        "tool_cache": tool_cache.stats(),
+        "memory_queue": get_memory_queue_stats(),
+        "memory_service": _memory_service_stats(backend),
+        "embed_cache": get_embed_cache_stats(),     # Mem0 en processus (sinon dans memory_service)
+        "memory_compactor": get_memory_compactor_stats(),
+        "lexical_index": get_lexical_stats(),
+        "project_index": get_project_index_stats(),
     }
 
 
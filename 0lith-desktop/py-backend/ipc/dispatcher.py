@@ -1,20 +1,92 @@
-"""Command dispatcher — registry of (fn, needs_emit) pairs keyed by command name."""
+"""Command dispatcher — registry of (fn, needs_emit, mode, on_accept) keyed by command name.
 
+Concurrency modes (per command):
+  control   — run inline on the stdin reader thread (cancel): never queued
+  exclusive — one at a time, FIFO, on a dedicated lane (chat, arena, memory_init...)
+  shared    — run concurrently on a small worker pool (status, listings, reads)
+
+on_accept(backend, request) runs on the reader thread when a queued command
+is accepted, before it waits for its lane — per-request state that a control
+command must reach while the request is still queued (cancel tokens) is set
+up there.
+"""
+
+import threading
 import traceback
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
 from olith_shared import log_error
 
+CONTROL = "control"
+EXCLUSIVE = "exclusive"
+SHARED = "shared"
+
+SHARED_WORKERS = 4
+
 
 class Dispatcher:
-    def __init__(self, backend):
+    def __init__(self, backend, max_workers: int = SHARED_WORKERS):
         self._backend = backend
         self._registry: dict[str, tuple] = {}
+        self._exclusive_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ipc-exclusive")
+        self._shared_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ipc-shared")
+        self._inflight = 0
+        self._inflight_lock = threading.Lock()
+
+    def register(self, command: str, fn, needs_emit: bool = False, mode: str = SHARED,
+                 on_accept=None) -> None:
+        if mode not in (CONTROL, EXCLUSIVE, SHARED):
+            raise ValueError(f"Unknown concurrency mode for '{command}': {mode}")
+        self._registry[command] = (fn, needs_emit, mode, on_accept)
+
+    def mode_of(self, command: str) -> str | None:
+        entry = self._registry.get(command)
+        return entry[2] if entry else None
+
+    @property
+    def inflight(self) -> int:
+        """Number of queued or running (non-control) commands."""
+        with self._inflight_lock:
+            return self._inflight
+
+    def submit(self, request: dict, emit, respond) -> None:
+        """Schedule a request according to its concurrency mode.
+
+        Returns immediately for exclusive/shared commands — the response is
+        delivered later through respond(). Control commands and unknown
+        commands are answered before returning.
+        """
+        entry = self._registry.get(request.get("command", ""))
+        mode = entry[2] if entry else None
+        if mode is None or mode == CONTROL:
+            respond(self.dispatch(request, emit))
+            return
+
+        on_accept = entry[3]
+        if on_accept is not None:
+            on_accept(self._backend, request)
+
+        pool = self._exclusive_pool if mode == EXCLUSIVE else self._shared_pool
+        with self._inflight_lock:
+            self._inflight += 1
+        pool.submit(self._run, request, emit, respond)
+
+    def _run(self, request: dict, emit, respond) -> None:
+        try:
+            respond(self.dispatch(request, emit))
+        except Exception:
+            log_error("ipc", f"Failed to deliver response: {traceback.format_exc()}")
+        finally:
+            with self._inflight_lock:
+                self._inflight -= 1
 
-    def register(self, command: str, fn, needs_emit: bool = False) -> None:
-        self._registry[command] = (fn, needs_emit)
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting work; optionally wait for queued commands to finish."""
+        self._exclusive_pool.shutdown(wait=wait)
+        self._shared_pool.shutdown(wait=wait)
 
     def dispatch(self, request: dict, emit) -> dict:
         req_id = request.get("id", str(uuid.uuid4()))
@@ -24,7 +96,7 @@ class Dispatcher:
         if not entry:
             return {"id": req_id, "status": "error", "message": f"Unknown command: {command}"}
 
-        fn, needs_emit = entry
+        fn, needs_emit, _mode, _on_accept = entry
 
         def _emit(data: dict) -> None:
             emit({"id": req_id, **data})
@@ -1,24 +1,57 @@
-"""IPC stdin/stdout loop — reads JSON lines, dispatches, writes responses."""
+"""IPC stdin/stdout loop — reads JSON lines, schedules them, writes responses.
+
+The reader never blocks on a command: requests are handed to the dispatcher,
+which runs them on its worker lanes. Every stdout line (responses and
+streamed events, from any thread) goes through write_json(), backed by the
+single buffered writer thread of ipc/stream.py while run() is active.
+"""
 
 import json
 import sys
+import threading
+
+from ipc.stream import StreamWriter
+
+_stdout_lock = threading.Lock()
+_writer: StreamWriter | None = None
+
+
+def write_json(data: dict) -> None:
+    """Queue one JSON line for stdout (direct locked write when no writer runs)."""
+    writer = _writer
+    if writer is not None:
+        writer.write(data)
+        return
+    line = json.dumps(data, ensure_ascii=False)
+    with _stdout_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+
+def stream_stats() -> dict:
+    """Writer throughput counters (chunks/sec, bytes/sec, coalescing ratio...)."""
+    writer = _writer
+    return writer.stats() if writer is not None else {}
 
 
 def run(dispatcher) -> None:
-    """Block on sys.stdin, dispatch each JSON line, write the response back."""
-    for line in sys.stdin:
-        line = line.strip()
-        if not line:
-            continue
-
-        def emit(data: dict) -> None:
-            print(json.dumps(data, ensure_ascii=False), flush=True)
-
-        try:
-            request = json.loads(line)
-        except json.JSONDecodeError as e:
-            print(json.dumps({"status": "error", "message": f"Invalid JSON: {e}"}), flush=True)
-            continue
-
-        response = dispatcher.dispatch(request, emit)
-        print(json.dumps(response, ensure_ascii=False), flush=True)
+    """Block on sys.stdin, schedule each JSON line; drain pending work on EOF."""
+    global _writer
+    _writer = StreamWriter(sys.stdout)
+    try:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                write_json({"status": "error", "message": f"Invalid JSON: {e}"})
+                continue
+
+            dispatcher.submit(request, write_json, write_json)
+    finally:
+        dispatcher.shutdown(wait=True)
+        writer, _writer = _writer, None
+        writer.close()
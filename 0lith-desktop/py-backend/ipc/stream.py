@@ -0,0 +1,192 @@
+"""Buffered stdout writer with token coalescing and bounded-queue backpressure.
+
+Every IPC line (responses, routing/arena events, token chunks) is queued here
+and written by a single writer thread, so producers never touch stdout.
+
+Pure token events — {"id", "status": "streaming", "chunk"} — are merged per
+request id and flushed when the buffered text reaches STREAM_MAX_BYTES or the
+oldest pending chunk is STREAM_WINDOW_MS old. Any other event for the same id
+flushes that id's pending chunks first, so per-request ordering is preserved.
+The frontend appends chunks, so merged chunks render identically.
+
+A message json.dumps cannot serialize is replaced by an error line for its
+request id; the writer thread keeps running (a dead writer would leave every
+later response queued forever).
+
+When the consumer (Tauri) reads slowly the queue fills up and put() blocks
+the producing thread — generation is throttled instead of buffering without
+bound.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+
+from olith_shared import log_error, log_warn
+
+STREAM_WINDOW_MS = int(os.getenv("OLITH_STREAM_WINDOW_MS", "16"))
+STREAM_MAX_BYTES = int(os.getenv("OLITH_STREAM_MAX_BYTES", "256"))
+STREAM_QUEUE_SIZE = int(os.getenv("OLITH_STREAM_QUEUE_SIZE", "1024"))
+
+_RATE_WINDOW_S = 5.0
+_MAX_BATCH = 256   # items drained before forcing a write
+_CLOSE = object()
+
+
+def _is_token_event(data: dict) -> bool:
+    return (data.get("status") == "streaming" and len(data) == 3 and "id" in data
+            and isinstance(data.get("chunk"), str))
+
+
+def _dumps(data: dict) -> str:
+    """JSON line for data, or an error line for its request id if unserializable."""
+    try:
+        return json.dumps(data, ensure_ascii=False)
+    except (TypeError, ValueError) as e:
+        req_id = data.get("id") if isinstance(data, dict) else None
+        log_error("ipc_writer", f"Unserializable message for request {req_id!r}: {e}")
+        return json.dumps(
+            {"id": req_id, "status": "error", "message": f"Unserializable response: {e}"},
+            ensure_ascii=False, default=str,
+        )
+
+
+class StreamWriter:
+    """Single writer thread owning an output stream (sys.stdout by default)."""
+
+    def __init__(
+        self,
+        out,
+        window_ms: int = STREAM_WINDOW_MS,
+        max_bytes: int = STREAM_MAX_BYTES,
+        max_queue: int = STREAM_QUEUE_SIZE,
+    ):
+        self._out = out
+        self._window = window_ms / 1000
+        self._max_bytes = max_bytes
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._pending: dict[str, list[str]] = {}   # req_id -> chunks not yet written
+        self._pending_bytes: dict[str, int] = {}
+        self._deadline: dict[str, float] = {}      # req_id -> flush deadline
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "chunks_in": 0, "bytes_in": 0, "lines_out": 0,
+            "chunk_lines_out": 0, "writes": 0, "backpressure_waits": 0,
+        }
+        self._recent: list[tuple[float, int]] = []  # (t, bytes) of recent chunks
+        self._thread = threading.Thread(target=self._loop, name="ipc-writer", daemon=True)
+        self._thread.start()
+
+    # ── Producer side ──────────────────────────────────────────────────────
+
+    def write(self, data: dict) -> None:
+        """Queue one IPC message. Blocks while the queue is full (backpressure)."""
+        try:
+            self._queue.put_nowait(data)
+        except queue.Full:
+            with self._stats_lock:
+                self._stats["backpressure_waits"] += 1
+            self._queue.put(data)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush everything still queued and stop the writer thread."""
+        self._queue.put(_CLOSE)
+        self._thread.join(timeout=timeout)
+
+    def stats(self) -> dict:
+        """Throughput counters, for tuning window/size (exposed via status)."""
+        now = time.monotonic()
+        with self._stats_lock:
+            recent = [(t, n) for t, n in self._recent if now - t <= _RATE_WINDOW_S]
+            s = dict(self._stats)
+        span = max(now - recent[0][0], 1e-3) if recent else 0
+        s["chunks_per_sec"] = round(len(recent) / span, 1) if recent else 0.0
+        s["bytes_per_sec"] = round(sum(n for _, n in recent) / span, 1) if recent else 0.0
+        s["coalesce_ratio"] = round(s["chunks_in"] / s["chunk_lines_out"], 2) if s["chunk_lines_out"] else 0.0
+        s["queue_depth"] = self._queue.qsize()
+        s["window_ms"] = int(self._window * 1000)
+        s["max_bytes"] = self._max_bytes
+        return s
+
+    # ── Writer thread ──────────────────────────────────────────────────────
+
+    def _loop(self) -> None:
+        lines: list[str] = []
+        closing = False
+        while not closing:
+            timeout = None
+            if self._deadline:
+                timeout = max(0.0, min(self._deadline.values()) - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            # Drain whatever is already queued so one flush covers the batch
+            drained = 0
+            while item is not None:
+                if item is _CLOSE:
+                    closing = True
+                    break
+                try:
+                    self._accept(item, lines)
+                except Exception as e:
+                    log_error("ipc_writer", f"Dropped malformed message: {e}")
+                drained += 1
+                if drained >= _MAX_BATCH:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            now = time.monotonic()
+            for req_id in [r for r, d in self._deadline.items() if closing or d <= now]:
+                self._flush_chunks(req_id, lines)
+            self._write_lines(lines)
+
+    def _accept(self, data: dict, lines: list[str]) -> None:
+        req_id = data.get("id")
+        if _is_token_event(data):
+            chunk = data["chunk"]
+            size = len(chunk.encode("utf-8"))
+            with self._stats_lock:
+                self._stats["chunks_in"] += 1
+                self._stats["bytes_in"] += size
+                self._recent.append((time.monotonic(), size))
+                if len(self._recent) > 4096:
+                    del self._recent[:2048]
+            self._pending.setdefault(req_id, []).append(chunk)
+            self._pending_bytes[req_id] = self._pending_bytes.get(req_id, 0) + size
+            self._deadline.setdefault(req_id, time.monotonic() + self._window)
+            if self._pending_bytes[req_id] >= self._max_bytes:
+                self._flush_chunks(req_id, lines)
+            return
+
+        if req_id in self._pending:
+            self._flush_chunks(req_id, lines)
+        lines.append(_dumps(data))
+
+    def _flush_chunks(self, req_id, lines: list[str]) -> None:
+        chunks = self._pending.pop(req_id, None)
+        self._pending_bytes.pop(req_id, None)
+        self._deadline.pop(req_id, None)
+        if chunks:
+            lines.append(_dumps({"id": req_id, "status": "streaming", "chunk": "".join(chunks)}))
+            with self._stats_lock:
+                self._stats["chunk_lines_out"] += 1
+
+    def _write_lines(self, lines: list[str]) -> None:
+        if not lines:
+            return
+        try:
+            self._out.write("\n".join(lines) + "\n")
+            self._out.flush()
+        except Exception as e:
+            log_warn("ipc_writer", f"stdout write failed: {e}")
+        with self._stats_lock:
+            self._stats["lines_out"] += len(lines)
+            self._stats["writes"] += 1
+        lines.clear()
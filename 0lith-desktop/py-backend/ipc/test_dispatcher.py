@@ -0,0 +1,147 @@
+"""
+Tests for ipc/dispatcher.py — concurrency modes (control / exclusive / shared).
+Run: python -m pytest py-backend/ipc/test_dispatcher.py -v
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+import unittest
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ipc.dispatcher import Dispatcher, CONTROL, EXCLUSIVE, SHARED
+
+
+class _Collector:
+    """Thread-safe respond() sink that lets tests wait for a given request id."""
+
+    def __init__(self) -> None:
+        self.responses: dict[str, dict] = {}
+        self.order: list[str] = []
+        self._cond = threading.Condition()
+
+    def __call__(self, data: dict) -> None:
+        with self._cond:
+            self.responses[data.get("id")] = data
+            self.order.append(data.get("id"))
+            self._cond.notify_all()
+
+    def wait_for(self, req_id: str, timeout: float = 5.0) -> dict:
+        with self._cond:
+            self._cond.wait_for(lambda: req_id in self.responses, timeout=timeout)
+            return self.responses[req_id]
+
+
+class TestDispatcherModes(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.backend = type("Backend", (), {})()
+        self.backend.cancel = threading.Event()
+        self.dispatcher = Dispatcher(self.backend)
+        self.out = _Collector()
+        self.events = _Collector()
+
+        def slow_chat(backend, request, emit):
+            emit({"status": "streaming", "chunk": "..."})
+            backend.cancel.wait(timeout=5)
+            return {"cancelled": backend.cancel.is_set()}
+
+        def cancel(backend, request):
+            backend.cancel.set()
+            return {"message": "Cancelled"}
+
+        self.dispatcher.register("chat", slow_chat, needs_emit=True, mode=EXCLUSIVE)
+        self.dispatcher.register("cancel", cancel, mode=CONTROL)
+        self.dispatcher.register("status", lambda b, r: {"ok": True}, mode=SHARED)
+
+    def tearDown(self) -> None:
+        self.backend.cancel.set()
+        self.dispatcher.shutdown(wait=True)
+
+    def test_control_answered_while_exclusive_runs(self) -> None:
+        self.dispatcher.submit({"id": "c1", "command": "chat"}, self.events, self.out)
+        time.sleep(0.05)
+
+        t0 = time.perf_counter()
+        self.dispatcher.submit({"id": "x1", "command": "cancel"}, self.out, self.out)
+        elapsed = time.perf_counter() - t0
+
+        self.assertEqual(self.out.responses["x1"]["status"], "ok")
+        self.assertLess(elapsed, 0.1)
+        self.assertTrue(self.out.wait_for("c1")["cancelled"])
+
+    def test_shared_not_blocked_by_exclusive(self) -> None:
+        self.dispatcher.submit({"id": "c1", "command": "chat"}, self.events, self.out)
+        self.dispatcher.submit({"id": "s1", "command": "status"}, self.out, self.out)
+
+        self.assertTrue(self.out.wait_for("s1", timeout=1.0)["ok"])
+        self.assertNotIn("c1", self.out.responses)
+
+    def test_exclusive_commands_run_in_order(self) -> None:
+        self.backend.cancel.set()
+        for i in range(3):
+            self.dispatcher.submit({"id": f"c{i}", "command": "chat"}, self.events, self.out)
+        self.out.wait_for("c2")
+        self.assertEqual(self.out.order, ["c0", "c1", "c2"])
+
+    def test_unknown_command_answered_inline(self) -> None:
+        self.dispatcher.submit({"id": "u1", "command": "nope"}, self.out, self.out)
+        self.assertEqual(self.out.responses["u1"]["status"], "error")
+
+    def test_invalid_mode_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            self.dispatcher.register("bad", lambda b, r: {}, mode="parallel")
+
+
+class TestCancelWhileQueued(unittest.TestCase):
+    """A cancel sent while a chat waits for the exclusive lane must reach it."""
+
+    def setUp(self) -> None:
+        from handlers import chat as h_chat
+
+        self.backend = type("Backend", (), {})()
+        self.backend._chat_lock = threading.Lock()
+        self.backend._cancel_tokens = []
+        self.backend._cancel_lock = threading.Lock()
+        self.release = threading.Event()
+        self.dispatcher = Dispatcher(self.backend)
+        self.out = _Collector()
+
+        def blocker(backend, request):
+            self.release.wait(timeout=5)
+            return {}
+
+        self.dispatcher.register("blocker", blocker, mode=EXCLUSIVE)
+        self.dispatcher.register("chat", h_chat.cmd_chat, needs_emit=True, mode=EXCLUSIVE,
+                                 on_accept=h_chat.accept_cancellable)
+        self.dispatcher.register("cancel", h_chat.cmd_cancel, mode=CONTROL)
+
+    def tearDown(self) -> None:
+        self.release.set()
+        self.dispatcher.shutdown(wait=True)
+
+    def test_queued_chat_sees_cancel(self) -> None:
+        self.dispatcher.submit({"id": "b1", "command": "blocker"}, self.out, self.out)
+        self.dispatcher.submit({"id": "c1", "command": "chat", "message": "hi"}, self.out, self.out)
+        self.dispatcher.submit({"id": "x1", "command": "cancel"}, self.out, self.out)
+        self.release.set()
+
+        response = self.out.wait_for("c1")
+        self.assertTrue(response["cancelled"])
+        self.assertEqual(self.backend._cancel_tokens, [])
+
+    def test_earlier_cancel_does_not_reach_new_request(self) -> None:
+        from handlers import chat as h_chat
+
+        self.dispatcher.submit({"id": "x1", "command": "cancel"}, self.out, self.out)
+        self.dispatcher.register("probe", lambda b, r: {"set": r["_cancel_token"].is_set()},
+                                 mode=EXCLUSIVE, on_accept=h_chat.accept_cancellable)
+        self.dispatcher.submit({"id": "p1", "command": "probe"}, self.out, self.out)
+        self.release.set()
+        self.assertFalse(self.out.wait_for("p1")["set"])
+
+if __name__ == "__main__":
+    unittest.main()
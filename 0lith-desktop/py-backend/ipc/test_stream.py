@@ -0,0 +1,120 @@
+"""
+Tests for ipc/stream.py — chunk coalescing, ordering, backpressure.
+Run: python -m pytest py-backend/ipc/test_stream.py -v
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ipc.stream import StreamWriter
+
+
+class _SlowOut(io.StringIO):
+    """StringIO whose flush() can be held to simulate a consumer not reading."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def flush(self) -> None:
+        self.gate.wait(timeout=5)
+        super().flush()
+
+
+def _lines(out: io.StringIO) -> list[dict]:
+    return [json.loads(l) for l in out.getvalue().splitlines() if l]
+
+
+class TestStreamWriter(unittest.TestCase):
+
+    def test_chunks_coalesced_and_reassembled(self) -> None:
+        out = io.StringIO()
+        w = StreamWriter(out, window_ms=50, max_bytes=10_000)
+        text = [f"tok{i} " for i in range(200)]
+        for t in text:
+            w.write({"id": "r1", "status": "streaming", "chunk": t})
+        w.write({"id": "r1", "status": "ok", "response": "done"})
+        w.close()
+
+        lines = _lines(out)
+        chunks = [l["chunk"] for l in lines if l["status"] == "streaming"]
+        self.assertEqual("".join(chunks), "".join(text))
+        self.assertLess(len(chunks), 20)
+        self.assertEqual(lines[-1]["status"], "ok")
+        self.assertGreater(w.stats()["coalesce_ratio"], 10)
+
+    def test_size_threshold_flushes(self) -> None:
+        out = io.StringIO()
+        w = StreamWriter(out, window_ms=10_000, max_bytes=8)
+        for _ in range(4):
+            w.write({"id": "r1", "status": "streaming", "chunk": "abcd"})
+        time.sleep(0.1)
+        self.assertEqual([l["chunk"] for l in _lines(out)], ["abcdabcd", "abcdabcd"])
+        w.close()
+
+    def test_time_window_flushes(self) -> None:
+        out = io.StringIO()
+        w = StreamWriter(out, window_ms=20, max_bytes=10_000)
+        w.write({"id": "r1", "status": "streaming", "chunk": "x"})
+        time.sleep(0.2)
+        self.assertEqual(_lines(out), [{"id": "r1", "status": "streaming", "chunk": "x"}])
+        w.close()
+
+    def test_other_events_not_merged(self) -> None:
+        out = io.StringIO()
+        w = StreamWriter(out, window_ms=50)
+        w.write({"id": "r1", "status": "streaming", "chunk": "a"})
+        w.write({"id": "r1", "status": "routing", "agent_id": "monolith"})
+        w.write({"id": "r2", "status": "streaming", "chunk": "b"})
+        w.close()
+        lines = _lines(out)
+        self.assertEqual(lines[0], {"id": "r1", "status": "streaming", "chunk": "a"})
+        self.assertEqual(lines[1]["status"], "routing")
+        self.assertEqual(lines[2]["chunk"], "b")
+
+    def test_unserializable_response_reported_and_writer_survives(self) -> None:
+        out = io.StringIO()
+        w = StreamWriter(out, window_ms=0)
+        w.write({"id": "r1", "status": "streaming", "chunk": "a"})
+        w.write({"id": "r1", "status": "ok", "result": {1, 2}})
+        w.write({"id": "r2", "status": "streaming", "chunk": b"bytes"})
+        w.write({"id": "r3", "status": "ok"})
+        w.close()
+        lines = _lines(out)
+        self.assertEqual(lines[0]["chunk"], "a")
+        self.assertEqual((lines[1]["id"], lines[1]["status"]), ("r1", "error"))
+        self.assertIn("set", lines[1]["message"])
+        self.assertEqual((lines[2]["id"], lines[2]["status"]), ("r2", "error"))
+        self.assertEqual(lines[3], {"id": "r3", "status": "ok"})
+
+    def test_backpressure_blocks_producer(self) -> None:
+        out = _SlowOut()
+        out.gate.clear()
+        w = StreamWriter(out, window_ms=0, max_bytes=1, max_queue=4)
+        done = threading.Event()
+
+        def produce():
+            for i in range(50):
+                w.write({"id": "r1", "status": "ok", "n": i})
+            done.set()
+
+        threading.Thread(target=produce, daemon=True).start()
+        self.assertFalse(done.wait(0.2))
+        out.gate.set()
+        self.assertTrue(done.wait(2))
+        w.close()
+        self.assertEqual(len(_lines(out)), 50)
+        self.assertGreater(w.stats()["backpressure_waits"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
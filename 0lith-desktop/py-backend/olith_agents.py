@@ -11,6 +11,8 @@ import json
 import time
 import threading
 from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 
 from olith_shared import (
     AGENT_COLORS, AGENT_EMOJIS,
@@ -21,11 +23,19 @@ from olith_memory_init import AGENTS, QDRANT_URL, check_service
 from config import OLLAMA_URL
 from olith_ollama import (
     chat_with_ollama, chat_with_ollama_stream,
-    chat_docker_pyrolith, chat_docker_pyrolith_stream,
+    chat_docker_pyrolith_stream,
+    GenerationCancelled,
 )
+from olith_residency import get_residency
+from olith_memory_queue import enqueue_memory
+from olith_lexical import hybrid_hits
+from olith_memory_filters import search_filtered, vector_search
+from olith_context import MEMORY_SHARE, OUTPUT_RESERVE, ContextAssembler, ContextOverflow, calibrate
 from olith_tools import (
     parse_tool_calls, execute_tool, tool_system_info,
-    MAX_AGENT_LOOP_ITERATIONS,
+    StreamingToolCallParser, READ_ONLY_ACTIONS,
+    run_tool_calls, timed_tool_call,
+    MAX_AGENT_LOOP_ITERATIONS, TOOL_WORKERS, tool_cache,
 )
 
 # ============================================================================
@@ -50,6 +60,19 @@ AGENT_NUM_CTX = {
     "pyrolith": 8192,
 }
 
+# Reserve de sortie dans num_ctx (generation de code longue pour les agents outilles)
+AGENT_OUTPUT_RESERVE = {
+    "monolith": 4096,
+    "aerolith": 8192,
+}
+
+# Place prevue pour les resultats d'outils : num_ctx est fixe pour toute la
+# boucle (un changement de palier ferait recharger le modele par Ollama)
+AGENT_TOOL_RESERVE = {
+    "monolith": 2048,
+    "aerolith": 4096,
+}
+
 # Agents ayant accès aux outils filesystem
 TOOL_AGENTS = {"aerolith", "monolith"}
 
@@ -234,16 +257,24 @@ def build_agent_system_prompt(agent_id: str, agent_info: dict, memories_context:
 # ============================================================================
 
 def route_hodolith(message: str) -> dict:
-    """Demande a Hodolith de router le message."""
+    """Demande a Hodolith de router le message.
+
+    "parsed": True seulement si la route vient du JSON de Hodolith (les replis
+    texte brut / par defaut ne servent pas d'exemples au FastRouter).
+    """
     try:
+        residency = get_residency()
+        residency.touch("hodolith")
         raw = chat_with_ollama(
-            "qwen3:1.7b",
+            AGENTS["hodolith"]["model"],
             [
                 {"role": "system", "content": HODOLITH_SYSTEM_PROMPT},
                 {"role": "user", "content": message + " /no_think"},
             ],
             timeout=AGENT_TIMEOUTS["hodolith"],
             num_ctx=AGENT_NUM_CTX["hodolith"],
+            keep_alive=residency.keep_alive("hodolith"),
+            cache=True,
         )
 
         raw = strip_think_blocks(raw)
@@ -261,6 +292,7 @@ def route_hodolith(message: str) -> dict:
                 candidate = raw[start:end + 1]
                 route = json.loads(candidate)
                 if "route" in route and route["route"] in AGENTS:
+                    route["parsed"] = True
                     if route["route"] == "hodolith":
                         route["route"] = "monolith"
                         route["reason"] = route.get("reason", "") + " (redirigé: hodolith → monolith)"
@@ -282,35 +314,120 @@ def route_hodolith(message: str) -> dict:
         return {"route": "monolith", "reason": f"Routage par défaut (erreur: {e})"}
 
 
+def route_message(message: str) -> dict:
+    """Routage rapide : kNN sur embeddings, Hodolith (LLM) seulement si incertain."""
+    from olith_router import get_router
+    return get_router().route(message, fallback=route_hodolith)
+
+
 # ============================================================================
 # MEMORY HELPERS
 # ============================================================================
 
-def search_memories(memory, message: str, agent_id: str) -> list[str]:
-    """Recherche les memoires pertinentes pour un agent."""
-    if not memory:
-        return []
+AGENT_MEMORY_LIMIT = 3
+SHARED_MEMORY_LIMIT = 2
 
-    memories_used = []
+# Embedding + un worker par namespace (shared + 4 agents routables)
+_MEMORY_POOL = ThreadPoolExecutor(max_workers=6, thread_name_prefix="mem-search")
+
+
+def _embed_query(memory, message: str):
+    """Embedding de la requete, calcule une fois pour tous les namespaces.
 
+    None si l'instance Mem0 n'expose pas embedding_model/vector_store :
+    chaque namespace retombe alors sur memory.search().
+    """
+    embedder = getattr(memory, "embedding_model", None)
+    if embedder is None or getattr(memory, "vector_store", None) is None:
+        return None
     try:
-        for mem in extract_memories(memory.search(message, user_id=agent_id, limit=3)):
-            text = memory_text(mem)
-            if text:
-                memories_used.append(text)
+        return embedder.embed(message, "search")
     except Exception as e:
-        log_warn("memory", f"Agent memory search failed for {agent_id}: {e}")
+        log_warn("memory", f"Query embedding failed, falling back to memory.search: {e}")
+        return None
+
+
+def _search_namespace(memory, message: str, namespace: str, limit: int, embedding: Future) -> list[str]:
+    vector = embedding.result()
+    if vector is None:
+        hits = extract_memories(memory.search(message, user_id=namespace, limit=limit))
+    else:
+        points = vector_search(memory, message, vector, limit, namespace)
+        hits = [
+            {"id": str(getattr(point, "id", "")), "memory": (getattr(point, "payload", None) or {}).get("data")}
+            for point in points
+        ]
+    # Vecteurs + BM25 (identifiants exacts : fichiers, CVE, ports...)
+    hits = hybrid_hits(memory, message, namespace, hits, limit)
+    return [t for t in (memory_text(m) for m in hits) if t]
+
+
+class MemoryPrefetch:
+    """Recherche memoire lancee avant/pendant le routage.
+
+    La requete est embeddee une seule fois, puis `shared` et chaque namespace
+    candidat sont interroges en parallele. for_agent() ne garde que le
+    namespace de l'agent choisi (les autres recherches non demarrees sont
+    annulees).
+    """
 
-    if agent_id != "shared":
+    def __init__(self, memory, message: str, agent_ids):
+        self.t0 = time.perf_counter()
+        self.wait_ms = 0.0
+        self._embedding = _MEMORY_POOL.submit(_embed_query, memory, message)
+        self._searches: dict[str, Future] = {
+            "shared": _MEMORY_POOL.submit(
+                _search_namespace, memory, message, "shared", SHARED_MEMORY_LIMIT, self._embedding),
+        }
+        for aid in agent_ids:
+            if aid != "shared":
+                self._searches[aid] = _MEMORY_POOL.submit(
+                    _search_namespace, memory, message, aid, AGENT_MEMORY_LIMIT, self._embedding)
+        self._finished: dict[str, float] = {}
+        for ns, future in self._searches.items():
+            future.add_done_callback(lambda _f, ns=ns: self._finished.setdefault(ns, time.perf_counter()))
+        self._agent: str | None = None
+
+    def _result(self, namespace: str) -> list[str]:
+        future = self._searches.get(namespace)
+        if future is None:
+            return []
         try:
-            for mem in extract_memories(memory.search(message, user_id="shared", limit=2)):
-                text = memory_text(mem)
-                if text and text not in memories_used:
-                    memories_used.append(text)
+            return future.result()
         except Exception as e:
-            log_warn("memory", f"Shared memory search failed: {e}")
+            log_warn("memory", f"Memory search failed for {namespace}: {e}")
+            return []
+
+    def for_agent(self, agent_id: str) -> list[str]:
+        """Memoires de l'agent puis `shared` (dedupliquees), comme avant."""
+        t_wait = time.perf_counter()
+        self._agent = agent_id
+        for ns, future in self._searches.items():
+            if ns not in (agent_id, "shared"):
+                future.cancel()
+        memories = list(self._result(agent_id))
+        for text in self._result("shared"):
+            if text not in memories:
+                memories.append(text)
+        self.wait_ms = round((time.perf_counter() - t_wait) * 1000, 1)
+        return memories
+
+    def stats(self) -> dict:
+        """retrieval_ms : debut -> resultats de l'agent ; wait_ms : temps bloque sur le chemin critique."""
+        ends = [self._finished[ns] for ns in (self._agent, "shared") if ns in self._finished]
+        done = max(ends) if ends else time.perf_counter()
+        return {
+            "retrieval_ms": round((done - self.t0) * 1000, 1),
+            "wait_ms": self.wait_ms,
+            "namespaces": len(self._searches),
+        }
 
-    return memories_used
+
+def search_memories(memory, message: str, agent_id: str) -> list[str]:
+    """Recherche les memoires pertinentes pour un agent."""
+    if not memory:
+        return []
+    return MemoryPrefetch(memory, message, [agent_id]).for_agent(agent_id)
 
 
 def tool_search_mem0(memory, query: str, agent_id: str) -> dict:
@@ -318,7 +435,8 @@ def tool_search_mem0(memory, query: str, agent_id: str) -> dict:
     if not memory or not query:
         return {"error": "Memory non initialisée ou query vide"}
     try:
-        memories_list = extract_memories(memory.search(query, user_id=agent_id, limit=5))
+        memories_list = extract_memories(search_filtered(memory, query, limit=5, user_id=agent_id))
+        memories_list = hybrid_hits(memory, query, agent_id, memories_list, 5)
         formatted = [memory_text(mem) or str(mem) for mem in memories_list]
         return {"results": formatted, "count": len(formatted)}
     except Exception as e:
@@ -329,15 +447,13 @@ def tool_add_mem0(memory, content: str, agent_id: str) -> dict:
     """Tool: ajoute un souvenir dans Mem0 depuis la boucle agent."""
     if not memory or not content:
         return {"error": "Memory non initialisée ou contenu vide"}
-    try:
-        memory.add(
-            content + " /no_think",
-            user_id=agent_id,
-            metadata={"type": "agent_learned", "agent_id": agent_id},
-        )
-        return {"message": "Mémoire ajoutée avec succès"}
-    except Exception as e:
-        return {"error": str(e)}
+    queued = enqueue_memory(
+        memory, content + " /no_think", agent_id,
+        metadata={"type": "agent_learned", "agent_id": agent_id},
+    )
+    if not queued:
+        return {"error": "File d'ecriture memoire pleine, reessaie plus tard"}
+    return {"message": "Mémoire enregistrée (écriture en arrière-plan)"}
 
 
 # Patterns triviaux qui ne méritent pas d'être stockés en mémoire partagée
@@ -362,6 +478,78 @@ def _is_worth_sharing(message: str) -> bool:
 # AGENT LOOP — The core: prompt → response → detect tools → execute → loop
 # ============================================================================
 
+_TOOL_POOL = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+
+
+def _tool_cache_delta(before: dict, after: dict) -> dict:
+    """Hits/misses du cache d'outils pendant ce chat (les chats sont exclusifs)."""
+    hits = after["hits"] - before["hits"]
+    misses = after["misses"] - before["misses"]
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+        "invalidations": after["invalidations"] - before["invalidations"],
+    }
+
+
+def _ms_since(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 1)
+
+
+def _dispatch_tool(tc: dict, memory, agent_id: str, project_root: str | None) -> dict:
+    """Execute un tool call (outils memoire/systeme ou filesystem)."""
+    action = tc.get("action", "")
+    tc_args = {k: v for k, v in tc.items() if k != "action"}
+    if action == "search_mem0":
+        return tool_search_mem0(memory, tc_args.get("query", ""), agent_id)
+    if action == "add_mem0":
+        return tool_add_mem0(memory, tc_args.get("content", ""), agent_id)
+    if action == "system_info":
+        return tool_system_info()
+    return execute_tool(action, tc_args, project_root)
+
+
+def _claim_early(early: list[tuple[dict, Future]], tc: dict) -> Future | None:
+    """Retire et retourne le resultat anticipe correspondant a tc, s'il existe."""
+    for i, (started, future) in enumerate(early):
+        if started == tc:
+            del early[i]
+            return future
+    return None
+
+
+def _discard_early(early: list[tuple[dict, Future]]) -> int:
+    """Annule les appels anticipes que la liste definitive n'a pas repris.
+
+    Un appel deja demarre (lecture seule) se termine ; son resultat est ignore.
+    """
+    for _, future in early:
+        future.cancel()
+    discarded = len(early)
+    early.clear()
+    return discarded
+
+
+def _assembler(agent_id: str) -> ContextAssembler:
+    return ContextAssembler(AGENTS[agent_id]["model"], AGENT_NUM_CTX.get(agent_id, 4096),
+                            AGENT_OUTPUT_RESERVE.get(agent_id, OUTPUT_RESERVE))
+
+
+def plan_num_ctx(agent_id: str, message: str) -> int | None:
+    """num_ctx de run_agent_loop, estime des le routage (preload).
+
+    Les memoires ne sont pas encore recuperees : leur part du budget est comptee pleine.
+    """
+    if agent_id not in AGENTS:
+        return None
+    assembler = _assembler(agent_id)
+    system_prompt = build_agent_system_prompt(agent_id, AGENTS[agent_id], "")
+    extra = int(assembler.prompt_budget * MEMORY_SHARE) + AGENT_TOOL_RESERVE.get(agent_id, 0)
+    return assembler.plan(system_prompt, conversation_history.get(agent_id), message,
+                          extra_tokens=extra, loaded=get_residency().loaded_num_ctx(agent_id))
+
+
 def run_agent_loop(
     agent_id: str,
     message: str,
@@ -370,15 +558,21 @@ def run_agent_loop(
     emit=None,
     route_reason: str | None = None,
     cancel_event: threading.Event | None = None,
+    memories: list[str] | None = None,
 ) -> dict:
     """Execute la boucle agent complète avec tool calls et conversation history.
 
+    memories : resultats deja recuperes (MemoryPrefetch) ; sinon recherche ici.
+
     Returns: dict avec agent_id, response, model, memories_used, tool_iterations, etc.
     """
     if agent_id not in AGENTS:
         return {"status": "error", "message": f"Unknown agent: {agent_id}"}
 
     agent_info = AGENTS[agent_id]
+    model = agent_info["model"]
+    cache_before = tool_cache.stats()
+    assembler = _assembler(agent_id)
 
     # Emit routing info
     if emit and route_reason is not None:
@@ -394,9 +588,11 @@ def run_agent_loop(
     # Recherche memoires pertinentes
     memories_context = ""
     memories_used = []
-    if memory:
+    if memories is not None or memory:
         try:
-            memories_used = search_memories(memory, message, agent_id)
+            if memories is None:
+                memories = search_memories(memory, message, agent_id)
+            memories_used = assembler.fit_memories(memories)
             if memories_used:
                 memories_context = "\n".join(f"  - {m}" for m in memories_used)
         except Exception as e:
@@ -405,27 +601,31 @@ def run_agent_loop(
     # Construction du system prompt XML
     system_prompt = build_agent_system_prompt(agent_id, agent_info, memories_context)
 
-    # Construire les messages avec historique de conversation
-    ollama_messages = [{"role": "system", "content": system_prompt}]
-
-    # Injecter l'historique de conversation (contexte des messages precedents)
+    # Historique de conversation (contexte des messages precedents) ; les
+    # messages sont reconstruits a chaque iteration sous le budget de tokens
     history = conversation_history.get(agent_id)
-    if history:
-        ollama_messages.extend(history)
+    turns: list[dict] = []
 
-    # Ajouter le message courant
-    ollama_messages.append({"role": "user", "content": message})
-
-    model = agent_info["model"]
     timeout = AGENT_TIMEOUTS.get(agent_id, 120)
-    num_ctx = AGENT_NUM_CTX.get(agent_id, 4096)
     has_tools = agent_id in TOOL_AGENTS
 
+    # num_ctx fixe pour toute la boucle ; modele en VRAM avec (attend le
+    # preload lance apres le routage, evince en LRU sinon)
+    residency = get_residency()
+    num_ctx = assembler.plan(system_prompt, history, message,
+                             extra_tokens=AGENT_TOOL_RESERVE.get(agent_id, 0),
+                             loaded=residency.loaded_num_ctx(agent_id))
+    residency.acquire(agent_id, cancel_event=cancel_event, num_ctx=num_ctx)
+    keep_alive = residency.keep_alive(agent_id)
+
     # ── Boucle agent ──
     final_response_parts = []
     iteration = 0
+    iteration_stats = []
+    run_tool = partial(_dispatch_tool, memory=memory, agent_id=agent_id, project_root=project_root)
 
     cancelled = False
+    overflow = None
 
     while iteration < MAX_AGENT_LOOP_ITERATIONS:
         iteration += 1
@@ -435,31 +635,85 @@ def run_agent_loop(
             cancelled = True
             break
 
-        # Appel Ollama
-        if agent_info.get("location") == "docker":
-            if emit and iteration == 1:
+        # Chaque iteration est streamee : l'utilisateur voit les tokens et les
+        # outils lecture seule demarres des que leur bloc JSON se ferme.
+        try:
+            ollama_messages, ctx = assembler.build(system_prompt, history, message, turns)
+        except ContextOverflow as e:
+            # Les iterations precedentes (outils deja executes) restent dans le resultat
+            log_warn("agent_loop", str(e))
+            overflow = str(e)
+            break
+        num_ctx = ctx["num_ctx"]
+        metrics: dict = {}
+
+        t_iter = time.perf_counter()
+        stats = {"iteration": iteration, "ttft_ms": None, "gen_ms": None,
+                 "tool_start_ms": [], "tool_ms": [], "early_tools": 0, "early_discarded": 0,
+                 "num_ctx": num_ctx, "prompt_tokens_est": ctx["prompt_tokens_est"],
+                 "prompt_tokens": None, "prompt_eval_ms": None,
+                 "ctx_segments": ctx["segments"], "elided": ctx["elided"],
+                 "truncated": ctx["truncated"], "history_dropped": ctx["history_dropped"],
+                 "num_predict": ctx["num_predict"], "done_reason": None}
+        parser = StreamingToolCallParser() if has_tools else None
+        early: list[tuple[dict, Future]] = []
+        write_seen = False
+
+        def _on_chunk(chunk: str) -> None:
+            nonlocal write_seen
+            if stats["ttft_ms"] is None:
+                stats["ttft_ms"] = _ms_since(t_iter)
+            if emit:
+                emit({"status": "streaming", "chunk": chunk})
+            if parser is None:
+                return
+            for tc in parser.feed(chunk):
+                # Une lecture qui suit une ecriture doit attendre celle-ci
+                if tc.get("action") not in READ_ONLY_ACTIONS:
+                    write_seen = True
+                if write_seen:
+                    continue
+                stats["early_tools"] += 1
+                early.append((tc, _TOOL_POOL.submit(timed_tool_call, run_tool, tc)))
+
+        # Appel Ollama — cancel_event coupe la connexion HTTP en cours,
+        # Ollama arrete alors la generation.
+        try:
+            if agent_info.get("location") == "docker":
                 response_text = chat_docker_pyrolith_stream(
-                    model, ollama_messages, timeout, emit, num_ctx
+                    model, ollama_messages, timeout,
+                    lambda event: _on_chunk(event["chunk"]), num_ctx, cancel_event,
+                    metrics=metrics, num_predict=ctx["num_predict"],
                 )
             else:
-                response_text = chat_docker_pyrolith(
-                    model, ollama_messages, timeout, num_ctx
-                )
-        else:
-            if emit and iteration == 1:
                 full_response = []
-                for chunk in chat_with_ollama_stream(model, ollama_messages, timeout, num_ctx):
-                    if cancel_event and cancel_event.is_set():
-                        cancelled = True
-                        break
+                for chunk in chat_with_ollama_stream(
+                    model, ollama_messages, timeout, num_ctx, cancel_event, keep_alive,
+                    metrics=metrics, num_predict=ctx["num_predict"],
+                ):
                     full_response.append(chunk)
-                    emit({"status": "streaming", "chunk": chunk})
+                    _on_chunk(chunk)
                 response_text = "".join(full_response)
-                if cancelled:
-                    final_response_parts.append(response_text)
-                    break
-            else:
-                response_text = chat_with_ollama(model, ollama_messages, timeout, num_ctx)
+        except GenerationCancelled:
+            cancelled = True
+            stats["early_discarded"] = _discard_early(early)
+            break
+        finally:
+            stats["gen_ms"] = _ms_since(t_iter)
+            stats["prompt_tokens"] = metrics.get("prompt_tokens")
+            stats["prompt_eval_ms"] = metrics.get("prompt_eval_ms")
+            stats["done_reason"] = metrics.get("done_reason")
+            iteration_stats.append(stats)
+        if stats["done_reason"] == "length":
+            log_warn("agent_loop", f"{agent_id}: generation cut at num_predict={ctx['num_predict']} "
+                                   f"(num_ctx={num_ctx})")
+        calibrate(model, ctx["prompt_tokens_est"], metrics.get("prompt_tokens"))
+
+        if cancel_event and cancel_event.is_set():
+            cancelled = True
+            stats["early_discarded"] = _discard_early(early)
+            final_response_parts.append(response_text)
+            break
 
         clean_response = strip_think_blocks(response_text)
 
@@ -468,99 +722,76 @@ def run_agent_loop(
             final_response_parts.append(clean_response)
             break
 
-        # Parser les tool calls
+        # Parser les tool calls (liste definitive, y compris les appels en ligne)
         text_part, tool_calls = parse_tool_calls(clean_response)
 
         if text_part:
             final_response_parts.append(text_part)
 
+        # Appels anticipes : repris par la liste definitive (meme appel), sinon annules
+        started = {}
+        for i, tc in enumerate(tool_calls):
+            future = _claim_early(early, tc)
+            if future is not None:
+                started[i] = future
+        stats["early_discarded"] = _discard_early(early)
+
         if not tool_calls:
             break
 
         # Executer les tool calls
-        ollama_messages.append({"role": "assistant", "content": response_text})
+        # Lectures en parallele, ecritures serialisees ; resultats dans l'ordre
 
         tool_results = []
-        for tc in tool_calls:
+        for _, tc, outcome in run_tool_calls(tool_calls, run_tool, _TOOL_POOL, project_root, started):
             action = tc.get("action", "")
-            tc_args = {k: v for k, v in tc.items() if k != "action"}
-
-            if emit:
-                emit({"status": "streaming", "chunk": f"\n`[outil: {action}]`\n"})
-
-            # Dispatch
-            if action == "search_mem0":
-                result = tool_search_mem0(memory, tc_args.get("query", ""), agent_id)
-            elif action == "add_mem0":
-                result = tool_add_mem0(memory, tc_args.get("content", ""), agent_id)
-            elif action == "system_info":
-                result = tool_system_info()
-            else:
-                result = execute_tool(action, tc_args, project_root)
-
+            result = outcome["result"]
             tool_results.append({"action": action, "result": result})
+            stats["tool_start_ms"].append(round((outcome["t0"] - t_iter) * 1000, 1))
+            stats["tool_ms"].append(outcome["ms"])
 
             if emit:
+                emit({"status": "streaming", "chunk": f"\n`[outil: {action} — {outcome['ms']:.0f} ms]`\n"})
                 result_preview = json.dumps(result, ensure_ascii=False)
                 if len(result_preview) > 300:
                     result_preview = result_preview[:300] + "..."
                 emit({"status": "streaming", "chunk": f"\n`→ {result_preview}`\n"})
 
-        # Re-injecter les resultats
-        tool_results_text = "\n\n".join(
-            f"Résultat de {tr['action']}:\n```json\n{json.dumps(tr['result'], ensure_ascii=False, indent=2)}\n```"
-            for tr in tool_results
-        )
-        ollama_messages.append({
-            "role": "user",
-            "content": f"[RÉSULTATS DES OUTILS — ne pas afficher, utilise ces données pour continuer]\n\n{tool_results_text}",
-        })
+        # Re-injectes (JSON compact) par l'assembleur a l'iteration suivante
+        turns.append({"assistant": response_text, "tool_results": tool_results})
 
     # Assembler la reponse finale
     response_text = "\n\n".join(part for part in final_response_parts if part)
 
     # Enregistrer les tags #User dans User_needed.md
-    if response_text and not cancelled:
+    if response_text and not cancelled and overflow is None:
         try:
             from olith_tasks import add_user_tags
             add_user_tags(agent_id, message, response_text)
         except Exception as e:
             log_warn("tasks", f"Failed to process #User tags: {e}")
 
-    # Sauvegarder dans l'historique de conversation (skip si cancelled sans contenu)
-    if not cancelled or response_text:
+    # Sauvegarder dans l'historique de conversation (skip si cancelled sans
+    # contenu ou tour interrompu par un debordement de contexte)
+    if overflow is None and (not cancelled or response_text):
         conversation_history.add(agent_id, "user", message)
         if response_text:
             conversation_history.add(agent_id, "assistant", response_text)
 
-    # Stockage en memoire (non-bloquant, skip si cancelled)
-    # TODO: implémenter un garbage collector qui supprime les mémoires
-    #       de type "conversation" de plus de 30 jours (mem0 metadata query)
-    result_thread = None
-    if memory and not cancelled and response_text:
-        def _store(mem, msg, aid, resp):
-            ts = int(time.time())
-            try:
-                clean = strip_think_blocks(resp)
-                mem.add(
-                    f"User: {msg}\n{aid.capitalize()}: {clean} /no_think",
-                    user_id=aid,
-                    metadata={"type": "conversation", "agent_id": aid, "timestamp": ts},
-                )
-                # Stockage shared uniquement si le message est substantiel
-                # (pas les salutations, remerciements, confirmations simples)
-                if _is_worth_sharing(msg):
-                    mem.add(
-                        f"User: {msg} /no_think",
-                        user_id="shared",
-                        metadata={"type": "conversation", "agent_id": aid, "timestamp": ts},
-                    )
-            except Exception as e:
-                log_warn("memory_store", f"Failed to store conversation for {aid}: {e}")
-
-        t = threading.Thread(target=_store, args=(memory, message, agent_id, response_text), daemon=True)
-        t.start()
-        result_thread = t
+    # Stockage en memoire (file d'ecriture, skip si cancelled)
+    # Expiration (30 jours) et doublons : olith_memory_compactor
+    if memory and not cancelled and overflow is None and response_text:
+        ts = int(time.time())
+        metadata = {"type": "conversation", "agent_id": agent_id, "timestamp": ts}
+        enqueue_memory(
+            memory,
+            f"User: {message}\n{agent_id.capitalize()}: {strip_think_blocks(response_text)} /no_think",
+            agent_id, metadata,
+        )
+        # Stockage shared uniquement si le message est substantiel
+        # (pas les salutations, remerciements, confirmations simples)
+        if _is_worth_sharing(message):
+            enqueue_memory(memory, f"User: {message} /no_think", "shared", dict(metadata))
 
     result = {
         "agent_id": agent_id,
@@ -571,9 +802,12 @@ def run_agent_loop(
         "model": model,
         "memories_used": len(memories_used),
         "tool_iterations": iteration,
+        "iterations": iteration_stats,
+        "tool_cache": _tool_cache_delta(cache_before, tool_cache.stats()),
         "cancelled": cancelled,
-        "_thread": result_thread,  # For the backend to track
     }
     if route_reason is not None:
         result["route_reason"] = route_reason
+    if overflow is not None:
+        result.update(status="error", message=overflow)
     return result
@@ -21,7 +21,7 @@ import requests
 from datetime import datetime
 from pathlib import Path
 
-from olith_ollama import chat_with_ollama, chat_docker_pyrolith
+from olith_ollama import chat_with_ollama, chat_docker_pyrolith, GenerationCancelled
 from olith_shared import strip_think_blocks, log_info, log_warn
 from config import PYROLITH_URL, PYROLITH_MODEL, CRYOLITH_MODEL, FALLBACK_MODEL
 from shared.streaming_relay import get_model_timeout, sync_call_with_fallback
@@ -103,38 +103,48 @@ def _pyrolith_available() -> bool:
         return False
 
 
-def _raw_call(messages: list[dict], model: str, is_docker: bool = False) -> str:
+def _raw_call(messages: list[dict], model: str, is_docker: bool = False, cancel_event=None) -> str:
     """Low-level LLM call with adaptive timeout. num_ctx=2048 kept small — arena prompts are short."""
     timeout = get_model_timeout(model)
     if is_docker:
-        return chat_docker_pyrolith(model, messages, timeout=timeout, num_ctx=2048)
-    return chat_with_ollama(model, messages, timeout=timeout, num_ctx=2048)
+        return chat_docker_pyrolith(model, messages, timeout=timeout, num_ctx=2048,
+                                    cancel_event=cancel_event)
+    return chat_with_ollama(model, messages, timeout=timeout, num_ctx=2048,
+                            cancel_event=cancel_event)
 
 
-def _llm_call_with_fallback(messages: list[dict], model: str, is_docker: bool = False) -> str:
+def _llm_call_with_fallback(messages: list[dict], model: str, is_docker: bool = False,
+                            cancel_event=None) -> str:
     """LLM call with automatic fallback to qwen3:14b if response too short (< 20 chars)."""
-    return sync_call_with_fallback(messages, model, is_docker=is_docker, num_ctx=2048)
+    return sync_call_with_fallback(messages, model, is_docker=is_docker, num_ctx=2048,
+                                   cancel_event=cancel_event)
 
 
-def _call_pyrolith(messages: list[dict]) -> str:
+def _call_pyrolith(messages: list[dict], cancel_event=None) -> str:
     """Call Pyrolith (Docker). Falls back to qwen3:14b if Docker is unavailable or response too short."""
     if _pyrolith_available():
         try:
-            return _llm_call_with_fallback(messages, ARENA_RED_MODEL, is_docker=True)
+            return _llm_call_with_fallback(messages, ARENA_RED_MODEL, is_docker=True,
+                                           cancel_event=cancel_event)
+        except GenerationCancelled:
+            raise
         except Exception as e:
             log_warn("arena", f"Pyrolith failed ({type(e).__name__}: {e}), falling back to qwen3:14b")
 
     log_info("arena", "Using qwen3:14b as Pyrolith fallback")
-    return _raw_call(messages, FALLBACK_MODEL, is_docker=False)
+    return _raw_call(messages, FALLBACK_MODEL, is_docker=False, cancel_event=cancel_event)
 
 
-def _call_cryolith(messages: list[dict]) -> str:
+def _call_cryolith(messages: list[dict], cancel_event=None) -> str:
     """Call Cryolith (Foundation-Sec-8B). Falls back to qwen3:14b on failure or short response."""
     try:
-        return _llm_call_with_fallback(messages, ARENA_BLUE_MODEL, is_docker=False)
+        return _llm_call_with_fallback(messages, ARENA_BLUE_MODEL, is_docker=False,
+                                       cancel_event=cancel_event)
+    except GenerationCancelled:
+        raise
     except Exception as e:
         log_warn("arena", f"Cryolith failed ({type(e).__name__}: {e}), falling back to qwen3:14b")
-        return _raw_call(messages, FALLBACK_MODEL, is_docker=False)
+        return _raw_call(messages, FALLBACK_MODEL, is_docker=False, cancel_event=cancel_event)
 
 
 def _parse_move(response: str, valid_types: list[str], forced_type: str = None) -> tuple[str, str, str]:
@@ -345,7 +355,7 @@ def run_arena_sql_injection(emit, cancel_event=None) -> dict:
         ]
         try:
             t0 = time.time()
-            red_raw = _call_pyrolith(red_messages)
+            red_raw = _call_pyrolith(red_messages, cancel_event)
             red_duration = time.time() - t0
             red_type, red_msg, red_details = _parse_move(red_raw, MOVE_TYPES_RED, forced_type=RED_SEQUENCE[round_num - 1])
             score_red += SCORE_TABLE.get(red_type, 3)
@@ -360,6 +370,10 @@ def run_arena_sql_injection(emit, cancel_event=None) -> dict:
                 "duration_s": round(red_duration, 1),
                 "score": {"red": score_red, "blue": score_blue},
             })
+        except GenerationCancelled:
+            log_info("arena", f"Round {round_num}: red move aborted by cancel")
+            _logj(log_path, {"event": "cancelled", "round": round_num, "ts": _now()})
+            break
         except Exception as e:
             log_warn("arena", f"Round {round_num} red move failed: {e}")
             _logj(log_path, {"event": "error", "round": round_num, "team": "red",
@@ -381,7 +395,7 @@ def run_arena_sql_injection(emit, cancel_event=None) -> dict:
         ]
         try:
             t0 = time.time()
-            blue_raw = _call_cryolith(blue_messages)
+            blue_raw = _call_cryolith(blue_messages, cancel_event)
             blue_duration = time.time() - t0
             blue_type, blue_msg, blue_details = _parse_move(blue_raw, MOVE_TYPES_BLUE, forced_type=BLUE_SEQUENCE[round_num - 1])
             score_blue += SCORE_TABLE.get(blue_type, 3)
@@ -396,6 +410,10 @@ def run_arena_sql_injection(emit, cancel_event=None) -> dict:
                 "duration_s": round(blue_duration, 1),
                 "score": {"red": score_red, "blue": score_blue},
             })
+        except GenerationCancelled:
+            log_info("arena", f"Round {round_num}: blue move aborted by cancel")
+            _logj(log_path, {"event": "cancelled", "round": round_num, "ts": _now()})
+            break
         except Exception as e:
             log_warn("arena", f"Round {round_num} blue move failed: {e}")
             _logj(log_path, {"event": "error", "round": round_num, "team": "blue",
@@ -422,10 +440,12 @@ def run_arena_sql_injection(emit, cancel_event=None) -> dict:
                 f"Analyse tes faiblesses tactiques."
             )},
         ]
-        red_review_raw = _call_pyrolith(red_review_msgs)
+        red_review_raw = _call_pyrolith(red_review_msgs, cancel_event)
         red_review = strip_think_blocks(red_review_raw).strip()[:500]
         _logj(log_path, {"event": "review", "team": "red",
                          "raw": red_review_raw[:2000], "review": red_review})
+    except GenerationCancelled:
+        _logj(log_path, {"event": "cancelled", "team": "red_review", "ts": _now()})
     except Exception as e:
         log_warn("arena", f"Red review failed: {e}")
         _logj(log_path, {"event": "error", "team": "red_review", "error": str(e)})
@@ -440,10 +460,12 @@ def run_arena_sql_injection(emit, cancel_event=None) -> dict:
                 f"Analyse tes lacunes défensives."
             )},
         ]
-        blue_review_raw = _call_cryolith(blue_review_msgs)
+        blue_review_raw = _call_cryolith(blue_review_msgs, cancel_event)
         blue_review = strip_think_blocks(blue_review_raw).strip()[:500]
         _logj(log_path, {"event": "review", "team": "blue",
                          "raw": blue_review_raw[:2000], "review": blue_review})
+    except GenerationCancelled:
+        _logj(log_path, {"event": "cancelled", "team": "blue_review", "ts": _now()})
     except Exception as e:
         log_warn("arena", f"Blue review failed: {e}")
         _logj(log_path, {"event": "error", "team": "blue_review", "error": str(e)})
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+0Lith V1 — Context Assembler
+==============================
+Assemble les messages envoyes a l'agent sous un budget de tokens :
+system prompt, memoires, historique, resultats d'outils.
+
+- Comptage par segment : estimation caracteres/token, recalibree par modele
+  avec le prompt_eval_count reel renvoye par Ollama.
+- Resultats d'outils en JSON compact ; un fichier relu plus tard n'est gardé
+  qu'une fois, et sous pression les corps de fichiers des iterations les plus
+  anciennes sont elides. Ceux de la derniere iteration sont tronques au
+  budget ; si le message et le system prompt seuls le depassent :
+  ContextOverflow (plutot qu'un prompt coupe en silence par Ollama).
+- num_ctx : plus petit palier suffisant pour le prompt + la reserve de sortie
+  de l'agent. Ollama recharge le modele quand num_ctx change, donc le dernier
+  palier utilise est reutilise s'il suffit et n'est pas demesure. plan()
+  le fixe avant le premier appel (le modele est charge avec) et pour toutes
+  les iterations de la boucle : les resultats d'outils tiennent dans le
+  budget de ce num_ctx au lieu de faire monter d'un palier en cours de route.
+- num_predict : place restante dans num_ctx ; une generation trop longue
+  s'arrete (done_reason "length") au lieu de decaler le contexte.
+"""
+
+import os
+import json
+import threading
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+CTX_LADDER = (2048, 4096, 8192, 16384, 32768)
+OUTPUT_RESERVE = int(os.getenv("OLITH_CTX_OUTPUT_RESERVE", "2048"))
+MEMORY_SHARE = 0.10      # part du budget prompt reservee aux memoires
+HISTORY_SHARE = 0.30     # part garantie a l'historique
+MAX_REUSE_RATIO = 4      # palier precedent reutilise jusqu'a 4x le besoin
+
+CHARS_PER_TOKEN = 3.5
+MESSAGE_OVERHEAD = 4     # tokens de template par message (role, separateurs)
+
+MIN_OUTPUT_TOKENS = 256  # num_predict minimal
+
+# Champs volumineux elidables dans les resultats d'outils
+_BODY_FIELDS = {"read_file": "content", "search_files": "results"}
+
+# Ratio reel/estime par modele (moyenne glissante)
+_calibration: dict[str, float] = {}
+_calibration_lock = threading.Lock()
+
+# Dernier num_ctx envoye par modele (celui avec lequel il est charge)
+_last_num_ctx: dict[str, int] = {}
+
+
+class ContextOverflow(ValueError):
+    """Prompt incompressible (system + message) plus grand que le budget."""
+
+
+def compact_json(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def estimate_tokens(text: str, model: str | None = None) -> int:
+    ratio = _calibration.get(model, 1.0) if model else 1.0
+    return int(len(text) / CHARS_PER_TOKEN * ratio) + 1
+
+
+def calibrate(model: str, estimated: int, actual: int | None) -> None:
+    """Ajuste l'estimation du modele avec le prompt_eval_count d'Ollama."""
+    if not actual or estimated <= 0:
+        return
+    with _calibration_lock:
+        prev = _calibration.get(model, 1.0)
+        observed = actual / (estimated / prev)   # ratio relatif a l'estimation brute
+        _calibration[model] = round(0.7 * prev + 0.3 * observed, 3)
+
+
+def pick_num_ctx(needed: int, max_ctx: int, previous: int | None = None) -> int:
+    """Plus petit palier >= needed (plafonne a max_ctx), ou le precedent s'il convient."""
+    if previous and needed <= previous <= max_ctx and previous <= needed * MAX_REUSE_RATIO:
+        return previous
+    for rung in CTX_LADDER:
+        if rung >= needed:
+            return min(rung, max_ctx)
+    return max_ctx
+
+
+def render_tool_results(tool_results: list[dict]) -> str:
+    """Message utilisateur re-injectant les resultats (JSON compact)."""
+    text = "\n\n".join(
+        f"Résultat de {tr['action']}:\n```json\n{compact_json(tr['result'])}\n```"
+        for tr in tool_results
+    )
+    return f"[RÉSULTATS DES OUTILS — ne pas afficher, utilise ces données pour continuer]\n\n{text}"
+
+
+def _elide(tr: dict, reason: str) -> dict:
+    action = tr["action"]
+    result = tr["result"]
+    field = _BODY_FIELDS.get(action)
+    if not isinstance(result, dict) or field not in result:
+        return tr
+    stub = dict(result)
+    if action == "read_file":
+        stub[field] = f"[elide: {reason}, {result.get('total_lines', '?')} lignes — relire si besoin]"
+    else:
+        stub[field] = f"[elide: {reason}, {len(result[field])} resultats — relancer si besoin]"
+    return {"action": action, "result": stub, "elided": True}
+
+
+def _truncate(tr: dict, keep: float) -> dict:
+    """Garde la fraction `keep` du corps (lignes / resultats entiers)."""
+    action = tr["action"]
+    result = tr["result"]
+    field = _BODY_FIELDS.get(action)
+    if not isinstance(result, dict) or field not in result:
+        return tr
+    stub = dict(result)
+    body = result[field]
+    if action == "read_file" and isinstance(body, str):
+        lines = body.splitlines(keepends=True)
+        kept = lines[:int(len(lines) * keep)]
+        stub[field] = "".join(kept) + (
+            f"\n[tronque: budget de contexte, {len(kept)}/{len(lines)} lignes — relire la suite si besoin]")
+    elif isinstance(body, list):
+        stub[field] = body[:int(len(body) * keep)]
+        stub["truncated"] = True
+    else:
+        return tr
+    return {"action": action, "result": stub, "elided": True}
+
+
+def _read_key(tr: dict) -> str | None:
+    if tr["action"] != "read_file" or not isinstance(tr["result"], dict):
+        return None
+    return f'{tr["result"].get("path")}:{tr["result"].get("showing")}'
+
+
+# ============================================================================
+# ASSEMBLER
+# ============================================================================
+
+class ContextAssembler:
+    """Construit les messages d'une iteration de la boucle agent.
+
+    turns : une entree par iteration precedente,
+            {"assistant": texte, "tool_results": [{"action", "result"}]}.
+    """
+
+    def __init__(self, model: str, max_ctx: int, output_reserve: int = OUTPUT_RESERVE):
+        self.model = model
+        self.max_ctx = max_ctx
+        self.output_reserve = min(output_reserve, max_ctx // 2)
+        self.prompt_budget = max_ctx - self.output_reserve
+        self.num_ctx: int | None = _last_num_ctx.get(model)
+        self.fixed = False
+
+    def _tokens(self, text: str) -> int:
+        return estimate_tokens(text, self.model) + MESSAGE_OVERHEAD
+
+    def plan(
+        self,
+        system: str,
+        history: list[dict],
+        user_message: str,
+        extra_tokens: int = 0,
+        loaded: int | None = None,
+    ) -> int:
+        """Fixe num_ctx avant le premier build, pour tous les build suivants.
+
+        extra_tokens : place a prevoir en plus (memoires pas encore recuperees,
+                       resultats d'outils des iterations suivantes).
+        loaded       : num_ctx du modele deja charge, reutilise s'il convient.
+        """
+        history_tokens = min(sum(self._tokens(m["content"]) for m in history),
+                             self.max_ctx - self.output_reserve)
+        needed = (self._tokens(system) + self._tokens(user_message) + history_tokens
+                  + extra_tokens + self.output_reserve)
+        self.num_ctx = pick_num_ctx(needed, self.max_ctx, loaded or self.num_ctx)
+        self.prompt_budget = self.num_ctx - min(self.output_reserve, self.num_ctx // 2)
+        self.fixed = True
+        return self.num_ctx
+
+    def fit_memories(self, memories: list[str]) -> list[str]:
+        """Memoires (deja triees par pertinence) dans leur part du budget."""
+        budget = int(self.prompt_budget * MEMORY_SHARE)
+        kept, used = [], 0
+        for m in memories:
+            cost = self._tokens(m)
+            if used + cost > budget:
+                break
+            kept.append(m)
+            used += cost
+        return kept
+
+    def build(
+        self,
+        system: str,
+        history: list[dict],
+        user_message: str,
+        turns: list[dict],
+    ) -> tuple[list[dict], dict]:
+        """Retourne (messages, rapport). Le rapport contient num_ctx et les tokens par segment."""
+        fixed = self._tokens(system) + self._tokens(user_message)
+        avail = max(self.prompt_budget - fixed, 0)
+
+        # 1. Une meme plage relue plus tard n'est gardee que dans sa lecture la plus recente
+        turns = [{"assistant": t["assistant"], "tool_results": list(t["tool_results"])} for t in turns]
+        seen: set[str] = set()
+        elided = 0
+        for turn in reversed(turns):
+            for i, tr in enumerate(turn["tool_results"]):
+                key = _read_key(tr)
+                if key is None:
+                    continue
+                if key in seen:
+                    turn["tool_results"][i] = _elide(tr, "relu plus loin")
+                    elided += 1
+                seen.add(key)
+
+        def _turn_cost(turn):
+            return self._tokens(turn["assistant"]) + self._tokens(render_tool_results(turn["tool_results"]))
+
+        tool_tokens = sum(_turn_cost(t) for t in turns)
+
+        # 2. Historique : part garantie, plus ce que les outils n'utilisent pas
+        history_cap = max(int(avail * HISTORY_SHARE), avail - tool_tokens)
+        kept_history = list(history)
+        history_tokens = sum(self._tokens(m["content"]) for m in kept_history)
+        dropped = 0
+        while kept_history and history_tokens > history_cap:
+            # Par paires user/assistant pour garder l'alternance
+            for _ in range(min(2, len(kept_history))):
+                history_tokens -= self._tokens(kept_history.pop(0)["content"])
+                dropped += 1
+
+        # 3. Outils : sous pression, elider les corps des iterations les plus anciennes
+        tools_cap = avail - history_tokens
+        for turn in turns[:-1]:
+            if tool_tokens <= tools_cap:
+                break
+            before = _turn_cost(turn)
+            new_results = []
+            for tr in turn["tool_results"]:
+                if not tr.get("elided") and tr["action"] in _BODY_FIELDS:
+                    new_elided = _elide(tr, "budget de contexte")
+                    elided += new_elided is not tr
+                    tr = new_elided
+                new_results.append(tr)
+            turn["tool_results"] = new_results
+            tool_tokens -= before - _turn_cost(turn)
+
+        # 4. Derniere iteration : corps tronques au budget restant
+        truncated = 0
+        if turns and tool_tokens > tools_cap:
+            last = turns[-1]
+            original = last["tool_results"]
+            before = _turn_cost(last)
+            keep = 1.0
+            for _ in range(8):
+                keep *= max(0.0, min(0.9, 1 - (tool_tokens - tools_cap) / max(before, 1)))
+                last["tool_results"] = [_truncate(tr, keep) for tr in original]
+                cost = _turn_cost(last)
+                if tool_tokens - before + cost <= tools_cap or keep == 0.0:
+                    break
+            truncated = sum(a is not b for a, b in zip(last["tool_results"], original))
+            tool_tokens += cost - before
+
+        messages = [{"role": "system", "content": system}, *kept_history,
+                    {"role": "user", "content": user_message}]
+        for turn in turns:
+            messages.append({"role": "assistant", "content": turn["assistant"]})
+            messages.append({"role": "user", "content": render_tool_results(turn["tool_results"])})
+
+        prompt_tokens = fixed + history_tokens + tool_tokens
+        limit = self.num_ctx if self.fixed else self.max_ctx
+        if prompt_tokens + MIN_OUTPUT_TOKENS > limit:
+            raise ContextOverflow(
+                f"Prompt trop long pour le contexte de {self.model} : ~{prompt_tokens} tokens "
+                f"(max {limit - MIN_OUTPUT_TOKENS})")
+        if not self.fixed:
+            self.num_ctx = pick_num_ctx(prompt_tokens + self.output_reserve, self.max_ctx, self.num_ctx)
+        _last_num_ctx[self.model] = self.num_ctx
+        report = {
+            "num_ctx": self.num_ctx,
+            "num_predict": max(self.num_ctx - prompt_tokens, MIN_OUTPUT_TOKENS),
+            "prompt_tokens_est": prompt_tokens,
+            "segments": {
+                "system": self._tokens(system),
+                "user": self._tokens(user_message),
+                "history": history_tokens,
+                "tools": tool_tokens,
+            },
+            "history_dropped": dropped,
+            "elided": elided,
+            "truncated": truncated,
+        }
+        return messages, report
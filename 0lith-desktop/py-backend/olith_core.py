@@ -7,6 +7,14 @@ Thin init: creates OlithBackend, registers all command handlers, starts the IPC
 Protocol: JSON line-delimited stdin/stdout
   Request:  {"id": "uuid", "command": "...", ...params}
   Response: {"id": "uuid", "status": "ok|error", ...data}
+
+Commands run concurrently (see ipc/dispatcher.py): responses can arrive out of
+request order and must be matched on "id".
+
+Fast startup: heavy subsystems (mem0, qdrant_client, kuzu, psutil) are imported
+on first use, and Ollama is started in a background thread — the dispatcher
+answers status/agents_list while Ollama is still coming up.
+  python olith_core.py --startup-profile   # import-time breakdown on stderr
 """
 
 import io
@@ -18,13 +26,18 @@ import threading
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
 sys.stdin = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
 
-# olith_shared applies Mem0 monkey-patch on import
-from olith_shared import log_info  # noqa: F401 (side-effect import)
-from olith_ollama import is_ollama_running, start_ollama
+# olith_shared installs the Mem0 /no_think import hook (patch applied when
+# mem0 is first imported)
+from olith_shared import log_info, ImportProfiler
+
+_profiler = ImportProfiler().install() if "--startup-profile" in sys.argv else None
+
+from olith_ollama import is_ollama_running, start_ollama, CancelToken
 from olith_history import ChatHistory
-from olith_memory_init import MEM0_CONFIG, check_qdrant_embedded
+from olith_memory_init import MEM0_CONFIG, check_qdrant
+from olith_memory_service import SERVICE_ENABLED, connect_memory_service
 
-from ipc.dispatcher import Dispatcher
+from ipc.dispatcher import Dispatcher, CONTROL, EXCLUSIVE
 from ipc.protocol import run
 
 import handlers.status as h_status
@@ -34,6 +47,9 @@ import handlers.gaming as h_gaming
 import handlers.filesystem as h_fs
 import handlers.tasks as h_tasks
 
+if _profiler:
+    _profiler.mark("imports done")
+
 
 # ============================================================================
 # BACKEND STATE
@@ -48,18 +64,110 @@ class OlithBackend:
         self._pending_threads: list[threading.Thread] = []
         self._threads_lock = threading.Lock()
         self._chat_lock = threading.Lock()
-        self._cancel_event = threading.Event()
+        # Jetons d'annulation des chats/arenas en file ou en cours (un par requete)
+        self._cancel_tokens: list[CancelToken] = []
+        self._cancel_lock = threading.Lock()
         self.history = ChatHistory()
+        self.warming = False
+        self.ollama_starting = False
+        self.qdrant_ok: bool | None = None
+        # Embedded Qdrant n'accepte qu'un client par dossier : sonde et init Mem0 sérialisées
+        self._qdrant_lock = threading.Lock()
+        # Ecritures Mem0 en processus (file, compacteur, clear) : comme _write_lock du service
+        self._memory_write_lock = threading.Lock()
 
     def _track_thread(self, thread: threading.Thread) -> None:
         with self._threads_lock:
             self._pending_threads = [t for t in self._pending_threads if t.is_alive()]
             self._pending_threads.append(thread)
 
+    def start_background_init(self, profiler: ImportProfiler | None = None) -> None:
+        """Start Ollama and pre-import qdrant_client/mem0 off the IPC path."""
+        def _mark(label: str) -> None:
+            if profiler:
+                profiler.mark(label)
+
+        def _init():
+            try:
+                if not is_ollama_running() and not self.gaming_mode:
+                    self.ollama_starting = True
+                    self.ollama_proc = start_ollama()
+                self.ollama_starting = False
+                _mark("ollama ready")
+
+                if is_ollama_running():
+                    from olith_router import get_router
+                    get_router().warm()
+                    _mark("router ready")
+
+                    from olith_agents import AGENT_NUM_CTX
+                    from olith_residency import get_residency
+                    get_residency().preload_pinned(AGENT_NUM_CTX)
+                    _mark("pinned models loaded")
+
+                with self._qdrant_lock:
+                    if self.memory is None:
+                        if SERVICE_ENABLED:
+                            # Le service ouvre Qdrant/Mem0 pendant le reste du warm-up
+                            self.qdrant_ok = connect_memory_service(wait_ready=False) is not None
+                        else:
+                            self.qdrant_ok = check_qdrant()
+                try:
+                    import mem0  # noqa: F401 (warm import — /no_think hook applies)
+                except ImportError:
+                    pass
+                # Sessions .json -> journaux .jsonl (une fois ; lecture transparente d'ici la)
+                self.history.migrate_legacy_sessions()
+                self.history.sync_catalog()
+                _mark("warm-up done")
+            finally:
+                self.ollama_starting = False
+                self.warming = False
+                if profiler:
+                    profiler.uninstall()
+                    profiler.report()
+
+        self.warming = True
+        t = threading.Thread(target=_init, name="startup-warmup", daemon=True)
+        t.start()
+        self._track_thread(t)
+
+    def _memory_for_queue(self):
+        """Mem0 pour la file d'ecriture ; None (on attend) en gaming mode."""
+        if self.gaming_mode:
+            return None
+        if self.memory is None:
+            self._init_memory_lazy()
+        return self.memory
+
+    def start_memory_queue(self) -> None:
+        """Worker d'ecriture Mem0 unique ; differe pendant un chat."""
+        from olith_memory_queue import start_memory_queue
+        start_memory_queue(self._memory_for_queue, name="core", busy_fn=self._chat_lock.locked,
+                           write_lock=self._memory_write_lock)
+
+    def start_memory_compactor(self) -> None:
+        """Compaction periodique de Mem0 ; avec le service memoire, c'est lui qui la fait."""
+        if SERVICE_ENABLED:
+            return
+        from olith_memory_compactor import start_memory_compactor
+        start_memory_compactor(self._memory_for_queue, lock=self._memory_write_lock,
+                               busy_fn=self._chat_lock.locked)
+
     def _init_memory_lazy(self) -> None:
+        with self._qdrant_lock:
+            self._init_memory_locked()
+
+    def _init_memory_locked(self) -> None:
         if self.memory:
             return
-        if not check_qdrant_embedded():
+        if SERVICE_ENABLED:
+            # Mem0 vit dans le service memoire, partage avec le watcher
+            self.memory = connect_memory_service()
+            if self.memory is not None:
+                log_info("memory", "Connected to memory service")
+            return
+        if not check_qdrant():
             return
 
         import copy
@@ -80,16 +188,27 @@ class OlithBackend:
                 lambda: Memory.from_config(config_dict=config),
                 max_retries=2, base_delay=2.0, exceptions=(Exception,),
             )
+            from olith_embed_cache import install_embedding_cache
+            from olith_lexical import install_lexical_index
+            from olith_memory_init import provision_collection
+            install_embedding_cache(self.memory)
+            install_lexical_index(self.memory)
+            provision_collection(self.memory)
             log_info("memory", "Mem0 initialized successfully")
         except Exception as e:
             log_error("memory", f"Mem0 init failed: {e}")
 
     def shutdown(self) -> None:
+        from olith_memory_queue import get_memory_queue
+        queue = get_memory_queue()
+        if queue is not None:
+            queue.stop()    # le reste est journalise et rejoue au prochain lancement
         with self._threads_lock:
             threads = list(self._pending_threads)
             self._pending_threads.clear()
         for t in threads:
             t.join(timeout=5)
+        self.history.close()
         if self.ollama_proc and self.ollama_proc.poll() is None:
             self.ollama_proc.terminate()
             try:
@@ -105,9 +224,11 @@ class OlithBackend:
 def main() -> None:
     backend = OlithBackend()
 
-    if not is_ollama_running():
-        backend.ollama_proc = start_ollama()
-
+    # Commands default to the shared pool; chat/arena and anything that
+    # rebuilds memory, stops Ollama, switches the current session or moves
+    # the project root run on the exclusive lane (never under a running
+    # chat), and cancel is answered inline so it reaches a running chat
+    # immediately.
     d = Dispatcher(backend)
 
     # Status & info
@@ -116,25 +237,28 @@ def main() -> None:
     d.register("system_info",      h_status.cmd_system_info)
 
     # Chat, cancel, arena, history
-    d.register("chat",             h_chat.cmd_chat,          needs_emit=True)
-    d.register("cancel",           h_chat.cmd_cancel)
-    d.register("arena",            h_chat.cmd_arena,         needs_emit=True)
-    d.register("clear_history",    h_chat.cmd_clear_history)
+    d.register("chat",             h_chat.cmd_chat,          needs_emit=True, mode=EXCLUSIVE,
+               on_accept=h_chat.accept_cancellable)
+    d.register("cancel",           h_chat.cmd_cancel,        mode=CONTROL)
+    d.register("arena",            h_chat.cmd_arena,         needs_emit=True, mode=EXCLUSIVE,
+               on_accept=h_chat.accept_cancellable)
+    d.register("clear_history",    h_chat.cmd_clear_history, mode=EXCLUSIVE)
     d.register("list_sessions",    h_chat.cmd_list_sessions)
-    d.register("load_session",     h_chat.cmd_load_session)
-    d.register("new_session",      h_chat.cmd_new_session)
+    d.register("load_session",     h_chat.cmd_load_session,  needs_emit=True, mode=EXCLUSIVE)
+    d.register("new_session",      h_chat.cmd_new_session,   mode=EXCLUSIVE)
+    d.register("search_history",   h_chat.cmd_search_history)
 
     # Memory
-    d.register("memory_init",      h_memory.cmd_memory_init)
+    d.register("memory_init",      h_memory.cmd_memory_init, mode=EXCLUSIVE)
     d.register("search",           h_memory.cmd_search)
     d.register("feedback",         h_memory.cmd_feedback)
-    d.register("clear_memories",   h_memory.cmd_clear_memories)
+    d.register("clear_memories",   h_memory.cmd_clear_memories, mode=EXCLUSIVE)
 
     # Gaming mode
-    d.register("gaming_mode",      h_gaming.cmd_gaming_mode)
+    d.register("gaming_mode",      h_gaming.cmd_gaming_mode, mode=EXCLUSIVE)
 
     # Filesystem
-    d.register("set_project_root", h_fs.cmd_set_project_root)
+    d.register("set_project_root", h_fs.cmd_set_project_root, mode=EXCLUSIVE)
     d.register("read_file",        h_fs.cmd_read_file)
     d.register("list_files",       h_fs.cmd_list_files)
     d.register("search_files",     h_fs.cmd_search_files)
@@ -143,6 +267,12 @@ def main() -> None:
     d.register("list_tasks",       h_tasks.cmd_list_tasks)
     d.register("resolve_tasks",    h_tasks.cmd_resolve_tasks)
 
+    if _profiler:
+        _profiler.mark("dispatcher ready")
+    backend.start_background_init(_profiler)
+    backend.start_memory_queue()
+    backend.start_memory_compactor()
+
     try:
         run(d)
     finally:
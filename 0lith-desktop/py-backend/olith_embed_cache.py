@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+0Lith V1 — Embedding Cache
+============================
+Cache d'embeddings adresse par contenu : cle = hash(modele, texte normalise).
+Evite de re-embedder les requetes repetees (messages identiques, requete
+fixe du watcher toutes les 5 min, tool_search_mem0 relances dans une boucle).
+
+Stockage sous DATA_DIR/embed_cache/, un jeu de fichiers par modele :
+    <modele>.vec   — tableau float32 memory-mappe, slots de taille fixe
+                     [cle 16 octets][dims x float32], en-tete avec generation
+    <modele>.idx   — ordre LRU persiste (cles hex, plus ancienne d'abord)
+    <modele>.lock  — verrou inter-processus des ecritures
+
+Taille plafonnee (OLITH_EMBED_CACHE_MB) : quand tous les slots sont pris,
+le moins recemment utilise est reecrit. Partage entre processus (service
+memoire, watcher, obsidian bridge) : chaque ecriture incremente la
+generation de l'en-tete, les autres processus re-indexent les cles quand
+ils la voient changer.
+
+Sans dependance au reste du backend : l'obsidian bridge charge ce fichier
+directement (importlib) pour son ollama_client.embed.
+
+OLITH_EMBED_CACHE=0 desactive le cache.
+"""
+
+import os
+import re
+import sys
+import json
+import atexit
+import mmap
+import struct
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    from config import DATA_DIR, EMBED_MODEL
+except ImportError:     # charge hors du backend (obsidian bridge)
+    DATA_DIR = os.getenv("OLITH_DATA_DIR", os.path.expanduser("~/.0lith"))
+    EMBED_MODEL = os.getenv("EMBED_MODEL", "qwen3-embedding:0.6b")
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+CACHE_ENABLED = os.getenv("OLITH_EMBED_CACHE", "1") != "0"
+CACHE_MB = float(os.getenv("OLITH_EMBED_CACHE_MB", "64"))
+CACHE_DIR = Path(DATA_DIR) / "embed_cache"
+MAX_ENTRIES = 65536          # borne le re-scan des cles (_sync)
+LRU_SAVE_EVERY = 64          # puts entre deux sauvegardes de l'ordre LRU
+
+_MAGIC = b"OLEMB1\0\0"
+_HEADER = struct.Struct("<8sIIQ")         # magic, dims, capacity, generation
+_HEADER_SIZE = 32
+_GEN_OFFSET = 16
+_KEY_SIZE = 16
+_EMPTY_KEY = bytes(_KEY_SIZE)
+_WS = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """NFC + espaces reduits : deux textes equivalents partagent leur cle."""
+    return _WS.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(model: str, text: str) -> bytes:
+    return hashlib.blake2b(f"{model}\0{normalize_text(text)}".encode("utf-8"), digest_size=_KEY_SIZE).digest()
+
+
+def _slug(model: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", model)
+
+
+@contextmanager
+def _file_lock(path: Path):
+    """Verrou exclusif inter-processus (fcntl / msvcrt)."""
+    with open(path, "a+b") as f:
+        if sys.platform == "win32":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+class EmbeddingCache:
+    """Cache LRU d'embeddings pour un modele, partage entre processus."""
+
+    def __init__(self, model: str, root: Path | str = CACHE_DIR, max_mb: float = CACHE_MB):
+        self.model = model
+        self.root = Path(root)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        slug = _slug(model)
+        self._vec_path = self.root / f"{slug}.vec"
+        self._idx_path = self.root / f"{slug}.idx"
+        self._lock_path = self.root / f"{slug}.lock"
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._mm: mmap.mmap | None = None
+        self.dims = 0
+        self.capacity = 0
+        self._slot_size = 0
+        self._vec = None
+        self._generation = -1
+        self._slots: dict[bytes, int] = {}
+        self._lru: OrderedDict[bytes, None] = OrderedDict()   # plus ancienne d'abord
+        self._free: list[int] = []
+        self._dirty = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.errors = 0
+
+    # ── Fichiers ──────────────────────────────────────────────────────────
+
+    def _map(self) -> bool:
+        """mmap du fichier existant ; False s'il n'existe pas (encore)."""
+        if self._mm is not None:
+            return True
+        if not self._vec_path.exists():
+            return False
+        f = open(self._vec_path, "r+b")
+        try:
+            mm = mmap.mmap(f.fileno(), 0)
+        except (OSError, ValueError):
+            f.close()
+            return False
+        magic, dims, capacity, _ = _HEADER.unpack_from(mm, 0)
+        if magic != _MAGIC or dims == 0 or len(mm) < _HEADER_SIZE + capacity * (_KEY_SIZE + 4 * dims):
+            mm.close()
+            f.close()
+            return False
+        self._file, self._mm = f, mm
+        self.dims, self.capacity = dims, capacity
+        self._slot_size = _KEY_SIZE + 4 * dims
+        self._vec = struct.Struct(f"<{dims}f")
+        self._load_lru()
+        return True
+
+    def _create(self, dims: int) -> None:
+        """Pre-alloue le fichier au plafond (appele sous le verrou fichier)."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        capacity = max(16, min(MAX_ENTRIES, (self.max_bytes - _HEADER_SIZE) // (_KEY_SIZE + 4 * dims)))
+        tmp = self._vec_path.with_suffix(".vec.tmp")
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, dims, capacity, 0).ljust(_HEADER_SIZE, b"\0"))
+            f.truncate(_HEADER_SIZE + capacity * (_KEY_SIZE + 4 * dims))
+        os.replace(tmp, self._vec_path)
+
+    def _load_lru(self) -> None:
+        try:
+            keys = json.loads(self._idx_path.read_text(encoding="utf-8")).get("lru", [])
+        except (OSError, ValueError):
+            keys = []
+        self._lru = OrderedDict((bytes.fromhex(k), None) for k in keys if len(k) == 2 * _KEY_SIZE)
+
+    def _save_lru(self) -> None:
+        tmp = self._idx_path.with_suffix(".idx.tmp")
+        try:
+            tmp.write_text(json.dumps({"model": self.model, "lru": [k.hex() for k in self._lru]}), encoding="utf-8")
+            os.replace(tmp, self._idx_path)
+            self._dirty = 0
+        except OSError:
+            self.errors += 1
+
+    def _lock_path_ready(self) -> Path:
+        self.root.mkdir(parents=True, exist_ok=True)
+        return self._lock_path
+
+    def _slot_offset(self, slot: int) -> int:
+        return _HEADER_SIZE + slot * self._slot_size
+
+    def _sync(self) -> None:
+        """Re-indexe les cles si un autre processus a ecrit depuis."""
+        generation = struct.unpack_from("<Q", self._mm, _GEN_OFFSET)[0]
+        if generation == self._generation:
+            return
+        slots: dict[bytes, int] = {}
+        free = []
+        mm = self._mm
+        for slot in range(self.capacity):
+            off = self._slot_offset(slot)
+            key = mm[off:off + _KEY_SIZE]
+            if key == _EMPTY_KEY:
+                free.append(slot)
+            else:
+                slots[key] = slot
+        # Ordre LRU conserve pour les cles connues, nouvelles cles = recentes
+        lru = OrderedDict((k, None) for k in self._lru if k in slots)
+        for k in slots:
+            lru.setdefault(k, None)
+        self._slots, self._lru, self._free = slots, lru, free[::-1]
+        self._generation = generation
+
+    # ── API ───────────────────────────────────────────────────────────────
+
+    def get(self, text: str) -> list[float] | None:
+        key = cache_key(self.model, text)
+        with self._lock:
+            try:
+                if not self._map():
+                    self.misses += 1
+                    return None
+                self._sync()
+                slot = self._slots.get(key)
+                if slot is not None:
+                    off = self._slot_offset(slot)
+                    vector = self._vec.unpack_from(self._mm, off + _KEY_SIZE)
+                    # Slot reecrit pendant la lecture par un autre processus ?
+                    if self._mm[off:off + _KEY_SIZE] == key:
+                        self._lru.move_to_end(key)
+                        self.hits += 1
+                        return list(vector)
+            except (OSError, ValueError, struct.error):
+                self.errors += 1
+            self.misses += 1
+            return None
+
+    def put(self, text: str, vector) -> None:
+        key = cache_key(self.model, text)
+        with self._lock:
+            try:
+                with _file_lock(self._lock_path_ready()):
+                    if not self._map():
+                        self._create(len(vector))
+                        if not self._map():
+                            return
+                    if len(vector) != self.dims:
+                        return
+                    self._sync()
+                    if key in self._slots:
+                        self._lru.move_to_end(key)
+                        return
+                    if self._free:
+                        slot = self._free.pop()
+                    else:
+                        evicted, _ = self._lru.popitem(last=False)
+                        slot = self._slots.pop(evicted)
+                        self.evictions += 1
+                    off = self._slot_offset(slot)
+                    mm = self._mm
+                    # Cle effacee, vecteur, puis cle : un lecteur concurrent ne
+                    # voit jamais une cle avec le vecteur d'une autre
+                    mm[off:off + _KEY_SIZE] = _EMPTY_KEY
+                    self._vec.pack_into(mm, off + _KEY_SIZE, *vector)
+                    mm[off:off + _KEY_SIZE] = key
+                    self._generation = struct.unpack_from("<Q", mm, _GEN_OFFSET)[0] + 1
+                    struct.pack_into("<Q", mm, _GEN_OFFSET, self._generation)
+                    self._slots[key] = slot
+                    self._lru[key] = None
+                    self.stores += 1
+            except (OSError, ValueError, struct.error):
+                self.errors += 1
+                return
+            self._dirty += 1
+            if self._dirty >= LRU_SAVE_EVERY:
+                self._save_lru()
+
+    def embed(self, text: str, embed_fn) -> list[float]:
+        """Vecteur du cache, sinon embed_fn(text) puis mise en cache."""
+        vector = self.get(text)
+        if vector is None:
+            vector = embed_fn(text)
+            self.put(text, vector)
+        return vector
+
+    def embed_many(self, texts: list[str], embed_batch_fn) -> list[list[float]]:
+        """Un seul appel embed_batch_fn pour les textes absents du cache."""
+        vectors = [self.get(t) for t in texts]
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        if missing:
+            fresh = dict(zip(missing, embed_batch_fn(missing)))
+            for t, v in fresh.items():
+                self.put(t, v)
+            vectors = [v if v is not None else fresh[t] for t, v in zip(texts, vectors)]
+        return vectors
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._mm is not None:
+                self._mm.flush()
+                if self._dirty:
+                    self._save_lru()
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._mm is not None:
+                self._mm.close()
+                self._file.close()
+                self._mm = self._file = None
+                self._generation = -1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model,
+            "entries": len(self._slots),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+
+# ============================================================================
+# MEM0
+# ============================================================================
+
+class CachedEmbedder:
+    """Enveloppe un embedder Mem0 (embed / embed_batch) avec le cache."""
+
+    def __init__(self, inner, cache: EmbeddingCache):
+        self._inner = inner
+        self._cache = cache
+
+    def embed(self, text, memory_action=None):
+        if not isinstance(text, str):
+            return self._inner.embed(text, memory_action)
+        return self._cache.embed(text, lambda t: self._inner.embed(t, memory_action))
+
+    def embed_batch(self, texts, memory_action="add"):
+        batch = getattr(self._inner, "embed_batch", None)
+        if batch is None:
+            return [self.embed(t, memory_action) for t in texts]
+        return self._cache.embed_many(list(texts), lambda missing: batch(missing, memory_action))
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+def install_embedding_cache(memory, model: str = EMBED_MODEL) -> bool:
+    """Branche le cache sur l'embedder de Mem0 (et celui du graphe s'il existe)."""
+    cache = get_embedding_cache(model)
+    if cache is None or memory is None:
+        return False
+    installed = False
+    for owner in (memory, getattr(memory, "graph", None)):
+        embedder = getattr(owner, "embedding_model", None)
+        if embedder is not None and not isinstance(embedder, CachedEmbedder):
+            owner.embedding_model = CachedEmbedder(embedder, cache)
+            installed = True
+    return installed
+
+
+# ============================================================================
+# SINGLETONS
+# ============================================================================
+
+_caches: dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model: str = EMBED_MODEL) -> EmbeddingCache | None:
+    if not CACHE_ENABLED:
+        return None
+    with _caches_lock:
+        cache = _caches.get(model)
+        if cache is None:
+            cache = _caches[model] = EmbeddingCache(model)
+        return cache
+
+
+def get_embed_cache_stats() -> dict:
+    with _caches_lock:
+        caches = list(_caches.values())
+    return {c.model: c.stats() for c in caches}
+
+
+def flush_embedding_caches() -> None:
+    with _caches_lock:
+        caches = list(_caches.values())
+    for cache in caches:
+        cache.flush()
+
+
+atexit.register(flush_embedding_caches)
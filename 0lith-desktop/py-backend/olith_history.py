@@ -2,27 +2,245 @@
 """
 0Lith V1 — Chat History Persistence
 =====================================
-Stocke les conversations en fichiers JSON dans ~/.0lith/chats/.
-Un fichier par session, nommé par date : 2026-02-21_14-30.json
+Stocke les conversations dans ~/.0lith/chats/, un fichier par session,
+nommé par date : 2026-02-21_14-30.jsonl
+
+Format journal (JSONL) : un message par ligne, ajouté en fin de fichier.
+Un ajout coûte O(1) quelle que soit la taille de la session, et un crash
+en cours d'écriture ne peut abîmer que la dernière ligne (réparée à la
+réouverture).
+
+- fsync groupé : toutes les FSYNC_BATCH lignes, sinon au plus tard après
+  FSYNC_INTERVAL_S (OLITH_HISTORY_FSYNC_BATCH / OLITH_HISTORY_FSYNC_S).
+- compact() réécrit une session de façon atomique (tmp + fsync + rename).
+- Anciennes sessions .json : lues telles quelles ; converties au premier
+  ajout, ou en une fois par migrate_legacy_sessions()
+  (python olith_history.py --migrate).
+- Index d'offsets <sid>.idx (début de chaque ligne, uint64) tenu à jour à
+  l'ajout : load_page lit la fenêtre demandée sans parcourir le journal,
+  en temps constant quelle que soit la taille de la session.
+- Catalogue SQLite/FTS5 (olith_history_catalog) tenu à jour à chaque ajout :
+  list_sessions paginé sans relire les journaux, search_history plein texte.
 """
 
+import os
 import json
 import time
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
 from pathlib import Path
 from datetime import datetime
 
+from olith_history_catalog import SessionCatalog
 from olith_shared import log_warn, log_info
 
 CHATS_DIR = Path.home() / ".0lith" / "chats"
 
+FSYNC_BATCH = int(os.getenv("OLITH_HISTORY_FSYNC_BATCH", "16"))
+FSYNC_INTERVAL_S = float(os.getenv("OLITH_HISTORY_FSYNC_S", "1.0"))
+MAX_OPEN_LOGS = 8           # sessions gardées ouvertes en ajout
+PAGE_SIZE = 50              # messages par fenêtre (load_page / stream)
+
+
+def _encode(message: dict) -> bytes:
+    return (json.dumps(message, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _fsync_dir(path: Path) -> None:
+    """Rend un rename durable (POSIX ; sans effet sous Windows)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_atomic(path: Path, messages: list[dict]) -> None:
+    """Écrit une session complète : tmp + fsync + rename."""
+    tmp = path.with_suffix(".jsonl.tmp")
+    with open(tmp, "wb") as f:
+        f.write(b"".join(_encode(m) for m in messages))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(path.parent)
+
+
+def read_jsonl(path: Path) -> list[dict]:
+    """Messages d'un journal ; les lignes illisibles (fin tronquée) sont ignorées."""
+    messages = []
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                messages.append(json.loads(line))
+            except ValueError:
+                continue
+    return messages
+
+
+def _repair_tail(path: Path) -> bool:
+    """Tronque une dernière ligne incomplète (crash pendant un ajout)."""
+    size = path.stat().st_size
+    if not size:
+        return False
+    with open(path, "rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) == b"\n":
+            return False
+        # Remonte jusqu'au dernier saut de ligne
+        pos = size
+        while pos > 0:
+            step = min(4096, pos)
+            f.seek(pos - step)
+            chunk = f.read(step)
+            idx = chunk.rfind(b"\n")
+            if idx >= 0:
+                pos = pos - step + idx + 1
+                break
+            pos -= step
+        f.truncate(max(pos, 0))
+    log_warn("history", f"Truncated partial last line in {path.name}")
+    return True
+
+
+# ── Index d'offsets ───────────────────────────────────────────────────────
+
+def _offsets_path(path: Path) -> Path:
+    return path.with_suffix(".idx")
+
+
+def build_offsets(path: Path) -> array:
+    """Début de chaque ligne complète du journal (un parcours)."""
+    offsets, pos = array("Q"), 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offsets.append(pos)
+            pos += len(line)
+    return offsets
+
+
+def _offsets_valid(path: Path, idx: Path) -> bool:
+    """L'index couvre exactement le journal : sa dernière entrée pointe sur la dernière ligne."""
+    size = path.stat().st_size if path.exists() else 0
+    idx_size = idx.stat().st_size if idx.exists() else -1
+    if idx_size < 0 or idx_size % 8:
+        return False
+    if idx_size == 0:
+        return size == 0
+    with open(idx, "rb") as f:
+        f.seek(-8, os.SEEK_END)
+        last = array("Q", f.read(8))[0]
+    if last >= size:
+        return False
+    with open(path, "rb") as f:
+        f.seek(max(last - 1, 0))
+        tail = f.read()
+    if last:
+        if tail[:1] != b"\n":
+            return False
+        tail = tail[1:]
+    return tail.endswith(b"\n") and tail.count(b"\n") == 1
+
+
+def _rebuild_offsets(path: Path) -> None:
+    _offsets_path(path).unlink(missing_ok=True)
+    ensure_offsets(path)
+
+
+def ensure_offsets(path: Path) -> int:
+    """Reconstruit l'index s'il manque ou ne correspond plus ; retourne le nombre de lignes."""
+    idx = _offsets_path(path)
+    if not _offsets_valid(path, idx):
+        offsets = build_offsets(path) if path.exists() else array("Q")
+        tmp = idx.with_suffix(".idx.tmp")
+        tmp.write_bytes(offsets.tobytes())
+        os.replace(tmp, idx)
+        return len(offsets)
+    return idx.stat().st_size // 8
+
+
+def read_lines(path: Path, start: int, end: int) -> list[dict]:
+    """Messages des lignes [start, end) via l'index (deux lectures ciblées)."""
+    if end <= start:
+        return []
+    with open(_offsets_path(path), "rb") as f:
+        f.seek(start * 8)
+        offsets = array("Q", f.read((end - start + 1) * 8))
+    with open(path, "rb") as f:
+        f.seek(offsets[0])
+        chunk = f.read(offsets[end - start] - offsets[0]) if len(offsets) > end - start else f.read()
+    messages = []
+    for line in chunk.splitlines():
+        try:
+            messages.append(json.loads(line))
+        except ValueError:
+            continue
+    return messages
+
+
+class _SessionLog:
+    """Journal d'une session ouvert en ajout, avec son index d'offsets."""
+
+    __slots__ = ("path", "file", "index", "unsynced")
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.file = open(path, "ab")
+        ensure_offsets(path)
+        self.index = open(_offsets_path(path), "ab")
+        self.unsynced = 0
+
+    def append(self, parts: list[bytes]) -> None:
+        offsets, pos = array("Q"), self.file.tell()
+        for part in parts:
+            offsets.append(pos)
+            pos += len(part)
+        self.file.write(b"".join(parts))
+        self.file.flush()       # visible des lecteurs ; durable au prochain fsync
+        self.index.write(offsets.tobytes())
+        self.index.flush()      # reconstructible : jamais fsync
+        self.unsynced += len(parts)
+
+    def sync(self) -> bool:
+        if not self.unsynced:
+            return False
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        return True
+
+    def close(self) -> None:
+        try:
+            self.sync()
+        finally:
+            self.file.close()
+            self.index.close()
+
 
 class ChatHistory:
     def __init__(self, chats_dir: Path = CHATS_DIR):
         self.chats_dir = chats_dir
         self.chats_dir.mkdir(parents=True, exist_ok=True)
         self._current_session: str | None = None
+        self._lock = threading.RLock()
+        self._logs: OrderedDict[str, _SessionLog] = OrderedDict()
+        self._timer: threading.Timer | None = None
+        self._catalog: SessionCatalog | None = None
+        self._catalog_failed = False
+        self.stats = {"appends": 0, "fsyncs": 0, "compactions": 0, "migrated": 0}
 
     def _session_path(self, session_id: str) -> Path:
+        return self.chats_dir / f"{session_id}.jsonl"
+
+    def _legacy_path(self, session_id: str) -> Path:
         return self.chats_dir / f"{session_id}.json"
 
     def _ensure_session(self) -> str:
@@ -36,59 +254,289 @@ class ChatHistory:
         self._current_session = datetime.now().strftime("%Y-%m-%d_%H-%M")
         return self._current_session
 
+    # ── Écriture ──────────────────────────────────────────────────────────
+
     def save_message(self, session_id: str | None, message: dict) -> str:
         """Ajoute un message à une session. Retourne le session_id utilisé."""
+        return self.save_messages(session_id, [message])
+
+    def save_messages(self, session_id: str | None, messages: list[dict]) -> str:
+        """Ajoute plusieurs messages en une écriture (ex. question + réponse)."""
         sid = session_id or self._ensure_session()
+        now = int(time.time() * 1000)
+        stamped = [{**m, "timestamp": m.get("timestamp", now)} for m in messages]
+        parts = [_encode(m) for m in stamped]
+        with self._lock:
+            try:
+                log = self._open_log(sid)
+                size_before = log.file.tell()
+                log.append(parts)
+                self.stats["appends"] += len(stamped)
+                self._index(sid, stamped, size_before, log.file.tell())
+                if log.unsynced >= FSYNC_BATCH:
+                    self._sync(log)
+                else:
+                    self._schedule_flush()
+            except OSError as e:
+                log_warn("history", f"Failed to write {sid}: {e}")
+        return sid
+
+    def _open_log(self, sid: str) -> _SessionLog:
+        log = self._logs.get(sid)
+        if log is not None:
+            self._logs.move_to_end(sid)
+            return log
         path = self._session_path(sid)
+        if not path.exists() and self._legacy_path(sid).exists():
+            self._migrate_locked(sid)
+        elif path.exists():
+            _repair_tail(path)
+        log = self._logs[sid] = _SessionLog(path)
+        while len(self._logs) > MAX_OPEN_LOGS:
+            _, oldest = self._logs.popitem(last=False)
+            self._close_log(oldest)
+        return log
 
-        data = {"session_id": sid, "messages": []}
-        if path.exists():
-            try:
-                data = json.loads(path.read_text(encoding="utf-8"))
-            except (json.JSONDecodeError, OSError) as e:
-                log_warn("history", f"Failed to read {path.name}: {e}")
+    # ── Catalogue ─────────────────────────────────────────────────────────
 
-        msg = {**message, "timestamp": message.get("timestamp", int(time.time() * 1000))}
-        data["messages"].append(msg)
-        data["updated_at"] = int(time.time() * 1000)
+    def _get_catalog(self) -> SessionCatalog | None:
+        """Catalogue ouvert et aligné sur les journaux au premier usage."""
+        with self._lock:
+            if self._catalog is None and not self._catalog_failed:
+                catalog = None
+                try:
+                    catalog = SessionCatalog(self.chats_dir / "catalog.sqlite3")
+                    catalog.sync(self.chats_dir, self.load_session)
+                    self._catalog = catalog
+                except (sqlite3.Error, OSError) as e:
+                    self._catalog_failed = True
+                    if catalog is not None:
+                        catalog.close()
+                    log_warn("history", f"Session catalog unavailable, scanning files: {e}")
+            return self._catalog
 
+    def _index(self, sid: str, messages: list[dict], size_before: int, size_after: int) -> None:
+        catalog = self._get_catalog()
+        if catalog is None:
+            return
         try:
-            path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-        except OSError as e:
-            log_warn("history", f"Failed to write {path.name}: {e}")
+            known = catalog.log_size(sid)
+            if known == size_before or (known is None and size_before == 0):
+                catalog.add_messages(sid, messages, size_after)
+            else:
+                # Journal modifié hors catalogue (migration, réparation) : ré-indexé en entier
+                catalog.reindex(sid, read_jsonl(self._session_path(sid)), size_after)
+        except sqlite3.Error as e:
+            log_warn("history", f"Catalog update failed for {sid}: {e}")
 
-        return sid
+    def _reindex(self, sid: str, messages: list[dict]) -> None:
+        """Après réécriture d'une session ; sinon repris par sync() à l'ouverture."""
+        if self._catalog is None:
+            return
+        try:
+            self._catalog.reindex(sid, messages, self._session_path(sid).stat().st_size)
+        except (sqlite3.Error, OSError) as e:
+            log_warn("history", f"Catalog update failed for {sid}: {e}")
+
+    def sync_catalog(self) -> dict | None:
+        """Ré-aligne le catalogue sur les journaux (démarrage)."""
+        catalog = self._get_catalog()
+        if catalog is None:
+            return None
+        with self._lock:
+            return catalog.sync(self.chats_dir, self.load_session)
+
+    def _sync(self, log: _SessionLog) -> None:
+        if log.sync():
+            self.stats["fsyncs"] += 1
+
+    def _close_log(self, log: _SessionLog) -> None:
+        if log.unsynced:
+            self.stats["fsyncs"] += 1
+        log.close()
+
+    def _schedule_flush(self) -> None:
+        if self._timer is None:
+            self._timer = threading.Timer(FSYNC_INTERVAL_S, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        """fsync des journaux ayant des lignes non synchronisées."""
+        with self._lock:
+            self._timer = None
+            for log in self._logs.values():
+                try:
+                    self._sync(log)
+                except OSError as e:
+                    log_warn("history", f"fsync failed for {log.path.name}: {e}")
+
+    def close(self) -> None:
+        """fsync et fermeture des journaux (arrêt du backend)."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            while self._logs:
+                _, log = self._logs.popitem()
+                try:
+                    self._close_log(log)
+                except OSError as e:
+                    log_warn("history", f"Failed to close {log.path.name}: {e}")
+            if self._catalog is not None:
+                self._catalog.close()
+                self._catalog = None
+
+    # ── Maintenance ───────────────────────────────────────────────────────
+
+    def compact(self, session_id: str) -> int:
+        """Réécrit une session (lignes valides seulement) de façon atomique."""
+        with self._lock:
+            log = self._logs.pop(session_id, None)
+            if log is not None:
+                self._close_log(log)
+            path = self._session_path(session_id)
+            if not path.exists():
+                return 0
+            messages = read_jsonl(path)
+            write_atomic(path, messages)
+            _rebuild_offsets(path)
+            self._reindex(session_id, messages)
+            self.stats["compactions"] += 1
+            return len(messages)
+
+    def _migrate_locked(self, sid: str) -> int:
+        legacy = self._legacy_path(sid)
+        data = json.loads(legacy.read_text(encoding="utf-8"))
+        messages = data.get("messages", [])
+        write_atomic(self._session_path(sid), messages)
+        _rebuild_offsets(self._session_path(sid))
+        legacy.unlink()
+        self._reindex(sid, messages)
+        self.stats["migrated"] += 1
+        return len(messages)
+
+    def migrate_legacy_sessions(self) -> int:
+        """Convertit toutes les sessions .json en journaux .jsonl (une fois)."""
+        migrated = 0
+        for legacy in sorted(self.chats_dir.glob("*.json")):
+            with self._lock:
+                if self._session_path(legacy.stem).exists():
+                    continue
+                try:
+                    self._migrate_locked(legacy.stem)
+                    migrated += 1
+                except (ValueError, OSError) as e:
+                    log_warn("history", f"Failed to migrate {legacy.name}: {e}")
+        if migrated:
+            log_info("history", f"Migrated {migrated} session(s) to JSONL")
+        return migrated
+
+    # ── Lecture ───────────────────────────────────────────────────────────
 
     def load_session(self, session_id: str) -> list[dict]:
-        """Charge tous les messages d'une session."""
+        """Charge tous les messages d'une session (.jsonl, ou ancien .json)."""
         path = self._session_path(session_id)
-        if not path.exists():
-            return []
         try:
-            data = json.loads(path.read_text(encoding="utf-8"))
-            return data.get("messages", [])
+            if path.exists():
+                return read_jsonl(path)
+            legacy = self._legacy_path(session_id)
+            if legacy.exists():
+                return json.loads(legacy.read_text(encoding="utf-8")).get("messages", [])
         except (json.JSONDecodeError, OSError) as e:
-            log_warn("history", f"Failed to load {path.name}: {e}")
+            log_warn("history", f"Failed to load {session_id}: {e}")
+        return []
+
+    def load_page(self, session_id: str, before: int | None = None, limit: int = PAGE_SIZE) -> dict:
+        """Fenêtre de messages, la plus récente d'abord.
+
+        before : curseur (rang du premier message déjà chargé) ; None = fin de session.
+        Retourne les messages [start, before) dans l'ordre chronologique, le total
+        et le curseur de la fenêtre précédente (None une fois le début atteint).
+        """
+        path = self._session_path(session_id)
+        with self._lock:
+            if path.exists():
+                try:
+                    total = ensure_offsets(path)
+                    end = total if before is None else max(min(before, total), 0)
+                    start = max(end - limit, 0)
+                    messages = read_lines(path, start, end)
+                except OSError as e:
+                    log_warn("history", f"Failed to load {session_id}: {e}")
+                    return {"messages": [], "total": 0, "cursor": None}
+            else:
+                # Ancien .json : pas d'index, découpé après lecture complète
+                everything = self.load_session(session_id)
+                total = len(everything)
+                end = total if before is None else max(min(before, total), 0)
+                start = max(end - limit, 0)
+                messages = everything[start:end]
+        return {"messages": messages, "total": total, "cursor": start or None}
+
+    def iter_pages(self, session_id: str, limit: int = PAGE_SIZE, before: int | None = None):
+        """Fenêtres successives jusqu'au début de la session (mode streamé)."""
+        while True:
+            page = self.load_page(session_id, before, limit)
+            if page["messages"] or page["cursor"] is not None:
+                yield page
+            if page["cursor"] is None:
+                return
+            before = page["cursor"]
+
+    def list_sessions(self, offset: int = 0, limit: int | None = None) -> list[dict]:
+        """Liste les sessions, triées par date décroissante."""
+        return self.list_sessions_page(offset, limit)["sessions"]
+
+    def list_sessions_page(self, offset: int = 0, limit: int | None = None) -> dict:
+        """Page de sessions + total, depuis le catalogue."""
+        catalog = self._get_catalog()
+        if catalog is not None:
+            try:
+                sessions, total = catalog.list_sessions(offset, limit)
+                return {"sessions": sessions, "total": total}
+            except sqlite3.Error as e:
+                log_warn("history", f"Catalog query failed, scanning files: {e}")
+        sessions = self._scan_sessions()
+        end = None if limit is None else offset + limit
+        return {"sessions": sessions[offset:end], "total": len(sessions)}
+
+    def search_history(self, query: str, agent_id: str | None = None, since: int | None = None,
+                       until: int | None = None, limit: int = 20) -> list[dict]:
+        """Recherche plein texte dans toutes les sessions (extraits classés)."""
+        catalog = self._get_catalog()
+        if catalog is None:
             return []
+        return catalog.search(query, agent_id=agent_id, since=since, until=until, limit=limit)
 
-    def list_sessions(self) -> list[dict]:
-        """Liste toutes les sessions, triées par date décroissante."""
+    def _scan_sessions(self) -> list[dict]:
+        """Sans catalogue : relit chaque session."""
+        files = {f.stem: f for f in self.chats_dir.glob("*.json")}
+        files.update({f.stem: f for f in self.chats_dir.glob("*.jsonl")})
         sessions = []
-        for f in sorted(self.chats_dir.glob("*.json"), reverse=True):
-            try:
-                data = json.loads(f.read_text(encoding="utf-8"))
-                msgs = data.get("messages", [])
-                first_user = next((m for m in msgs if m.get("type") == "user"), None)
-                sessions.append({
-                    "session_id": f.stem,
-                    "message_count": len(msgs),
-                    "preview": (first_user["content"][:80] if first_user else ""),
-                    "updated_at": data.get("updated_at", 0),
-                })
-            except (json.JSONDecodeError, OSError):
+        for sid in sorted(files, reverse=True):
+            msgs = self.load_session(sid)
+            if not msgs and files[sid].suffix == ".json":
                 continue
+            first_user = next((m for m in msgs if m.get("type") == "user"), None)
+            sessions.append({
+                "session_id": sid,
+                "message_count": len(msgs),
+                "preview": (first_user["content"][:80] if first_user else ""),
+                "updated_at": msgs[-1].get("timestamp", 0) if msgs else 0,
+            })
         return sessions
 
     @property
     def current_session(self) -> str | None:
         return self._current_session
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="0Lith — sessions de chat")
+    parser.add_argument("--migrate", action="store_true", help="Convertir les sessions .json en .jsonl")
+    args = parser.parse_args()
+    if args.migrate:
+        print(f"{ChatHistory().migrate_legacy_sessions()} session(s) migrated")
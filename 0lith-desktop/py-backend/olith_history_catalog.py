@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+0Lith V1 — Chat Session Catalog
+=================================
+Catalogue SQLite des sessions de chat (~/.0lith/chats/catalog.sqlite3),
+tenu à jour à chaque ajout par ChatHistory :
+
+- sessions     : compteur, aperçu, dates, taille du journal indexée
+- messages     : une ligne par message (session, rang, type, agent, date)
+- messages_fts : index plein texte FTS5 (accents ignorés) pour search_history
+
+Les fichiers de session restent la source de vérité : sync() ré-indexe les
+sessions dont la taille a changé hors catalogue (crash, copie manuelle) et
+oublie celles dont le fichier a disparu.
+"""
+
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+from olith_shared import log_info
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id    TEXT PRIMARY KEY,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    preview       TEXT NOT NULL DEFAULT '',
+    created_at    INTEGER NOT NULL DEFAULT 0,
+    updated_at    INTEGER NOT NULL DEFAULT 0,
+    log_size      INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id         INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    seq        INTEGER NOT NULL,
+    type       TEXT,
+    agent_id   TEXT,
+    timestamp  INTEGER,
+    content    TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS messages_session ON messages(session_id, seq);
+CREATE INDEX IF NOT EXISTS messages_time ON messages(timestamp);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    content, content='messages', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+"""
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_query(text: str) -> str:
+    """Texte libre -> requête FTS5 sûre : mots entre guillemets (ET), préfixe sur le dernier."""
+    words = _WORD.findall(text)
+    if not words:
+        return ""
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+class SessionCatalog:
+    """Métadonnées + index plein texte des sessions."""
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    # ── Écriture ──────────────────────────────────────────────────────────
+
+    def add_messages(self, session_id: str, messages: list[dict], log_size: int) -> None:
+        """Indexe des messages ajoutés en fin de session."""
+        with self._lock, self._db:
+            self._insert_locked(session_id, messages, log_size)
+
+    def _insert_locked(self, session_id: str, messages: list[dict], log_size: int) -> None:
+        row = self._db.execute(
+            "SELECT message_count, preview, created_at FROM sessions WHERE session_id = ?", (session_id,),
+        ).fetchone()
+        count, preview, created = row if row else (0, "", 0)
+        self._db.executemany(
+            "INSERT INTO messages(session_id, seq, type, agent_id, timestamp, content) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (session_id, count + i, m.get("type"), m.get("agent_id"), m.get("timestamp"),
+                 m.get("content") if isinstance(m.get("content"), str) else "")
+                for i, m in enumerate(messages)
+            ],
+        )
+        if not preview:
+            first_user = next((m for m in messages if m.get("type") == "user"), None)
+            preview = first_user["content"][:80] if first_user else ""
+        timestamps = [m.get("timestamp") or 0 for m in messages]
+        updated = timestamps[-1] if timestamps else 0
+        self._db.execute(
+            "INSERT INTO sessions(session_id, message_count, preview, created_at, updated_at, log_size) "
+            "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(session_id) DO UPDATE SET "
+            "message_count = excluded.message_count, preview = excluded.preview, "
+            "updated_at = MAX(sessions.updated_at, excluded.updated_at), log_size = excluded.log_size",
+            (session_id, count + len(messages), preview, created or (timestamps[0] if timestamps else 0),
+             updated, log_size),
+        )
+
+    def log_size(self, session_id: str) -> int | None:
+        """Taille du journal au dernier indexage (None : session inconnue)."""
+        with self._lock:
+            row = self._db.execute("SELECT log_size FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def reindex(self, session_id: str, messages: list[dict], log_size: int) -> None:
+        """Remplace l'index d'une session (compaction, reprise après crash)."""
+        with self._lock, self._db:
+            self._delete_locked(session_id)
+            self._insert_locked(session_id, messages, log_size)
+
+    def _delete_locked(self, session_id: str) -> None:
+        self._db.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+        self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def sync(self, chats_dir: Path, read_fn) -> dict:
+        """Aligne le catalogue sur les fichiers de session (taille comme témoin)."""
+        with self._lock:
+            indexed = dict(self._db.execute("SELECT session_id, log_size FROM sessions"))
+        # Anciennes sessions .json indexées aussi ; le .jsonl l'emporte s'il existe
+        on_disk = {f.stem: f.stat().st_size for f in chats_dir.glob("*.json")}
+        on_disk.update({f.stem: f.stat().st_size for f in chats_dir.glob("*.jsonl")})
+        stale = [sid for sid in indexed if sid not in on_disk]
+        changed = [sid for sid, size in on_disk.items() if indexed.get(sid) != size]
+        if stale:
+            with self._lock, self._db:
+                for sid in stale:
+                    self._delete_locked(sid)
+        for sid in changed:
+            self.reindex(sid, read_fn(sid), on_disk[sid])
+        if stale or changed:
+            log_info("history", f"Catalog synced: {len(changed)} reindexed, {len(stale)} removed")
+        return {"reindexed": len(changed), "removed": len(stale), "sessions": len(on_disk)}
+
+    # ── Lecture ───────────────────────────────────────────────────────────
+
+    def list_sessions(self, offset: int = 0, limit: int | None = None) -> tuple[list[dict], int]:
+        """Sessions les plus récentes d'abord (nom = date) ; retourne (page, total)."""
+        with self._lock:
+            total = self._db.execute("SELECT COUNT(*) FROM sessions WHERE message_count > 0").fetchone()[0]
+            rows = self._db.execute(
+                "SELECT session_id, message_count, preview, updated_at FROM sessions "
+                "WHERE message_count > 0 ORDER BY session_id DESC LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset),
+            ).fetchall()
+        sessions = [
+            {"session_id": sid, "message_count": count, "preview": preview, "updated_at": updated}
+            for sid, count, preview, updated in rows
+        ]
+        return sessions, total
+
+    def search(self, query: str, agent_id: str | None = None, since: int | None = None,
+               until: int | None = None, limit: int = 20) -> list[dict]:
+        """Messages correspondant à la requête, les plus pertinents d'abord (BM25)."""
+        match = fts_query(query)
+        if not match:
+            return []
+        sql = (
+            "SELECT m.session_id, m.seq, m.type, m.agent_id, m.timestamp, "
+            "snippet(messages_fts, 0, '[', ']', '…', 12), bm25(messages_fts) "
+            "FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid "
+            "WHERE messages_fts MATCH ?"
+        )
+        params: list = [match]
+        if agent_id:
+            sql += " AND m.agent_id = ?"
+            params.append(agent_id)
+        if since is not None:
+            sql += " AND m.timestamp >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND m.timestamp < ?"
+            params.append(until)
+        sql += " ORDER BY bm25(messages_fts) LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [
+            {"session_id": sid, "seq": seq, "type": type_, "agent_id": agent, "timestamp": ts,
+             "snippet": snippet, "score": round(-rank, 3)}
+            for sid, seq, type_, agent, ts, snippet, rank in rows
+        ]
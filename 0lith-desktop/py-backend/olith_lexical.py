@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+0Lith V1 — Lexical Memory Index
+=================================
+Index BM25 du texte des memoires, a cote de la collection Qdrant de Mem0.
+La similarite vectorielle rate les identifiants exacts (noms de fichiers,
+CVE, fonctions, ports) : la recherche hybride fusionne les deux classements
+par Reciprocal Rank Fusion (RRF).
+
+- Tokenisation orientee identifiants : "CVE-2024-3094" et "olith_core.py"
+  restent des tokens entiers, plus leurs morceaux.
+- Un shard par namespace (user_id) : les recherches sont toujours filtrees.
+- Mise a jour incrementale : IndexedVectorStore enveloppe le vector store de
+  Mem0 (insert / update / delete) ; sync() reconcilie avec Qdrant au
+  demarrage et apres une compaction.
+- Persiste sous DATA_DIR/lexical/<collection>.json (textes seulement ; les
+  postings sont reconstruits au chargement).
+
+OLITH_LEXICAL=0 desactive l'index (recherche vectorielle seule).
+"""
+
+import os
+import re
+import json
+import math
+import atexit
+import threading
+import unicodedata
+from collections import Counter
+from pathlib import Path
+
+from config import DATA_DIR
+from olith_shared import log_info, log_warn
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+LEXICAL_ENABLED = os.getenv("OLITH_LEXICAL", "1") != "0"
+LEXICAL_DIR = Path(DATA_DIR) / "lexical"
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+COMMON_TERM_RATIO = 0.05    # au-dela, un terme ne fait que re-noter les candidats
+SAVE_EVERY = 200            # modifications entre deux sauvegardes
+
+_TOKEN = re.compile(r"[a-z0-9_]+(?:[.\-:/@][a-z0-9_]+)*")
+_SPLIT = re.compile(r"[.\-:/@_]+")
+_STOPWORDS = frozenset(
+    "le la les de des du un une et ou en est que qui dans pour sur par avec pas ce cette ces "
+    "il elle je tu nous vous ils au aux se sa son ses mon ma mes ne plus "
+    "the a an of to in is are and or for on with by be it this that as at from not".split()
+)
+
+
+def _fold(text: str) -> str:
+    """Minuscules sans accents."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for match in _TOKEN.finditer(_fold(text)):
+        token = match.group()
+        if token not in _STOPWORDS and (len(token) > 1 or token.isdigit()):
+            tokens.append(token)
+        parts = [p for p in _SPLIT.split(token) if p]
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p not in _STOPWORDS and len(p) > 1)
+    return tokens
+
+
+def rrf_fuse(rankings: list[list], k: int = RRF_K) -> list:
+    """Reciprocal Rank Fusion de plusieurs classements de cles."""
+    scores: dict = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def fuse_results(vector_hits: list[dict], lexical_hits: list[dict], limit: int) -> list[dict]:
+    """Fusion RRF de resultats {"id", "memory", ...} ; un doublon garde sa version vectorielle."""
+    by_key: dict = {}
+    rankings = []
+    for hits in (vector_hits, lexical_hits):
+        ranking = []
+        for hit in hits:
+            key = str(hit.get("id") or hit.get("memory"))
+            by_key.setdefault(key, hit)
+            ranking.append(key)
+        rankings.append(ranking)
+    return [by_key[key] for key in rrf_fuse(rankings)[:limit]]
+
+
+# ============================================================================
+# INDEX
+# ============================================================================
+
+class _Shard:
+    """Postings BM25 d'un namespace."""
+
+    __slots__ = ("postings", "lengths", "total_len")
+
+    def __init__(self):
+        self.postings: dict[str, dict[str, int]] = {}
+        self.lengths: dict[str, int] = {}
+        self.total_len = 0
+
+    def add(self, doc_id: str, tokens: list[str]) -> None:
+        for term, tf in Counter(tokens).items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+        self.lengths[doc_id] = len(tokens)
+        self.total_len += len(tokens)
+
+    def remove(self, doc_id: str, tokens: list[str]) -> None:
+        for term in set(tokens):
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+        self.total_len -= self.lengths.pop(doc_id, 0)
+
+    def search(self, terms: list[str], limit: int) -> list[tuple[str, float]]:
+        n = len(self.lengths)
+        if not n:
+            return []
+        avg_len = self.total_len / n or 1.0
+        scores: dict[str, float] = {}
+        postings = sorted(filter(None, (self.postings.get(t) for t in set(terms))), key=len)
+        for posting in postings:
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            # Termes frequents ("py", "cve"...) : ne notent que les candidats
+            # deja trouves par les termes selectifs, sans parcourir leur posting
+            if scores and len(posting) > COMMON_TERM_RATIO * n:
+                docs = [(d, posting[d]) for d in scores if d in posting]
+            else:
+                docs = posting.items()
+            for doc_id, tf in docs:
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[doc_id] / avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+        best = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        return best[:limit]
+
+
+class LexicalIndex:
+    """Index BM25 des memoires (id Qdrant -> namespace, texte)."""
+
+    def __init__(self, path: Path | str | None = None):
+        self.path = None
+        self._lock = threading.RLock()
+        self._docs: dict[str, tuple[str, str]] = {}
+        self._shards: dict[str, _Shard] = {}
+        self._dirty = 0
+        self.searches = 0
+        if path is not None:
+            self._load(Path(path))          # avant self.path : pas de sauvegarde pendant le chargement
+            self.path = Path(path)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # ── Mise a jour ───────────────────────────────────────────────────────
+
+    def add(self, doc_id, user_id: str | None, text: str | None) -> None:
+        doc_id = str(doc_id)
+        with self._lock:
+            self._remove_locked(doc_id)
+            if not text or not user_id:
+                return
+            self._docs[doc_id] = (user_id, text)
+            self._shards.setdefault(user_id, _Shard()).add(doc_id, tokenize(text))
+            self._touch()
+
+    def remove(self, doc_id) -> None:
+        with self._lock:
+            if self._remove_locked(str(doc_id)):
+                self._touch()
+
+    def _remove_locked(self, doc_id: str) -> bool:
+        old = self._docs.pop(doc_id, None)
+        if old is None:
+            return False
+        shard = self._shards.get(old[0])
+        if shard is not None:
+            shard.remove(doc_id, tokenize(old[1]))
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._docs.clear()
+            self._shards.clear()
+            self._touch()
+
+    def _touch(self) -> None:
+        self._dirty += 1
+        if self.path is not None and self._dirty >= SAVE_EVERY:
+            self.save()
+
+    # ── Recherche ─────────────────────────────────────────────────────────
+
+    def search(self, query: str, user_id: str, limit: int = 10) -> list[dict]:
+        """Resultats {"id", "memory", "score"} du namespace, meilleurs d'abord."""
+        terms = tokenize(query)
+        with self._lock:
+            self.searches += 1
+            shard = self._shards.get(user_id)
+            if shard is None or not terms:
+                return []
+            return [
+                {"id": doc_id, "memory": self._docs[doc_id][1], "score": round(score, 4)}
+                for doc_id, score in shard.search(terms, limit)
+            ]
+
+    # ── Persistance / Qdrant ──────────────────────────────────────────────
+
+    def _load(self, path: Path) -> None:
+        try:
+            docs = json.loads(path.read_text(encoding="utf-8")).get("docs", {})
+        except (OSError, ValueError):
+            return
+        for doc_id, (user_id, text) in docs.items():
+            self.add(doc_id, user_id, text)
+        self._dirty = 0
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            data = json.dumps({"docs": self._docs}, ensure_ascii=False)
+            self._dirty = 0
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".json.tmp")
+            tmp.write_text(data, encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            log_warn("lexical", f"Failed to save index: {e}")
+
+    def sync(self, client, collection: str) -> dict:
+        """Reconcilie avec Qdrant : ids seuls, puis textes des points manquants.
+
+        Seuls les documents deja indexes avant le parcours peuvent etre retires :
+        une insertion concurrente (IndexedVectorStore.insert) n'est pas vue
+        comme obsolete.
+        """
+        with self._lock:
+            known = set(self._docs)
+        ids = set()
+        offset = None
+        while True:
+            points, offset = client.scroll(collection_name=collection, limit=1024, offset=offset,
+                                           with_payload=False, with_vectors=False)
+            ids.update(str(p.id) for p in points)
+            if offset is None:
+                break
+        with self._lock:
+            stale = [d for d in known if d not in ids and d in self._docs]
+            missing = [d for d in ids if d not in self._docs]
+        for doc_id in stale:
+            self.remove(doc_id)
+        for start in range(0, len(missing), 256):
+            for record in client.retrieve(collection_name=collection, ids=missing[start:start + 256],
+                                          with_payload=["data", "user_id"], with_vectors=False):
+                payload = record.payload or {}
+                self.add(record.id, payload.get("user_id"), payload.get("data"))
+        if stale or missing:
+            self.save()
+        return {"added": len(missing), "removed": len(stale), "docs": len(self._docs)}
+
+    def stats(self) -> dict:
+        return {"docs": len(self._docs), "namespaces": len(self._shards), "searches": self.searches}
+
+
+# ============================================================================
+# MEM0
+# ============================================================================
+
+class IndexedVectorStore:
+    """Vector store Mem0 dont les ecritures tiennent l'index lexical a jour."""
+
+    def __init__(self, inner, lexical: LexicalIndex):
+        self._inner = inner
+        self.lexical = lexical
+
+    def insert(self, vectors, payloads=None, ids=None):
+        result = self._inner.insert(vectors=vectors, payloads=payloads, ids=ids)
+        for doc_id, payload in zip(ids or [], payloads or []):
+            payload = payload or {}
+            self.lexical.add(doc_id, payload.get("user_id"), payload.get("data"))
+        return result
+
+    def update(self, vector_id, vector=None, payload=None):
+        result = self._inner.update(vector_id=vector_id, vector=vector, payload=payload)
+        if payload is not None:
+            self.lexical.add(vector_id, payload.get("user_id"), payload.get("data"))
+        return result
+
+    def delete(self, vector_id):
+        result = self._inner.delete(vector_id=vector_id)
+        self.lexical.remove(vector_id)
+        return result
+
+    def reset(self):
+        self.lexical.clear()
+        return self._inner.reset()
+
+    def delete_col(self):
+        self.lexical.clear()
+        return self._inner.delete_col()
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+def lexical_index_of(memory) -> LexicalIndex | None:
+    """Index lexical local de l'instance Mem0 (None : client du service, ou desactive)."""
+    return getattr(getattr(memory, "vector_store", None), "lexical", None)
+
+
+def hybrid_hits(memory, query: str, user_id: str, vector_hits: list[dict], limit: int) -> list[dict]:
+    """vector_hits fusionnes (RRF) avec le BM25 du namespace, si l'index est local.
+
+    Avec le service memoire, la fusion est deja faite cote service.
+    """
+    lexical = lexical_index_of(memory)
+    if lexical is None:
+        return vector_hits[:limit]
+    return fuse_results(vector_hits, lexical.search(query, user_id, limit), limit)
+
+
+_indexes: dict[str, LexicalIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def install_lexical_index(memory) -> LexicalIndex | None:
+    """Enveloppe memory.vector_store et synchronise l'index en arriere-plan."""
+    if not LEXICAL_ENABLED or memory is None:
+        return None
+    existing = lexical_index_of(memory)
+    if existing is not None:
+        return existing
+    store = getattr(memory, "vector_store", None)
+    client = getattr(store, "client", None)
+    if client is None:
+        return None
+    collection = store.collection_name
+    with _indexes_lock:
+        index = _indexes.get(collection)
+        if index is None:
+            index = _indexes[collection] = LexicalIndex(LEXICAL_DIR / f"{collection}.json")
+    memory.vector_store = IndexedVectorStore(store, index)
+
+    def _sync():
+        try:
+            report = index.sync(client, collection)
+            log_info("lexical", f"Index synced: {report}")
+        except Exception as e:
+            log_warn("lexical", f"Index sync failed: {e}")
+    threading.Thread(target=_sync, name="lexical-sync", daemon=True).start()
+    return index
+
+
+def get_lexical_stats() -> dict:
+    with _indexes_lock:
+        return {name: index.stats() for name, index in _indexes.items()}
+
+
+def _save_all() -> None:
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        if index._dirty:
+            index.save()
+
+
+atexit.register(_save_all)
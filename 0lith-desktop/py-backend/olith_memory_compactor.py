@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+0Lith V1 — Memory Compactor
+=============================
+Passe de maintenance periodique de la collection Mem0 (Qdrant) :
+
+1. Expiration par TTL selon le type (filtres de payload : type + timestamp,
+   created_at de Mem0 pour les memoires sans timestamp).
+2. Fusion des quasi-doublons : par namespace et par type, les vecteurs au
+   cosinus >= OLITH_MEMORY_DEDUP_THRESHOLD sont regroupes ; la plus recente
+   est gardee (merged_count incremente), les autres supprimees.
+3. Vacuum : VACUUM SQLite du Qdrant embarque (un serveur Qdrant vacuum seul).
+4. Rapport : points supprimes, taille de la collection, p95 de latence de
+   recherche avant/apres.
+
+Les memoires canoniques (source: bootstrap) ne sont jamais touchees.
+Tourne dans le service memoire (ou dans le backend si le service est
+desactive), sous le verrou d'ecriture, et attend la fin d'un chat.
+"""
+
+import os
+import time
+import threading
+from datetime import datetime, timezone
+
+from olith_memory_filters import delete_where, memory_filter
+from olith_shared import log_info, log_warn
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+COMPACT_INTERVAL_S = float(os.getenv("OLITH_MEMORY_COMPACT_INTERVAL_H", "24")) * 3600
+COMPACT_INITIAL_DELAY_S = float(os.getenv("OLITH_MEMORY_COMPACT_DELAY_S", "600"))
+DEDUP_THRESHOLD = float(os.getenv("OLITH_MEMORY_DEDUP_THRESHOLD", "0.95"))
+MAX_DEFER_S = 600           # attente max d'une fenetre sans chat
+
+# TTL en jours par type de memoire ; types absents = pas d'expiration
+TTL_DAYS = {
+    "conversation": 30,
+    "shadow_thinking": 7,
+    "prediction_feedback": 60,
+}
+
+NAMESPACES = ("hodolith", "monolith", "aerolith", "cryolith", "pyrolith", "shared")
+LATENCY_SAMPLES = 20
+_SCROLL_PAGE = 256
+
+
+def _p95(samples: list[float]) -> float | None:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2)
+
+
+def _point_time(payload: dict) -> float:
+    """Date de la memoire en secondes : timestamp, sinon created_at (Mem0)."""
+    ts = payload.get("timestamp")
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    created = payload.get("created_at") or payload.get("created")
+    if isinstance(created, str):
+        try:
+            dt = datetime.fromisoformat(created)
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            return dt.timestamp()
+        except ValueError:
+            pass
+    return 0.0
+
+
+def _vector(point) -> list[float] | None:
+    vector = getattr(point, "vector", None)
+    if isinstance(vector, dict):        # vecteurs nommes : le premier
+        vector = next(iter(vector.values()), None)
+    return vector
+
+
+def _scroll(client, collection: str, flt, with_vectors: bool = False, payload=True):
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection, scroll_filter=flt, limit=_SCROLL_PAGE,
+            offset=offset, with_payload=payload, with_vectors=with_vectors,
+        )
+        yield from points
+        if offset is None:
+            return
+
+
+def _count(client, collection: str, flt=None) -> int:
+    return client.count(collection_name=collection, count_filter=flt, exact=True).count
+
+
+# ============================================================================
+# PASSES
+# ============================================================================
+
+def expire_by_ttl(client, collection: str, now: float, ttl_days: dict[str, float]) -> dict[str, int]:
+    """Supprime les memoires plus vieilles que le TTL de leur type."""
+    from qdrant_client import models
+
+    expired = {}
+    for type_, days in ttl_days.items():
+        cutoff = now - days * 86400
+        # 1. Avec timestamp : filtre type + range, resolu par les index de payload
+        removed = delete_where(client, collection, memory_filter(types=type_, before=cutoff))
+        # 2. Sans timestamp (anciennes memoires) : created_at de Mem0 (ISO), compare ici
+        is_type = models.FieldCondition(key="type", match=models.MatchValue(value=type_))
+        flt = models.Filter(must=[is_type, models.IsEmptyCondition(is_empty=models.PayloadField(key="timestamp"))])
+        ids = [
+            p.id for p in _scroll(client, collection, flt, payload=["created_at", "created"])
+            if 0 < _point_time(p.payload or {}) < cutoff
+        ]
+        if ids:
+            client.delete(collection_name=collection, points_selector=models.PointIdsList(points=ids))
+        if removed + len(ids):
+            expired[type_] = removed + len(ids)
+    return expired
+
+
+def merge_near_duplicates(client, collection: str, namespace: str, threshold: float = DEDUP_THRESHOLD) -> int:
+    """Regroupe les quasi-doublons d'un namespace (par type) ; garde la plus recente."""
+    import numpy as np
+    from qdrant_client import models
+
+    flt = models.Filter(
+        must=[models.FieldCondition(key="user_id", match=models.MatchValue(value=namespace))],
+        must_not=[models.FieldCondition(key="source", match=models.MatchValue(value="bootstrap"))],
+    )
+    groups: dict[str, list] = {}
+    for point in _scroll(client, collection, flt, with_vectors=True,
+                         payload=["type", "timestamp", "created_at", "created", "merged_count"]):
+        if _vector(point) is not None:
+            groups.setdefault((point.payload or {}).get("type") or "", []).append(point)
+
+    removed = 0
+    for points in groups.values():
+        if len(points) < 2:
+            continue
+        points.sort(key=lambda p: _point_time(p.payload or {}), reverse=True)   # recentes d'abord
+        matrix = np.asarray([_vector(p) for p in points], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        reps: list[int] = []
+        merged_into: dict[int, list] = {}
+        for i in range(len(points)):
+            if reps:
+                sims = matrix[reps] @ matrix[i]
+                best = int(np.argmax(sims))
+                if sims[best] >= threshold:
+                    merged_into.setdefault(reps[best], []).append(points[i].id)
+                    continue
+            reps.append(i)
+        for rep, dup_ids in merged_into.items():
+            kept = points[rep]
+            count = int((kept.payload or {}).get("merged_count") or 0) + len(dup_ids)
+            client.set_payload(collection_name=collection, payload={"merged_count": count}, points=[kept.id])
+            client.delete(collection_name=collection, points_selector=models.PointIdsList(points=dup_ids))
+            removed += len(dup_ids)
+    return removed
+
+
+def vacuum(client, collection: str) -> dict:
+    """VACUUM du stockage SQLite du Qdrant embarque ; no-op pour un serveur."""
+    local = getattr(client, "_client", None)
+    coll = getattr(local, "collections", {}).get(collection) if local is not None else None
+    persistence = getattr(coll, "storage", None)
+    conn = getattr(persistence, "storage", None)
+    if local is None:
+        return {"mode": "server"}      # l'optimiseur Qdrant vacuum lui-meme
+    if conn is None:
+        return {"mode": "in-memory"}
+    path = getattr(persistence, "location", None)
+    before = path.stat().st_size if path is not None and path.exists() else None
+    conn.execute("VACUUM")
+    after = path.stat().st_size if path is not None and path.exists() else None
+    return {"mode": "embedded", "bytes_before": before, "bytes_after": after}
+
+
+def _sample_queries(client, collection: str, namespaces) -> list[tuple[str, list[float]]]:
+    """Vecteurs existants comme requetes de latence (pris avant la compaction)."""
+    from qdrant_client import models
+
+    samples = []
+    per_ns = max(1, LATENCY_SAMPLES // max(1, len(namespaces)))
+    for ns in namespaces:
+        flt = models.Filter(must=[models.FieldCondition(key="user_id", match=models.MatchValue(value=ns))])
+        points, _ = client.scroll(collection_name=collection, scroll_filter=flt, limit=per_ns,
+                                  with_payload=False, with_vectors=True)
+        samples.extend((ns, _vector(p)) for p in points if _vector(p) is not None)
+    return samples
+
+
+def _search_p95(vector_store, samples) -> float | None:
+    timings = []
+    for ns, vector in samples:
+        t0 = time.perf_counter()
+        try:
+            # positionnel : limit / top_k selon la version de Mem0
+            vector_store.search("", vector, 5, {"user_id": ns})
+        except Exception:
+            continue
+        timings.append((time.perf_counter() - t0) * 1000)
+    return _p95(timings)
+
+
+def compact_memories(memory, now: float | None = None, ttl_days: dict[str, float] | None = None,
+                     threshold: float = DEDUP_THRESHOLD, namespaces=NAMESPACES) -> dict:
+    """Une passe complete ; retourne le rapport."""
+    vector_store = getattr(memory, "vector_store", None)
+    client = getattr(vector_store, "client", None)
+    if client is None:
+        raise RuntimeError("Mem0 instance has no Qdrant client")
+    collection = vector_store.collection_name
+    now = now if now is not None else time.time()
+    t0 = time.perf_counter()
+
+    points_before = _count(client, collection)
+    samples = _sample_queries(client, collection, namespaces)
+    p95_before = _search_p95(vector_store, samples)
+
+    expired = expire_by_ttl(client, collection, now, TTL_DAYS if ttl_days is None else ttl_days)
+    merged = sum(merge_near_duplicates(client, collection, ns, threshold) for ns in namespaces)
+    vacuum_report = vacuum(client, collection)
+    # Suppressions faites directement dans Qdrant : l'index BM25 suit
+    lexical = getattr(vector_store, "lexical", None)
+    if lexical is not None:
+        lexical.sync(client, collection)
+
+    points_after = _count(client, collection)
+    p95_after = _search_p95(vector_store, samples)
+    return {
+        "expired": expired,
+        "merged": merged,
+        "removed": points_before - points_after,
+        "points_before": points_before,
+        "points_after": points_after,
+        "search_p95_ms_before": p95_before,
+        "search_p95_ms_after": p95_after,
+        "vacuum": vacuum_report,
+        "duration_ms": round((time.perf_counter() - t0) * 1000, 1),
+        "at": int(now),
+    }
+
+
+# ============================================================================
+# SCHEDULER
+# ============================================================================
+
+class MemoryCompactor:
+    """Lance compact_memories periodiquement dans un thread daemon.
+
+    memory_fn : Mem0 courant ou None (pas pret / gaming : passe sautee).
+    lock      : verrou d'ecriture partage avec les memory.add du processus.
+    busy_fn   : vrai pendant un chat ; la passe attend (au plus MAX_DEFER_S).
+    """
+
+    def __init__(self, memory_fn, interval_s: float = COMPACT_INTERVAL_S,
+                 initial_delay_s: float = COMPACT_INITIAL_DELAY_S, lock=None, busy_fn=None):
+        self._memory_fn = memory_fn
+        self.interval_s = interval_s
+        self.initial_delay_s = initial_delay_s
+        self._lock = lock or threading.Lock()
+        self._busy_fn = busy_fn
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.runs = 0
+        self.last_report: dict | None = None
+        self.last_error: str | None = None
+
+    def start(self) -> "MemoryCompactor":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="memory-compactor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_once(self) -> dict | None:
+        memory = self._memory_fn()
+        if memory is None:
+            return None
+        deadline = time.monotonic() + MAX_DEFER_S
+        while self._busy_fn is not None and self._busy_fn() and time.monotonic() < deadline:
+            if self._stop.wait(1.0):
+                return None
+        try:
+            with self._lock:
+                report = compact_memories(memory)
+        except Exception as e:
+            self.last_error = str(e)
+            log_warn("memory_compactor", f"Compaction failed: {e}")
+            return None
+        self.runs += 1
+        self.last_report = report
+        self.last_error = None
+        log_info("memory_compactor",
+                 f"{report['removed']} removed ({sum(report['expired'].values())} expired, "
+                 f"{report['merged']} merged), "
+                 f"{report['points_after']} left, p95 {report['search_p95_ms_before']} -> "
+                 f"{report['search_p95_ms_after']} ms")
+        return report
+
+    def _run(self) -> None:
+        if self._stop.wait(self.initial_delay_s):
+            return
+        while True:
+            self.run_once()
+            if self._stop.wait(self.interval_s):
+                return
+
+    def stats(self) -> dict:
+        return {"runs": self.runs, "last_report": self.last_report, "last_error": self.last_error}
+
+
+_compactor: MemoryCompactor | None = None
+_compactor_lock = threading.Lock()
+
+
+def start_memory_compactor(memory_fn, lock=None, busy_fn=None) -> MemoryCompactor:
+    """Cree et demarre le compacteur du processus (service memoire ou backend)."""
+    global _compactor
+    with _compactor_lock:
+        if _compactor is None:
+            _compactor = MemoryCompactor(memory_fn, lock=lock, busy_fn=busy_fn).start()
+        return _compactor
+
+
+def get_memory_compactor() -> MemoryCompactor | None:
+    return _compactor
+
+
+def get_memory_compactor_stats() -> dict:
+    return _compactor.stats() if _compactor is not None else {}
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+0Lith V1 — Memory Payload Indexes & Filtered Search
+=====================================================
+Les memoires portent des metadonnees (type, agent_id, timestamp, file_path,
+confidence_score) : la collection olith_memories est provisionnee avec un
+index de payload par champ, et les recherches / suppressions filtrent cote
+Qdrant au lieu de tout classer ensemble ou de tout parcourir.
+
+    search_filtered(memory, "deploy", user_id="hodolith",
+                    types="shadow_thinking", file_path="src/app.py",
+                    since=time.time() - 86400)
+    search_filtered(memory, None, user_id="monolith", types=["identity", "capabilities"])
+    delete_filtered(memory, types="conversation", before=cutoff)
+
+Qdrant embarque : les index de payload n'existent qu'en mode serveur (le
+mode local filtre par parcours) ; ensure_payload_indexes ne fait alors rien.
+
+Toutes les recherches vectorielles live (search_filtered, vector_search :
+SearchBatcher du service, MemoryPrefetch) passent par query_points, qui
+applique les SearchParams du profil de stockage (ef HNSW, oversampling +
+rescoring si la collection est quantifiee).
+"""
+
+import time
+
+from olith_shared import log_info, log_warn
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# champ -> type d'index Qdrant
+PAYLOAD_INDEXES = {
+    "user_id": "keyword",
+    "type": "keyword",
+    "agent_id": "keyword",
+    "file_path": "keyword",
+    "timestamp": "float",           # secondes epoch (int ou float)
+    "confidence_score": "float",
+}
+
+
+def is_local_client(client) -> bool:
+    """Vrai pour le Qdrant embarque / en memoire (pas d'index de payload)."""
+    return type(getattr(client, "_client", None)).__name__ == "QdrantLocal"
+
+
+def _store_of(memory):
+    store = getattr(memory, "vector_store", None)
+    if getattr(store, "client", None) is None:
+        raise RuntimeError("Mem0 instance has no Qdrant client")
+    return store
+
+
+# ============================================================================
+# INDEX
+# ============================================================================
+
+def ensure_payload_indexes(client, collection: str) -> dict:
+    """Cree les index de payload manquants (idempotent)."""
+    if is_local_client(client):
+        return {"mode": "embedded", "created": []}
+    from qdrant_client import models
+
+    existing = set(client.get_collection(collection_name=collection).payload_schema or {})
+    created = []
+    for field, schema in PAYLOAD_INDEXES.items():
+        if field in existing:
+            continue
+        try:
+            client.create_payload_index(
+                collection_name=collection, field_name=field,
+                field_schema=models.PayloadSchemaType(schema), wait=True,
+            )
+            created.append(field)
+        except Exception as e:
+            log_warn("memory_index", f"Payload index on {field} failed: {e}")
+    if created:
+        log_info("memory_index", f"Payload indexes created on {collection}: {', '.join(created)}")
+    return {"mode": "server", "created": created}
+
+
+def install_payload_indexes(memory) -> dict | None:
+    """ensure_payload_indexes sur la collection Mem0 ; None si pas de client Qdrant."""
+    store = getattr(memory, "vector_store", None)
+    client = getattr(store, "client", None)
+    if client is None:
+        return None
+    try:
+        return ensure_payload_indexes(client, store.collection_name)
+    except Exception as e:
+        log_warn("memory_index", f"Payload index provisioning failed: {e}")
+        return None
+
+
+# ============================================================================
+# FILTRES
+# ============================================================================
+
+def memory_filter(user_id: str | None = None, types=None, agent_id: str | None = None,
+                  file_path: str | None = None, since: float | None = None,
+                  before: float | None = None, min_confidence: float | None = None):
+    """Filtre Qdrant des metadonnees ; None sans condition.
+
+    types : un type ou une liste (OU). since / before : bornes [since, before)
+    sur timestamp, en secondes.
+    """
+    from qdrant_client import models
+
+    must = []
+    for key, value in (("user_id", user_id), ("agent_id", agent_id), ("file_path", file_path)):
+        if value is not None:
+            must.append(models.FieldCondition(key=key, match=models.MatchValue(value=value)))
+    if types is not None:
+        types = [types] if isinstance(types, str) else list(types)
+        match = models.MatchValue(value=types[0]) if len(types) == 1 else models.MatchAny(any=types)
+        must.append(models.FieldCondition(key="type", match=match))
+    if since is not None or before is not None:
+        must.append(models.FieldCondition(key="timestamp", range=models.Range(gte=since, lt=before)))
+    if min_confidence is not None:
+        must.append(models.FieldCondition(key="confidence_score", range=models.Range(gte=min_confidence)))
+    return models.Filter(must=must) if must else None
+
+
+def point_to_memory(point) -> dict:
+    """Point Qdrant -> resultat au format Mem0 {"id", "memory", "score", "metadata"}."""
+    payload = dict(getattr(point, "payload", None) or {})
+    text = payload.pop("data", "")
+    return {
+        "id": str(getattr(point, "id", "")),
+        "memory": text,
+        "score": getattr(point, "score", None),
+        "metadata": payload,
+    }
+
+
+# ============================================================================
+# RECHERCHE / SUPPRESSION
+# ============================================================================
+
+def query_points(store, vector, flt, limit: int) -> list:
+    """Points les plus proches, avec les SearchParams du profil en mode serveur."""
+    search_params = None
+    if not is_local_client(store.client):
+        from olith_memory_init import profile_search_params
+        search_params = profile_search_params()
+    return store.client.query_points(
+        collection_name=store.collection_name, query=vector, query_filter=flt,
+        limit=limit, search_params=search_params, with_payload=True,
+    ).points
+
+
+def vector_search(memory, query: str, vector, limit: int, user_id: str) -> list:
+    """Recherche vectorielle d'un namespace (vecteur de requete deja calcule).
+
+    Sans client Qdrant expose (autre vector store) : vector_store.search de Mem0.
+    """
+    store = memory.vector_store
+    if getattr(store, "client", None) is None:
+        # (query, vectors, limit, filters) en positionnel : le nom du 3e
+        # parametre differe selon la version de Mem0 (limit / top_k)
+        return store.search(query, vector, limit, {"user_id": user_id})
+    return query_points(store, vector, memory_filter(user_id=user_id), limit)
+
+
+def search_filtered(memory, query: str | None, limit: int = 5, **filters) -> dict:
+    """Recherche restreinte par metadonnees ({"results": [...]} comme memory.search).
+
+    Sans requete : les memoires correspondantes, plus recentes d'abord.
+    Avec le service memoire (MemoryClient), la recherche s'y execute.
+    """
+    if hasattr(memory, "search_filtered"):
+        return memory.search_filtered(query, limit=limit, **filters)
+    store = _store_of(memory)
+    flt = memory_filter(**filters)
+    if query:
+        vector = memory.embedding_model.embed(query, "search")
+        points = query_points(store, vector, flt, limit)
+    else:
+        from qdrant_client import models
+        points, _ = store.client.scroll(
+            collection_name=store.collection_name, scroll_filter=flt, limit=limit,
+            order_by=models.OrderBy(key="timestamp", direction=models.Direction.DESC),
+            with_payload=True, with_vectors=False,
+        )
+    return {"results": [point_to_memory(p) for p in points]}
+
+
+def delete_where(client, collection: str, flt) -> int:
+    """Supprime les points du filtre (via les index) ; retourne leur nombre."""
+    from qdrant_client import models
+
+    count = client.count(collection_name=collection, count_filter=flt, exact=True).count
+    if count:
+        client.delete(collection_name=collection, points_selector=models.FilterSelector(filter=flt))
+    return count
+
+
+def delete_filtered(memory, **filters) -> dict:
+    """Suppression par metadonnees (ex. types + before) ; refuse un filtre vide."""
+    if hasattr(memory, "delete_filtered"):
+        return memory.delete_filtered(**filters)
+    flt = memory_filter(**filters)
+    if flt is None:
+        raise ValueError("delete_filtered needs at least one filter")
+    store = _store_of(memory)
+    t0 = time.perf_counter()
+    deleted = delete_where(store.client, store.collection_name, flt)
+    lexical = getattr(store, "lexical", None)
+    if deleted and lexical is not None:
+        lexical.sync(store.client, store.collection_name)
+    return {"deleted": deleted, "ms": round((time.perf_counter() - t0) * 1000, 1)}
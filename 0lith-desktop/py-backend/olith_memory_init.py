@@ -12,15 +12,20 @@ Usage:
     python olith_memory_init.py --test       # Test de récupération mémoire
     python olith_memory_init.py --reset      # Reset + re-init
     python olith_memory_init.py --status     # Vérifie l'état des services
+    python olith_memory_init.py --migrate-profile int8   # Profil de stockage (serveur Qdrant)
 """
 
+import os
 import sys
 import json
 import time
+import uuid
+import hashlib
 import argparse
 import requests
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
+from urllib.parse import urlparse
 
 # ============================================================================
 # CONFIGURATION
@@ -32,12 +37,36 @@ from config import (
     CRYOLITH_MODEL, PYROLITH_MODEL, EMBED_MODEL,
     DATA_DIR,
 )
+from olith_embed_cache import get_embedding_cache, install_embedding_cache, normalize_text
+from olith_lexical import install_lexical_index
+from olith_memory_filters import install_payload_indexes, is_local_client
 
 # Embedded Qdrant — all runtime state lives under DATA_DIR (~/.0lith)
 QDRANT_DATA_PATH: Path = Path(DATA_DIR) / "qdrant"
 # Legacy Docker URL — kept for callers that import QDRANT_URL
 QDRANT_URL = "http://localhost:6333"
 
+# Serveur Qdrant optionnel (ex. http://localhost:6333) a la place de l'embarque
+QDRANT_SERVER_URL = os.getenv("OLITH_QDRANT_URL", "")
+
+# Profils de stockage des vecteurs (OLITH_MEMORY_PROFILE).
+# Quantization, vecteurs sur disque (mmap) et HNSW ne s'appliquent qu'avec un
+# serveur Qdrant : l'embarque cherche en force brute sur une copie float32 en
+# RAM et ignore ces parametres.
+#   on_disk      : vecteurs originaux en mmap (page cache) au lieu de la RAM
+#   quantization : None | "int8" (scalaire, 4x) | "binary" (32x), gardee en RAM
+#   oversampling : candidats quantifies x N, re-notes sur les vecteurs originaux
+STORAGE_PROFILES = {
+    "default": {"on_disk": False, "quantization": None, "oversampling": 1.0},
+    "ondisk": {"on_disk": True, "quantization": None, "oversampling": 1.0},
+    "int8": {"on_disk": True, "quantization": "int8", "oversampling": 2.0},
+    "binary": {"on_disk": True, "quantization": "binary", "oversampling": 4.0},
+}
+MEMORY_PROFILE = os.getenv("OLITH_MEMORY_PROFILE", "default")
+HNSW_M = int(os.getenv("OLITH_HNSW_M", "16"))
+HNSW_EF_CONSTRUCT = int(os.getenv("OLITH_HNSW_EF_CONSTRUCT", "100"))
+HNSW_EF = int(os.getenv("OLITH_HNSW_EF", "128"))          # ef a la recherche
+
 # Mem0 config — Qwen3-Embedding + Qdrant + Kuzu
 MEM0_CONFIG = {
     "llm": {
@@ -62,6 +91,7 @@ MEM0_CONFIG = {
             "path": str(QDRANT_DATA_PATH),
             "collection_name": "olith_memories",
             "embedding_model_dims": 1024,       # Qwen3-Embedding default
+            "on_disk": STORAGE_PROFILES.get(MEMORY_PROFILE, STORAGE_PROFILES["default"])["on_disk"],
         }
     },
     "graph_store": {
@@ -73,6 +103,11 @@ MEM0_CONFIG = {
     "version": "v1.1",
 }
 
+if QDRANT_SERVER_URL:
+    _qdrant_url = urlparse(QDRANT_SERVER_URL)
+    MEM0_CONFIG["vector_store"]["config"].pop("path")
+    MEM0_CONFIG["vector_store"]["config"].update(host=_qdrant_url.hostname, port=_qdrant_url.port or 6333)
+
 
 # ============================================================================
 # AGENT DEFINITIONS — Qui est qui dans 0Lith
@@ -247,6 +282,16 @@ def check_qdrant_embedded(data_path: Path = None) -> bool:
         return False
 
 
+def check_qdrant() -> bool:
+    """Qdrant utilise par Mem0 : le serveur (OLITH_QDRANT_URL) ou l'embarque.
+
+    En mode serveur, le dossier embarque n'est ni ouvert ni cree.
+    """
+    if QDRANT_SERVER_URL:
+        return check_service("Qdrant", QDRANT_SERVER_URL.rstrip("/") + "/")
+    return check_qdrant_embedded()
+
+
 def migrate_from_docker_qdrant(data_path: Path = None) -> int:
     """
     Migre les vecteurs depuis Docker Qdrant (localhost:6333) vers le mode embarqué.
@@ -316,6 +361,150 @@ def migrate_from_docker_qdrant(data_path: Path = None) -> int:
         return 0
 
 
+# ============================================================================
+# STORAGE PROFILES — quantization, mmap, HNSW
+# ============================================================================
+
+def storage_profile(name: str | None = None) -> dict:
+    """Profil de stockage (OLITH_MEMORY_PROFILE par defaut)."""
+    name = name or MEMORY_PROFILE
+    if name not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile: {name} (choices: {', '.join(STORAGE_PROFILES)})")
+    return {"name": name, **STORAGE_PROFILES[name]}
+
+
+def profile_collection_params(profile: dict) -> dict:
+    """hnsw_config / quantization_config / on_disk d'une collection."""
+    from qdrant_client import models
+
+    quantization = None
+    if profile["quantization"] == "int8":
+        quantization = models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8, quantile=0.99, always_ram=True,
+        ))
+    elif profile["quantization"] == "binary":
+        quantization = models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    return {
+        "on_disk": profile["on_disk"],
+        "hnsw_config": models.HnswConfigDiff(m=HNSW_M, ef_construct=HNSW_EF_CONSTRUCT),
+        "quantization_config": quantization,
+    }
+
+
+def profile_search_params(profile: dict | None = None):
+    """SearchParams du profil : ef HNSW, oversampling + rescoring si quantifie."""
+    from qdrant_client import models
+
+    profile = profile or storage_profile()
+    quantization = None
+    if profile["quantization"]:
+        quantization = models.QuantizationSearchParams(rescore=True, oversampling=profile["oversampling"])
+    return models.SearchParams(hnsw_ef=HNSW_EF, quantization=quantization)
+
+
+def _current_profile_state(info) -> tuple:
+    vectors = info.config.params.vectors
+    dense = vectors.get("") if isinstance(vectors, dict) else vectors
+    quant = info.config.quantization_config
+    kind = "int8" if getattr(quant, "scalar", None) else "binary" if getattr(quant, "binary", None) else None
+    hnsw = info.config.hnsw_config
+    return bool(getattr(dense, "on_disk", False)), kind, hnsw.m, hnsw.ef_construct
+
+
+def apply_storage_profile(client, collection: str, profile: dict | None = None) -> dict:
+    """Met la collection au profil, en place (serveur Qdrant ; reindexation en arriere-plan)."""
+    from qdrant_client import models
+
+    profile = profile or storage_profile()
+    if is_local_client(client):
+        return {"mode": "embedded", "profile": profile["name"], "applied": False}
+    wanted = (profile["on_disk"], profile["quantization"], HNSW_M, HNSW_EF_CONSTRUCT)
+    if _current_profile_state(client.get_collection(collection_name=collection)) == wanted:
+        return {"mode": "server", "profile": profile["name"], "applied": False}
+    params = profile_collection_params(profile)
+    client.update_collection(
+        collection_name=collection,
+        vectors_config={"": models.VectorParamsDiff(on_disk=params["on_disk"])},
+        hnsw_config=params["hnsw_config"],
+        quantization_config=params["quantization_config"] or models.Disabled.DISABLED,
+    )
+    return {"mode": "server", "profile": profile["name"], "applied": True}
+
+
+def provision_collection(memory) -> dict | None:
+    """Index de payload + profil de stockage de la collection Mem0."""
+    store = getattr(memory, "vector_store", None)
+    client = getattr(store, "client", None)
+    if client is None:
+        return None
+    report = {"indexes": install_payload_indexes(memory)}
+    try:
+        report["profile"] = apply_storage_profile(client, store.collection_name)
+    except Exception as e:
+        report["profile"] = {"error": str(e)}
+    return report
+
+
+def copy_collection(source, target, collection: str, profile: dict, page: int = 256) -> int:
+    """Copie la collection (vecteurs denses + BM25, payloads) dans target, creee au profil."""
+    from qdrant_client import models
+
+    info = source.get_collection(collection_name=collection)
+    vectors = info.config.params.vectors
+    dense = vectors.get("") if isinstance(vectors, dict) else vectors
+    params = profile_collection_params(profile)
+    target.create_collection(
+        collection_name=collection,
+        vectors_config=models.VectorParams(size=dense.size, distance=dense.distance, on_disk=params["on_disk"]),
+        sparse_vectors_config=info.config.params.sparse_vectors,
+        hnsw_config=params["hnsw_config"],
+        quantization_config=params["quantization_config"],
+    )
+    copied = 0
+    offset = None
+    while True:
+        records, offset = source.scroll(collection_name=collection, limit=page, offset=offset,
+                                        with_payload=True, with_vectors=True)
+        if records:
+            target.upsert(collection_name=collection, wait=True, points=[
+                models.PointStruct(id=r.id, vector=r.vector, payload=r.payload) for r in records
+            ])
+            copied += len(records)
+        if offset is None:
+            return copied
+
+
+def migrate_storage_profile(name: str, collection: str = "olith_memories") -> dict:
+    """Migration hors ligne vers un profil (backend et service memoire arretes).
+
+    Collection deja sur le serveur : profil applique en place. Sinon la
+    collection embarquee est copiee vers le serveur, creee au profil.
+    """
+    from qdrant_client import QdrantClient
+
+    profile = storage_profile(name)
+    if not QDRANT_SERVER_URL:
+        raise RuntimeError("Storage profiles need a Qdrant server: set OLITH_QDRANT_URL "
+                           "(embedded Qdrant ignores quantization, on-disk vectors and HNSW)")
+    t0 = time.time()
+    server = QdrantClient(url=QDRANT_SERVER_URL)
+    try:
+        if server.collection_exists(collection):
+            report = apply_storage_profile(server, collection, profile)
+        else:
+            embedded = QdrantClient(path=str(QDRANT_DATA_PATH))
+            try:
+                copied = copy_collection(embedded, server, collection, profile)
+            finally:
+                embedded.close()
+            report = {"mode": "embedded->server", "profile": profile["name"], "applied": True, "copied": copied}
+        report["points"] = server.count(collection_name=collection, exact=True).count
+    finally:
+        server.close()
+    report["duration_s"] = round(time.time() - t0, 1)
+    return report
+
+
 def _maybe_migrate():
     """Lance la migration Docker→embarqué si le dossier embarqué est absent ou vide."""
     if QDRANT_DATA_PATH.exists() and any(QDRANT_DATA_PATH.iterdir()):
@@ -382,10 +571,15 @@ def check_status() -> dict:
         print_fail(f"Ollama inaccessible ({OLLAMA_URL})")
         print_info("Lance Ollama : ollama serve")
 
-    # 2. Qdrant embarqué (mode embedded — no Docker)
-    qdrant_ok = check_qdrant_embedded()
+    # 2. Qdrant : serveur (OLITH_QDRANT_URL) ou embarqué (no Docker)
+    qdrant_ok = check_qdrant()
     status["qdrant"] = qdrant_ok
-    if qdrant_ok:
+    if QDRANT_SERVER_URL:
+        if qdrant_ok:
+            print_ok(f"Serveur Qdrant actif ({QDRANT_SERVER_URL})")
+        else:
+            print_fail(f"Serveur Qdrant inaccessible ({QDRANT_SERVER_URL})")
+    elif qdrant_ok:
         print_ok(f"Qdrant embarqué prêt ({QDRANT_DATA_PATH})")
     else:
         print_fail(f"Qdrant embarqué inaccessible ({QDRANT_DATA_PATH})")
@@ -472,200 +666,276 @@ def init_memory(use_graph: bool = True):
 
     print_info("Initialisation de Mem0...")
     memory = Memory.from_config(config_dict=config)
+    install_embedding_cache(memory)
+    install_lexical_index(memory)
+    provision_collection(memory)
     print_ok("Mem0 initialisé")
     return memory
 
 
-def register_agent_identities(memory, verbose: bool = True):
-    """Enregistre l'identité de chaque agent dans la mémoire partagée."""
-    print_header("Enregistrement des Identités des Agents")
+# ============================================================================
+# CANONICAL MEMORIES — faits statiques (identites, relations, protocole)
+# ============================================================================
 
-    timestamp = datetime.now().isoformat()
+TEAM_TEXT = (
+    "Je fais partie du système 0Lith V1, un framework multi-agent "
+    "de cybersécurité composé de 5 agents : "
+    "Hodolith (Dispatcher, qwen3:1.7b), "
+    "Monolith (Orchestrateur, qwen3:14b), "
+    "Aerolith (Codeur, qwen3-coder:30b), "
+    "Cryolith (Blue Team, Foundation-Sec-8B), "
+    "Pyrolith (Red Team, DeepHat-7B en Docker). "
+    "Notre mémoire est partagée via Mem0 + Qdrant + Kuzu. "
+    "Notre embedding model est qwen3-embedding:0.6b."
+)
 
-    for agent_id, info in AGENTS.items():
-        if verbose:
-            print(f"\n  {info['color']} {agent_id.upper()} — {info['role']}")
-            print(f"     Modèle: {info['model']}")
+SPARRING_PROTOCOL = (
+    "Le sparring est un exercice où Pyrolith (Red Team) attaque et "
+    "Cryolith (Blue Team) défend. Monolith supervise et évalue. "
+    "Protocole : 1) Monolith définit le scénario (CVE, type d'attaque, cible). "
+    "2) Pyrolith planifie et exécute l'attaque. "
+    "3) Cryolith détecte, analyse et propose des défenses. "
+    "4) Monolith évalue les performances des deux côtés. "
+    "5) Les résultats sont mémorisés pour améliorer les futures sessions. "
+    "Aerolith intervient si du code custom est nécessaire."
+)
 
-        # 1. Identité principale
-        identity_text = (
-            f"Mon nom est {agent_id.capitalize()}. {info['description']}"
-        )
-        memory.add(
-            identity_text,
-            user_id=agent_id,
-            metadata={
-                "user_id": agent_id,
-                "type": "identity",
-                "priority": "critical",
-                "created": timestamp,
-                "model": info["model"],
-                "role": info["role"],
-            }
-        )
-        if verbose:
-            print_ok("Identité enregistrée")
+# Quelques CVE exemples pour amorcer la mémoire
+SAMPLE_CVES = [
+    {
+        "text": (
+            "CVE-2024-3094 : Backdoor dans xz-utils (liblzma) versions 5.6.0 et 5.6.1. "
+            "Vecteur : supply chain attack via un mainteneur compromis. "
+            "Impact : exécution de code à distance via sshd. Score CVSS : 10.0 (Critique). "
+            "Mitigation : downgrader vers xz-utils 5.4.x, vérifier les signatures."
+        ),
+        "cve_id": "CVE-2024-3094",
+        "severity": "critical",
+        "cvss": 10.0,
+    },
+    {
+        "text": (
+            "CVE-2024-6387 : RegreSSHion — Race condition dans OpenSSH sshd. "
+            "Versions affectées : 8.5p1 à 9.7p1. "
+            "Impact : exécution de code à distance en root (unauthenticated). "
+            "Score CVSS : 8.1 (Élevé). "
+            "Mitigation : mettre à jour OpenSSH vers 9.8p1+, limiter MaxStartups."
+        ),
+        "cve_id": "CVE-2024-6387",
+        "severity": "high",
+        "cvss": 8.1,
+    },
+]
+
+
+def _item(text: str, user_id: str, **metadata) -> dict:
+    return {"text": text, "user_id": user_id, "metadata": {"user_id": user_id, **metadata}}
 
-        # 2. Capacités
-        caps_text = (
+
+def identity_memories(timestamp: str) -> list[dict]:
+    """3 memoires par agent : identite, capacites, connaissance du systeme."""
+    items = []
+    for agent_id, info in AGENTS.items():
+        items.append(_item(
+            f"Mon nom est {agent_id.capitalize()}. {info['description']}",
+            agent_id, type="identity", priority="critical", created=timestamp,
+            model=info["model"], role=info["role"],
+        ))
+        items.append(_item(
             f"En tant que {agent_id.capitalize()} ({info['role']}), "
-            f"mes capacités sont : {'; '.join(info['capabilities'])}."
-        )
-        memory.add(
-            caps_text,
-            user_id=agent_id,
-            metadata={
-                "user_id": agent_id,
-                "type": "capabilities",
-                "priority": "high",
-                "created": timestamp,
-            }
-        )
-        if verbose:
-            print_ok("Capacités enregistrées")
-
-        # 3. Connaissance du système 0Lith global
-        team_text = (
-            f"Je fais partie du système 0Lith V1, un framework multi-agent "
-            f"de cybersécurité composé de 5 agents : "
-            f"Hodolith (Dispatcher, qwen3:1.7b), "
-            f"Monolith (Orchestrateur, qwen3:14b), "
-            f"Aerolith (Codeur, qwen3-coder:30b), "
-            f"Cryolith (Blue Team, Foundation-Sec-8B), "
-            f"Pyrolith (Red Team, DeepHat-7B en Docker). "
-            f"Notre mémoire est partagée via Mem0 + Qdrant + Kuzu. "
-            f"Notre embedding model est qwen3-embedding:0.6b."
-        )
-        memory.add(
-            team_text,
-            user_id=agent_id,
-            metadata={
-                "user_id": agent_id,
-                "type": "system_knowledge",
-                "priority": "high",
-                "created": timestamp,
-            }
+            f"mes capacités sont : {'; '.join(info['capabilities'])}.",
+            agent_id, type="capabilities", priority="high", created=timestamp,
+        ))
+        items.append(_item(
+            TEAM_TEXT, agent_id, type="system_knowledge", priority="high", created=timestamp,
+        ))
+    return items
+
+
+def relation_memories(timestamp: str) -> list[dict]:
+    """Relations entre agents (alimentent aussi le graphe Kuzu)."""
+    return [
+        _item(
+            f"{source.capitalize()} {relation.replace('_', ' ').lower()} "
+            f"{target.capitalize()} : {context}.",
+            source, type="relation", relation_type=relation,
+            source_agent=source, target_agent=target, created=timestamp,
         )
-        if verbose:
-            print_ok("Connaissance système enregistrée")
+        for source, relation, target, context in AGENT_RELATIONS
+    ]
 
-    # Petit délai pour laisser Qdrant indexer
-    time.sleep(1)
-    print(f"\n  📊 {len(AGENTS)} agents enregistrés avec 3 mémoires chacun "
-          f"= {len(AGENTS) * 3} mémoires totales")
 
+def protocol_memories(timestamp: str) -> list[dict]:
+    """Protocole de sparring (Monolith, Pyrolith, Cryolith) et CVE exemples."""
+    items = [
+        _item(SPARRING_PROTOCOL, agent, type="protocol", protocol_name="sparring",
+              priority="high", created=timestamp)
+        for agent in ["monolith", "pyrolith", "cryolith"]
+    ]
+    for cve in SAMPLE_CVES:
+        for agent in ["pyrolith", "cryolith"]:
+            items.append(_item(
+                cve["text"], agent, type="cve", cve_id=cve["cve_id"],
+                severity=cve["severity"], cvss=cve["cvss"], created=timestamp,
+            ))
+    return items
 
-def register_agent_relations(memory, verbose: bool = True):
-    """Enregistre les relations entre agents (pour le graphe Kuzu)."""
-    print_header("Enregistrement des Relations Inter-Agents")
 
-    timestamp = datetime.now().isoformat()
+def canonical_memories(timestamp: str | None = None) -> list[dict]:
+    timestamp = timestamp or datetime.now().isoformat()
+    return identity_memories(timestamp) + relation_memories(timestamp) + protocol_memories(timestamp)
 
-    for source, relation, target, context in AGENT_RELATIONS:
-        relation_text = (
-            f"{source.capitalize()} {relation.replace('_', ' ').lower()} "
-            f"{target.capitalize()} : {context}."
-        )
-        memory.add(
-            relation_text,
-            user_id=source,
-            metadata={
-                "user_id": source,
-                "type": "relation",
-                "relation_type": relation,
-                "source_agent": source,
-                "target_agent": target,
-                "created": timestamp,
-            }
-        )
-        if verbose:
-            source_color = AGENTS[source]["color"]
-            target_color = AGENTS[target]["color"]
-            print(f"  {source_color} {source} —[{relation}]→ "
-                  f"{target_color} {target}")
 
-    time.sleep(1)
-    print(f"\n  📊 {len(AGENT_RELATIONS)} relations enregistrées")
+# ============================================================================
+# BULK LOADER — idempotent, sans extraction LLM
+# ============================================================================
 
+def memory_fingerprint(item: dict) -> str:
+    """Empreinte (agent, type, texte normalise) ; independante de la date."""
+    key = f'{item["user_id"]}\0{item["metadata"].get("type", "")}\0{normalize_text(item["text"])}'
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
 
-def register_sparring_protocol(memory, verbose: bool = True):
-    """Enregistre le protocole de sparring Red vs Blue."""
-    print_header("Enregistrement du Protocole de Sparring")
-
-    timestamp = datetime.now().isoformat()
-
-    sparring_protocol = (
-        "Le sparring est un exercice où Pyrolith (Red Team) attaque et "
-        "Cryolith (Blue Team) défend. Monolith supervise et évalue. "
-        "Protocole : 1) Monolith définit le scénario (CVE, type d'attaque, cible). "
-        "2) Pyrolith planifie et exécute l'attaque. "
-        "3) Cryolith détecte, analyse et propose des défenses. "
-        "4) Monolith évalue les performances des deux côtés. "
-        "5) Les résultats sont mémorisés pour améliorer les futures sessions. "
-        "Aerolith intervient si du code custom est nécessaire."
-    )
 
-    # Enregistré pour les 3 agents impliqués
-    for agent in ["monolith", "pyrolith", "cryolith"]:
-        memory.add(
-            sparring_protocol,
-            user_id=agent,
-            metadata={
-                "user_id": agent,
-                "type": "protocol",
-                "protocol_name": "sparring",
-                "priority": "high",
-                "created": timestamp,
-            }
+def _point_id(fingerprint: str) -> str:
+    """Id Qdrant deterministe : un re-upsert ecrase au lieu de dupliquer."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"olith-bootstrap:{fingerprint}"))
+
+
+def _existing_ids(vector_store, ids: list[str]) -> set[str]:
+    client = getattr(vector_store, "client", None)
+    if client is not None and hasattr(client, "retrieve"):
+        points = client.retrieve(
+            collection_name=vector_store.collection_name, ids=ids,
+            with_payload=False, with_vectors=False,
         )
+        return {str(p.id) for p in points}
+    return {i for i in ids if vector_store.get(i) is not None}
+
+
+def _embed_batch(texts: list[str]) -> list[list[float]]:
+    """Un seul appel /api/embed pour tous les textes absents du cache."""
+    from olith_ollama import embed_texts   # import local : olith_ollama importe ce module
+
+    def _embed(batch):
+        return embed_texts(batch, timeout=120)
+
+    cache = get_embedding_cache()
+    return cache.embed_many(texts, _embed) if cache is not None else _embed(texts)
+
+
+def bulk_load_memories(memory, items: list[dict], embed_fn=None) -> dict:
+    """Upsert direct dans Qdrant des memoires absentes ; rapport de timing.
+
+    Les relations nouvelles passent aussi par le graphe Mem0 s'il est actif
+    (seule etape avec LLM, une fois par relation grace aux empreintes).
+    """
+    vector_store = getattr(memory, "vector_store", None)
+    if vector_store is None:
+        raise RuntimeError("Mem0 instance has no vector_store")
+    embed_fn = embed_fn or _embed_batch
+    t0 = time.perf_counter()
+
+    by_id: dict[str, tuple[str, dict]] = {}
+    for item in items:
+        fp = memory_fingerprint(item)
+        by_id.setdefault(_point_id(fp), (fp, item))
+    existing = _existing_ids(vector_store, list(by_id))
+    todo = [(pid, fp, item) for pid, (fp, item) in by_id.items() if pid not in existing]
+    t_lookup = time.perf_counter()
+
+    vectors = embed_fn([item["text"] for _, _, item in todo]) if todo else []
+    t_embed = time.perf_counter()
+
+    if todo:
+        now = datetime.now(timezone.utc).isoformat()
+        payloads = []
+        for _, fp, item in todo:
+            payloads.append({
+                **item["metadata"],
+                "data": item["text"],
+                "hash": hashlib.md5(item["text"].encode()).hexdigest(),
+                "fingerprint": fp,
+                "source": "bootstrap",
+                "created_at": now,
+                "updated_at": now,
+            })
+        vector_store.insert(vectors=vectors, payloads=payloads, ids=[pid for pid, _, _ in todo])
+    t_upsert = time.perf_counter()
+
+    graph_added = 0
+    graph = getattr(memory, "graph", None)
+    if graph is not None and getattr(memory, "enable_graph", True):
+        for _, _, item in todo:
+            if item["metadata"].get("type") != "relation":
+                continue
+            try:
+                graph.add(item["text"], {"user_id": item["user_id"]})
+                graph_added += 1
+            except Exception as e:
+                print_warn(f"Graphe : relation non ajoutée ({e})")
+
+    def _ms(a, b):
+        return round((b - a) * 1000, 1)
+
+    return {
+        "total": len(by_id),
+        "added": len(todo),
+        "skipped": len(by_id) - len(todo),
+        "graph_added": graph_added,
+        "lookup_ms": _ms(t0, t_lookup),
+        "embed_ms": _ms(t_lookup, t_embed),
+        "upsert_ms": _ms(t_embed, t_upsert),
+        "graph_ms": _ms(t_upsert, time.perf_counter()),
+        "total_ms": _ms(t0, time.perf_counter()),
+    }
+
 
+def bootstrap_memories(memory, verbose: bool = False) -> dict:
+    """Charge les memoires canoniques ; sans effet si elles sont deja la.
+
+    Avec le service memoire (MemoryClient), le chargement s'execute dans le
+    service, proprietaire du vector store.
+    """
+    remote = getattr(memory, "bootstrap", None)
+    report = remote() if remote is not None else bulk_load_memories(memory, canonical_memories())
     if verbose:
-        print_ok("Protocole sparring enregistré pour Monolith, Pyrolith, Cryolith")
-
-    # Quelques CVE exemples pour amorcer la mémoire
-    sample_cves = [
-        {
-            "text": (
-                "CVE-2024-3094 : Backdoor dans xz-utils (liblzma) versions 5.6.0 et 5.6.1. "
-                "Vecteur : supply chain attack via un mainteneur compromis. "
-                "Impact : exécution de code à distance via sshd. Score CVSS : 10.0 (Critique). "
-                "Mitigation : downgrader vers xz-utils 5.4.x, vérifier les signatures."
-            ),
-            "cve_id": "CVE-2024-3094",
-            "severity": "critical",
-            "cvss": 10.0,
-        },
-        {
-            "text": (
-                "CVE-2024-6387 : RegreSSHion — Race condition dans OpenSSH sshd. "
-                "Versions affectées : 8.5p1 à 9.7p1. "
-                "Impact : exécution de code à distance en root (unauthenticated). "
-                "Score CVSS : 8.1 (Élevé). "
-                "Mitigation : mettre à jour OpenSSH vers 9.8p1+, limiter MaxStartups."
-            ),
-            "cve_id": "CVE-2024-6387",
-            "severity": "high",
-            "cvss": 8.1,
-        },
-    ]
+        print_bootstrap_report(report)
+    return report
 
-    for cve in sample_cves:
-        for agent in ["pyrolith", "cryolith"]:
-            memory.add(
-                cve["text"],
-                user_id=agent,
-                metadata={
-                    "user_id": agent,
-                    "type": "cve",
-                    "cve_id": cve["cve_id"],
-                    "severity": cve["severity"],
-                    "cvss": cve["cvss"],
-                    "created": timestamp,
-                }
-            )
 
+def print_bootstrap_report(report: dict) -> None:
+    print_header("Bootstrap des Mémoires Canoniques")
+    print_ok(f"{report['added']} ajoutées, {report['skipped']} déjà présentes "
+             f"(sur {report['total']})")
+    if report.get("graph_added"):
+        print_ok(f"{report['graph_added']} relations ajoutées au graphe")
+    print_info(f"lookup {report['lookup_ms']} ms · embed {report['embed_ms']} ms · "
+               f"upsert {report['upsert_ms']} ms · graphe {report['graph_ms']} ms · "
+               f"total {report['total_ms']} ms")
+
+
+def register_agent_identities(memory, verbose: bool = True) -> dict:
+    """Enregistre l'identité de chaque agent dans la mémoire partagée."""
+    report = bulk_load_memories(memory, identity_memories(datetime.now().isoformat()))
+    if verbose:
+        print_bootstrap_report(report)
+    return report
+
+
+def register_agent_relations(memory, verbose: bool = True) -> dict:
+    """Enregistre les relations entre agents (pour le graphe Kuzu)."""
+    report = bulk_load_memories(memory, relation_memories(datetime.now().isoformat()))
     if verbose:
-        print_ok(f"{len(sample_cves)} CVE exemples enregistrés pour Pyrolith & Cryolith")
+        print_bootstrap_report(report)
+    return report
+
+
+def register_sparring_protocol(memory, verbose: bool = True) -> dict:
+    """Enregistre le protocole de sparring Red vs Blue."""
+    report = bulk_load_memories(memory, protocol_memories(datetime.now().isoformat()))
+    if verbose:
+        print_bootstrap_report(report)
+    return report
 
 # ============================================================================
 # TESTS
@@ -801,8 +1071,21 @@ def main():
                         help="Vérifier l'état des services")
     parser.add_argument("--no-graph", action="store_true",
                         help="Fonctionner sans Kuzu (vecteurs seulement)")
+    parser.add_argument("--migrate-profile", choices=list(STORAGE_PROFILES),
+                        help="Migrer la collection vers un profil de stockage (hors ligne)")
     args = parser.parse_args()
 
+    # --- Migration de profil (backend arrete) ---
+    if args.migrate_profile:
+        try:
+            report = migrate_storage_profile(args.migrate_profile)
+        except Exception as e:
+            print_fail(f"Migration impossible : {e}")
+            sys.exit(1)
+        print_ok(f"Profil {report['profile']} ({report['mode']}) : {report['points']} points "
+                 f"en {report['duration_s']}s")
+        return
+
     print(r"""
      █████╗ ██╗     ██╗████████╗██╗  ██╗
     ██╔══██╗██║     ██║╚══██╔══╝██║  ██║
@@ -855,21 +1138,14 @@ def main():
         test_cross_agent_knowledge(memory)
         return
 
-    # --- Initialisation complète ---
-    print_header("Initialisation Complète de la Mémoire 0Lith")
-
+    # --- Initialisation complète (idempotente : relancer ne duplique rien) ---
     t0 = time.time()
-
-    register_agent_identities(memory)
-    register_agent_relations(memory)
-    register_sparring_protocol(memory)
-
+    bootstrap_memories(memory, verbose=True)
     elapsed = time.time() - t0
     print_header(f"Initialisation Terminée en {elapsed:.1f}s")
 
-    # Test automatique après init
+    # Test automatique après init (upsert Qdrant synchrone, rien à attendre)
     print_info("Lancement des tests de vérification...")
-    time.sleep(2)  # Laisser Qdrant indexer
 
     all_passed = test_memory_retrieval(memory)
     test_cross_agent_knowledge(memory)
@@ -885,6 +1161,7 @@ def main():
     1. Teste la mémoire :  python olith_memory_init.py --test
     2. Reset si besoin :   python olith_memory_init.py --reset
     3. Status services :   python olith_memory_init.py --status
+    4. Profil stockage :   python olith_memory_init.py --migrate-profile int8
 
     Dans ton code agent, récupère les mémoires avec :
         from mem0 import Memory
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+0Lith V1 — Memory Write Queue
+===============================
+File d'ecriture Mem0 unique par processus : remplace les threads daemon
+lances a chaque memory.add (fin de chat, feedback, add_mem0, shadow thinking).
+
+- Un seul worker : une extraction LLM a la fois, jamais en rafale.
+- File bornee a priorites : pleine, une ecriture prioritaire evince la plus
+  ancienne des moins prioritaires ; sinon elle est refusee.
+- Journal JSONL sous DATA_DIR/memory_queue : chaque ecriture est journalisee
+  avant d'etre acceptee, marquee faite apres memory.add, et rejouee au
+  demarrage suivant si le processus s'arrete avant.
+- Coalescence : les ecritures en attente pour le meme namespace avec les
+  memes metadonnees (hors timestamp) partent en un seul memory.add, date
+  de la plus ancienne (expiration TTL et filtres par date).
+- Drainage GPU-aware : tant que busy_fn() est vrai (chat en cours), le
+  worker attend, au plus OLITH_MEMQ_MAX_DEFER_S.
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+from pathlib import Path
+
+from config import DATA_DIR
+from olith_shared import log_info, log_warn, retry_on_failure
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+MEMQ_DIR = Path(DATA_DIR) / "memory_queue"
+MEMQ_MAX_DEPTH = int(os.getenv("OLITH_MEMQ_MAX_DEPTH", "256"))
+MEMQ_BATCH_WINDOW_S = float(os.getenv("OLITH_MEMQ_BATCH_WINDOW_S", "1.5"))
+MEMQ_MAX_DEFER_S = float(os.getenv("OLITH_MEMQ_MAX_DEFER_S", "120"))
+
+PRIORITY_HIGH = 0       # action explicite de l'utilisateur (feedback)
+PRIORITY_NORMAL = 1     # conversation, add_mem0
+PRIORITY_LOW = 2        # predictions du watcher
+
+MAX_COALESCE = 4        # ecritures fusionnees au plus par memory.add
+MAX_COALESCED_CHARS = 4000
+_COMPACT_EVERY = 64     # reecriture du journal apres N entrees "done"
+_LATENCY_WINDOW = 200
+
+
+def _coalesce_key(item: dict) -> str:
+    meta = {k: v for k, v in (item.get("metadata") or {}).items() if k != "timestamp"}
+    return json.dumps([item["user_id"], meta], sort_keys=True, ensure_ascii=False)
+
+
+class MemoryWriteQueue:
+    """Ecritures Mem0 serialisees, journalisees et coalescees."""
+
+    def __init__(
+        self,
+        memory_fn,
+        name: str = "core",
+        journal_dir: Path = MEMQ_DIR,
+        max_depth: int = MEMQ_MAX_DEPTH,
+        batch_window_s: float = MEMQ_BATCH_WINDOW_S,
+        max_defer_s: float = MEMQ_MAX_DEFER_S,
+        busy_fn=None,
+        write_lock=None,
+    ):
+        self._memory_fn = memory_fn
+        self._busy_fn = busy_fn
+        # Partage avec le compacteur : pas de memory.add pendant ses suppressions
+        self._write_lock = write_lock or threading.Lock()
+        self.max_depth = max_depth
+        self.batch_window_s = batch_window_s
+        self.max_defer_s = max_defer_s
+        self.journal_path = Path(journal_dir) / f"{name}.jsonl"
+        self._pending: list[dict] = []
+        self._cond = threading.Condition()
+        self._journal_lock = threading.Lock()
+        self._done_since_compact = 0
+        self._stop = False
+        self._flushing = False
+        self._in_flight = False
+        self._thread: threading.Thread | None = None
+        self._latencies: list[float] = []
+        self._stats = {
+            "submitted": 0, "written": 0, "coalesced": 0, "dropped": 0,
+            "rejected": 0, "replayed": 0, "failed": 0, "deferred_s": 0.0,
+        }
+        self._replay()
+
+    # ── Journal ──
+
+    def _append(self, record: dict) -> None:
+        with self._journal_lock:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _replay(self) -> None:
+        """Recharge les ecritures journalisees mais jamais terminees."""
+        if not self.journal_path.exists():
+            return
+        pending: dict[str, dict] = {}
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue        # derniere ligne tronquee par un crash
+                    if record.get("op") == "add":
+                        pending[record["id"]] = record
+                    elif record.get("op") == "done":
+                        for item_id in record.get("ids", []):
+                            pending.pop(item_id, None)
+        except OSError as e:
+            log_warn("memory_queue", f"Journal unreadable: {e}")
+            return
+        self._pending = sorted(pending.values(), key=lambda r: (r["priority"], r["enqueued"]))
+        self._stats["replayed"] = len(self._pending)
+        self._compact()
+        if self._pending:
+            log_info("memory_queue", f"Replaying {len(self._pending)} pending memory writes")
+
+    def _compact(self) -> None:
+        """Reecrit le journal avec les seules entrees en attente (tmp + os.replace).
+
+        Sous self._cond : aucun submit ne peut journaliser dans l'ancien
+        fichier entre l'instantane et le remplacement.
+        """
+        with self._cond, self._journal_lock:
+            pending = list(self._pending)
+            tmp = self.journal_path.with_suffix(".tmp")
+            try:
+                tmp.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp, "w", encoding="utf-8") as f:
+                    for item in pending:
+                        f.write(json.dumps(item, ensure_ascii=False) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.journal_path)
+                self._done_since_compact = 0
+            except OSError as e:
+                log_warn("memory_queue", f"Journal compaction failed: {e}")
+
+    # ── API ──
+
+    def start(self) -> "MemoryWriteQueue":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="memory-ingest", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, text: str, user_id: str, metadata: dict | None = None,
+               priority: int = PRIORITY_NORMAL) -> bool:
+        """Journalise puis met en file. False si la file est pleine."""
+        item = {
+            "op": "add", "id": uuid.uuid4().hex, "text": text, "user_id": user_id,
+            "metadata": metadata or {}, "priority": priority, "enqueued": time.time(),
+        }
+        evicted = None
+        with self._cond:
+            if len(self._pending) >= self.max_depth:
+                worst = max(self._pending, key=lambda r: (r["priority"], -r["enqueued"]))
+                if worst["priority"] <= priority:
+                    self._stats["rejected"] += 1
+                    return False
+                self._pending.remove(worst)
+                self._stats["dropped"] += 1
+                evicted = worst
+            self._append(item)
+            self._pending.append(item)
+            self._stats["submitted"] += 1
+            self._cond.notify()
+        if evicted is not None:
+            log_warn("memory_queue", f"Queue full, dropped a priority-{evicted['priority']} write")
+            self._append({"op": "done", "ids": [evicted["id"]]})
+        return True
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Attend que la file soit vide (tests, arret propre). Ignore busy_fn."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._flushing = True
+            self._cond.notify_all()
+            try:
+                while self._pending or self._in_flight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(min(remaining, 0.1))
+                return True
+            finally:
+                self._flushing = False
+
+    def stop(self) -> None:
+        """Arret du worker ; ce qui reste est rejoue au prochain demarrage."""
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def stats(self) -> dict:
+        with self._cond:
+            s = dict(self._stats)
+            s["depth"] = len(self._pending)
+            lat = sorted(self._latencies)
+        s["max_depth"] = self.max_depth
+        s["deferred_s"] = round(s["deferred_s"], 1)
+        s["latency_ms_avg"] = round(sum(lat) / len(lat), 1) if lat else None
+        s["latency_ms_p95"] = round(lat[min(len(lat) - 1, int(len(lat) * 0.95))], 1) if lat else None
+        return s
+
+    # ── Worker ──
+
+    def _take_batch(self) -> list[dict]:
+        """Plus prioritaire/ancienne + les suivantes de meme cle (sous self._cond)."""
+        self._pending.sort(key=lambda r: (r["priority"], r["enqueued"]))
+        head = self._pending[0]
+        key = _coalesce_key(head)
+        batch, size = [head], len(head["text"])
+        for item in self._pending[1:]:
+            if len(batch) >= MAX_COALESCE:
+                break
+            if _coalesce_key(item) == key and size + len(item["text"]) <= MAX_COALESCED_CHARS:
+                batch.append(item)
+                size += len(item["text"])
+        for item in batch:
+            self._pending.remove(item)
+        return batch
+
+    def _wait_for_gpu(self) -> None:
+        if self._busy_fn is None:
+            return
+        t0 = time.monotonic()
+        while not self._stop and not self._flushing:
+            try:
+                busy = self._busy_fn()
+            except Exception:
+                busy = False
+            if not busy or time.monotonic() - t0 >= self.max_defer_s:
+                break
+            with self._cond:
+                self._cond.wait(0.25)
+        with self._cond:
+            self._stats["deferred_s"] += time.monotonic() - t0
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._stop:
+                    self._cond.wait()
+                if self._stop:
+                    return
+            # Laisse arriver les ecritures voisines (coalescence), puis le GPU se liberer
+            deadline = time.monotonic() + self.batch_window_s
+            with self._cond:
+                while not (self._flushing or self._stop) and time.monotonic() < deadline:
+                    self._cond.wait(deadline - time.monotonic())
+            self._wait_for_gpu()
+
+            memory = self._memory_fn()
+            if memory is None:
+                with self._cond:
+                    self._cond.wait(5.0)      # Mem0 pas encore pret : on reessaie
+                continue
+
+            with self._cond:
+                if not self._pending:
+                    continue
+                batch = self._take_batch()
+                self._in_flight = True
+            try:
+                self._write(memory, batch)
+            finally:
+                with self._cond:
+                    self._in_flight = False
+                    self._cond.notify_all()
+
+    def _write(self, memory, batch: list[dict]) -> None:
+        no_think = any(item["text"].endswith("/no_think") for item in batch)
+        text = "\n\n".join(item["text"].removesuffix(" /no_think") for item in batch)
+        if no_think:
+            text += " /no_think"
+        metadata = dict(batch[-1]["metadata"])
+        stamps = [item["metadata"]["timestamp"] for item in batch
+                  if isinstance(item["metadata"].get("timestamp"), (int, float))]
+        if stamps:
+            metadata["timestamp"] = min(stamps)
+
+        def _add():
+            with self._write_lock:
+                return memory.add(text, user_id=batch[0]["user_id"], metadata=metadata)
+
+        try:
+            retry_on_failure(_add, max_retries=2, base_delay=1.0)
+            ok = True
+        except Exception as e:
+            # Abandonnee apres retries : ne pas rejouer une ecriture empoisonnee
+            ok = False
+            log_warn("memory_queue", f"Write to {batch[0]['user_id']} failed: {e}")
+        now = time.time()
+        with self._cond:
+            if ok:
+                self._stats["written"] += 1
+                self._stats["coalesced"] += len(batch) - 1
+            else:
+                self._stats["failed"] += len(batch)
+            for item in batch:
+                self._latencies.append((now - item["enqueued"]) * 1000)
+            del self._latencies[:-_LATENCY_WINDOW]
+        self._append({"op": "done", "ids": [item["id"] for item in batch]})
+        self._done_since_compact += len(batch)
+        if self._done_since_compact >= _COMPACT_EVERY:
+            self._compact()
+
+
+# ============================================================================
+# ACCES GLOBAL
+# ============================================================================
+
+_queue: MemoryWriteQueue | None = None
+_queue_lock = threading.Lock()
+
+
+def start_memory_queue(memory_fn, name: str = "core", busy_fn=None, write_lock=None) -> MemoryWriteQueue:
+    """Cree et demarre la file du processus (backend, watcher).
+
+    write_lock : verrou d'ecriture Mem0 du processus (partage avec le compacteur).
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = MemoryWriteQueue(memory_fn, name=name, busy_fn=busy_fn, write_lock=write_lock).start()
+        return _queue
+
+
+def get_memory_queue() -> MemoryWriteQueue | None:
+    return _queue
+
+
+def get_memory_queue_stats() -> dict:
+    return _queue.stats() if _queue is not None else {}
+
+
+def enqueue_memory(memory, text: str, user_id: str, metadata: dict | None = None,
+                   priority: int = PRIORITY_NORMAL) -> bool:
+    """Ecriture Mem0 via la file du processus.
+
+    Sans file demarree (scripts, tests), ecrit directement dans un thread
+    daemon comme avant.
+    """
+    # timestamp numerique sur toutes les memoires : filtres / suppressions par date
+    metadata = {**(metadata or {})}
+    metadata.setdefault("timestamp", int(time.time()))
+    if _queue is not None:
+        return _queue.submit(text, user_id, metadata, priority)
+    if memory is None:
+        return False
+
+    def _store():
+        try:
+            memory.add(text, user_id=user_id, metadata=metadata)
+        except Exception as e:
+            log_warn("memory_store", f"Failed to store memory for {user_id}: {e}")
+
+    threading.Thread(target=_store, daemon=True).start()
+    return True
@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+"""
+0Lith V1 — Memory Service
+===========================
+Processus unique proprietaire du Qdrant embarque, du graphe Kuzu et de
+l'instance Mem0. olith_core et olith_watcher deviennent des clients legers
+(MemoryClient) : un appel = un aller-retour sur une socket locale, au lieu
+d'une instance Mem0 par processus (RAM doublee, verrou du dossier Qdrant,
+QdrantClient rouvert a chaque `status`).
+
+Protocole : JSON par ligne sur 127.0.0.1:OLITH_MEMORY_PORT.
+    -> {"auth": "<secret>"}                      (1re ligne de chaque connexion)
+    -> {"id": 1, "op": "search", "args": [...], "kwargs": {...}}
+    <- {"id": 1, "result": ...}  |  {"id": 1, "error": "..."}
+
+- Secret par installation dans DATA_DIR/memory_service.token (0600) : un
+  autre processus local, ou une page web (POST no-cors), ne peut pas
+  appeler add/delete. Ligne non JSON ou secret faux : connexion fermee.
+
+- Recherches regroupees : celles qui arrivent dans la meme fenetre (~10 ms,
+  ex. les namespaces de MemoryPrefetch) partagent un seul appel /api/embed
+  pour leurs requetes distinctes, puis interrogent le vector store.
+- Ecritures (add/delete/...) serialisees entre tous les clients.
+- Le service s'arrete seul apres OLITH_MEMORY_SERVICE_IDLE_S sans client ;
+  le prochain client le relance (connect_memory_service).
+- OLITH_MEMORY_SERVICE=0 : chaque processus garde son Mem0 en interne.
+
+Usage:
+    python olith_memory_service.py      # normalement lance par les clients
+"""
+
+import os
+import sys
+import copy
+import hmac
+import json
+import time
+import select
+import socket
+import secrets
+import itertools
+import threading
+import subprocess
+import socketserver
+from concurrent.futures import Future
+from pathlib import Path
+from queue import Queue, Empty
+
+from config import DATA_DIR
+from olith_shared import log_info, log_warn, log_error
+from olith_embed_cache import get_embedding_cache, install_embedding_cache
+from olith_lexical import get_lexical_stats, hybrid_hits, install_lexical_index
+from olith_memory_filters import delete_filtered, point_to_memory, search_filtered, vector_search
+from olith_memory_compactor import get_memory_compactor_stats, start_memory_compactor
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+SERVICE_ENABLED = os.getenv("OLITH_MEMORY_SERVICE", "1") != "0"
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = int(os.getenv("OLITH_MEMORY_PORT", "11437"))
+IDLE_EXIT_S = float(os.getenv("OLITH_MEMORY_SERVICE_IDLE_S", "900"))
+# Memoires canoniques chargees a chaque demarrage (idempotent, ~0 si deja la)
+BOOTSTRAP_ON_START = os.getenv("OLITH_MEMORY_BOOTSTRAP", "1") != "0"
+BATCH_WINDOW_S = 0.01
+MAX_BATCH = 32
+CALL_TIMEOUT_S = 300     # un add declenche une extraction LLM
+SPAWN_TIMEOUT_S = 15
+TOKEN_PATH = Path(DATA_DIR) / "memory_service.token"
+MAX_AUTH_LINE = 1024
+
+# Memory.reset (efface la collection entiere) n'est pas expose
+WRITE_OPS = {"add", "update", "delete", "delete_all"}
+READ_OPS = {"search", "get", "get_all", "history"}
+# Rejouees apres une coupure ; les ecritures (add non idempotent) jamais
+RETRYABLE_OPS = READ_OPS | {"ping", "stats", "search_filtered"}
+
+
+def service_token(path: Path | None = None) -> str:
+    """Secret partage service / clients, cree au premier appel (mode 0600)."""
+    path = path or TOKEN_PATH
+    try:
+        token = path.read_text(encoding="ascii").strip()
+        if token:
+            return token
+    except FileNotFoundError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="ascii") as f:
+        f.write(secrets.token_hex(32))
+    try:
+        os.link(tmp, path)          # atomique, sans ecraser un secret deja cree
+    except FileExistsError:
+        pass
+    except OSError:
+        if not path.exists():
+            os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return path.read_text(encoding="ascii").strip()
+
+
+def _jsonable(obj):
+    """Resultats Mem0 -> JSON (objets inconnus en str)."""
+    return json.loads(json.dumps(obj, default=str, ensure_ascii=False))
+
+
+def create_memory():
+    """Instance Mem0 depuis MEM0_CONFIG (sans graphe si kuzu est absent)."""
+    from olith_memory_init import MEM0_CONFIG, check_qdrant, provision_collection
+    if not check_qdrant():
+        raise RuntimeError("Qdrant unavailable")
+    config = copy.deepcopy(MEM0_CONFIG)
+    try:
+        import kuzu  # noqa: F401
+    except ImportError:
+        config.pop("graph_store", None)
+    from mem0 import Memory
+    memory = Memory.from_config(config_dict=config)
+    install_embedding_cache(memory)
+    install_lexical_index(memory)
+    provision_collection(memory)
+    return memory
+
+
+# ============================================================================
+# SERVICE
+# ============================================================================
+
+class SearchBatcher:
+    """Regroupe les recherches simultanees : un embedding par requete distincte."""
+
+    def __init__(self, service: "MemoryService", embed_fn=None, embed_cache=None):
+        self._service = service
+        self._embed_fn = embed_fn
+        self._cache = embed_cache
+        self._queue: Queue = Queue()
+        self.stats = {"batches": 0, "searches": 0, "embedded_queries": 0}
+        threading.Thread(target=self._run, name="memsvc-batcher", daemon=True).start()
+
+    def submit(self, query: str, user_id: str, limit: int) -> Future:
+        future: Future = Future()
+        self._queue.put((query, user_id, limit, future))
+        return future
+
+    def _embed(self, memory, queries: list[str]) -> dict[str, list[float]]:
+        if self._embed_fn is not None and len(queries) > 1:
+            try:
+                if self._cache is not None:
+                    return dict(zip(queries, self._cache.embed_many(queries, self._embed_fn)))
+                return dict(zip(queries, self._embed_fn(queries)))
+            except Exception as e:
+                log_warn("memory_service", f"Batched embed failed, embedding one by one: {e}")
+        # embedding_model passe deja par le cache (install_embedding_cache)
+        return {q: memory.embedding_model.embed(q, "search") for q in queries}
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + BATCH_WINDOW_S
+            while len(batch) < MAX_BATCH:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except Empty:
+                    break
+            try:
+                memory = self._service.memory()
+                vectors = self._embed(memory, list(dict.fromkeys(q for q, _, _, _ in batch)))
+                self.stats["batches"] += 1
+                self.stats["searches"] += len(batch)
+                self.stats["embedded_queries"] += len(vectors)
+            except Exception as e:
+                for *_, future in batch:
+                    future.set_exception(e)
+                continue
+            for query, user_id, limit, future in batch:
+                try:
+                    points = vector_search(memory, query, vectors[query], limit, user_id)
+                    hits = hybrid_hits(memory, query, user_id, [point_to_memory(p) for p in points], limit)
+                    future.set_result({"results": hits})
+                except Exception as e:
+                    future.set_exception(e)
+
+
+class MemoryService:
+    """Detient Mem0 ; execute les operations des clients."""
+
+    def __init__(self, memory_factory=create_memory, embed_fn=None, embed_cache=None,
+                 bootstrap_on_start: bool = False):
+        self._factory = memory_factory
+        self._bootstrap_on_start = bootstrap_on_start
+        self._memory = None
+        self._init_error: str | None = None
+        self._ready = threading.Event()
+        self._write_lock = threading.Lock()
+        self.embed_cache = embed_cache
+        self.batcher = SearchBatcher(self, embed_fn, embed_cache)
+        self.clients = 0
+        self.last_activity = time.monotonic()
+        self._lock = threading.Lock()
+        self._op_stats: dict[str, dict] = {}
+
+    def start_init(self) -> None:
+        def _init():
+            try:
+                self._memory = self._factory()
+                log_info("memory_service", "Mem0 ready")
+            except Exception as e:
+                self._init_error = str(e)
+                log_error("memory_service", f"Mem0 init failed: {e}")
+            finally:
+                self._ready.set()
+            if self._memory is not None and self._bootstrap_on_start:
+                try:
+                    report = self.bootstrap()
+                    log_info("memory_service", f"Bootstrap: {report['added']} added, "
+                                               f"{report['skipped']} present, {report['total_ms']} ms")
+                except Exception as e:
+                    log_warn("memory_service", f"Bootstrap failed: {e}")
+        threading.Thread(target=_init, name="memsvc-init", daemon=True).start()
+
+    def memory(self):
+        self._ready.wait()
+        if self._memory is None:
+            raise RuntimeError(f"Memory unavailable: {self._init_error}")
+        return self._memory
+
+    def bootstrap(self) -> dict:
+        """Memoires canoniques (olith_memory_init), sous le verrou d'ecriture."""
+        from olith_memory_init import bulk_load_memories, canonical_memories
+        memory = self.memory()
+        with self._write_lock:
+            return bulk_load_memories(memory, canonical_memories())
+
+    def compact(self) -> dict:
+        """Passe de compaction immediate (TTL, quasi-doublons, vacuum)."""
+        from olith_memory_compactor import compact_memories
+        memory = self.memory()
+        with self._write_lock:
+            return compact_memories(memory)
+
+    def memory_or_none(self):
+        """Mem0 si l'init a reussi, sinon None (compacteur)."""
+        try:
+            return self.memory()
+        except RuntimeError:
+            return None
+
+    def _batchable(self, args: list, kwargs: dict) -> bool:
+        """search(query, user_id=..., limit=...) simple -> chemin regroupe."""
+        memory = self.memory()
+        if getattr(memory, "vector_store", None) is None or getattr(memory, "embedding_model", None) is None:
+            return False
+        return len(args) == 1 and set(kwargs) <= {"user_id", "limit"} and "user_id" in kwargs
+
+    def handle(self, request: dict) -> dict:
+        op = request.get("op")
+        args = request.get("args") or []
+        kwargs = request.get("kwargs") or {}
+        t0 = time.perf_counter()
+        self.last_activity = time.monotonic()
+        try:
+            if op == "ping":
+                result = self.ping()
+            elif op == "stats":
+                result = self.stats()
+            elif op == "bootstrap":
+                result = self.bootstrap()
+            elif op == "compact":
+                result = self.compact()
+            elif op == "search_filtered":
+                result = search_filtered(self.memory(), *args, **kwargs)
+            elif op == "delete_filtered":
+                memory = self.memory()
+                with self._write_lock:
+                    result = delete_filtered(memory, **kwargs)
+            elif op == "search" and self._batchable(args, kwargs):
+                result = self.batcher.submit(args[0], kwargs["user_id"], kwargs.get("limit", 100)).result()
+            elif op in READ_OPS:
+                result = getattr(self.memory(), op)(*args, **kwargs)
+            elif op in WRITE_OPS:
+                memory = self.memory()
+                with self._write_lock:
+                    result = getattr(memory, op)(*args, **kwargs)
+            else:
+                raise ValueError(f"Unknown op: {op}")
+            response = {"id": request.get("id"), "result": _jsonable(result)}
+        except Exception as e:
+            response = {"id": request.get("id"), "error": f"{type(e).__name__}: {e}"}
+        self._record(op, (time.perf_counter() - t0) * 1000)
+        return response
+
+    def _record(self, op, ms: float) -> None:
+        with self._lock:
+            s = self._op_stats.setdefault(op, {"calls": 0, "total_ms": 0.0})
+            s["calls"] += 1
+            s["total_ms"] += ms
+
+    def ping(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "ready": self._ready.is_set(),
+            "memory": self._memory is not None,
+            "qdrant": self._memory is not None,   # le client Qdrant vit dans Mem0
+            "error": self._init_error,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            ops = {
+                op: {"calls": s["calls"], "avg_ms": round(s["total_ms"] / s["calls"], 1)}
+                for op, s in self._op_stats.items()
+            }
+        return {
+            "pid": os.getpid(),
+            "clients": self.clients,
+            "ops": ops,
+            "batching": dict(self.batcher.stats),
+            "embed_cache": self.embed_cache.stats() if self.embed_cache is not None else None,
+            "compactor": get_memory_compactor_stats(),
+            "lexical": get_lexical_stats(),
+        }
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _authenticate(self) -> bool:
+        try:
+            hello = json.loads(self.rfile.readline(MAX_AUTH_LINE))
+        except (OSError, ValueError):
+            return False
+        token = hello.get("auth") if isinstance(hello, dict) else None
+        return isinstance(token, str) and hmac.compare_digest(token, self.server.token)
+
+    def handle(self):
+        service: MemoryService = self.server.service
+        if not self._authenticate():
+            return
+        with service._lock:
+            service.clients += 1
+        try:
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    return              # pas un client 0Lith (en-tetes HTTP...)
+                if not isinstance(request, dict):
+                    return
+                response = service.handle(request)
+                self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+                self.wfile.flush()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            with service._lock:
+                service.clients -= 1
+            service.last_activity = time.monotonic()
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = False     # un seul service par port
+
+    def __init__(self, address, handler, token: str | None = None):
+        super().__init__(address, handler)
+        self.token = token or service_token()
+
+
+def serve(host: str = SERVICE_HOST, port: int = SERVICE_PORT, service: MemoryService | None = None,
+          idle_exit_s: float = IDLE_EXIT_S) -> None:
+    """Bind d'abord (un second service echoue ici, avant d'ouvrir Qdrant), puis init Mem0."""
+    server = _Server((host, port), _Handler)
+    server.service = service or MemoryService(
+        embed_fn=_default_embed_fn(), embed_cache=get_embedding_cache(), bootstrap_on_start=BOOTSTRAP_ON_START,
+    )
+    server.service.start_init()
+    start_memory_compactor(server.service.memory_or_none, lock=server.service._write_lock)
+    log_info("memory_service", f"Listening on {host}:{port} (pid {os.getpid()})")
+
+    def _idle_watch():
+        while True:
+            time.sleep(5)
+            svc = server.service
+            if svc.clients == 0 and time.monotonic() - svc.last_activity > idle_exit_s:
+                log_info("memory_service", "Idle, shutting down")
+                server.shutdown()
+                return
+    threading.Thread(target=_idle_watch, name="memsvc-idle", daemon=True).start()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def _default_embed_fn():
+    from olith_ollama import embed_texts
+    return embed_texts
+
+
+# ============================================================================
+# CLIENT
+# ============================================================================
+
+class MemoryClient:
+    """Sous-ensemble de mem0.Memory servi par le service (add/search/delete...).
+
+    Une connexion par thread : les appels concurrents (MemoryPrefetch) partent
+    en parallele et le service les regroupe.
+    """
+
+    def __init__(self, host: str = SERVICE_HOST, port: int = SERVICE_PORT, timeout: float = CALL_TIMEOUT_S,
+                 token: str | None = None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._token = token
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and select.select([conn[0]], [], [], 0)[0]:
+            # Lisible hors requete : fermee par le service (arret sur inactivite)
+            self._drop()
+            conn = None
+        if conn is None:
+            if self._token is None:
+                self._token = service_token()
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            try:
+                sock.sendall((json.dumps({"auth": self._token}) + "\n").encode("ascii"))
+            except OSError:
+                sock.close()
+                raise
+            conn = (sock, sock.makefile("rb"))
+            self._local.conn = conn
+        return conn
+
+    def _drop(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn[1].close()
+                conn[0].close()
+            except OSError:
+                pass
+
+    def call(self, op: str, *args, **kwargs):
+        request = {"id": next(self._ids), "op": op, "args": list(args), "kwargs": kwargs}
+        data = (json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8")
+        for attempt in range(2):
+            sent = False
+            try:
+                sock, reader = self._conn()
+                sent = True
+                sock.sendall(data)
+                line = reader.readline()
+                if not line:
+                    raise ConnectionError("memory service closed the connection")
+                break
+            except OSError:
+                self._drop()
+                # Requete peut-etre deja executee : une ecriture n'est pas rejouee
+                if attempt == 1 or (sent and op not in RETRYABLE_OPS):
+                    raise
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+    # API Mem0 utilisee par 0Lith
+    def add(self, *args, **kwargs):
+        return self.call("add", *args, **kwargs)
+
+    def search(self, *args, **kwargs):
+        return self.call("search", *args, **kwargs)
+
+    def get_all(self, *args, **kwargs):
+        return self.call("get_all", *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self.call("delete", *args, **kwargs)
+
+    def delete_all(self, *args, **kwargs):
+        return self.call("delete_all", *args, **kwargs)
+
+    def search_filtered(self, query, limit: int = 5, **filters) -> dict:
+        return self.call("search_filtered", query, limit=limit, **filters)
+
+    def delete_filtered(self, **filters) -> dict:
+        return self.call("delete_filtered", **filters)
+
+    def bootstrap(self) -> dict:
+        return self.call("bootstrap")
+
+    def compact(self) -> dict:
+        return self.call("compact")
+
+    def ping(self) -> dict:
+        return self.call("ping")
+
+    def stats(self) -> dict:
+        return self.call("stats")
+
+    def close(self) -> None:
+        self._drop()
+
+
+def _spawn_service() -> None:
+    log_info("memory_service", "Starting memory service process")
+    subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve())],
+        cwd=str(Path(__file__).resolve().parent),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0,
+        start_new_session=sys.platform != "win32",
+    )
+
+
+def probe_memory_service() -> dict | None:
+    """ping du service s'il tourne deja (sans le lancer), sinon None."""
+    if not SERVICE_ENABLED:
+        return None
+    client = MemoryClient(timeout=2)
+    try:
+        return client.ping()
+    except OSError:
+        return None
+    finally:
+        client.close()
+
+
+def connect_memory_service(spawn: bool = True, wait_ready: bool = True) -> MemoryClient | None:
+    """Client connecte au service (lance au besoin), ou None si indisponible.
+
+    wait_ready : attend la fin de l'init Mem0 cote service ; None si elle a echoue.
+    """
+    if not SERVICE_ENABLED:
+        return None
+    client = MemoryClient()
+    deadline = time.monotonic() + SPAWN_TIMEOUT_S
+    spawned = False
+    while True:
+        try:
+            info = client.ping()
+            break
+        except OSError:
+            if not spawn:
+                return None
+            if not spawned:
+                _spawn_service()
+                spawned = True
+            if time.monotonic() > deadline:
+                log_warn("memory_service", "Memory service did not start in time")
+                return None
+            time.sleep(0.2)
+    while wait_ready and not info.get("ready"):
+        if time.monotonic() > deadline + CALL_TIMEOUT_S:
+            return None
+        time.sleep(0.2)
+        info = client.ping()
+    if wait_ready and not info.get("memory"):
+        log_warn("memory_service", f"Memory service has no Mem0: {info.get('error')}")
+        return None
+    return client
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+if __name__ == "__main__":
+    try:
+        serve()
+    except OSError as e:
+        # Port deja pris : un autre service tourne deja
+        log_info("memory_service", f"Not starting: {e}")
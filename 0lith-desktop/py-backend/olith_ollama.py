@@ -4,17 +4,262 @@
 ====================================================
 Gere les appels a l'API Ollama (streaming et non-streaming)
 et le cycle de vie du processus Ollama (start/stop/gaming mode).
+
+Annulation : chaque appel accepte un cancel_event. Quand il est declenche,
+la socket HTTP en cours est coupee (shutdown) — Ollama voit la deconnexion
+et arrete la generation, ce qui libere le GPU au lieu d'attendre le timeout.
 """
 
 import os
 import sys
 import json
 import time
+import socket
+import threading
 import subprocess
+from contextlib import contextmanager
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
 
 from olith_shared import log_warn, log_error, log_info, retry_on_failure
 from olith_memory_init import OLLAMA_URL, PYROLITH_URL
+from config import EMBED_MODEL
+
+# ============================================================================
+# CANCELLATION — Coupe la connexion HTTP d'un appel en cours
+# ============================================================================
+
+class GenerationCancelled(Exception):
+    """Levee quand un appel Ollama est interrompu par son cancel_event."""
+
+
+class CancelToken(threading.Event):
+    """threading.Event qui notifie les appels Ollama en cours lorsqu'il est set().
+
+    Un threading.Event classique reste accepte partout (surveille par polling) ;
+    le token evite le thread de polling et horodate l'annulation.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._callbacks: list = []
+        self._cb_lock = threading.Lock()
+        self.set_at: float | None = None
+
+    def set(self) -> None:
+        with self._cb_lock:
+            if self.set_at is None:
+                self.set_at = time.perf_counter()
+            callbacks = list(self._callbacks)
+        super().set()
+        for cb in callbacks:
+            try:
+                cb()
+            except Exception as e:
+                log_warn("cancel", f"Abort callback failed: {e}")
+
+    def clear(self) -> None:
+        with self._cb_lock:
+            self.set_at = None
+        super().clear()
+
+    def add_callback(self, fn):
+        """Enregistre fn (appelee au set()). Retourne une fonction de desinscription."""
+        with self._cb_lock:
+            self._callbacks.append(fn)
+        if self.is_set():
+            fn()
+
+        def _remove():
+            with self._cb_lock:
+                if fn in self._callbacks:
+                    self._callbacks.remove(fn)
+        return _remove
+
+
+class _AbortGuard:
+    """Lie un appel HTTP a sa connexion pour pouvoir la couper depuis un autre thread."""
+
+    def __init__(self):
+        self._conn: HTTPConnection | None = None
+        self._lock = threading.Lock()
+        self.aborted = False
+        self.abort_requested_at: float | None = None
+
+    def bind(self, conn: HTTPConnection) -> None:
+        with self._lock:
+            self._conn = conn
+
+    def abort(self) -> None:
+        with self._lock:
+            if self.abort_requested_at is None:
+                self.abort_requested_at = time.perf_counter()
+            self.aborted = True
+            conn = self._conn
+        if conn is not None:
+            _shutdown_socket(conn)
+
+
+def _shutdown_socket(conn: HTTPConnection) -> None:
+    """shutdown() reveille un recv() bloque dans un autre thread (close() ne le fait pas)."""
+    sock = getattr(conn, "sock", None)
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+_call_local = threading.local()
+
+
+class _AbortableHTTPConnection(HTTPConnection):
+    def request(self, *args, **kwargs):
+        guard: _AbortGuard | None = getattr(_call_local, "guard", None)
+        if guard is not None:
+            guard.bind(self)
+        result = super().request(*args, **kwargs)
+        # Annulation arrivee pendant le connect : la socket existe maintenant
+        if guard is not None and guard.aborted:
+            _shutdown_socket(self)
+        return result
+
+
+class _AbortableHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _AbortableHTTPConnection
+
+
+class _AbortableAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            **self.poolmanager.pool_classes_by_scheme,
+            "http": _AbortableHTTPConnectionPool,
+        }
+
+
+_abort_stats = {"aborts": 0, "last_ms": 0.0, "max_ms": 0.0, "total_ms": 0.0}
+_abort_stats_lock = threading.Lock()
+
+
+def _record_abort(cancel_event, guard: _AbortGuard, where: str) -> None:
+    """Mesure le temps entre l'annulation et le retour effectif de l'appel."""
+    started = getattr(cancel_event, "set_at", None) or guard.abort_requested_at
+    elapsed_ms = (time.perf_counter() - started) * 1000 if started else 0.0
+    with _abort_stats_lock:
+        _abort_stats["aborts"] += 1
+        _abort_stats["last_ms"] = round(elapsed_ms, 1)
+        _abort_stats["max_ms"] = round(max(_abort_stats["max_ms"], elapsed_ms), 1)
+        _abort_stats["total_ms"] += elapsed_ms
+    log_info("cancel", f"{where} aborted {elapsed_ms:.0f} ms after cancel")
+
+
+def get_abort_stats() -> dict:
+    """Statistiques time-to-abort (exposees par status)."""
+    with _abort_stats_lock:
+        n = _abort_stats["aborts"]
+        return {
+            "aborts": n,
+            "last_abort_ms": _abort_stats["last_ms"],
+            "max_abort_ms": _abort_stats["max_ms"],
+            "avg_abort_ms": round(_abort_stats["total_ms"] / n, 1) if n else 0.0,
+        }
+
+
+def _on_cancel(cancel_event: threading.Event, fn):
+    """Appelle fn des que cancel_event est set. Retourne une fonction de desinscription."""
+    if isinstance(cancel_event, CancelToken):
+        return cancel_event.add_callback(fn)
+
+    done = threading.Event()
+
+    def _poll():
+        while not done.is_set():
+            if cancel_event.wait(0.1):
+                if not done.is_set():
+                    fn()
+                return
+
+    threading.Thread(target=_poll, daemon=True).start()
+    return done.set
+
+
+@contextmanager
+def _abortable(cancel_event: threading.Event | None, where: str):
+    """Contexte d'un appel annulable. Traduit l'erreur de socket coupee en GenerationCancelled."""
+    if cancel_event is None:
+        yield None
+        return
+    if cancel_event.is_set():
+        raise GenerationCancelled(f"{where}: cancelled before start")
+
+    guard = _AbortGuard()
+    unregister = _on_cancel(cancel_event, guard.abort)
+    try:
+        yield guard
+    except GenerationCancelled:
+        _record_abort(cancel_event, guard, where)
+        raise
+    except Exception as e:
+        if guard.aborted or cancel_event.is_set():
+            _record_abort(cancel_event, guard, where)
+            raise GenerationCancelled(f"{where}: cancelled") from e
+        raise
+    finally:
+        unregister()
+
+
+def _post(url: str, payload: dict, timeout: int, guard: _AbortGuard | None, stream: bool = False):
+    """POST via la session partagee ; la connexion utilisee est liee au guard."""
+    _call_local.guard = guard
+    try:
+        return _session.post(url, json=payload, timeout=timeout, stream=stream)
+    finally:
+        _call_local.guard = None
+
+
+def _iter_stream_content(response, guard: _AbortGuard | None, metrics: dict | None = None):
+    """Yield le contenu de chaque ligne NDJSON ; s'arrete proprement si annule.
+
+    chunk_size=None : chaque chunk HTTP est traite des reception (le defaut de
+    512 octets retardait les tokens et la detection d'annulation).
+    metrics : si fourni, recoit les compteurs de la ligne finale (done).
+    """
+    try:
+        for line in response.iter_lines(chunk_size=None):
+            if guard is not None and guard.aborted:
+                return
+            if line:
+                data = json.loads(line)
+                content = data.get("message", {}).get("content", "")
+                if content:
+                    yield content
+                if data.get("done", False):
+                    if metrics is not None:
+                        metrics.update(_done_metrics(data))
+                    return
+    except Exception:
+        if guard is not None and guard.aborted:
+            return
+        raise
+    finally:
+        response.close()
+
+
+def _done_metrics(data: dict) -> dict:
+    """prompt_eval / eval d'Ollama (durees en ns) convertis en ms."""
+    return {
+        "prompt_tokens": data.get("prompt_eval_count"),
+        "prompt_eval_ms": round(data.get("prompt_eval_duration", 0) / 1e6, 1),
+        "eval_tokens": data.get("eval_count"),
+        "eval_ms": round(data.get("eval_duration", 0) / 1e6, 1),
+        "done_reason": data.get("done_reason"),
+    }
+
 
 # ============================================================================
 # CONNECTION POOLING — Reutilise les connexions TCP
@@ -23,6 +268,7 @@ from olith_memory_init import OLLAMA_URL, PYROLITH_URL
 # Session partagee pour tous les appels HTTP (connection pooling)
 _session = requests.Session()
 _session.headers.update({"Content-Type": "application/json"})
+_session.mount("http://", _AbortableAdapter())
 
 
 def get_session() -> requests.Session:
@@ -30,6 +276,64 @@ def get_session() -> requests.Session:
     return _session
 
 
+# ============================================================================
+# RESPONSE CACHE — opt-in par site d'appel (cache=True)
+# ============================================================================
+
+_DIGEST_TTL_S = 60
+_digests: dict[str, tuple[float, dict[str, str]]] = {}   # url -> (fetched_at, {model: digest})
+_digests_lock = threading.Lock()
+
+
+def get_model_digest(model: str, url: str | None = None) -> str | None:
+    """Digest des poids du modele (/api/tags, rafraichi toutes les 60 s)."""
+    url = url or OLLAMA_URL
+    with _digests_lock:
+        fetched_at, digests = _digests.get(url, (0.0, {}))
+    if time.monotonic() - fetched_at > _DIGEST_TTL_S or model not in digests:
+        try:
+            r = _session.get(f"{url}/api/tags", timeout=3)
+            r.raise_for_status()
+            digests = {m["name"]: m.get("digest", "") for m in r.json().get("models", [])}
+        except Exception:
+            return None
+        with _digests_lock:
+            _digests[url] = (time.monotonic(), digests)
+    return digests.get(model) or digests.get(f"{model}:latest") or None
+
+
+def cache_lookup(model: str, messages: list[dict], options: dict, url: str | None = None):
+    """Retourne (key, reponse en cache ou None).
+
+    key est None quand la requete n'est pas cacheable : cache desactive,
+    serveur injoignable ou modele inconnu (pas de digest).
+    """
+    from olith_response_cache import get_response_cache, make_key
+    cache = get_response_cache()
+    digest = get_model_digest(model, url) if cache else None
+    if not digest:
+        return None, None
+    key = make_key(digest, messages, options)
+    return key, cache.get(key)
+
+
+def cache_store(key: str | None, model: str, value: str) -> None:
+    from olith_response_cache import get_response_cache
+    cache = get_response_cache()
+    if key and cache:
+        cache.put(key, model, value)
+
+
+def _cached_call(model: str, messages: list[dict], options: dict, url: str, call):
+    """Consulte le cache avant call(), y stocke le resultat ensuite."""
+    key, hit = cache_lookup(model, messages, options, url)
+    if hit is not None:
+        return hit
+    result = call()
+    cache_store(key, model, result)
+    return result
+
+
 # ============================================================================
 # OLLAMA API
 # ============================================================================
@@ -39,24 +343,36 @@ def chat_with_ollama(
     messages: list[dict],
     timeout: int = 120,
     num_ctx: int = 4096,
+    cancel_event: threading.Event | None = None,
+    keep_alive: str | int = "5m",
+    cache: bool = False,
 ) -> str:
-    """Appel direct a l'API Ollama (non-streaming). Retourne le contenu de la reponse."""
+    """Appel direct a l'API Ollama (non-streaming). Retourne le contenu de la reponse.
+
+    Leve GenerationCancelled si cancel_event est declenche pendant l'appel.
+    cache=True : le site d'appel declare la requete deterministe, la reponse
+    est servie depuis / stockee dans le cache disque (olith_response_cache).
+    """
+    payload = {
+        "model": model,
+        "messages": messages,
+        "stream": False,
+        "keep_alive": keep_alive,
+        "options": {"num_ctx": num_ctx},
+    }
+
     def _call():
-        response = _session.post(
-            f"{OLLAMA_URL}/api/chat",
-            json={
-                "model": model,
-                "messages": messages,
-                "stream": False,
-                "keep_alive": "5m",
-                "options": {"num_ctx": num_ctx},
-            },
-            timeout=timeout,
-        )
-        response.raise_for_status()
-        return response.json()["message"]["content"]
+        with _abortable(cancel_event, f"chat {model}") as guard:
+            response = _post(f"{OLLAMA_URL}/api/chat", payload, timeout, guard)
+            response.raise_for_status()
+            return response.json()["message"]["content"]
 
-    return retry_on_failure(_call, max_retries=2, base_delay=1.0)
+    def _call_with_retry():
+        return retry_on_failure(_call, max_retries=2, base_delay=1.0)
+
+    if cache:
+        return _cached_call(model, messages, payload["options"], OLLAMA_URL, _call_with_retry)
+    return _call_with_retry()
 
 
 def chat_with_ollama_stream(
@@ -64,33 +380,46 @@ def chat_with_ollama_stream(
     messages: list[dict],
     timeout: int = 120,
     num_ctx: int = 4096,
+    cancel_event: threading.Event | None = None,
+    keep_alive: str | int = "5m",
+    metrics: dict | None = None,
+    num_predict: int | None = None,
 ):
-    """Appel streaming a l'API Ollama. Yield chaque token au fur et a mesure."""
-    def _connect():
-        resp = _session.post(
-            f"{OLLAMA_URL}/api/chat",
-            json={
-                "model": model,
-                "messages": messages,
-                "stream": True,
-                "keep_alive": "5m",
-                "options": {"num_ctx": num_ctx},
-            },
-            timeout=timeout,
-            stream=True,
-        )
-        resp.raise_for_status()
-        return resp
-
-    response = retry_on_failure(_connect, max_retries=2, base_delay=1.0)
-    for line in response.iter_lines():
-        if line:
-            data = json.loads(line)
-            content = data.get("message", {}).get("content", "")
-            if content:
-                yield content
-            if data.get("done", False):
-                return
+    """Appel streaming a l'API Ollama. Yield chaque token au fur et a mesure.
+
+    Si cancel_event est declenche, la connexion est coupee et le generateur
+    s'arrete (sans lever) — l'appelant verifie cancel_event.
+    metrics : rempli en fin de stream (prompt_tokens, prompt_eval_ms, ...).
+    num_predict : plafond de tokens generes (place restante dans num_ctx).
+    """
+    options = {"num_ctx": num_ctx}
+    if num_predict is not None:
+        options["num_predict"] = num_predict
+    payload = {
+        "model": model,
+        "messages": messages,
+        "stream": True,
+        "keep_alive": keep_alive,
+        "options": options,
+    }
+    try:
+        with _abortable(cancel_event, f"stream {model}") as guard:
+            def _connect():
+                try:
+                    resp = _post(f"{OLLAMA_URL}/api/chat", payload, timeout, guard, stream=True)
+                except requests.exceptions.RequestException:
+                    if guard is not None and guard.aborted:
+                        raise GenerationCancelled(f"stream {model}: cancelled") from None
+                    raise
+                resp.raise_for_status()
+                return resp
+
+            response = retry_on_failure(_connect, max_retries=2, base_delay=1.0)
+            yield from _iter_stream_content(response, guard, metrics)
+            if guard is not None and guard.aborted:
+                raise GenerationCancelled(f"stream {model}: cancelled")
+    except GenerationCancelled:
+        return
 
 
 def chat_docker_pyrolith(
@@ -98,20 +427,34 @@ def chat_docker_pyrolith(
     messages: list[dict],
     timeout: int = 360,
     num_ctx: int = 8192,
+    cancel_event: threading.Event | None = None,
+    cache: bool = False,
 ) -> str:
-    """Appel a Pyrolith via Docker Ollama (port 11435)."""
-    response = _session.post(
-        f"{PYROLITH_URL}/api/chat",
-        json={
-            "model": model,
-            "messages": messages,
-            "stream": False,
-            "options": {"num_ctx": num_ctx},
-        },
-        timeout=timeout,
-    )
-    response.raise_for_status()
-    return response.json()["message"]["content"]
+    """Appel a Pyrolith via Docker Ollama (port 11435).
+
+    Leve GenerationCancelled si cancel_event est declenche pendant l'appel.
+    """
+    options = {"num_ctx": num_ctx}
+
+    def _call():
+        with _abortable(cancel_event, f"pyrolith {model}") as guard:
+            response = _post(
+                f"{PYROLITH_URL}/api/chat",
+                {
+                    "model": model,
+                    "messages": messages,
+                    "stream": False,
+                    "options": options,
+                },
+                timeout,
+                guard,
+            )
+            response.raise_for_status()
+            return response.json()["message"]["content"]
+
+    if cache:
+        return _cached_call(model, messages, options, PYROLITH_URL, _call)
+    return _call()
 
 
 def chat_docker_pyrolith_stream(
@@ -120,41 +463,81 @@ def chat_docker_pyrolith_stream(
     timeout: int = 300,
     emit=None,
     num_ctx: int = 8192,
+    cancel_event: threading.Event | None = None,
+    metrics: dict | None = None,
+    num_predict: int | None = None,
 ) -> str:
-    """Appel streaming a Pyrolith via Docker Ollama (port 11435)."""
-    response = _session.post(
-        f"{PYROLITH_URL}/api/chat",
-        json={
-            "model": model,
-            "messages": messages,
-            "stream": True,
-            "options": {"num_ctx": num_ctx},
-        },
-        timeout=timeout,
-        stream=True,
-    )
-    response.raise_for_status()
+    """Appel streaming a Pyrolith via Docker Ollama (port 11435).
+
+    Retourne le texte recu jusque-la si cancel_event est declenche.
+    """
     full_response = []
-    for line in response.iter_lines():
-        if line:
-            data = json.loads(line)
-            content = data.get("message", {}).get("content", "")
-            if content:
+    options = {"num_ctx": num_ctx}
+    if num_predict is not None:
+        options["num_predict"] = num_predict
+    try:
+        with _abortable(cancel_event, f"pyrolith stream {model}") as guard:
+            response = _post(
+                f"{PYROLITH_URL}/api/chat",
+                {
+                    "model": model,
+                    "messages": messages,
+                    "stream": True,
+                    "options": options,
+                },
+                timeout,
+                guard,
+                stream=True,
+            )
+            response.raise_for_status()
+            for content in _iter_stream_content(response, guard, metrics):
                 full_response.append(content)
                 if emit:
                     emit({"status": "streaming", "chunk": content})
-            if data.get("done", False):
-                break
+            if guard is not None and guard.aborted:
+                raise GenerationCancelled(f"pyrolith stream {model}: cancelled")
+    except GenerationCancelled:
+        pass
     return "".join(full_response)
 
 
+def embed_texts(
+    texts: list[str],
+    model: str | None = None,
+    timeout: int = 30,
+) -> list[list[float]]:
+    """Embeddings via /api/embed (un seul appel pour tout le batch).
+
+    Retourne un vecteur par texte, dans l'ordre d'entree.
+    """
+    if not texts:
+        return []
+    payload = {
+        "model": model or EMBED_MODEL,
+        "input": texts,
+        "keep_alive": "24h",
+    }
+
+    def _call():
+        response = _session.post(f"{OLLAMA_URL}/api/embed", json=payload, timeout=timeout)
+        response.raise_for_status()
+        embeddings = response.json().get("embeddings") or []
+        if len(embeddings) != len(texts):
+            raise ValueError(f"/api/embed returned {len(embeddings)} vectors for {len(texts)} inputs")
+        return embeddings
+
+    return retry_on_failure(_call, max_retries=2, base_delay=0.5)
+
+
 # ============================================================================
 # OLLAMA PROCESS MANAGEMENT
 # ============================================================================
 
 OLLAMA_GPU_ENV = {
     **os.environ,
-    "OLLAMA_MAX_LOADED_MODELS": "2",
+    # Hodolith epingle + agent courant + agent precharge — le budget VRAM
+    # reel est gere par olith_residency (eviction LRU explicite)
+    "OLLAMA_MAX_LOADED_MODELS": "3",
     "OLLAMA_KEEP_ALIVE": "24h",
     "OLLAMA_FLASH_ATTENTION": "1",
 }
@@ -225,6 +608,39 @@ def stop_ollama():
         log_warn("ollama", f"Force kill failed: {e}")
 
 
+def get_running_models(url: str | None = None) -> list[dict]:
+    """Modeles charges selon /api/ps (entrees brutes : name, size, size_vram...)."""
+    r = _session.get(f"{url or OLLAMA_URL}/api/ps", timeout=5)
+    r.raise_for_status()
+    return r.json().get("models", [])
+
+
+def load_model(model: str, keep_alive: str | int = "5m", timeout: int = 300,
+               cancel_event: threading.Event | None = None, options: dict | None = None) -> None:
+    """Charge un modele en VRAM sans generer (requete /api/generate sans prompt).
+
+    options      : options du runner, notamment {"num_ctx": ...} — Ollama recharge
+                   le modele si l'appel chat suivant demande un autre num_ctx.
+    cancel_event : coupe la requete si pose (GenerationCancelled).
+    """
+    payload = {"model": model, "keep_alive": keep_alive}
+    if options:
+        payload["options"] = options
+    with _abortable(cancel_event, f"load {model}") as guard:
+        r = _post(f"{OLLAMA_URL}/api/generate", payload, timeout, guard)
+        r.raise_for_status()
+
+
+def unload_model(model: str, timeout: int = 30) -> None:
+    """Decharge un modele immediatement (keep_alive = 0)."""
+    r = _session.post(
+        f"{OLLAMA_URL}/api/generate",
+        json={"model": model, "keep_alive": 0},
+        timeout=timeout,
+    )
+    r.raise_for_status()
+
+
 def get_loaded_models() -> tuple[list[dict], float]:
     """Get currently loaded models and total VRAM usage.
     Returns (loaded_models_list, vram_used_gb)."""
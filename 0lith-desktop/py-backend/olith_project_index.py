@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+"""
+0Lith V1 — Project File Index
+===============================
+Index des fichiers du projet ouvert, construit une fois par set_project_root :
+chemins, tailles, mtimes, texte/binaire, nombre de lignes. list_files et
+search_files deviennent des lectures d'index au lieu d'un parcours du disque
+avec un stat par entree.
+
+- Mise a jour incrementale : chaque dossier visite par une requete est
+  re-valide par son mtime (un stat par dossier, pas par fichier) et relu
+  s'il a change ; les fichiers relus par search_files sont re-valides par
+  fstat ; write_file / edit_file appellent touch() ; un observateur
+  watchdog signale les fichiers modifies (a defaut : balayage des mtimes
+  au plus toutes les SWEEP_INTERVAL_S).
+- Index de trigrammes (olith_trigram) alimente au meme passage : la
+  recherche regex ne relit que les fichiers candidats.
+- Construction en arriere-plan ; en attendant, les outils gardent le
+  parcours direct.
+- Persiste sous DATA_DIR/project_index/<hash racine>.json.gz (colonnes
+  compactes) + .trigrams.npz : rouvrir un projet ne relit pas le disque.
+
+OLITH_PROJECT_INDEX=0 desactive l'index, OLITH_TRIGRAM_INDEX=0 les trigrammes.
+"""
+
+import os
+import gzip
+import json
+import time
+import atexit
+import hashlib
+import threading
+from pathlib import Path
+
+from config import DATA_DIR
+from olith_shared import TEXT_EXTENSIONS, IGNORED_DIRS, log_info, log_warn
+from olith_trigram import TrigramIndex, regex_query
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+PROJECT_INDEX_ENABLED = os.getenv("OLITH_PROJECT_INDEX", "1") != "0"
+TRIGRAM_INDEX_ENABLED = os.getenv("OLITH_TRIGRAM_INDEX", "1") != "0"
+PROJECT_INDEX_DIR = Path(DATA_DIR) / "project_index"
+SNIFF_BYTES = 8192                      # octets lus pour detecter un binaire
+LINE_COUNT_MAX_BYTES = 16 * 1024 * 1024 # au-dela, lignes non comptees (-1) ni trigrammes
+SAVE_INTERVAL_S = 60.0                  # sauvegarde differee apres mises a jour
+SWEEP_INTERVAL_S = 5.0                  # balayage des mtimes sans watchdog
+FORMAT_VERSION = 1
+
+# Colonnes d'une entree fichier
+SIZE, MTIME, TEXT, LINES = range(4)
+
+
+def _store_path(root: Path) -> Path:
+    digest = hashlib.sha1(str(root).encode("utf-8")).hexdigest()[:16]
+    return PROJECT_INDEX_DIR / f"{digest}.json.gz"
+
+
+def _name_key(name: str) -> str:
+    return name.lower()
+
+
+def sniff_file(path: str, size: int) -> tuple[bool, int, bytes | None]:
+    """(texte ?, lignes, contenu) ; binaire = extension inconnue ou octet NUL en tete.
+
+    Le contenu (pour les trigrammes) n'est rendu que sous LINE_COUNT_MAX_BYTES.
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix not in TEXT_EXTENSIONS and suffix != "":
+        return False, 0, None
+    try:
+        with open(path, "rb") as f:
+            if size > LINE_COUNT_MAX_BYTES:
+                return b"\0" not in f.read(SNIFF_BYTES), -1, None
+            data = f.read()
+    except OSError:
+        return False, 0, None
+    if b"\0" in data[:SNIFF_BYTES]:
+        return False, 0, None
+    return True, count_lines(data), data
+
+
+def count_lines(data: bytes) -> int:
+    return data.count(b"\n") + (1 if data and not data.endswith(b"\n") else 0)
+
+
+class ProjectIndex:
+    """Arborescence + metadonnees des fichiers d'une racine de projet.
+
+    _dirs  : chemin relatif ("" = racine) -> [mtime_ns, sous-dossiers, fichiers]
+             (noms tries sans casse, comme l'ancien list_files)
+    _files : chemin relatif -> [taille, mtime_ns, texte (0/1), lignes]
+    """
+
+    def __init__(self, root: Path | str, path: Path | None = None):
+        self.root = Path(root).resolve()
+        self.path = path
+        self._dirs: dict[str, list] = {}
+        self._files: dict[str, list] = {}
+        self._lock = threading.RLock()
+        self.ready = threading.Event()
+        self._dirty = False
+        self._last_save = 0.0
+        self._stats = {"build_ms": 0.0, "load_ms": 0.0, "rescanned_dirs": 0, "updated_files": 0}
+        self.trigrams = TrigramIndex() if TRIGRAM_INDEX_ENABLED else None
+        self._pending: set[str] = set()     # chemins signales par watchdog
+        self._pending_lock = threading.Lock()
+        self._observer = None
+        self._last_sweep = time.monotonic()
+
+    # ── Construction ──────────────────────────────────────────────────────
+
+    def _abs(self, rel: str) -> str:
+        return os.path.join(self.root, rel) if rel else str(self.root)
+
+    @staticmethod
+    def _join(rel: str, name: str) -> str:
+        return f"{rel}/{name}" if rel else name
+
+    def _scan_dir(self, rel: str) -> list[str]:
+        """(Re)lit un dossier ; retourne les sous-dossiers nouveaux a parcourir."""
+        abs_dir = self._abs(rel)
+        try:
+            mtime = os.stat(abs_dir).st_mtime_ns
+            entries = list(os.scandir(abs_dir))
+        except OSError:
+            self._drop_dir(rel)
+            return []
+        old = self._dirs.get(rel)
+        subdirs, files = [], []
+        for entry in entries:
+            if entry.name in IGNORED_DIRS:
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.is_file():
+                    files.append(entry.name)
+                    self._index_file(self._join(rel, entry.name), entry.stat())
+            except OSError:
+                continue
+        subdirs.sort(key=_name_key)
+        files.sort(key=_name_key)
+        if old is not None:
+            for name in set(old[2]) - set(files):
+                self._remove_file(self._join(rel, name))
+            for name in set(old[1]) - set(subdirs):
+                self._drop_dir(self._join(rel, name))
+        self._dirs[rel] = [mtime, subdirs, files]
+        self._dirty = True
+        known = set(old[1]) if old is not None else set()
+        return [self._join(rel, d) for d in subdirs if d not in known]
+
+    def _scan_tree(self, rel: str) -> None:
+        stack = [rel]
+        while stack:
+            stack.extend(self._scan_dir(stack.pop()))
+
+    def _drop_dir(self, rel: str) -> None:
+        entry = self._dirs.pop(rel, None)
+        if entry is None:
+            return
+        for name in entry[2]:
+            self._remove_file(self._join(rel, name))
+        for name in entry[1]:
+            self._drop_dir(self._join(rel, name))
+
+    def _index_file(self, rel: str, st: os.stat_result) -> None:
+        prev = self._files.get(rel)
+        if prev is not None and prev[SIZE] == st.st_size and prev[MTIME] == st.st_mtime_ns:
+            return
+        is_text, lines, data = sniff_file(self._abs(rel), st.st_size)
+        meta = self._files[rel] = [st.st_size, st.st_mtime_ns, int(is_text), lines]
+        if self.trigrams is not None:
+            self.trigrams.on_file(rel, meta, data, is_text)
+        if prev is not None:
+            self._stats["updated_files"] += 1
+
+    def _remove_file(self, rel: str) -> None:
+        if self._files.pop(rel, None) is not None and self.trigrams is not None:
+            self.trigrams.on_file(rel, None, None)
+
+    def build(self) -> None:
+        t0 = time.perf_counter()
+        with self._lock:
+            self._dirs.clear()
+            self._files.clear()
+            if self.trigrams is not None:
+                self.trigrams.begin_bulk()
+            self._scan_tree("")
+            if self.trigrams is not None:
+                self.trigrams.end_bulk()
+            self._stats["build_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        self.ready.set()
+        self.save()
+        log_info("project", f"Index built: {len(self._files)} files in {self._stats['build_ms']:.0f} ms")
+
+    # ── Mises a jour ──────────────────────────────────────────────────────
+
+    def _validate_dir(self, rel: str) -> list | None:
+        """Entree du dossier, relue si son mtime a change (ajout / suppression)."""
+        entry = self._dirs.get(rel)
+        try:
+            mtime = os.stat(self._abs(rel)).st_mtime_ns
+        except OSError:
+            self._drop_dir(rel)
+            return None
+        if entry is None or entry[0] != mtime:
+            self._stats["rescanned_dirs"] += 1
+            if entry is None:
+                self._scan_tree(rel)
+            else:
+                for new_dir in self._scan_dir(rel):
+                    self._scan_tree(new_dir)
+            entry = self._dirs.get(rel)
+        return entry
+
+    def touch(self, path: Path | str) -> None:
+        """Apres ecriture d'un fichier du projet (write_file / edit_file)."""
+        rel = self.relative(path)
+        if rel is None:
+            return
+        with self._lock:
+            parent = rel.rpartition("/")[0]
+            if parent in self._dirs:
+                self._validate_dir(parent)
+                try:
+                    self._index_file(rel, os.stat(self._abs(rel)))
+                except OSError:
+                    self._remove_file(rel)
+                self._dirty = True
+        self._maybe_save()
+
+    def update_file(self, rel: str, st: os.stat_result) -> list | None:
+        """Re-valide un fichier deja ouvert (fstat) ; relu seulement s'il a change."""
+        with self._lock:
+            prev = self._files.get(rel)
+            if prev is not None and prev[SIZE] == st.st_size and prev[MTIME] == st.st_mtime_ns:
+                return prev
+            self._index_file(rel, st)
+            self._dirty = True
+            return self._files.get(rel)
+
+    def _on_event(self, *paths: str) -> None:
+        with self._pending_lock:
+            self._pending.update(p for p in paths if p)
+
+    def _apply_pending(self) -> None:
+        """Reporte les changements signales par watchdog (ou balaie les mtimes)."""
+        if self._observer is None:
+            if time.monotonic() - self._last_sweep > SWEEP_INTERVAL_S:
+                self.sweep()
+            return
+        with self._pending_lock:
+            pending, self._pending = self._pending, set()
+        if not pending:
+            return
+        with self._lock:
+            for path in pending:
+                rel = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if rel.startswith("..") or any(part in IGNORED_DIRS for part in rel.split("/")):
+                    continue
+                rel = "" if rel == "." else rel
+                if rel in self._dirs:
+                    self._validate_dir(rel)
+                    continue
+                parent = rel.rpartition("/")[0]
+                if parent not in self._dirs:
+                    continue
+                self._validate_dir(parent)
+                if rel.rpartition("/")[2] in self._dirs.get(parent, (0, (), ()))[2]:
+                    try:
+                        self._index_file(rel, os.stat(self._abs(rel)))
+                    except OSError:
+                        self._remove_file(rel)
+            self._dirty = True
+
+    def sweep(self) -> int:
+        """Balayage complet des mtimes (dossiers puis fichiers) ; retourne les fichiers relus."""
+        with self._lock:
+            self._last_sweep = time.monotonic()
+            before = self._stats["updated_files"]
+            for rel in list(self._dirs):
+                if rel in self._dirs:
+                    self._validate_dir(rel)
+            for rel in list(self._files):
+                try:
+                    self._index_file(rel, os.stat(self._abs(rel)))
+                except OSError:
+                    parent = rel.rpartition("/")[0]
+                    if parent in self._dirs:
+                        self._validate_dir(parent)
+                    self._remove_file(rel)
+            changed = self._stats["updated_files"] - before
+            if changed:
+                self._dirty = True
+        return changed
+
+    def start_watching(self) -> bool:
+        """Observateur watchdog sur la racine (sinon : balayage periodique)."""
+        try:
+            from watchdog import events
+            from watchdog.observers import Observer
+        except ImportError:
+            return False
+        index = self
+
+        class _Handler(events.FileSystemEventHandler):
+            def on_any_event(self, event):
+                # Les lectures (search_files compris) ne changent rien a l'index
+                if event.event_type in ("opened", "closed_no_write"):
+                    return
+                index._on_event(event.src_path, getattr(event, "dest_path", ""))
+
+        try:
+            observer = Observer()
+            try:
+                # watchdog >= 4 : filtre applique au masque inotify, les
+                # ouvertures / lectures de fichiers ne remontent plus du tout
+                observer.schedule(_Handler(), str(self.root), recursive=True, event_filter=[
+                    events.FileCreatedEvent, events.FileDeletedEvent, events.FileModifiedEvent,
+                    events.FileMovedEvent, events.FileClosedEvent, events.DirCreatedEvent,
+                    events.DirDeletedEvent, events.DirMovedEvent,
+                ])
+            except (TypeError, AttributeError):
+                observer.schedule(_Handler(), str(self.root), recursive=True)
+            observer.daemon = True
+            observer.start()
+        except OSError as e:
+            log_warn("project", f"File watcher unavailable, sweeping mtimes: {e}")
+            return False
+        self._observer = observer
+        return True
+
+    def close(self) -> None:
+        observer, self._observer = self._observer, None
+        if observer is not None:
+            observer.stop()
+        if self._dirty and self.ready.is_set():
+            self.save()
+
+    # ── Requetes ──────────────────────────────────────────────────────────
+
+    def relative(self, path: Path | str) -> str | None:
+        """Chemin relatif a la racine ("" = racine), None si hors projet."""
+        try:
+            rel = Path(path).resolve().relative_to(self.root)
+        except ValueError:
+            return None
+        rel = rel.as_posix()
+        return "" if rel == "." else rel
+
+    def tree(self, rel: str, max_depth: int, max_entries: int, touched: dict | None = None) -> tuple[list, list]:
+        """Meme parcours que l'ancien list_files : dossiers d'abord, profondeur d'abord."""
+        files, dirs = [], []
+        self._apply_pending()
+
+        def _walk(dir_rel: str, depth: int):
+            if depth > max_depth or len(files) + len(dirs) >= max_entries:
+                return
+            entry = self._validate_dir(dir_rel)
+            if entry is None:
+                return
+            if touched is not None:
+                touched[self._abs(dir_rel)] = (entry[0],)
+            for name in entry[1]:
+                child = self._join(dir_rel, name)
+                dirs.append(child + "/")
+                _walk(child, depth + 1)
+            files.extend(self._join(dir_rel, name) for name in entry[2])
+
+        with self._lock:
+            _walk(rel, 0)
+        self._maybe_save()
+        return files, dirs
+
+    def iter_files(self, rel: str, touched: dict | None = None):
+        """(chemin relatif, entree) de chaque fichier sous rel, dossiers re-valides."""
+        self._apply_pending()
+        stack = [rel]
+        while stack:
+            dir_rel = stack.pop()
+            with self._lock:
+                entry = self._validate_dir(dir_rel)
+                if entry is None:
+                    continue
+                if touched is not None:
+                    touched[self._abs(dir_rel)] = (entry[0],)
+                children = [(self._join(dir_rel, n), self._files.get(self._join(dir_rel, n))) for n in entry[2]]
+                stack.extend(self._join(dir_rel, d) for d in reversed(entry[1]))
+            for child, meta in children:
+                if meta is not None:
+                    yield child, meta
+        self._maybe_save()
+
+    def search_candidates(self, pattern: str, flags: int = 0) -> list[str] | None:
+        """Fichiers pouvant contenir la regex (index de trigrammes), None : tous."""
+        if self.trigrams is None:
+            return None
+        query = regex_query(pattern, flags)
+        if query is None:
+            return None
+        self._apply_pending()
+        return self.trigrams.candidates(query, self._read_indexable)
+
+    def _read_indexable(self, rel: str) -> bytes | None:
+        meta = self._files.get(rel)
+        if meta is None or not meta[TEXT] or meta[SIZE] > LINE_COUNT_MAX_BYTES:
+            return None
+        try:
+            with open(self._abs(rel), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def get_file(self, rel: str) -> list | None:
+        return self._files.get(rel)
+
+    def abs_path(self, rel: str) -> str:
+        return self._abs(rel)
+
+    # ── Persistance ───────────────────────────────────────────────────────
+
+    def _trigram_path(self) -> Path:
+        return self.path.with_name(self.path.name.replace(".json.gz", ".trigrams.npz"))
+
+    def load(self) -> bool:
+        if self.path is None or not self.path.exists():
+            return False
+        if self.trigrams is not None and not self.trigrams.load(self._trigram_path()):
+            return False
+        t0 = time.perf_counter()
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            log_warn("project", f"Index unreadable, rebuilding: {e}")
+            return False
+        if data.get("version") != FORMAT_VERSION or data.get("root") != str(self.root):
+            return False
+        with self._lock:
+            self._dirs = data["dirs"]
+            self._files = dict(zip(data["paths"], data["meta"]))
+            self._stats["build_ms"] = data.get("build_ms", 0.0)
+            self._stats["load_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            self._dirty = False
+        self.ready.set()
+        return True
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            data = json.dumps({
+                "version": FORMAT_VERSION, "root": str(self.root), "build_ms": self._stats["build_ms"],
+                "dirs": self._dirs, "paths": list(self._files), "meta": list(self._files.values()),
+            }, ensure_ascii=False, separators=(",", ":"))
+            self._dirty = False
+            self._last_save = time.monotonic()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.trigrams is not None:
+                self.trigrams.save(self._trigram_path())
+            tmp = self.path.with_suffix(".tmp")
+            with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=5) as f:
+                f.write(data)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            log_warn("project", f"Failed to save index: {e}")
+
+    def _maybe_save(self) -> None:
+        if self._dirty and self.ready.is_set() and time.monotonic() - self._last_save > SAVE_INTERVAL_S:
+            self._last_save = time.monotonic()
+            threading.Thread(target=self.save, name="project-index-save", daemon=True).start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            text = [m for m in self._files.values() if m[TEXT]]
+            s = {
+                "root": str(self.root),
+                "state": "ready" if self.ready.is_set() else "building",
+                "files": len(self._files),
+                "dirs": len(self._dirs),
+                "text_files": len(text),
+                "lines": sum(m[LINES] for m in text if m[LINES] > 0),
+                "bytes": sum(m[SIZE] for m in self._files.values()),
+                **self._stats,
+            }
+        try:
+            s["index_bytes"] = self.path.stat().st_size if self.path else 0
+            if self.trigrams is not None:
+                s["index_bytes"] += self._trigram_path().stat().st_size
+        except OSError:
+            pass
+        s.setdefault("index_bytes", 0)
+        s["watching"] = self._observer is not None
+        if self.trigrams is not None:
+            s["trigrams"] = self.trigrams.info()
+        return s
+
+
+# ============================================================================
+# INDEX ACTIF — un seul projet ouvert a la fois
+# ============================================================================
+
+_active: ProjectIndex | None = None
+_active_lock = threading.Lock()
+
+
+def open_project_index(root: Path | str, background: bool = True) -> ProjectIndex | None:
+    """Index du projet : charge depuis le disque, sinon construit (en arriere-plan)."""
+    global _active
+    if not PROJECT_INDEX_ENABLED:
+        return None
+    root = Path(root).resolve()
+    with _active_lock:
+        if _active is not None and _active.root == root:
+            return _active
+        previous, _active = _active, ProjectIndex(root, _store_path(root))
+        index = _active
+    if previous is not None:
+        previous.close()
+    if index.load():
+        log_info("project", f"Index loaded: {len(index._files)} files in {index._stats['load_ms']:.0f} ms")
+
+        def _catch_up():
+            # Fichiers modifies pendant que l'application etait fermee
+            index.start_watching()
+            changed = index.sweep()
+            if changed:
+                log_info("project", f"Index caught up: {changed} file(s) changed")
+        if background:
+            threading.Thread(target=_catch_up, name="project-index-sweep", daemon=True).start()
+        else:
+            _catch_up()
+        return index
+
+    def _build():
+        try:
+            index.start_watching()
+            index.build()
+        except Exception as e:
+            log_warn("project", f"Index build failed: {e}")
+    if background:
+        threading.Thread(target=_build, name="project-index-build", daemon=True).start()
+    else:
+        _build()
+    return index
+
+
+def project_index_for(project_root: str | None, target: Path | None = None) -> ProjectIndex | None:
+    """Index pret couvrant target (dans le projet ouvert), sinon None."""
+    index = _active
+    if index is None or not project_root or not index.ready.is_set():
+        return None
+    if Path(project_root).resolve() != index.root:
+        return None
+    if target is not None and index.relative(target) is None:
+        return None
+    return index
+
+
+def get_project_index_stats() -> dict:
+    index = _active
+    return index.stats() if index is not None else {}
+
+
+def _save_active() -> None:
+    index = _active
+    if index is not None:
+        index.close()
+
+
+atexit.register(_save_active)
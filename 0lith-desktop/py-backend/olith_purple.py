@@ -150,9 +150,19 @@ async def _call_with_fallback(
             f"falling back to {FALLBACK_MODEL}"
         )
 
-    return await _call_ollama(
+    # Le fallback rejoue le meme prompt a chaque echec court : cache disque
+    from olith_ollama import cache_lookup, cache_store
+    messages = [{"role": "user", "content": prompt}]
+    key, hit = await asyncio.to_thread(
+        cache_lookup, FALLBACK_MODEL, messages, {"num_ctx": 2048}, "http://localhost:11434"
+    )
+    if hit is not None:
+        return hit
+    response = await _call_ollama(
         "http://localhost:11434", FALLBACK_MODEL, prompt, timeout=180
     )
+    await asyncio.to_thread(cache_store, key, FALLBACK_MODEL, response)
+    return response
 
 
 async def call_pyrolith(prompt: str) -> str:
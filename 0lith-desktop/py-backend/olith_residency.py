@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+0Lith V1 — Model Residency Manager (VRAM)
+===========================================
+Decide quels modeles restent charges dans Ollama au lieu de laisser le
+premier appel venu charger (et Ollama evincer) implicitement.
+
+- Empreinte VRAM par agent : estimation initiale, corrigee par /api/ps.
+- Hodolith (et le modele d'embedding) sont epingles : keep_alive = -1,
+  jamais evinces.
+- keep_alive par agent (AGENT_KEEP_ALIVE) passe a chaque appel chat.
+- Avant de charger un modele, les modeles les moins recemment utilises sont
+  decharges jusqu'a tenir dans OLITH_VRAM_BUDGET_GB.
+- preload_async() charge l'agent choisi juste apres le routage, pendant la
+  recherche memoire ; acquire() attend ce chargement au lieu de le refaire.
+- Le num_ctx du chargement fait partie de la residence : Ollama recharge le
+  runner quand un appel demande un autre num_ctx, donc un modele charge avec
+  un autre contexte n'est pas "warm" et est recharge (cold load compte).
+- Attente et chargement suivent le CancelToken de la requete : cancel rend
+  la main sans attendre la fin du chargement.
+- Cold loads, temps de chargement et evictions par agent remontent dans status.
+"""
+
+import os
+import time
+import threading
+
+from config import EMBED_MODEL
+from olith_shared import log_info, log_warn
+from olith_memory_init import AGENTS
+from olith_ollama import GenerationCancelled, get_running_models, load_model, unload_model
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+VRAM_BUDGET_GB = float(os.getenv("OLITH_VRAM_BUDGET_GB", "15"))
+
+# Agents epingles (keep_alive = -1, jamais evinces)
+PINNED_AGENTS = {a.strip() for a in os.getenv("OLITH_PINNED_AGENTS", "hodolith").split(",") if a.strip()}
+
+# Empreinte VRAM estimee (Go) tant que /api/ps ne l'a pas mesuree
+AGENT_VRAM_GB = {
+    "hodolith": 2.0,
+    "monolith": 10.5,
+    "aerolith": 14.0,   # 30B Q4 : deborde en RAM sur une carte 16 Go, size_vram plafonne
+    "cryolith": 6.0,
+}
+DEFAULT_VRAM_GB = 6.0
+
+# Duree de residence apres le dernier appel
+AGENT_KEEP_ALIVE = {
+    "monolith": "30m",   # agent par defaut, le plus sollicite
+    "aerolith": "10m",   # le plus gros : libere vite la carte
+    "cryolith": "15m",
+}
+DEFAULT_KEEP_ALIVE = "5m"
+
+_WAIT_TIMEOUT = 300
+_WAIT_POLL = 0.1    # granularite de l'attente d'un preload (reactivite a l'annulation)
+
+
+def _same_model(a: str, b: str) -> bool:
+    """/api/ps ajoute ':latest' aux noms sans tag."""
+    def norm(name: str) -> str:
+        return name if ":" in name.rsplit("/", 1)[-1] else f"{name}:latest"
+    return norm(a) == norm(b)
+
+
+class ModelResidency:
+    """Gestion explicite de la residence des modeles locaux. Thread-safe."""
+
+    def __init__(
+        self,
+        agents: dict = AGENTS,
+        budget_gb: float = VRAM_BUDGET_GB,
+        pinned: set[str] = PINNED_AGENTS,
+        running_fn=get_running_models,
+        load_fn=load_model,
+        unload_fn=unload_model,
+    ):
+        # Pyrolith tourne dans son propre conteneur Ollama : hors budget
+        self._models = {
+            aid: info["model"] for aid, info in agents.items()
+            if info.get("location", "local") != "docker"
+        }
+        self.budget_gb = budget_gb
+        self.pinned = {a for a in pinned if a in self._models}
+        self._pinned_models = {self._models[a] for a in self.pinned} | {EMBED_MODEL}
+        self._running_fn = running_fn
+        self._load_fn = load_fn
+        self._unload_fn = unload_fn
+
+        self._lock = threading.Lock()
+        self._footprint_gb = {m: AGENT_VRAM_GB.get(a, DEFAULT_VRAM_GB) for a, m in self._models.items()}
+        self._last_used: dict[str, float] = {}
+        self._loading: dict[str, threading.Event] = {}
+        self._loading_ctx: dict[str, int | None] = {}   # num_ctx du chargement en cours
+        self._num_ctx: dict[str, int] = {}             # num_ctx des modeles charges
+        self._resident: dict[str, float] = {}       # dernier /api/ps : modele -> Go
+        self._stats = {aid: self._empty_stats() for aid in self._models}
+
+    @staticmethod
+    def _empty_stats() -> dict:
+        return {
+            "cold_loads": 0, "warm_hits": 0, "preloads": 0, "evictions": 0,
+            "last_load_ms": 0.0, "avg_load_ms": 0.0, "max_load_ms": 0.0,
+            "preload_wait_ms": 0.0,
+        }
+
+    # ── Policies ───────────────────────────────────────────────────────────
+
+    def keep_alive(self, agent_id: str) -> str | int:
+        """keep_alive a passer a Ollama pour cet agent."""
+        if agent_id in self.pinned:
+            return -1
+        return AGENT_KEEP_ALIVE.get(agent_id, DEFAULT_KEEP_ALIVE)
+
+    def touch(self, agent_id: str) -> None:
+        """Marque l'agent comme utilise (ordre LRU)."""
+        model = self._models.get(agent_id)
+        if model:
+            with self._lock:
+                self._last_used[model] = time.monotonic()
+
+    def _agent_of(self, model: str) -> str | None:
+        for aid, m in self._models.items():
+            if _same_model(m, model):
+                return aid
+        return None
+
+    def _is_pinned(self, model: str) -> bool:
+        return any(_same_model(model, p) for p in self._pinned_models)
+
+    # ── Residency ──────────────────────────────────────────────────────────
+
+    def _refresh(self) -> dict[str, float]:
+        """Relit /api/ps, met a jour les empreintes mesurees."""
+        resident = {}
+        for m in self._running_fn():
+            name = m.get("name") or m.get("model", "")
+            resident[name] = m.get("size_vram", 0) / 1e9
+        with self._lock:
+            for name, gb in resident.items():
+                aid = self._agent_of(name)
+                if aid and gb > 0:
+                    self._footprint_gb[self._models[aid]] = gb
+            # Un modele decharge (keep_alive expire, eviction) perd son num_ctx
+            for model in list(self._num_ctx):
+                if model not in self._loading and not any(_same_model(model, r) for r in resident):
+                    del self._num_ctx[model]
+            self._resident = resident
+        return resident
+
+    def loaded_num_ctx(self, agent_id: str) -> int | None:
+        """num_ctx du modele de l'agent : celui du chargement en cours, sinon du dernier."""
+        model = self._models.get(agent_id)
+        with self._lock:
+            if model in self._loading:
+                return self._loading_ctx.get(model)
+            return self._num_ctx.get(model)
+
+    def _make_room(self, model: str, resident: dict[str, float]) -> None:
+        """Decharge les modeles LRU non epingles jusqu'a tenir dans le budget."""
+        used = sum(resident.values())
+        with self._lock:
+            need = self._footprint_gb.get(model, DEFAULT_VRAM_GB)
+            candidates = sorted(
+                (m for m in resident if not _same_model(m, model) and not self._is_pinned(m)),
+                key=lambda m: self._last_used.get(m, 0.0),
+            )
+        for victim in candidates:
+            if used + need <= self.budget_gb:
+                break
+            try:
+                self._unload_fn(victim)
+            except Exception as e:
+                log_warn("residency", f"Failed to unload {victim}: {e}")
+                continue
+            used -= resident.pop(victim)
+            aid = self._agent_of(victim)
+            if aid:
+                with self._lock:
+                    self._stats[aid]["evictions"] += 1
+            log_info("residency", f"Evicted {victim} ({used:.1f}/{self.budget_gb:.1f} GB used)")
+
+    def acquire(self, agent_id: str, preload: bool = False,
+                cancel_event: threading.Event | None = None, num_ctx: int | None = None) -> str:
+        """Garantit que le modele de l'agent est charge (avec num_ctx si fourni).
+
+        Retourne "warm" (deja en VRAM), "cold" (charge maintenant), "waited"
+        (un preload en cours a ete attendu), "cancelled" (cancel_event pose
+        pendant l'attente ou le chargement), "skipped" (agent non gere) ou
+        "error" (Ollama injoignable — l'appel chat chargera implicitement).
+        """
+        model = self._models.get(agent_id)
+        if not model:
+            return "skipped"
+
+        waited = False
+        while True:
+            with self._lock:
+                pending = self._loading.get(model)
+                if pending is None:
+                    self._loading[model] = threading.Event()
+                    self._loading_ctx[model] = num_ctx
+                    break
+                pending_ctx = self._loading_ctx.get(model)
+
+            t0 = time.perf_counter()
+            deadline = time.monotonic() + _WAIT_TIMEOUT
+            while not pending.wait(_WAIT_POLL):
+                if cancel_event is not None and cancel_event.is_set():
+                    return "cancelled"
+                if time.monotonic() >= deadline:
+                    break
+            with self._lock:
+                self._stats[agent_id]["preload_wait_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            waited = True
+            if num_ctx is None or pending_ctx == num_ctx:
+                self.touch(agent_id)
+                return "waited"
+            # Preload lance avec un autre num_ctx : le verifier ci-dessous
+
+        try:
+            resident = self._refresh()
+            if any(_same_model(m, model) for m in resident) and self._ctx_matches(model, num_ctx):
+                if not preload:
+                    with self._lock:
+                        self._stats[agent_id]["warm_hits"] += 1
+                return "waited" if waited else "warm"
+
+            self._make_room(model, resident)
+            t0 = time.perf_counter()
+            self._load_fn(model, self.keep_alive(agent_id), cancel_event=cancel_event,
+                          options={"num_ctx": num_ctx} if num_ctx else None)
+            with self._lock:
+                if num_ctx:
+                    self._num_ctx[model] = num_ctx
+                else:
+                    self._num_ctx.pop(model, None)
+            self._record_load(agent_id, (time.perf_counter() - t0) * 1000, preload)
+            self._refresh()
+            return "cold"
+        except GenerationCancelled:
+            log_info("residency", f"acquire({agent_id}) cancelled")
+            return "cancelled"
+        except Exception as e:
+            log_warn("residency", f"acquire({agent_id}) failed: {e}")
+            return "error"
+        finally:
+            self.touch(agent_id)
+            with self._lock:
+                self._loading_ctx.pop(model, None)
+                self._loading.pop(model).set()
+
+    def _ctx_matches(self, model: str, num_ctx: int | None) -> bool:
+        """Le modele resident a-t-il ete charge avec ce num_ctx ? (inconnu : non)"""
+        if num_ctx is None:
+            return True
+        with self._lock:
+            return self._num_ctx.get(model) == num_ctx
+
+    def preload_async(self, agent_id: str, cancel_event: threading.Event | None = None,
+                      num_ctx: int | None = None) -> threading.Thread | None:
+        """Charge l'agent en arriere-plan (pendant la recherche memoire)."""
+        if agent_id not in self._models:
+            return None
+        t = threading.Thread(
+            target=self.acquire, args=(agent_id, True, cancel_event, num_ctx),
+            name=f"preload-{agent_id}", daemon=True,
+        )
+        t.start()
+        return t
+
+    def preload_pinned(self, num_ctx: dict[str, int] | None = None) -> None:
+        """num_ctx : par agent, celui de ses appels chat (evite un rechargement)."""
+        for agent_id in sorted(self.pinned):
+            self.acquire(agent_id, preload=True, num_ctx=(num_ctx or {}).get(agent_id))
+
+    def reset(self) -> None:
+        """Oublie l'etat de residence (Ollama arrete, ex. gaming mode)."""
+        with self._lock:
+            self._resident = {}
+            self._last_used.clear()
+            self._num_ctx.clear()
+
+    # ── Metrics ────────────────────────────────────────────────────────────
+
+    def _record_load(self, agent_id: str, ms: float, preload: bool) -> None:
+        with self._lock:
+            s = self._stats[agent_id]
+            s["cold_loads"] += 1
+            s["preloads"] += int(preload)
+            s["avg_load_ms"] = round(s["avg_load_ms"] + (ms - s["avg_load_ms"]) / s["cold_loads"], 1)
+            s["last_load_ms"] = round(ms, 1)
+            s["max_load_ms"] = round(max(s["max_load_ms"], ms), 1)
+        log_info("residency", f"Loaded {self._models[agent_id]} in {ms:.0f}ms"
+                              f"{' (preload)' if preload else ''}")
+
+    def stats(self) -> dict:
+        """Etat sans appel reseau (dernier /api/ps connu)."""
+        with self._lock:
+            resident = dict(self._resident)
+            agents = {
+                aid: {**s, "vram_gb": round(self._footprint_gb[self._models[aid]], 1),
+                      "num_ctx": self._num_ctx.get(self._models[aid])}
+                for aid, s in self._stats.items()
+            }
+        return {
+            "budget_gb": self.budget_gb,
+            "used_gb": round(sum(resident.values()), 1),
+            "pinned": sorted(self.pinned),
+            "resident": [
+                {"model": m, "vram_gb": round(gb, 1), "pinned": self._is_pinned(m)}
+                for m, gb in resident.items()
+            ],
+            "agents": {aid: {**s, "keep_alive": self.keep_alive(aid)} for aid, s in agents.items()},
+        }
+
+
+# Instance globale
+_residency: ModelResidency | None = None
+_residency_lock = threading.Lock()
+
+
+def get_residency() -> ModelResidency:
+    global _residency
+    with _residency_lock:
+        if _residency is None:
+            _residency = ModelResidency()
+        return _residency
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+0Lith V1 — Persistent LLM Response Cache
+==========================================
+Cache disque des reponses LLM pour les appels declares cacheables par leur
+site d'appel (cache=True dans olith_ollama) : routage Hodolith, predictions
+du watcher, retries de fallback arena/purple...
+
+Cle : sha256(digest du modele, messages, options). Le digest vient de
+/api/tags — un `ollama pull` qui change les poids invalide naturellement
+les anciennes entrees.
+
+Stockage : SQLite (WAL, partage entre le backend et le watcher) dans
+DATA_DIR/cache/llm_responses.sqlite3, reponses compressees zlib.
+Eviction : TTL (OLITH_LLM_CACHE_TTL_H) + LRU sous OLITH_LLM_CACHE_MB.
+OLITH_LLM_CACHE=0 desactive le cache.
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+
+from config import DATA_DIR
+from olith_shared import log_warn
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+LLM_CACHE_ENABLED = os.getenv("OLITH_LLM_CACHE", "1") != "0"
+LLM_CACHE_PATH = Path(DATA_DIR) / "cache" / "llm_responses.sqlite3"
+LLM_CACHE_MAX_BYTES = int(float(os.getenv("OLITH_LLM_CACHE_MB", "64")) * 1024 * 1024)
+LLM_CACHE_TTL_S = int(float(os.getenv("OLITH_LLM_CACHE_TTL_H", "168")) * 3600)
+
+_EVICT_TARGET = 0.9    # apres depassement, redescend a 90% du plafond
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key         TEXT PRIMARY KEY,
+    model       TEXT NOT NULL,
+    value       BLOB NOT NULL,
+    size        INTEGER NOT NULL,
+    created     REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access);
+"""
+
+
+def make_key(digest: str, messages: list[dict], options: dict) -> str:
+    """Cle stable : JSON canonique (cles triees) du triplet."""
+    blob = json.dumps(
+        {"digest": digest, "messages": messages, "options": options},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Store cle -> reponse, LRU/TTL, plafond en octets. Thread-safe."""
+
+    def __init__(
+        self,
+        path: Path = LLM_CACHE_PATH,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        ttl_s: int = LLM_CACHE_TTL_S,
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+            self._purge_expired()
+        return self._conn
+
+    def _purge_expired(self) -> None:
+        cur = self._conn.execute(
+            "DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_s,)
+        )
+        self._stats["expired"] += cur.rowcount
+        self._conn.commit()
+
+    def get(self, key: str) -> str | None:
+        """Reponse en cache, ou None (miss / expiree / erreur disque)."""
+        with self._lock:
+            try:
+                db = self._db()
+                row = db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                now = time.time()
+                if row is None:
+                    self._stats["misses"] += 1
+                    return None
+                if now - row[1] > self.ttl_s:
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    db.commit()
+                    self._stats["expired"] += 1
+                    self._stats["misses"] += 1
+                    return None
+                db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                db.commit()
+                self._stats["hits"] += 1
+                return zlib.decompress(row[0]).decode("utf-8")
+            except (sqlite3.Error, zlib.error) as e:
+                log_warn("llm_cache", f"Lookup failed: {e}")
+                self._stats["misses"] += 1
+                return None
+
+    def put(self, key: str, model: str, value: str) -> None:
+        if not value:
+            return
+        blob = zlib.compress(value.encode("utf-8"), 6)
+        now = time.time()
+        with self._lock:
+            try:
+                db = self._db()
+                db.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, value, size, created, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, blob, len(blob), now, now),
+                )
+                self._stats["stores"] += 1
+                self._evict(db)
+                db.commit()
+            except sqlite3.Error as e:
+                log_warn("llm_cache", f"Store failed: {e}")
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        """LRU : supprime les entrees les moins recemment lues au-dela du plafond."""
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * _EVICT_TARGET)
+        victims = []
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY last_access ASC"):
+            if total <= target:
+                break
+            victims.append((key,))
+            total -= size
+        db.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self._stats["evictions"] += len(victims)
+
+    def clear(self) -> None:
+        with self._lock:
+            try:
+                db = self._db()
+                db.execute("DELETE FROM responses")
+                db.commit()
+            except sqlite3.Error as e:
+                log_warn("llm_cache", f"Clear failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            try:
+                entries, size = self._db().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+                ).fetchone()
+            except sqlite3.Error:
+                entries, size = 0, 0
+        lookups = s["hits"] + s["misses"]
+        s.update({
+            "hit_rate": round(s["hits"] / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "ttl_s": self.ttl_s,
+        })
+        return s
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Instance globale (ouverte au premier appel cacheable)
+_cache: ResponseCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache | None:
+    """Cache partage, ou None si OLITH_LLM_CACHE=0."""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+
+def get_response_cache_stats() -> dict:
+    return _cache.stats() if _cache is not None else {}
@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+"""
+0Lith V1 — Fast Router (kNN sur embeddings)
+=============================================
+Remplace l'appel LLM Hodolith systematique : le message est embedde avec
+EMBED_MODEL puis compare (cosinus) a un jeu d'exemples etiquetes, persiste
+dans ~/.0lith/router/. Hodolith (LLM) n'est appele que si la marge entre les
+deux meilleures routes est trop faible — sa decision devient alors un nouvel
+exemple, le routeur apprend au fil de l'eau.
+
+Fichiers (DATA_DIR/router/) :
+  examples.jsonl — {"text", "route", "source", "ts"}  (source : seed | llm)
+  vectors.npy    — une ligne float32 normalisee par exemple
+  vectors.json   — {"model", "count"} : re-embed si EMBED_MODEL change
+  routes.jsonl   — journal de chaque decision (sert au benchmark)
+
+Benchmark hors-ligne (leave-one-out sur les routes decidees par le LLM) :
+    python olith_router.py --benchmark
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+from config import DATA_DIR, EMBED_MODEL
+from olith_shared import log_info, log_warn
+from olith_ollama import embed_texts
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+ROUTER_DIR = Path(DATA_DIR) / "router"
+
+ROUTES = ("monolith", "aerolith", "cryolith", "pyrolith")
+
+# Seuils de confiance — en dessous, repli sur le LLM Hodolith
+ROUTER_MIN_MARGIN = float(os.getenv("OLITH_ROUTER_MIN_MARGIN", "0.04"))
+ROUTER_MIN_SIMILARITY = float(os.getenv("OLITH_ROUTER_MIN_SIM", "0.45"))
+ROUTER_TOP_K = 3               # voisins moyennes par route
+ROUTER_MAX_EXAMPLES = 2000     # au-dela, les plus anciens exemples appris sont oublies
+_LATENCY_WINDOW = 500
+
+# Exemples initiaux, derives des regles de HODOLITH_SYSTEM_PROMPT
+SEED_EXAMPLES = {
+    "monolith": [
+        "Bonjour, comment ça va ?",
+        "Hello, how are you today?",
+        "Qui es-tu et que peux-tu faire ?",
+        "Aide-moi à planifier ma semaine",
+        "What's the best strategy to learn a new language?",
+        "Explique-moi la différence entre RAM et VRAM",
+        "Pourquoi mon PC est lent au démarrage ?",
+        "Comment fonctionne l'application 0Lith ?",
+        "Résume les points clés de cette réflexion",
+        "Can you help me reason through this decision?",
+        "Quel est le sens de la vie ?",
+        "Donne-moi des idées pour un projet personnel",
+    ],
+    "aerolith": [
+        "Écris un script Python qui renomme des fichiers",
+        "Write a function that parses a CSV file",
+        "Corrige ce bug dans mon code TypeScript",
+        "Why does this Rust code not compile?",
+        "Refactorise cette classe pour la rendre testable",
+        "Ajoute des tests unitaires pour ce module",
+        "How do I debug a segmentation fault in C?",
+        "Implémente un composant Svelte pour une liste",
+        "Optimise cette requête SQL lente",
+        "Fix the TypeError in my JavaScript function",
+        "Lis le fichier main.py et explique le code",
+        "Crée un script bash pour sauvegarder un dossier",
+    ],
+    "cryolith": [
+        "Écris une règle YARA pour détecter ce malware",
+        "Explain CVE-2021-44228 and how to mitigate it",
+        "Comment durcir la configuration SSH de mon serveur ?",
+        "Analyse ces logs pour détecter une intrusion",
+        "Write a Sigma rule to detect suspicious PowerShell",
+        "Quelles sont les bonnes pratiques de hardening Windows ?",
+        "Comment détecter un mouvement latéral sur le réseau ?",
+        "Blue team: how do we respond to a ransomware incident?",
+        "Cette CVE affecte-t-elle ma version d'OpenSSL ?",
+        "Configure un pare-feu pour bloquer ce trafic",
+        "Mets en place une détection d'exfiltration DNS",
+    ],
+    "pyrolith": [
+        "Lance un test d'intrusion sur ma machine de test",
+        "Run a pentest against my lab web server",
+        "Exploite cette injection SQL sur mon environnement de test",
+        "Écris un exploit pour ce buffer overflow dans mon CTF",
+        "Perform an offensive red team attack on the staging host",
+        "Trouve une escalade de privilèges sur cette VM de lab",
+        "Craft a reverse shell payload for my authorized pentest",
+        "Attaque ce service exposé dans le cadre de l'audit autorisé",
+        "Énumère les ports et exploite les services vulnérables du lab",
+    ],
+}
+
+
+# ============================================================================
+# FAST ROUTER
+# ============================================================================
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _unit(rows) -> np.ndarray:
+    matrix = np.asarray(rows, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class FastRouter:
+    """kNN sur embeddings, repli LLM sous le seuil de confiance. Thread-safe."""
+
+    def __init__(
+        self,
+        data_dir: Path = ROUTER_DIR,
+        embed_fn=embed_texts,
+        model: str = EMBED_MODEL,
+        min_margin: float = ROUTER_MIN_MARGIN,
+        min_similarity: float = ROUTER_MIN_SIMILARITY,
+    ):
+        self.data_dir = Path(data_dir)
+        self._embed_fn = embed_fn
+        self.model = model
+        self.min_margin = min_margin
+        self.min_similarity = min_similarity
+
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._examples: list[dict] = []
+        self._index: dict[str, int] = {}          # texte normalise -> ligne
+        self._matrix: np.ndarray | None = None
+
+        self._stats_lock = threading.Lock()
+        self._counts = {"requests": 0, "knn": 0, "fallback": 0, "embed_errors": 0, "learned": 0}
+        self._latency: dict[str, deque] = {
+            "all": deque(maxlen=_LATENCY_WINDOW),
+            "knn": deque(maxlen=_LATENCY_WINDOW),
+            "fallback": deque(maxlen=_LATENCY_WINDOW),
+        }
+
+    # ── Persistence ────────────────────────────────────────────────────────
+
+    @property
+    def _examples_path(self) -> Path:
+        return self.data_dir / "examples.jsonl"
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.data_dir / "vectors.npy"
+
+    @property
+    def _meta_path(self) -> Path:
+        return self.data_dir / "vectors.json"
+
+    @property
+    def routes_log_path(self) -> Path:
+        return self.data_dir / "routes.jsonl"
+
+    def _ensure_loaded(self) -> None:
+        """Charge exemples + vecteurs ; embed en un seul batch ce qui manque."""
+        if self._loaded:
+            return
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+
+        examples = self._read_examples()
+        dirty = not examples
+        if dirty:
+            examples = self._bootstrap_examples()
+
+        matrix = self._read_vectors(len(examples))
+        if matrix is None:
+            dirty = True
+            t0 = time.perf_counter()
+            matrix = _unit(self._embed_fn([e["text"] for e in examples]))
+            log_info("router", f"Embedded {len(examples)} routing examples in "
+                               f"{(time.perf_counter() - t0) * 1000:.0f}ms")
+
+        self._examples = examples
+        self._matrix = matrix
+        self._index = {_normalize(e["text"]): i for i, e in enumerate(examples)}
+        self._loaded = True
+        if dirty:
+            self._save()
+
+    def _read_examples(self) -> list[dict]:
+        if not self._examples_path.exists():
+            return []
+        examples = []
+        try:
+            with self._examples_path.open(encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        ex = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if ex.get("text") and ex.get("route") in ROUTES:
+                        examples.append(ex)
+        except OSError as e:
+            log_warn("router", f"Failed to read {self._examples_path.name}: {e}")
+        return examples
+
+    def _bootstrap_examples(self) -> list[dict]:
+        """Seeds des regles Hodolith + anciennes decisions LLM du journal."""
+        now = int(time.time())
+        examples, seen = [], set()
+        for route, texts in SEED_EXAMPLES.items():
+            for text in texts:
+                seen.add(_normalize(text))
+                examples.append({"text": text, "route": route, "source": "seed", "ts": now})
+        for entry in self.read_route_log():
+            key = _normalize(entry["message"])
+            if entry.get("method") == "llm" and key not in seen:
+                seen.add(key)
+                examples.append({"text": entry["message"], "route": entry["route"],
+                                 "source": "llm", "ts": entry.get("ts", now)})
+        return examples[-ROUTER_MAX_EXAMPLES:]
+
+    def _read_vectors(self, count: int) -> np.ndarray | None:
+        try:
+            meta = json.loads(self._meta_path.read_text(encoding="utf-8"))
+            if meta.get("model") != self.model or meta.get("count") != count:
+                return None
+            matrix = np.load(self._vectors_path)
+            return matrix if matrix.shape[0] == count else None
+        except (OSError, ValueError):
+            return None
+
+    def _save(self) -> None:
+        """Ecriture atomique (tmp + replace) des exemples et des vecteurs."""
+        try:
+            tmp = self._examples_path.with_suffix(".jsonl.tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                for ex in self._examples:
+                    f.write(json.dumps(ex, ensure_ascii=False) + "\n")
+            os.replace(tmp, self._examples_path)
+
+            tmp = self._vectors_path.with_suffix(".npy.tmp")
+            with tmp.open("wb") as f:
+                np.save(f, self._matrix)
+            os.replace(tmp, self._vectors_path)
+
+            self._meta_path.write_text(
+                json.dumps({"model": self.model, "count": len(self._examples)}),
+                encoding="utf-8",
+            )
+        except OSError as e:
+            log_warn("router", f"Failed to persist routing examples: {e}")
+
+    def read_route_log(self, path: Path | None = None) -> list[dict]:
+        """Decisions passees (message, route, methode, marge...)."""
+        path = path or self.routes_log_path
+        entries = []
+        if not path.exists():
+            return entries
+        try:
+            with path.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if entry.get("message") and entry.get("route") in ROUTES:
+                        entries.append(entry)
+        except OSError as e:
+            log_warn("router", f"Failed to read {path.name}: {e}")
+        return entries
+
+    def _log_route(self, entry: dict) -> None:
+        try:
+            self.data_dir.mkdir(parents=True, exist_ok=True)
+            with self.routes_log_path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except OSError as e:
+            log_warn("router", f"Failed to log route: {e}")
+
+    # ── Classification ─────────────────────────────────────────────────────
+
+    def _score(self, vec: np.ndarray, exclude: int | None = None) -> dict:
+        """Score par route = moyenne des ROUTER_TOP_K meilleures similarites."""
+        sims = self._matrix @ vec
+        if exclude is not None:
+            sims = sims.copy()
+            sims[exclude] = -np.inf
+        labels = np.array([e["route"] for e in self._examples])
+
+        scores = {}
+        for route in ROUTES:
+            route_sims = sims[labels == route]
+            route_sims = route_sims[np.isfinite(route_sims)]
+            if route_sims.size:
+                k = min(ROUTER_TOP_K, route_sims.size)
+                scores[route] = float(np.mean(np.sort(route_sims)[-k:]))
+
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        if not ranked:
+            return {"route": None, "scores": {}, "similarity": 0.0, "margin": 0.0, "confident": False}
+        best_route, best = ranked[0]
+        margin = best - ranked[1][1] if len(ranked) > 1 else best
+        return {
+            "route": best_route,
+            "scores": {r: round(s, 4) for r, s in ranked},
+            "similarity": round(best, 4),
+            "margin": round(margin, 4),
+            "confident": margin >= self.min_margin and best >= self.min_similarity,
+        }
+
+    def classify(self, message: str) -> dict:
+        """kNN seul (pas de repli LLM, pas de journal)."""
+        with self._lock:
+            self._ensure_loaded()
+        vec = _unit(self._embed_fn([message]))[0]
+        with self._lock:
+            return self._score(vec)
+
+    def learn(self, text: str, route: str, source: str = "llm", vec: np.ndarray | None = None) -> None:
+        """Ajoute (ou re-etiquette) un exemple et persiste."""
+        if route not in ROUTES or not text.strip():
+            return
+        if vec is None:
+            vec = _unit(self._embed_fn([text]))[0]
+        with self._lock:
+            self._ensure_loaded()
+            key = _normalize(text)
+            row = self._index.get(key)
+            if row is not None:
+                if self._examples[row]["source"] == "seed" or self._examples[row]["route"] == route:
+                    return
+                self._examples[row].update({"route": route, "source": source, "ts": int(time.time())})
+            else:
+                self._examples.append({"text": text, "route": route, "source": source, "ts": int(time.time())})
+                self._matrix = np.vstack([self._matrix, vec[None, :].astype(np.float32)])
+                self._index[key] = len(self._examples) - 1
+                self._evict()
+            self._save()
+        with self._stats_lock:
+            self._counts["learned"] += 1
+
+    def _evict(self) -> None:
+        overflow = len(self._examples) - ROUTER_MAX_EXAMPLES
+        if overflow <= 0:
+            return
+        learned = [i for i, e in enumerate(self._examples) if e["source"] != "seed"]
+        drop = set(learned[:overflow])
+        keep = [i for i in range(len(self._examples)) if i not in drop]
+        self._examples = [self._examples[i] for i in keep]
+        self._matrix = self._matrix[keep]
+        self._index = {_normalize(e["text"]): i for i, e in enumerate(self._examples)}
+
+    # ── Routing ────────────────────────────────────────────────────────────
+
+    def route(self, message: str, fallback) -> dict:
+        """Route via kNN ; appelle fallback(message) -> {"route", "reason"} si incertain.
+
+        Le dict retourne contient aussi "method" (knn | llm), "margin",
+        "similarity" et "latency_ms". Seules les reponses LLM marquees
+        "parsed" sont apprises et journalisees comme exemples etiquetes ;
+        un repli par defaut est journalise en "llm_default".
+        """
+        t0 = time.perf_counter()
+        vec, result = None, None
+        try:
+            with self._lock:
+                self._ensure_loaded()
+            vec = _unit(self._embed_fn([message]))[0]
+            with self._lock:
+                result = self._score(vec)
+        except Exception as e:
+            log_warn("router", f"Embedding router unavailable, using Hodolith: {e}")
+            with self._stats_lock:
+                self._counts["embed_errors"] += 1
+
+        labelled = False
+        if result and result["confident"]:
+            method = "knn"
+            route = {
+                "route": result["route"],
+                "reason": f"kNN (similarité {result['similarity']:.2f}, marge {result['margin']:.2f})",
+            }
+        else:
+            method = "llm"
+            route = dict(fallback(message))
+            labelled = bool(route.pop("parsed", False)) and route.get("route") in ROUTES
+            if vec is not None and labelled:
+                try:
+                    self.learn(message, route["route"], "llm", vec)
+                except Exception as e:
+                    log_warn("router", f"Failed to learn route: {e}")
+
+        latency_ms = round((time.perf_counter() - t0) * 1000, 1)
+        self._record(method, latency_ms)
+        route.update({
+            "method": method,
+            "margin": result["margin"] if result else None,
+            "similarity": result["similarity"] if result else None,
+            "latency_ms": latency_ms,
+        })
+        self._log_route({
+            "ts": int(time.time()),
+            "message": message[:2000],
+            "route": route.get("route"),
+            "method": method if method == "knn" or labelled else "llm_default",
+            "knn_route": result["route"] if result else None,
+            "margin": route["margin"],
+            "similarity": route["similarity"],
+            "latency_ms": latency_ms,
+        })
+        return route
+
+    def warm(self) -> None:
+        """Charge l'index (et embed les seeds) hors du chemin critique."""
+        try:
+            with self._lock:
+                self._ensure_loaded()
+        except Exception as e:
+            log_warn("router", f"Router warm-up failed: {e}")
+
+    # ── Metrics ────────────────────────────────────────────────────────────
+
+    def _record(self, method: str, latency_ms: float) -> None:
+        with self._stats_lock:
+            self._counts["requests"] += 1
+            self._counts["knn" if method == "knn" else "fallback"] += 1
+            self._latency["all"].append(latency_ms)
+            self._latency["knn" if method == "knn" else "fallback"].append(latency_ms)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            counts = dict(self._counts)
+            latency = {k: list(v) for k, v in self._latency.items()}
+        requests = counts["requests"]
+        return {
+            **counts,
+            "fallback_rate": round(counts["fallback"] / requests, 3) if requests else 0.0,
+            "p50_ms": _percentile(latency["all"], 50),
+            "p95_ms": _percentile(latency["all"], 95),
+            "knn_p50_ms": _percentile(latency["knn"], 50),
+            "fallback_p50_ms": _percentile(latency["fallback"], 50),
+            "examples": len(self._examples),
+            "min_margin": self.min_margin,
+            "min_similarity": self.min_similarity,
+        }
+
+    # ── Offline benchmark ──────────────────────────────────────────────────
+
+    def benchmark(self, entries: list[dict] | None = None) -> dict:
+        """Precision kNN (leave-one-out) contre les routes decidees par le LLM.
+
+        Chaque message journalise avec method == "llm" sert de verite terrain ;
+        son propre exemple est exclu de l'index pendant sa classification.
+        """
+        if entries is None:
+            entries = self.read_route_log()
+        labeled, seen = [], set()
+        for e in entries:
+            key = _normalize(e["message"])
+            if e.get("method") == "llm" and key not in seen:
+                seen.add(key)
+                labeled.append(e)
+
+        with self._lock:
+            self._ensure_loaded()
+        report = {
+            "samples": len(labeled), "accuracy": 0.0, "confident_rate": 0.0,
+            "confident_accuracy": 0.0, "avg_classify_ms": 0.0, "per_route": {},
+        }
+        if not labeled:
+            return report
+
+        t0 = time.perf_counter()
+        vectors = _unit(self._embed_fn([e["message"] for e in labeled]))
+        embed_ms = (time.perf_counter() - t0) * 1000
+
+        correct = confident = confident_correct = 0
+        per_route = {r: {"total": 0, "correct": 0} for r in ROUTES}
+        t0 = time.perf_counter()
+        with self._lock:
+            for entry, vec in zip(labeled, vectors):
+                result = self._score(vec, exclude=self._index.get(_normalize(entry["message"])))
+                hit = result["route"] == entry["route"]
+                correct += hit
+                per_route[entry["route"]]["total"] += 1
+                per_route[entry["route"]]["correct"] += hit
+                if result["confident"]:
+                    confident += 1
+                    confident_correct += hit
+        score_ms = (time.perf_counter() - t0) * 1000
+
+        n = len(labeled)
+        report.update({
+            "accuracy": round(correct / n, 3),
+            "confident_rate": round(confident / n, 3),
+            "confident_accuracy": round(confident_correct / confident, 3) if confident else 0.0,
+            "avg_classify_ms": round((embed_ms + score_ms) / n, 2),
+            "per_route": {
+                r: round(v["correct"] / v["total"], 3)
+                for r, v in per_route.items() if v["total"]
+            },
+        })
+        return report
+
+
+# Instance globale (chargee au premier routage ou au warm-up)
+_router: FastRouter | None = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> FastRouter:
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = FastRouter()
+        return _router
+
+
+def get_router_stats() -> dict:
+    """Latence et taux de repli LLM (exposes via status)."""
+    return _router.stats() if _router is not None else {}
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="0Lith fast router tools")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Leave-one-out accuracy against logged Hodolith routes")
+    parser.add_argument("--log", type=Path, default=None,
+                        help="routes.jsonl to evaluate (default: DATA_DIR/router/routes.jsonl)")
+    args = parser.parse_args()
+
+    if not args.benchmark:
+        parser.print_help()
+        return
+
+    router = get_router()
+    entries = router.read_route_log(args.log) if args.log else None
+    report = router.benchmark(entries)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if not report["samples"]:
+        print("No LLM-routed messages logged yet — use the app first.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
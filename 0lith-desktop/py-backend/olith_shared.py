@@ -8,32 +8,188 @@ Module partagé entre olith_core.py et olith_watcher.py.
 
 import sys
 import re
+import time
+import threading
+import importlib.abc
 
 # ============================================================================
 # MEM0 MONKEY-PATCH — Disable qwen3 <think> blocks in Mem0 fact extraction
 # ============================================================================
 
+_MEM0_OLLAMA_MODULE = "mem0.llms.ollama"
+
+
+def _find_spec_without(finder, fullname, path, target=None):
+    """Resolve a module spec with every meta-path finder except `finder`."""
+    for other in sys.meta_path:
+        if other is finder:
+            continue
+        find_spec = getattr(other, "find_spec", None)
+        if find_spec is None:
+            continue
+        spec = find_spec(fullname, path, target)
+        if spec is not None:
+            return spec
+    return None
+
+
+def _apply_no_think_patch(module) -> None:
+    """Wrap OllamaLLM.generate_response to append /no_think to user messages."""
+    llm_cls = getattr(module, "OllamaLLM", None)
+    if llm_cls is None or getattr(llm_cls.generate_response, "_olith_no_think", False):
+        return
+
+    _orig_generate = llm_cls.generate_response
+
+    def _patched_generate(self, messages, **kwargs):
+        for msg in messages:
+            if msg.get("role") == "user":
+                msg["content"] += " /no_think"
+        return _orig_generate(self, messages, **kwargs)
+
+    _patched_generate._olith_no_think = True
+    llm_cls.generate_response = _patched_generate
+
+
+class _Mem0PatchHook(importlib.abc.MetaPathFinder):
+    """Applies the /no_think patch right after mem0.llms.ollama is executed,
+    so importing olith_shared no longer pays for importing mem0 (~1.5 s)."""
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname != _MEM0_OLLAMA_MODULE:
+            return None
+        spec = _find_spec_without(self, fullname, path, target)
+        if spec is None or spec.loader is None:
+            return spec
+        # SourceFileLoader instances are per-file: wrapping this one is local
+        orig_exec = spec.loader.exec_module
+
+        def _exec_module(module):
+            orig_exec(module)
+            _apply_no_think_patch(module)
+
+        spec.loader.exec_module = _exec_module
+        return spec
+
+
 def patch_mem0_ollama():
     """Patch Mem0's OllamaLLM to append /no_think to user messages.
-    Must be called BEFORE any Mem0 import that triggers LLM usage."""
-    try:
-        from mem0.llms.ollama import OllamaLLM as _OllamaLLM
 
-        _orig_generate = _OllamaLLM.generate_response
+    Lazy: installs an import hook that patches the class whenever Mem0 gets
+    imported (first memory use). Patches immediately if already imported."""
+    module = sys.modules.get(_MEM0_OLLAMA_MODULE)
+    if module is not None:
+        _apply_no_think_patch(module)
+        return
+    if not any(isinstance(f, _Mem0PatchHook) for f in sys.meta_path):
+        sys.meta_path.insert(0, _Mem0PatchHook())
 
-        def _patched_generate(self, messages, **kwargs):
-            for msg in messages:
-                if msg.get("role") == "user":
-                    msg["content"] += " /no_think"
-            return _orig_generate(self, messages, **kwargs)
 
-        _OllamaLLM.generate_response = _patched_generate
-    except ImportError:
-        pass  # mem0 not installed
+# Install hook on import
+patch_mem0_ollama()
 
 
-# Apply patch on import
-patch_mem0_ollama()
+# ============================================================================
+# STARTUP PROFILING — --startup-profile (olith_core.py)
+# ============================================================================
+
+class _TimedLoader:
+    """Loader proxy that records how long a module takes to execute."""
+
+    def __init__(self, loader, name: str, profiler: "ImportProfiler"):
+        self._loader = loader
+        self._name = name
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        create = getattr(self._loader, "create_module", None)
+        return create(spec) if create else None
+
+    def exec_module(self, module):
+        self._profiler._enter(self._name)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit(self._name)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class ImportProfiler(importlib.abc.MetaPathFinder):
+    """Import-time breakdown (like python -X importtime) plus startup milestones.
+
+    Only installed with --startup-profile; the report goes to stderr.
+    Imports nest per thread (the warm-up thread imports mem0 while the main
+    thread keeps importing), so the frame stack is thread-local.
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.records: dict[str, tuple[float, float]] = {}  # name -> (cumulative, self)
+        self.milestones: list[tuple[str, float]] = []
+        self._local = threading.local()
+
+    @property
+    def _stack(self) -> list[list]:
+        """This thread's import frames: [name, start, children_time]."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @property
+    def _resolving(self) -> set[str]:
+        resolving = getattr(self._local, "resolving", None)
+        if resolving is None:
+            resolving = self._local.resolving = set()
+        return resolving
+
+    def install(self) -> "ImportProfiler":
+        sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname in self._resolving:
+            return None
+        self._resolving.add(fullname)
+        try:
+            spec = _find_spec_without(self, fullname, path, target)
+        finally:
+            self._resolving.discard(fullname)
+        if spec is not None and spec.loader is not None:
+            spec.loader = _TimedLoader(spec.loader, fullname, self)
+        return spec
+
+    def _enter(self, name: str) -> None:
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def _exit(self, name: str) -> None:
+        stack = self._stack
+        _, start, children = stack.pop()
+        cumulative = time.perf_counter() - start
+        self.records[name] = (cumulative, cumulative - children)
+        if stack:
+            stack[-1][2] += cumulative
+
+    def mark(self, label: str) -> None:
+        """Record a named startup milestone (ms since the profiler was created)."""
+        self.milestones.append((label, (time.perf_counter() - self.t0) * 1000))
+
+    def report(self, top: int = 25) -> None:
+        lines = ["[INFO] [startup] === startup profile ==="]
+        for label, ms in self.milestones:
+            lines.append(f"[INFO] [startup] {ms:9.1f} ms  {label}")
+        lines.append(f"[INFO] [startup] {'cumul ms':>9} {'self ms':>9}  module (top {top} by cumulative)")
+        ranked = sorted(self.records.items(), key=lambda kv: kv[1][0], reverse=True)[:top]
+        for name, (cumulative, own) in ranked:
+            lines.append(f"[INFO] [startup] {cumulative * 1000:9.1f} {own * 1000:9.1f}  {name}")
+        sys.stderr.write("\n".join(lines) + "\n")
+        sys.stderr.flush()
 
 
 # ============================================================================
@@ -8,24 +8,34 @@ Parser pour détecter les tool calls JSON dans les réponses IA.
 
 import os
 import re
+import copy
 import json
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, wait
 from pathlib import Path
 
-from olith_shared import TEXT_EXTENSIONS, IGNORED_DIRS, log_warn
+from olith_shared import TEXT_EXTENSIONS, IGNORED_DIRS, log_warn, strip_think_blocks
+from olith_project_index import TEXT, project_index_for
 
 # ============================================================================
 # LIMITES
 # ============================================================================
 
 MAX_FILE_SIZE = 500 * 1024       # 500 KB pour read/write
-MAX_SEARCH_FILE_SIZE = 50 * 1024 # 50 KB pour search (perf)
 MAX_SEARCH_RESULTS = 50
 MAX_LIST_FILES = 200
 MAX_AGENT_LOOP_ITERATIONS = 10
+TOOL_WORKERS = int(os.getenv("OLITH_TOOL_WORKERS", "4"))   # outils en parallele par iteration
 
 # Actions par niveau d'autonomie
 LEVEL_0_ACTIONS = {"read_file", "list_files", "search_files", "search_mem0", "add_mem0"}
 LEVEL_2_ACTIONS = {"write_file", "edit_file"}
+# Sans effet de bord : executables pendant que la generation continue
+READ_ONLY_ACTIONS = {"read_file", "list_files", "search_files", "search_mem0", "system_info"}
+# Serialisees, dans l'ordre, apres les lectures de la meme ressource
+WRITE_ACTIONS = LEVEL_2_ACTIONS | {"add_mem0"}
 
 
 # ============================================================================
@@ -86,8 +96,14 @@ def _is_within(child: Path, parent: Path) -> bool:
 # FILESYSTEM TOOLS
 # ============================================================================
 
-def tool_read_file(path: str, project_root: str | None, offset: int = 1, limit: int = 500) -> dict:
-    """Lit le contenu d'un fichier dans le sandbox."""
+def tool_read_file(
+    path: str, project_root: str | None, offset: int = 1, limit: int = 500,
+    touched: dict | None = None,
+) -> dict:
+    """Lit le contenu d'un fichier dans le sandbox.
+
+    touched : si fourni, recoit {chemin: (mtime_ns, taille)} du fichier lu.
+    """
     target = validate_path(path, project_root)
 
     if not target.is_file():
@@ -96,7 +112,10 @@ def tool_read_file(path: str, project_root: str | None, offset: int = 1, limit:
     if target.suffix.lower() not in TEXT_EXTENSIONS and target.suffix != "":
         return {"error": f"Type de fichier non supporté: {target.suffix}"}
 
-    size = target.stat().st_size
+    st = target.stat()
+    size = st.st_size
+    if touched is not None:
+        touched[str(target)] = (st.st_mtime_ns, size)
     if size > MAX_FILE_SIZE:
         return {"error": f"Fichier trop volumineux ({size} bytes, max {MAX_FILE_SIZE})"}
 
@@ -125,8 +144,14 @@ def tool_read_file(path: str, project_root: str | None, offset: int = 1, limit:
     }
 
 
-def tool_list_files(path: str, project_root: str | None, max_depth: int = 3) -> dict:
-    """Liste les fichiers d'un repertoire (tree)."""
+def tool_list_files(
+    path: str, project_root: str | None, max_depth: int = 3,
+    touched: dict | None = None,
+) -> dict:
+    """Liste les fichiers d'un repertoire (tree).
+
+    touched : si fourni, recoit {dossier: (mtime_ns,)} de chaque dossier parcouru.
+    """
     target = validate_path(path, project_root)
 
     if not target.is_dir():
@@ -148,6 +173,8 @@ def tool_list_files(path: str, project_root: str | None, max_depth: int = 3) ->
             return
         try:
             entries = sorted(dir_path.iterdir(), key=lambda e: (not e.is_dir(), e.name.lower()))
+            if touched is not None:
+                touched[str(dir_path)] = (dir_path.stat().st_mtime_ns,)
         except PermissionError:
             return
         for entry in entries:
@@ -160,7 +187,11 @@ def tool_list_files(path: str, project_root: str | None, max_depth: int = 3) ->
             elif entry.is_file():
                 files.append(rel)
 
-    _walk(target, 0)
+    index = project_index_for(project_root, target)
+    if index is not None:
+        files, dirs = index.tree(index.relative(target), max_depth, MAX_LIST_FILES, touched)
+    else:
+        _walk(target, 0)
 
     return {
         "path": _rel(target) or ".",
@@ -171,8 +202,14 @@ def tool_list_files(path: str, project_root: str | None, max_depth: int = 3) ->
     }
 
 
-def tool_search_files(pattern: str, project_root: str | None, path: str = ".", glob_pattern: str = "") -> dict:
-    """Recherche un pattern (regex) dans les fichiers du projet."""
+def tool_search_files(
+    pattern: str, project_root: str | None, path: str = ".", glob_pattern: str = "",
+    touched: dict | None = None,
+) -> dict:
+    """Recherche un pattern (regex) dans les fichiers du projet.
+
+    touched : si fourni, recoit les dossiers parcourus et les fichiers examines.
+    """
     target = validate_path(path, project_root)
     root = Path(project_root).resolve() if project_root else target
 
@@ -192,37 +229,87 @@ def tool_search_files(pattern: str, project_root: str | None, path: str = ".", g
 
     results = []
 
-    for dirpath, dirnames, filenames in os.walk(str(target)):
-        dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS]
-
-        for fname in filenames:
+    def _grep_file(fpath: str, rel: str) -> os.stat_result | None:
+        """Verifie un fichier ligne a ligne, en flux (pas de limite de taille)."""
+        try:
+            with open(fpath, encoding="utf-8", errors="replace") as f:
+                st = os.fstat(f.fileno())
+                for i, line in enumerate(f, 1):
+                    line = line[:-1] if line.endswith("\n") else line
+                    if regex.search(line):
+                        results.append({"file": rel, "line": i, "content": line.rstrip()[:200]})
+                        if len(results) >= MAX_SEARCH_RESULTS:
+                            break
+        except OSError:
+            return None
+        return st
+
+    def _search_candidates(index, candidates: list[str]) -> None:
+        """Seuls les fichiers retenus par l'index de trigrammes sont relus.
+
+        Pas de touched : l'index suit lui-meme les modifications, le resultat
+        n'est pas memoise par tool_cache.
+        """
+        prefix = index.relative(target)
+        prefix = prefix + "/" if prefix else ""
+        for rel in candidates:
             if len(results) >= MAX_SEARCH_RESULTS:
                 break
+            if not rel.startswith(prefix) or os.path.splitext(rel)[1].lower() not in TEXT_EXTENSIONS:
+                continue
+            fpath = index.abs_path(rel)
+            if glob_pattern and not Path(fpath).match(glob_pattern):
+                continue
+            _grep_file(fpath, rel)
 
-            fpath = Path(dirpath) / fname
-            if fpath.suffix.lower() not in TEXT_EXTENSIONS:
+    def _search_index(index) -> None:
+        """Regex sans trigramme exploitable : tous les fichiers texte de l'index."""
+        for rel, meta in index.iter_files(index.relative(target), touched):
+            if len(results) >= MAX_SEARCH_RESULTS:
+                break
+            if not meta[TEXT] or os.path.splitext(rel)[1].lower() not in TEXT_EXTENSIONS:
                 continue
-            if glob_pattern and not fpath.match(glob_pattern):
+            fpath = index.abs_path(rel)
+            if glob_pattern and not Path(fpath).match(glob_pattern):
                 continue
-            try:
-                if fpath.stat().st_size > MAX_SEARCH_FILE_SIZE:
-                    continue
-            except OSError:
+            st = _grep_file(fpath, rel)
+            if st is None:
                 continue
+            if touched is not None:
+                touched[fpath] = (st.st_mtime_ns, st.st_size)
+            # Fichier modifie depuis l'indexation : l'index suit (fstat gratuit)
+            index.update_file(rel, st)
+
+    def _search_walk() -> None:
+        for dirpath, dirnames, filenames in os.walk(str(target)):
+            dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS]
+            if touched is not None:
+                try:
+                    touched[dirpath] = (os.stat(dirpath).st_mtime_ns,)
+                except OSError:
+                    pass
 
-            try:
-                content = fpath.read_text(encoding="utf-8", errors="replace")
-                for i, line in enumerate(content.splitlines(), 1):
-                    if regex.search(line):
-                        results.append({
-                            "file": _rel(fpath),
-                            "line": i,
-                            "content": line.rstrip()[:200],
-                        })
-                        if len(results) >= MAX_SEARCH_RESULTS:
-                            break
-            except Exception:
-                continue
+            for fname in filenames:
+                if len(results) >= MAX_SEARCH_RESULTS:
+                    break
+
+                fpath = Path(dirpath) / fname
+                if fpath.suffix.lower() not in TEXT_EXTENSIONS:
+                    continue
+                if glob_pattern and not fpath.match(glob_pattern):
+                    continue
+                st = _grep_file(str(fpath), _rel(fpath))
+                if st is not None and touched is not None:
+                    touched[str(fpath)] = (st.st_mtime_ns, st.st_size)
+
+    index = project_index_for(project_root, target)
+    candidates = index.search_candidates(pattern, re.IGNORECASE) if index is not None else None
+    if candidates is not None:
+        _search_candidates(index, candidates)
+    elif index is not None:
+        _search_index(index)
+    else:
+        _search_walk()
 
     return {
         "pattern": pattern,
@@ -355,12 +442,165 @@ def tool_system_info() -> dict:
     return info
 
 
+# ============================================================================
+# TOOL RESULT CACHE — memoisation par projet, invalidee par mtime/taille
+# ============================================================================
+
+TOOL_CACHE_MAX_BYTES = int(float(os.getenv("OLITH_TOOL_CACHE_MB", "32")) * 1024 * 1024)
+CACHEABLE_ACTIONS = {"read_file", "list_files", "search_files"}
+
+
+def _stamp(path: str, kind_len: int) -> tuple | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns,) if kind_len == 1 else (st.st_mtime_ns, st.st_size)
+
+
+class ToolResultCache:
+    """Resultats read/list/search, valides par les stats des chemins touches.
+
+    Une entree = (resultat, {chemin: stamp}). Un hit re-stat les chemins
+    touches (pas de re-lecture ni de regex) ; write_file/edit_file invalident
+    directement les entrees qui touchent le fichier ou son dossier parent.
+    LRU sous max_bytes (taille JSON des resultats). Thread-safe.
+    """
+
+    def __init__(self, max_bytes: int = TOOL_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[dict, dict, int]] = OrderedDict()
+        self._by_path: dict[str, set[str]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "invalidations": 0, "evictions": 0}
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        result, touched, _ = entry
+        if any(_stamp(p, len(stamp)) != stamp for p, stamp in touched.items()):
+            with self._lock:
+                self._drop(key)
+                self._stats["stale"] += 1
+                self._stats["misses"] += 1
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+        return copy.deepcopy(result)
+
+    def put(self, key: str, result: dict, touched: dict) -> None:
+        size = len(json.dumps(result, ensure_ascii=False)) + 64 * len(touched)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (copy.deepcopy(result), dict(touched), size)
+            self._bytes += size
+            for p in touched:
+                self._by_path.setdefault(p, set()).add(key)
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def invalidate_path(self, path: Path | str) -> None:
+        """Apres ecriture : entrees touchant le fichier ou son dossier."""
+        path = str(path)
+        with self._lock:
+            keys = set(self._by_path.get(path, ())) | set(self._by_path.get(os.path.dirname(path), ()))
+            for key in keys:
+                self._drop(key)
+            self._stats["invalidations"] += len(keys)
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry[2]
+        for p in entry[1]:
+            keys = self._by_path.get(p)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_path[p]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_path.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s.update({"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes})
+        lookups = s["hits"] + s["misses"]
+        s["hit_rate"] = round(s["hits"] / lookups, 3) if lookups else 0.0
+        return s
+
+
+tool_cache = ToolResultCache()
+
+
+def _tool_cache_key(action: str, args: dict, project_root: str | None) -> str:
+    """Arguments normalises (chemin resolu, valeurs par defaut explicites)."""
+    target = str(validate_path(args.get("path", "."), project_root))
+    if action == "read_file":
+        norm = [target, int(args.get("offset", 1)), int(args.get("limit", 500))]
+    elif action == "list_files":
+        norm = [target, int(args.get("max_depth", 3))]
+    else:
+        norm = [target, args["pattern"], args.get("glob", "")]
+    root = str(Path(project_root).resolve()) if project_root else ""
+    return json.dumps([root, action, norm], ensure_ascii=False)
+
+
 def execute_tool(action: str, args: dict, project_root: str | None) -> dict:
-    """Execute un outil filesystem et retourne le resultat."""
+    """Execute un outil filesystem et retourne le resultat.
+
+    read/list/search passent par tool_cache ; write/edit l'invalident et
+    mettent a jour l'index du projet.
+    """
+    key = None
+    if action in CACHEABLE_ACTIONS:
+        try:
+            key = _tool_cache_key(action, args, project_root)
+        except (KeyError, ValueError, TypeError):
+            key = None      # l'appel normal produira le message d'erreur
+        if key is not None:
+            hit = tool_cache.get(key)
+            if hit is not None:
+                return hit
+
+    touched: dict = {}
+    result = _run_tool(action, args, project_root, touched)
+
+    if key is not None and "error" not in result:
+        if touched:     # sans chemin touche (recherche par trigrammes) : rien a re-valider
+            tool_cache.put(key, result, touched)
+    elif action in LEVEL_2_ACTIONS:
+        try:
+            written = validate_path(args["path"], project_root, write=True)
+        except (KeyError, ValueError):
+            return result
+        tool_cache.invalidate_path(written)
+        index = project_index_for(project_root, written)
+        if index is not None:
+            index.touch(written)
+    return result
+
+
+def _run_tool(action: str, args: dict, project_root: str | None, touched: dict) -> dict:
     dispatch = {
-        "read_file":    lambda: tool_read_file(args["path"], project_root, args.get("offset", 1), args.get("limit", 500)),
-        "list_files":   lambda: tool_list_files(args.get("path", "."), project_root, args.get("max_depth", 3)),
-        "search_files": lambda: tool_search_files(args["pattern"], project_root, args.get("path", "."), args.get("glob", "")),
+        "read_file":    lambda: tool_read_file(args["path"], project_root, args.get("offset", 1), args.get("limit", 500), touched),
+        "list_files":   lambda: tool_list_files(args.get("path", "."), project_root, args.get("max_depth", 3), touched),
+        "search_files": lambda: tool_search_files(args["pattern"], project_root, args.get("path", "."), args.get("glob", ""), touched),
         "write_file":   lambda: tool_write_file(args["path"], args["content"], project_root),
         "edit_file":    lambda: tool_edit_file(args["path"], args["old_string"], args["new_string"], project_root),
     }
@@ -380,10 +620,106 @@ def execute_tool(action: str, args: dict, project_root: str | None) -> dict:
         return {"error": f"Erreur outil {action}: {e}"}
 
 
+# ============================================================================
+# TOOL SCHEDULER — lectures en parallele, ecritures serialisees
+# ============================================================================
+
+def _tool_resource(call: dict, project_root: str | None) -> str | None:
+    """Ressource touchee par un tool call (chemin resolu, memoire) ou None."""
+    action = call.get("action")
+    if action in ("search_mem0", "add_mem0"):
+        return "mem0:"
+    if action in ("read_file", "write_file", "edit_file", "list_files", "search_files"):
+        path = str(call.get("path", "."))
+        try:
+            return str(validate_path(path, project_root))
+        except Exception:
+            return os.path.normpath(path)
+    return None
+
+
+def _resources_overlap(a: str | None, b: str | None) -> bool:
+    """Meme ressource, ou l'une contient l'autre (list/search d'un dossier ecrit)."""
+    if a is None or b is None:
+        return False
+    if a == b:
+        return True
+    return a.startswith(b.rstrip(os.sep) + os.sep) or b.startswith(a.rstrip(os.sep) + os.sep)
+
+
+def timed_tool_call(run, call: dict) -> dict:
+    """Execute run(call) ; retourne {"result", "t0", "ms"} sans jamais lever."""
+    t0 = time.perf_counter()
+    try:
+        result = run(call)
+    except Exception as e:
+        log_warn("tools", f"Tool {call.get('action')} failed: {e}")
+        result = {"error": f"Erreur outil {call.get('action')}: {e}"}
+    return {"result": result, "t0": t0, "ms": round((time.perf_counter() - t0) * 1000, 1)}
+
+
+def run_tool_calls(calls: list[dict], run, pool, project_root: str | None = None, started: dict | None = None):
+    """Ordonnance les tool calls d'une iteration sur pool.
+
+    - Les lectures independantes tournent en parallele.
+    - Les ecritures (WRITE_ACTIONS) s'executent une par une, dans l'ordre,
+      apres toute lecture precedente de la meme ressource ; une lecture
+      posterieure attend l'ecriture qui la precede.
+    - started : {index: Future} deja lances (outils demarres pendant le streaming).
+
+    Generateur : yield (index, call, outcome) dans l'ordre d'origine, des que
+    le prefixe est disponible. outcome = timed_tool_call(...).
+    """
+    n = len(calls)
+    resources = [_tool_resource(c, project_root) for c in calls]
+    is_write = [c.get("action") in WRITE_ACTIONS for c in calls]
+
+    deps: list[set[int]] = [set() for _ in calls]
+    last_write = None
+    for i in range(n):
+        for j in range(i):
+            if (is_write[i] or is_write[j]) and _resources_overlap(resources[i], resources[j]):
+                deps[i].add(j)
+        if is_write[i]:
+            if last_write is not None:
+                deps[i].add(last_write)
+            last_write = i
+
+    futures = dict(started or {})
+    pending = [i for i in range(n) if i not in futures]
+    next_out = 0
+    while next_out < n:
+        for i in list(pending):
+            if all(j in futures and futures[j].done() for j in deps[i]):
+                futures[i] = pool.submit(timed_tool_call, run, calls[i])
+                pending.remove(i)
+
+        while next_out < n and next_out in futures and futures[next_out].done():
+            yield next_out, calls[next_out], futures[next_out].result()
+            next_out += 1
+
+        running = [f for f in futures.values() if not f.done()]
+        if running and next_out < n:
+            wait(running, return_when=FIRST_COMPLETED)
+
+
 # ============================================================================
 # TOOL-CALL PARSER
 # ============================================================================
 
+# Pattern 1: blocs ```json ... ``` contenant une action
+_CODE_BLOCK_PATTERN = re.compile(
+    r'```(?:json)?\s*\n(\{[^`]*?"action"\s*:\s*"[^"]+?"[^`]*?\})\s*\n```',
+    re.DOTALL
+)
+
+# Pattern 2: JSON brut sur une ligne (fallback)
+_INLINE_PATTERN = re.compile(
+    r'^(\{"action"\s*:\s*"[^"]+?"[^\n]*\})\s*$',
+    re.MULTILINE
+)
+
+
 def parse_tool_calls(response_text: str) -> tuple[str, list[dict]]:
     """Parse une reponse d'IA pour extraire les tool calls JSON.
 
@@ -395,21 +731,9 @@ def parse_tool_calls(response_text: str) -> tuple[str, list[dict]]:
     """
     tool_calls = []
 
-    # Pattern 1: blocs ```json ... ``` contenant une action
-    code_block_pattern = re.compile(
-        r'```(?:json)?\s*\n(\{[^`]*?"action"\s*:\s*"[^"]+?"[^`]*?\})\s*\n```',
-        re.DOTALL
-    )
-
-    # Pattern 2: JSON brut sur une ligne (fallback)
-    inline_pattern = re.compile(
-        r'^(\{"action"\s*:\s*"[^"]+?"[^\n]*\})\s*$',
-        re.MULTILINE
-    )
-
     clean_text = response_text
 
-    for match in code_block_pattern.finditer(response_text):
+    for match in _CODE_BLOCK_PATTERN.finditer(response_text):
         try:
             obj = json.loads(match.group(1))
             if "action" in obj:
@@ -418,7 +742,7 @@ def parse_tool_calls(response_text: str) -> tuple[str, list[dict]]:
         except json.JSONDecodeError:
             continue
 
-    for match in inline_pattern.finditer(clean_text):
+    for match in _INLINE_PATTERN.finditer(clean_text):
         try:
             obj = json.loads(match.group(1))
             if "action" in obj and obj not in tool_calls:
@@ -432,6 +756,71 @@ def parse_tool_calls(response_text: str) -> tuple[str, list[dict]]:
     return clean_text, tool_calls
 
 
+class StreamingToolCallParser:
+    """Detection incrementale des tool calls pendant le streaming.
+
+    feed(chunk) retourne les blocs ```json {"action": ...}``` qui viennent de
+    se fermer, dans l'ordre. Le contenu d'un <think> non encore ferme est
+    ignore. La liste definitive reste celle de parse_tool_calls() sur la
+    reponse complete (les appels en ligne ne sont detectes qu'a la fin).
+
+    Le texte deja traite (blocs fermes, <think> fermes, prose) est retire du
+    tampon et jamais reparcouru : le tampon commence au premier bloc ou
+    <think> encore ouvert, et la recherche de sa fermeture reprend la ou elle
+    s'etait arretee.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._chunks: list[str] = []   # recus depuis le dernier parcours
+        self._pos = 0        # tout ce qui precede est traite
+        self._resume = 0     # recherche de la fermeture du bloc ouvert en _pos
+
+    def feed(self, chunk: str) -> list[dict]:
+        self._chunks.append(chunk)
+        if "`" not in chunk:
+            return []   # un bloc ne se ferme que sur des backticks
+
+        text = self._text = self._text + "".join(self._chunks)
+        self._chunks.clear()
+        calls = []
+        while True:
+            fence = text.find("```", self._pos)
+            think = text.find("<think>", self._pos, fence if fence >= 0 else len(text))
+            if think >= 0:
+                # <think> avant le prochain bloc : saute-le une fois ferme
+                self._pos = think
+                end = text.find("</think>", max(think + 7, self._resume))
+                if end < 0:
+                    self._resume = max(len(text) - 7, think + 7)
+                    break
+                self._pos = self._resume = end + 8
+                continue
+            if fence < 0:
+                # Prose : garde la fin (debut possible de ``` ou <think>)
+                self._pos = max(self._pos, len(text) - 6)
+                break
+            self._pos = fence
+            close = text.find("```", max(fence + 3, self._resume))
+            if close < 0:
+                self._resume = max(len(text) - 2, fence + 3)
+                break
+            match = _CODE_BLOCK_PATTERN.match(text, fence)
+            if match is not None and match.end() == close + 3:
+                try:
+                    obj = json.loads(match.group(1))
+                except json.JSONDecodeError:
+                    obj = {}
+                if "action" in obj:
+                    calls.append(obj)
+            self._pos = self._resume = close + 3
+
+        self._text = text[self._pos:]
+        self._resume -= self._pos
+        self._pos = 0
+        return calls
+
+
 # ============================================================================
 # INLINE TESTS — python olith_tools.py
 # ============================================================================
@@ -561,5 +950,25 @@ if __name__ == "__main__":
     # Cleanup
     shutil.rmtree(tmpdir)
 
+    print(f"\n=== StreamingToolCallParser tests ===\n")
+
+    def _test_stream_parser():
+        parser = StreamingToolCallParser()
+        response = 'Je lis.\n```json\n{"action": "read_file", "path": "a.py"}\n```\nPuis ```json\n{"action": "list_files"}\n```'
+        found = []
+        for i in range(0, len(response), 7):
+            found.extend(parser.feed(response[i:i + 7]))
+        assert [c["action"] for c in found] == ["read_file", "list_files"], found
+        assert found == parse_tool_calls(response)[1], "must agree with parse_tool_calls"
+    _test("streaming parser emits each closed block once", _test_stream_parser)
+
+    def _test_stream_parser_think():
+        parser = StreamingToolCallParser()
+        block = '```json\n{"action": "read_file", "path": "a.py"}\n```'
+        assert parser.feed("<think>" + block) == [], "block inside open <think> ignored"
+        assert parser.feed("</think>ok") == []
+        assert len(parser.feed("\n" + block)) == 1
+    _test("streaming parser skips <think> blocks", _test_stream_parser_think)
+
     print(f"\n=== Results: {passed} passed, {failed} failed ===\n")
     exit(1 if failed else 0)
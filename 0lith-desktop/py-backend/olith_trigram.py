@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+0Lith V1 — Trigram Index for search_files
+===========================================
+Index de trigrammes (facon codesearch) des fichiers texte du projet : une
+regex est decomposee en trigrammes obligatoires (ET / OU), les listes de
+fichiers correspondantes sont intersectees, et seuls ces candidats sont
+relus et verifies ligne a ligne.
+
+- Trigrammes d'octets, ASCII en minuscules (search_files est insensible a
+  la casse) ; un caractere non ASCII coupe un litteral, et les rares
+  equivalences Unicode de re.IGNORECASE (K Kelvin, s long, i sans point)
+  sont ramenees a l'ASCII a l'indexation : la decomposition ne peut
+  qu'elargir les candidats, jamais en perdre.
+- Base immuable (CSR numpy : cles triees, offsets, ids de fichiers) + une
+  surcouche pour les fichiers modifies depuis ; fusion au-dela de
+  MERGE_THRESHOLD fichiers.
+- Alimente par ProjectIndex (construction, fichiers modifies/supprimes),
+  persiste a cote de lui (<hash racine>.trigrams.npz).
+"""
+
+import json
+import threading
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from re import _parser as sre_parse, _constants as sre_c
+except ImportError:         # Python < 3.11
+    import sre_parse
+    import sre_constants as sre_c
+
+from olith_shared import log_warn
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+MERGE_THRESHOLD = 2000          # fichiers en surcouche avant fusion dans la base
+_EMPTY = np.empty(0, dtype=np.uint32)
+_REPEATS = tuple(getattr(sre_c, name) for name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT")
+                 if hasattr(sre_c, name))
+
+
+# Caracteres non ASCII que re.IGNORECASE egale a une lettre ASCII (UTF-8)
+_CASE_FOLDS = ((b"\xe2\x84\xaa", b"k"), (b"\xc5\xbf", b"s"), (b"\xc4\xb1", b"i"), (b"\xc4\xb0", b"i"))
+
+
+def file_trigrams(data: bytes) -> np.ndarray:
+    """Trigrammes distincts (uint32 = 3 octets), tries."""
+    if not data.isascii():
+        for variant, ascii_char in _CASE_FOLDS:
+            data = data.replace(variant, ascii_char)
+    if len(data) < 3:
+        return _EMPTY
+    a = np.frombuffer(data.lower(), dtype=np.uint8).astype(np.uint32)
+    return np.unique((a[:-2] << 16) | (a[1:-1] << 8) | a[2:])
+
+
+def _trigram(s: str) -> int:
+    return (ord(s[0]) << 16) | (ord(s[1]) << 8) | ord(s[2])
+
+
+# ============================================================================
+# REGEX -> REQUETE DE TRIGRAMMES
+# ============================================================================
+# Requete : None (aucune contrainte), int (trigramme), ("and", [...]), ("or", [...])
+
+def _literal_char(op, av) -> str | None:
+    if op is sre_c.LITERAL and av < 128:
+        return chr(av).lower()
+    return None
+
+
+def _and(parts: list):
+    flat = []
+    for part in parts:
+        if part is None:
+            continue
+        if isinstance(part, tuple) and part[0] == "and":
+            flat.extend(part[1])
+        else:
+            flat.append(part)
+    if not flat:
+        return None
+    return flat[0] if len(flat) == 1 else ("and", flat)
+
+
+def _or(branches: list):
+    if not branches or any(b is None for b in branches):
+        return None
+    return branches[0] if len(branches) == 1 else ("or", branches)
+
+
+def _analyze(items) -> object:
+    parts, run = [], []
+
+    def flush():
+        if len(run) >= 3:
+            parts.append(_and([_trigram("".join(run[i:i + 3])) for i in range(len(run) - 2)]))
+        run.clear()
+
+    for op, av in items:
+        char = _literal_char(op, av)
+        if char is not None:
+            run.append(char)
+        elif op is sre_c.AT:
+            continue                            # ^ $ \b : largeur nulle, le litteral continue
+        elif op is sre_c.SUBPATTERN:
+            sub = av[-1]
+            chars = [_literal_char(o, a) for o, a in sub]
+            if chars and all(c is not None for c in chars):
+                run.extend(chars)               # (foo)bar : meme litteral
+            else:
+                flush()
+                parts.append(_analyze(sub))
+        elif op is sre_c.BRANCH:
+            flush()
+            parts.append(_or([_analyze(branch) for branch in av[1]]))
+        elif op in _REPEATS:
+            flush()
+            if av[0] >= 1:
+                parts.append(_analyze(av[2]))
+        elif op is getattr(sre_c, "ATOMIC_GROUP", None):
+            flush()
+            parts.append(_analyze(av))
+        else:
+            flush()                             # classe, ., \w, lookaround... : coupe le litteral
+    flush()
+    return _and(parts)
+
+
+def regex_query(pattern: str, flags: int = 0):
+    """Trigrammes requis par la regex (None : tous les fichiers sont candidats)."""
+    return _analyze(sre_parse.parse(pattern, flags))
+
+
+def _match_set(query, trigrams: set) -> bool:
+    if query is None:
+        return True
+    if isinstance(query, int):
+        return query in trigrams
+    op, parts = query
+    if op == "and":
+        return all(_match_set(p, trigrams) for p in parts)
+    return any(_match_set(p, trigrams) for p in parts)
+
+
+# ============================================================================
+# INDEX
+# ============================================================================
+
+class TrigramIndex:
+    """Listes de fichiers par trigramme, pour une racine de projet."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+        self.stats = {"queries": 0, "candidates": 0, "merges": 0, "reindexed": 0}
+
+    def _reset(self) -> None:
+        self.paths: list[str | None] = []       # id -> chemin relatif (None : supprime)
+        self.ids: dict[str, int] = {}
+        self.keys = _EMPTY                      # trigrammes tries
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.postings = _EMPTY                  # ids de fichiers, par trigramme
+        self._overlay: dict[int, np.ndarray] = {}
+        self._stale: set[int] = set()           # ids dont les postings de base sont perimes
+        self._dirty: set[str] = set()           # modifies, contenu pas encore relu
+        self._unindexed: set[int] = set()       # texte mais non indexe : toujours candidat
+        self._bulk: list | None = None
+
+    def _id(self, rel: str) -> int:
+        fid = self.ids.get(rel)
+        if fid is None:
+            fid = self.ids[rel] = len(self.paths)
+            self.paths.append(rel)
+        return fid
+
+    # ── Alimentation (ProjectIndex) ───────────────────────────────────────
+
+    def begin_bulk(self) -> None:
+        with self._lock:
+            self._reset()
+            self._bulk = []
+
+    def end_bulk(self) -> None:
+        with self._lock:
+            bulk, self._bulk = self._bulk or [], None
+            self._build_base(bulk)
+
+    def on_file(self, rel: str, meta: list | None, data: bytes | None, is_text: bool = True) -> None:
+        """Fichier ajoute / modifie (data : contenu si deja lu) ou supprime (meta None)."""
+        with self._lock:
+            if meta is None or not is_text:
+                fid = self.ids.pop(rel, None)
+                self._dirty.discard(rel)
+                if fid is not None:
+                    self.paths[fid] = None
+                    self._overlay.pop(fid, None)
+                    self._unindexed.discard(fid)
+                    self._stale.add(fid)
+                return
+            fid = self._id(rel)
+            if self._bulk is not None:
+                if data is None:
+                    self._unindexed.add(fid)
+                else:
+                    self._bulk.append((fid, file_trigrams(data)))
+                return
+            if data is None:
+                self._dirty.add(rel)
+                return
+            self._set_overlay(fid, file_trigrams(data))
+
+    def _set_overlay(self, fid: int, trigrams: np.ndarray) -> None:
+        self._dirty.discard(self.paths[fid])
+        self._unindexed.discard(fid)
+        self._stale.add(fid)
+        self._overlay[fid] = trigrams
+        self.stats["reindexed"] += 1
+        if len(self._overlay) > MERGE_THRESHOLD:
+            self._merge()
+
+    def _build_base(self, items: list) -> None:
+        lengths = np.fromiter((len(t) for _, t in items), dtype=np.int64, count=len(items))
+        if not items or not lengths.sum():
+            self.keys, self.offsets, self.postings = _EMPTY, np.zeros(1, dtype=np.int64), _EMPTY
+            return
+        # (trigramme << 32 | id) : un seul tri en place
+        combined = np.concatenate([t.astype(np.uint64) << np.uint64(32) for _, t in items])
+        combined |= np.repeat(np.fromiter((f for f, _ in items), dtype=np.uint64, count=len(items)), lengths)
+        combined.sort()
+        trigrams = (combined >> np.uint64(32)).astype(np.uint32)
+        self.postings = (combined & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+        del combined
+        self.keys, starts = np.unique(trigrams, return_index=True)
+        self.offsets = np.append(starts, len(trigrams)).astype(np.int64)
+
+    def _merge(self) -> None:
+        """Surcouche et suppressions reportees dans la base."""
+        counts = np.diff(self.offsets)
+        items = []
+        if len(self.postings):
+            trigrams = np.repeat(self.keys, counts)
+            keep = ~np.isin(self.postings, np.fromiter(self._stale, dtype=np.uint32, count=len(self._stale)))
+            fids, trigrams = self.postings[keep], trigrams[keep]
+            order = np.argsort(fids, kind="stable")
+            fids, trigrams = fids[order], trigrams[order]
+            bounds = np.flatnonzero(np.diff(fids)) + 1
+            for fid_group, tri_group in zip(np.split(fids, bounds), np.split(trigrams, bounds)):
+                if len(fid_group):
+                    items.append((int(fid_group[0]), tri_group))
+        items.extend(self._overlay.items())
+        self._build_base(items)
+        self._overlay.clear()
+        self._stale.clear()
+        self.stats["merges"] += 1
+
+    # ── Requetes ──────────────────────────────────────────────────────────
+
+    def _posting(self, trigram: int) -> np.ndarray:
+        i = int(np.searchsorted(self.keys, trigram))
+        if i < len(self.keys) and self.keys[i] == trigram:
+            return self.postings[self.offsets[i]:self.offsets[i + 1]]
+        return _EMPTY
+
+    def _eval(self, query) -> np.ndarray:
+        if isinstance(query, int):
+            return self._posting(query)
+        op, parts = query
+        if op == "and":
+            # Trigrammes seuls d'abord, du plus rare au plus frequent
+            singles = sorted((p for p in parts if isinstance(p, int)), key=lambda t: len(self._posting(t)))
+            result = None
+            for part in singles + [p for p in parts if not isinstance(p, int)]:
+                ids = self._eval(part)
+                result = ids if result is None else np.intersect1d(result, ids, assume_unique=True)
+                if not len(result):
+                    break
+            return result if result is not None else _EMPTY
+        result = _EMPTY
+        for part in parts:
+            result = np.union1d(result, self._eval(part))
+        return result
+
+    def candidates(self, query, read_fn=None) -> list[str] | None:
+        """Chemins pouvant correspondre (tries), None si la requete ne filtre rien.
+
+        read_fn(rel) -> bytes | None relit les fichiers modifies en attente.
+        """
+        if query is None:
+            return None
+        with self._lock:
+            if self._dirty and read_fn is not None:
+                for rel in list(self._dirty):
+                    data = read_fn(rel)
+                    fid = self.ids.get(rel)
+                    if fid is None:
+                        self._dirty.discard(rel)
+                    elif data is None:
+                        self._dirty.discard(rel)
+                        self._unindexed.add(fid)
+                    else:
+                        self._set_overlay(fid, file_trigrams(data))
+            fids = set(self._eval(query).tolist())
+            fids -= self._stale
+            fids.update(fid for fid, tri in self._overlay.items() if _match_set(query, set(tri.tolist())))
+            fids.update(self._unindexed)
+            fids.update(self.ids[rel] for rel in self._dirty if rel in self.ids)
+            paths = sorted(p for p in (self.paths[f] for f in fids) if p is not None)
+            self.stats["queries"] += 1
+            self.stats["candidates"] += len(paths)
+        return paths
+
+    # ── Persistance ───────────────────────────────────────────────────────
+
+    def save(self, path: Path) -> None:
+        with self._lock:
+            if self._overlay or self._stale:
+                self._merge()
+            arrays = {
+                "keys": self.keys, "offsets": self.offsets, "postings": self.postings,
+                "unindexed": np.fromiter(self._unindexed, dtype=np.uint32, count=len(self._unindexed)),
+                "paths": np.frombuffer(json.dumps(self.paths).encode("utf-8"), dtype=np.uint8),
+                "dirty": np.frombuffer(json.dumps(sorted(self._dirty)).encode("utf-8"), dtype=np.uint8),
+            }
+        try:
+            tmp = path.with_name(path.name + ".tmp")
+            with open(tmp, "wb") as f:
+                np.savez(f, **arrays)
+            tmp.replace(path)
+        except OSError as e:
+            log_warn("project", f"Failed to save trigram index: {e}")
+
+    def load(self, path: Path) -> bool:
+        try:
+            with np.load(path) as data:
+                paths = json.loads(data["paths"].tobytes().decode("utf-8"))
+                keys, offsets, postings = data["keys"], data["offsets"], data["postings"]
+                unindexed = set(data["unindexed"].tolist())
+                dirty = set(json.loads(data["dirty"].tobytes().decode("utf-8")))
+        except (OSError, ValueError, KeyError) as e:
+            if path.exists():
+                log_warn("project", f"Trigram index unreadable, rebuilding: {e}")
+            return False
+        with self._lock:
+            self._reset()
+            self.paths = paths
+            self.ids = {p: i for i, p in enumerate(paths) if p is not None}
+            self.keys, self.offsets, self.postings = keys, offsets, postings
+            self._unindexed = unindexed
+            self._dirty = dirty
+        return True
+
+    def mark_dirty(self, rel: str) -> None:
+        with self._lock:
+            if rel in self.ids:
+                self._dirty.add(rel)
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                "files": len(self.ids),
+                "trigrams": len(self.keys),
+                "postings": len(self.postings),
+                "bytes": int(self.keys.nbytes + self.offsets.nbytes + self.postings.nbytes),
+                "overlay": len(self._overlay),
+                "dirty": len(self._dirty),
+                "unindexed": len(self._unindexed),
+                **self.stats,
+            }
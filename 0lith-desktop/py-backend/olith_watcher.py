@@ -43,12 +43,23 @@ from olith_shared import (
     TEXT_EXTENSIONS,
 )
 
+from olith_memory_queue import (
+    enqueue_memory, get_memory_queue, get_memory_queue_stats, start_memory_queue,
+    PRIORITY_HIGH, PRIORITY_LOW,
+)
+
+from olith_memory_service import SERVICE_ENABLED, connect_memory_service
+from olith_embed_cache import install_embedding_cache
+from olith_lexical import install_lexical_index
+from olith_memory_filters import search_filtered
+
 from olith_memory_init import (
     MEM0_CONFIG,
     OLLAMA_URL,
     QDRANT_URL,
     check_service,
-    check_qdrant_embedded,
+    check_qdrant,
+    provision_collection,
 )
 
 # ============================================================================
@@ -106,6 +117,7 @@ def emit_status(watcher):
         "watch_dir": str(watcher.watch_dir) if watcher.watch_dir else "",
         "paused": watcher.paused,
         "ollama_available": watcher.ollama_available,
+        "memory_queue": get_memory_queue_stats(),
     })
 
 
@@ -216,7 +228,11 @@ class OlithWatcher:
             if self.memory:
                 return True
             try:
-                if not check_qdrant_embedded():
+                if SERVICE_ENABLED:
+                    # Mem0 partage avec le backend via le service memoire
+                    self.memory = connect_memory_service()
+                    return self.memory is not None
+                if not check_qdrant():
                     return False
                 config = copy.deepcopy(MEM0_CONFIG)
                 try:
@@ -225,6 +241,9 @@ class OlithWatcher:
                     config.pop("graph_store", None)
                 from mem0 import Memory
                 self.memory = Memory.from_config(config_dict=config)
+                install_embedding_cache(self.memory)
+                install_lexical_index(self.memory)
+                provision_collection(self.memory)
                 return True
             except Exception as e:
                 log_warn("watcher_memory", f"Mem0 init failed: {e}")
@@ -239,31 +258,29 @@ class OlithWatcher:
             self.ollama_available = False  # Expected when Ollama is not running
         return self.ollama_available
 
-    def _call_hodolith(self, prompt: str, timeout: int = 30):
-        """Call qwen3:1.7b for analysis. Returns None if unavailable."""
+    def _call_hodolith(self, prompt: str, timeout: int = 30, cache: bool = False):
+        """Call qwen3:1.7b for analysis. Returns None if unavailable.
+
+        cache=True serves identical prompts from the on-disk LLM response cache.
+        """
         if not self._check_ollama():
             return None
         try:
-            response = requests.post(
-                f"{OLLAMA_URL}/api/chat",
-                json={
-                    "model": HODOLITH_MODEL,
-                    "messages": [
-                        {"role": "system", "content":
-                            "Tu es un assistant d'analyse de code. "
-                            "Analyse les changements et suggere les prochaines etapes. "
-                            "Reponds en 1-2 phrases concises. /no_think"
-                        },
-                        {"role": "user", "content": prompt + " /no_think"},
-                    ],
-                    "stream": False,
-                    "keep_alive": "5m",
-                    "options": {"num_ctx": 2048},
-                },
+            from olith_ollama import chat_with_ollama
+            text = chat_with_ollama(
+                HODOLITH_MODEL,
+                [
+                    {"role": "system", "content":
+                        "Tu es un assistant d'analyse de code. "
+                        "Analyse les changements et suggere les prochaines etapes. "
+                        "Reponds en 1-2 phrases concises. /no_think"
+                    },
+                    {"role": "user", "content": prompt + " /no_think"},
+                ],
                 timeout=timeout,
+                num_ctx=2048,
+                cache=cache,
             )
-            response.raise_for_status()
-            text = response.json()["message"]["content"]
             text = strip_think_blocks(text)
             return text
         except Exception as e:
@@ -303,7 +320,8 @@ class OlithWatcher:
         Returns None only when Ollama is unavailable.
         Clamps confidence_score to [0.0, 1.0].
         """
-        text = self._call_hodolith(prompt, timeout=timeout)
+        # Same file snippet -> same prediction: served from the response cache
+        text = self._call_hodolith(prompt, timeout=timeout, cache=True)
         if text is None:
             return None
 
@@ -469,27 +487,32 @@ class OlithWatcher:
                 daemon=True,
             ).start()
 
+    def _memory_for_queue(self):
+        """Mem0 for the write queue; None (hold writes) while paused for gaming."""
+        if self.paused or not self._ensure_memory():
+            return None
+        return self.memory
+
     def _store_shadow_thinking(self, text: str, metadata: dict):
-        """Store pre-analyzed result in Mem0 with shadow_thinking tag."""
-        if not self._ensure_memory():
+        """Queue pre-analyzed result for Mem0 with shadow_thinking tag."""
+        if get_memory_queue() is None and not self._ensure_memory():
             return
-        try:
-            self.memory.add(
-                text + " /no_think",
-                user_id="hodolith",
-                metadata={
-                    "type": "shadow_thinking",
-                    "user_id": "hodolith",
-                    **metadata,
-                    "timestamp": int(time.time()),
-                },
-            )
-        except Exception as e:
-            log_warn("watcher_shadow_store", f"Failed to store shadow thinking: {e}")
+        enqueue_memory(
+            self.memory,
+            text + " /no_think",
+            "hodolith",
+            metadata={
+                "type": "shadow_thinking",
+                "user_id": "hodolith",
+                **metadata,
+                "timestamp": int(time.time()),
+            },
+            priority=PRIORITY_LOW,
+        )
 
     def store_feedback(self, suggestion_id: str, action: str, modified_text=None):
-        """Store user feedback about a suggestion in Mem0."""
-        if not self._ensure_memory():
+        """Queue user feedback about a suggestion for Mem0."""
+        if get_memory_queue() is None and not self._ensure_memory():
             return
         feedback_map = {
             "accepted": "prediction correct - user accepted the suggestion",
@@ -497,19 +520,18 @@ class OlithWatcher:
             "modified": f"user prefers a different approach: {modified_text or 'unspecified'}",
         }
         feedback_text = feedback_map.get(action, f"feedback: {action}")
-        try:
-            self.memory.add(
-                f"{feedback_text} (suggestion_id: {suggestion_id}) /no_think",
-                user_id="hodolith",
-                metadata={
-                    "type": "prediction_feedback",
-                    "user_id": "hodolith",
-                    "suggestion_id": suggestion_id,
-                    "action": action,
-                },
-            )
-        except Exception as e:
-            log_warn("watcher_feedback", f"Failed to store feedback: {e}")
+        enqueue_memory(
+            self.memory,
+            f"{feedback_text} (suggestion_id: {suggestion_id}) /no_think",
+            "hodolith",
+            metadata={
+                "type": "prediction_feedback",
+                "user_id": "hodolith",
+                "suggestion_id": suggestion_id,
+                "action": action,
+            },
+            priority=PRIORITY_HIGH,
+        )
 
     def check_schedule(self):
         """Check schedule.json for upcoming events / free slots."""
@@ -539,10 +561,14 @@ class OlithWatcher:
             return
 
         try:
-            results = self.memory.search(
+            # Predictions des dernieres 24 h seulement (index type + timestamp)
+            results = search_filtered(
+                self.memory,
                 "recent file changes and project activity",
-                user_id="hodolith",
                 limit=3,
+                user_id="hodolith",
+                types="shadow_thinking",
+                since=time.time() - 86400,
             )
             memories = extract_memories(results)
 
@@ -621,6 +647,7 @@ def main():
         watch_dir = sys.argv[1]
 
     watcher = OlithWatcher(watch_dir)
+    start_memory_queue(watcher._memory_for_queue, name="watcher")
 
     if watcher.watch_dir:
         watcher.start_watching()
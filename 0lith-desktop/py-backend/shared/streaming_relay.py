@@ -27,21 +27,26 @@ def sync_call_with_fallback(
     fallback_model: str = FALLBACK_MODEL,
     min_chars: int = 20,
     num_ctx: int = 2048,
+    cancel_event=None,
 ) -> str:
     """Sync LLM call with adaptive timeout + short-response fallback.
 
     Returns raw response string (think blocks not stripped — caller decides).
     Falls back to fallback_model when the stripped text is shorter than min_chars.
+    Raises GenerationCancelled (olith_ollama) as soon as cancel_event is set.
     """
     timeout = get_model_timeout(model)
 
-    def _call(m: str, docker: bool) -> str:
+    def _call(m: str, docker: bool, cache: bool = False) -> str:
         if docker:
-            return chat_docker_pyrolith(m, messages, timeout=timeout, num_ctx=num_ctx)
-        return chat_with_ollama(m, messages, timeout=timeout, num_ctx=num_ctx)
+            return chat_docker_pyrolith(m, messages, timeout=timeout, num_ctx=num_ctx,
+                                        cancel_event=cancel_event, cache=cache)
+        return chat_with_ollama(m, messages, timeout=timeout, num_ctx=num_ctx,
+                                cancel_event=cancel_event, cache=cache)
 
     raw = _call(model, is_docker)
     if model != fallback_model and len(strip_think_blocks(raw).strip()) < min_chars:
         log_warn("relay", f"Short response ({len(strip_think_blocks(raw).strip())} chars) from {model}, retrying with {fallback_model}")
-        raw = _call(fallback_model, False)
+        # Meme prompt rejoue a chaque echec court du modele primaire : cacheable
+        raw = _call(fallback_model, False, cache=True)
     return raw
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test streamed agent loop (olith_agents.run_agent_loop)
+================================================================
+A scripted stream replaces Ollama: every iteration must stream, and a
+read-only tool whose JSON block closes early must start before the
+generation ends.
+
+Usage:
+    python -m pytest test_agent_loop.py -v
+    python test_agent_loop.py
+"""
+
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+import olith_agents
+import olith_context
+from olith_context import ContextAssembler, ContextOverflow
+from olith_ollama import CancelToken
+from olith_tools import StreamingToolCallParser, parse_tool_calls, run_tool_calls
+
+
+class _Residency:
+    def __init__(self, acquired=None):
+        self.acquired = acquired if acquired is not None else []
+
+    def acquire(self, agent_id, preload=False, cancel_event=None, num_ctx=None):
+        self.acquired.append(num_ctx)
+        return "warm"
+
+    def loaded_num_ctx(self, agent_id):
+        return None
+
+    def keep_alive(self, agent_id):
+        return "5m"
+
+    def touch(self, agent_id):
+        pass
+
+
+class TestStreamedAgentLoop(unittest.TestCase):
+
+    def setUp(self):
+        olith_context._calibration.clear()              # faux prompt_eval_count des autres tests
+        self.project = Path(tempfile.mkdtemp(prefix="olith_loop_", dir=str(Path.home())))
+        (self.project / "a.py").write_text("print('hi')\n", encoding="utf-8")
+        self.calls = 0
+
+        def fake_stream(model, messages, timeout, num_ctx, cancel_event, keep_alive, metrics=None,
+                        num_predict=None):
+            self.calls += 1
+            if metrics is not None:
+                metrics.update({"prompt_tokens": 100 * self.calls, "prompt_eval_ms": 5.0})
+            if self.calls == 1:
+                yield "Je lis le fichier.\n"
+                yield '```json\n{"action": "read_file", "path": "a.py"}\n```\n'
+                time.sleep(0.3)          # generation continue apres le bloc
+                yield "Suite du raisonnement."
+            else:
+                yield "Le fichier affiche hi."
+
+        self._orig = (olith_agents.chat_with_ollama_stream, olith_agents.get_residency)
+        olith_agents.chat_with_ollama_stream = fake_stream
+        self.acquired = []
+        olith_agents.get_residency = lambda: _Residency(self.acquired)
+
+    def tearDown(self):
+        olith_agents.chat_with_ollama_stream, olith_agents.get_residency = self._orig
+        olith_agents.conversation_history.clear()
+        shutil.rmtree(self.project, ignore_errors=True)
+
+    def test_every_iteration_streams_and_tool_starts_early(self):
+        events = []
+        result = olith_agents.run_agent_loop(
+            agent_id="aerolith", message="lis a.py", memory=None,
+            project_root=str(self.project), emit=events.append,
+        )
+        chunks = "".join(e.get("chunk", "") for e in events)
+        self.assertIn("Le fichier affiche hi.", chunks)          # iteration 2 streamee
+        self.assertRegex(chunks, r"\[outil: read_file — \d+ ms\]")
+
+        first, second = result["iterations"]
+        self.assertEqual(first["early_tools"], 1)
+        self.assertLess(first["tool_start_ms"][0], first["gen_ms"] - 200)
+        self.assertIsNotNone(first["ttft_ms"])
+        self.assertIsNotNone(second["ttft_ms"])
+        self.assertEqual(result["response"].count("Le fichier affiche hi."), 1)
+
+    def test_tool_result_reinjected(self):
+        seen = []
+        orig = olith_agents.chat_with_ollama_stream
+
+        def spy(model, messages, *args, **kwargs):
+            seen.append(messages[-1]["content"])
+            return orig(model, messages, *args, **kwargs)
+
+        olith_agents.chat_with_ollama_stream = spy
+        olith_agents.run_agent_loop(
+            agent_id="aerolith", message="lis a.py", memory=None,
+            project_root=str(self.project),
+        )
+        self.assertIn("print('hi')", seen[1])
+        self.assertIn('{"path":"a.py"', seen[1])          # JSON compact
+
+    def test_prompt_stats_per_iteration(self):
+        result = olith_agents.run_agent_loop(
+            agent_id="aerolith", message="lis a.py", memory=None,
+            project_root=str(self.project),
+        )
+        first, second = result["iterations"]
+        self.assertEqual((first["prompt_tokens"], second["prompt_tokens"]), (100, 200))
+        self.assertEqual(first["prompt_eval_ms"], 5.0)
+        self.assertLessEqual(first["num_ctx"], olith_agents.AGENT_NUM_CTX["aerolith"])
+        self.assertGreater(second["ctx_segments"]["tools"], 0)
+
+    def test_output_reserve_and_num_predict(self):
+        sent = []
+        orig = olith_agents.chat_with_ollama_stream
+
+        def spy(model, messages, timeout, num_ctx, *args, num_predict=None, **kwargs):
+            sent.append((num_ctx, num_predict))
+            return orig(model, messages, timeout, num_ctx, *args, num_predict=num_predict, **kwargs)
+
+        olith_agents.chat_with_ollama_stream = spy
+        result = olith_agents.run_agent_loop(
+            agent_id="aerolith", message="lis a.py", memory=None,
+            project_root=str(self.project),
+        )
+        reserve = olith_agents.AGENT_OUTPUT_RESERVE["aerolith"]
+        for (num_ctx, num_predict), stats in zip(sent, result["iterations"]):
+            self.assertGreaterEqual(num_predict, reserve)
+            self.assertEqual(num_ctx - num_predict, stats["prompt_tokens_est"])
+
+    def test_oversized_message_reported(self):
+        result = olith_agents.run_agent_loop(
+            agent_id="aerolith", message="x" * 200_000, memory=None,
+            project_root=str(self.project),
+        )
+        self.assertEqual(result["status"], "error")
+        self.assertIn("trop long", result["message"])
+        self.assertEqual((result["agent_id"], result["response"], result["cancelled"]), ("aerolith", "", False))
+        self.assertEqual(self.calls, 0)
+
+    def test_overflow_after_tools_keeps_work(self):
+        orig_build = ContextAssembler.build
+        builds = []
+
+        def build(asm, *args, **kwargs):
+            builds.append(1)
+            if len(builds) == 2:
+                raise ContextOverflow("Prompt trop long pour le contexte de test")
+            return orig_build(asm, *args, **kwargs)
+
+        with patch.object(ContextAssembler, "build", build):
+            result = olith_agents.run_agent_loop(
+                agent_id="aerolith", message="lis a.py", memory=None,
+                project_root=str(self.project),
+            )
+        self.assertEqual(result["status"], "error")
+        self.assertIn("Je lis le fichier.", result["response"])
+        self.assertEqual((result["agent_name"], result["cancelled"]), ("Aerolith", False))
+        self.assertEqual(len(result["iterations"]), 1)
+        self.assertEqual(olith_agents.conversation_history.get("aerolith"), [])
+
+    def test_num_ctx_fixed_for_the_loop(self):
+        sent = []
+        orig = olith_agents.chat_with_ollama_stream
+
+        def spy(model, messages, timeout, num_ctx, *args, **kwargs):
+            sent.append(num_ctx)
+            return orig(model, messages, timeout, num_ctx, *args, **kwargs)
+
+        olith_agents.chat_with_ollama_stream = spy
+        (self.project / "a.py").write_text(f"x = '{'a' * 120}'\n" * 400, encoding="utf-8")   # ~14k tokens
+        olith_agents.run_agent_loop(
+            agent_id="aerolith", message="lis a.py", memory=None,
+            project_root=str(self.project),
+        )
+        self.assertEqual(len(sent), 2)
+        self.assertEqual(sent[0], sent[1])
+        self.assertEqual(self.acquired, [sent[0]])
+
+
+    def test_unclaimed_early_calls_discarded_on_cancel(self):
+        token = CancelToken()
+
+        def stream(model, messages, timeout, num_ctx, cancel_event, keep_alive, **kwargs):
+            self.calls += 1
+            yield '```json\n{"action": "read_file", "path": "a.py"}\n```\n'
+            token.set()
+            yield "fin"
+
+        olith_agents.chat_with_ollama_stream = stream
+        result = olith_agents.run_agent_loop(
+            agent_id="aerolith", message="lis a.py", memory=None,
+            project_root=str(self.project), cancel_event=token,
+        )
+        self.assertTrue(result["cancelled"])
+        (stats,) = result["iterations"]
+        self.assertEqual((stats["early_tools"], stats["early_discarded"]), (1, 1))
+
+    def test_early_calls_claimed_not_rerun(self):
+        runs = []
+        orig = olith_agents._dispatch_tool
+
+        def counting(tc, **kwargs):
+            runs.append(tc["action"])
+            return orig(tc, **kwargs)
+
+        with patch.object(olith_agents, "_dispatch_tool", counting):
+            result = olith_agents.run_agent_loop(
+                agent_id="aerolith", message="lis a.py", memory=None,
+                project_root=str(self.project),
+            )
+        self.assertEqual(runs, ["read_file"])
+        self.assertEqual(result["iterations"][0]["early_discarded"], 0)
+
+
+class TestStreamingToolCallParser(unittest.TestCase):
+
+    RESPONSE = (
+        "<think>```json\n{\"action\": \"write_file\", \"path\": \"x\"}\n```</think>Je lis.\n"
+        "```python\nprint('pas un appel')\n```\n"
+        "```json\n{\"action\": \"read_file\", \"path\": \"a.py\"}\n```\n"
+        "```json\n{\"pas\": \"un appel\"}\n```\n"
+        "Puis ```json\n{\"action\": \"list_files\"}\n```"
+    )
+
+    def _feed(self, text, step):
+        parser = StreamingToolCallParser()
+        found = []
+        for i in range(0, len(text), step):
+            found.extend(parser.feed(text[i:i + step]))
+        return found
+
+    def test_agrees_with_final_parse_for_any_chunking(self):
+        expected = parse_tool_calls(olith_agents.strip_think_blocks(self.RESPONSE))[1]
+        self.assertEqual([c["action"] for c in expected], ["read_file", "list_files"])
+        for step in (1, 2, 3, 5, 8, 13, 64, len(self.RESPONSE)):
+            self.assertEqual(self._feed(self.RESPONSE, step), expected, step)
+
+    def test_open_think_waits_for_close(self):
+        parser = StreamingToolCallParser()
+        block = '```json\n{"action": "read_file", "path": "a.py"}\n```'
+        self.assertEqual(parser.feed("<think>" + block), [])
+        self.assertEqual(parser.feed("</think>ok"), [])
+        self.assertEqual(len(parser.feed("\n" + block)), 1)
+
+    def test_long_answer_scanned_once(self):
+        # 3000 blocs de code : un reparcours complet par chunk serait quadratique
+        part = "Voici le code :\n```python\n" + "x = 1\n" * 20 + "```\n"
+        text = part * 3000 + '```json\n{"action": "list_files"}\n```'
+        t0 = time.perf_counter()
+        found = self._feed(text, 4)
+        self.assertEqual(found, [{"action": "list_files"}])
+        self.assertLess(time.perf_counter() - t0, 1.0)
+
+
+class TestToolScheduler(unittest.TestCase):
+    """run_tool_calls : lectures paralleles, ecritures ordonnees, resultats en ordre."""
+
+    def setUp(self):
+        self.pool = ThreadPoolExecutor(max_workers=4)
+        self.log: list[tuple[str, str, float]] = []
+        self._lock = threading.Lock()
+
+    def tearDown(self):
+        self.pool.shutdown(wait=True)
+
+    def _run(self, call):
+        start = time.perf_counter()
+        time.sleep(call.get("delay", 0.15))
+        with self._lock:
+            self.log.append((call["action"], call.get("path", ""), start))
+        return {"ok": call["action"]}
+
+    def _schedule(self, calls):
+        return list(run_tool_calls(calls, self._run, self.pool, project_root=None))
+
+    def test_reads_run_concurrently_in_original_order(self):
+        calls = [{"action": "read_file", "path": f"/tmp/f{i}.py"} for i in range(4)]
+        t0 = time.perf_counter()
+        out = self._schedule(calls)
+        self.assertLess(time.perf_counter() - t0, 0.45)
+        self.assertEqual([i for i, _, _ in out], [0, 1, 2, 3])
+        self.assertTrue(all(o["ms"] >= 100 for _, _, o in out))
+
+    def test_write_waits_for_earlier_read_of_same_path(self):
+        calls = [
+            {"action": "read_file", "path": "/tmp/a.py", "delay": 0.2},
+            {"action": "edit_file", "path": "/tmp/a.py", "delay": 0.01},
+        ]
+        self._schedule(calls)
+        starts = {action: start for action, _, start in self.log}
+        self.assertGreaterEqual(starts["edit_file"] - starts["read_file"], 0.19)
+
+    def test_read_after_write_sees_write(self):
+        calls = [
+            {"action": "write_file", "path": "/tmp/b.py", "delay": 0.2},
+            {"action": "read_file", "path": "/tmp/b.py", "delay": 0.01},
+            {"action": "read_file", "path": "/tmp/other.py", "delay": 0.01},
+        ]
+        self._schedule(calls)
+        order = [(action, path) for action, path, _ in self.log]
+        self.assertEqual(order[0], ("read_file", "/tmp/other.py"))   # independante : pas bloquee
+        self.assertLess(order.index(("write_file", "/tmp/b.py")), order.index(("read_file", "/tmp/b.py")))
+
+    def test_writes_serialized_in_order(self):
+        calls = [
+            {"action": "write_file", "path": "/tmp/x.py", "delay": 0.1},
+            {"action": "add_mem0", "delay": 0.01},
+            {"action": "edit_file", "path": "/tmp/y.py", "delay": 0.01},
+        ]
+        self._schedule(calls)
+        self.assertEqual([a for a, _, _ in self.log], ["write_file", "add_mem0", "edit_file"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test token-budgeted context assembler (olith_context.py)
+==================================================================
+Budget per segment, elision of superseded / old file bodies, history
+trimming and num_ctx ladder selection.
+
+Usage:
+    python -m pytest test_context.py -v
+    python test_context.py
+"""
+
+import unittest
+
+import olith_context
+from olith_context import ContextAssembler, pick_num_ctx, render_tool_results
+
+
+def _read(path, body, showing="lines 1-10 of 10"):
+    return {"action": "read_file",
+            "result": {"path": path, "content": body, "total_lines": 10, "showing": showing}}
+
+
+class TestContextAssembler(unittest.TestCase):
+
+    def setUp(self):
+        olith_context._last_num_ctx.clear()
+        olith_context._calibration.clear()
+
+    def test_small_prompt_uses_small_ctx(self):
+        asm = ContextAssembler("m", 32768)
+        _, report = asm.build("system", [], "bonjour", [])
+        self.assertEqual(report["num_ctx"], 4096)       # prompt + reserve de sortie 2048
+
+    def test_reread_file_keeps_latest_body_only(self):
+        asm = ContextAssembler("m", 32768)
+        turns = [
+            {"assistant": "je lis", "tool_results": [_read("a.py", "OLD BODY")]},
+            {"assistant": "je relis", "tool_results": [_read("a.py", "NEW BODY")]},
+        ]
+        messages, report = asm.build("system", [], "go", turns)
+        text = "".join(m["content"] for m in messages)
+        self.assertNotIn("OLD BODY", text)
+        self.assertIn("NEW BODY", text)
+        self.assertEqual(report["elided"], 1)
+
+    def test_budget_pressure_elides_old_bodies_then_history(self):
+        asm = ContextAssembler("m", 4096)
+        big = "x" * 12000                                # > budget prompt a lui seul
+        turns = [
+            {"assistant": "1", "tool_results": [_read("a.py", big)]},
+            {"assistant": "2", "tool_results": [_read("b.py", "petit")]},
+        ]
+        history = [{"role": "user", "content": "h" * 4000}, {"role": "assistant", "content": "r" * 4000}]
+        messages, report = asm.build("system", history, "go", turns)
+        text = "".join(m["content"] for m in messages)
+        self.assertNotIn(big, text)
+        self.assertIn("petit", text)
+        self.assertEqual(report["history_dropped"], 2)
+        self.assertLessEqual(report["prompt_tokens_est"], asm.prompt_budget)
+        self.assertLessEqual(report["num_ctx"], 4096)
+
+    def test_output_reserve_sizes_num_ctx(self):
+        asm = ContextAssembler("m", 32768, output_reserve=8192)
+        _, report = asm.build("system", [], "ecris le module", [])
+        self.assertEqual(report["num_ctx"], 16384)
+        self.assertGreaterEqual(report["num_predict"], 8192)
+        self.assertEqual(report["num_ctx"] - report["num_predict"], report["prompt_tokens_est"])
+
+    def test_newest_turn_truncated_to_budget(self):
+        asm = ContextAssembler("m", 4096)
+        body = "".join(f"ligne {i}\n" for i in range(3000))
+        turns = [{"assistant": "je lis", "tool_results": [_read("a.py", body)]}]
+        messages, report = asm.build("system", [], "go", turns)
+        text = messages[-1]["content"]
+        self.assertIn("ligne 0", text)
+        self.assertIn("tronque", text)
+        self.assertEqual(report["truncated"], 1)
+        self.assertLessEqual(report["prompt_tokens_est"], asm.prompt_budget)
+        self.assertEqual(report["num_ctx"], 4096)
+
+    def test_oversized_message_raises(self):
+        asm = ContextAssembler("m", 4096)
+        with self.assertRaises(olith_context.ContextOverflow):
+            asm.build("system", [], "x" * 20000, [])
+
+    def test_compact_json(self):
+        text = render_tool_results([{"action": "list_files", "result": {"files": ["a", "b"]}}])
+        self.assertIn('{"files":["a","b"]}', text)
+
+    def test_memories_fit_share(self):
+        asm = ContextAssembler("m", 4096)
+        kept = asm.fit_memories(["m" * 300] * 10)
+        self.assertLess(len(kept), 10)
+        self.assertGreater(len(kept), 0)
+
+    def test_num_ctx_reuse_avoids_reload(self):
+        self.assertEqual(pick_num_ctx(3000, 32768), 4096)
+        self.assertEqual(pick_num_ctx(3000, 32768, previous=8192), 8192)     # deja charge
+        self.assertEqual(pick_num_ctx(1000, 32768, previous=32768), 2048)    # demesure
+        self.assertEqual(pick_num_ctx(50000, 32768), 32768)
+
+    def test_plan_matches_first_build(self):
+        asm = ContextAssembler("m", 32768, output_reserve=8192)
+        planned = asm.plan("system", [], "ecris le module", extra_tokens=2000)
+        self.assertEqual(planned, 16384)
+        _, report = asm.build("system", [], "ecris le module", [])
+        self.assertEqual(report["num_ctx"], planned)
+
+    def test_plan_reuses_loaded_num_ctx(self):
+        asm = ContextAssembler("m", 32768)
+        self.assertEqual(asm.plan("system", [], "bonjour", loaded=8192), 8192)
+        self.assertEqual(asm.plan("system", [], "bonjour", loaded=32768), 4096)   # demesure
+
+    def test_planned_num_ctx_fixed_across_builds(self):
+        asm = ContextAssembler("m", 32768)
+        self.assertEqual(asm.plan("system", [], "go"), 4096)
+        body = "".join(f"ligne {i}\n" for i in range(3000))
+        turns = [{"assistant": "je lis", "tool_results": [_read("a.py", body)]}]
+        _, report = asm.build("system", [], "go", turns)
+        self.assertEqual(report["num_ctx"], 4096)             # tronque plutot que recharger
+        self.assertEqual(report["truncated"], 1)
+        self.assertGreaterEqual(report["num_predict"], 2048)
+
+    def test_calibration_scales_estimate(self):
+        base = olith_context.estimate_tokens("x" * 3500, "m")
+        olith_context.calibrate("m", base, base * 2)
+        self.assertGreater(olith_context.estimate_tokens("x" * 3500, "m"), base)
+
+
+if __name__ == "__main__":
+    unittest.main()
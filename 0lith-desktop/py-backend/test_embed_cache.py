@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test embedding cache (olith_embed_cache.py)
+=====================================================
+Cle par contenu normalise, eviction LRU au plafond, persistance et partage
+entre instances (= processus) sur le meme dossier, enveloppe Mem0.
+
+Usage:
+    python -m pytest test_embed_cache.py -v
+    python test_embed_cache.py
+"""
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from olith_embed_cache import CachedEmbedder, EmbeddingCache, cache_key
+
+DIMS = 8
+# Plafond minuscule : 16 slots (minimum)
+TINY_MB = 0.0001
+
+
+def _vec(seed: float) -> list[float]:
+    return [seed + i for i in range(DIMS)]
+
+
+class _Embedder:
+    def __init__(self):
+        self.calls = []
+        self.config = "cfg"
+
+    def embed(self, text, memory_action=None):
+        self.calls.append(text)
+        return _vec(len(text))
+
+    def embed_batch(self, texts, memory_action="add"):
+        self.calls.append(list(texts))
+        return [_vec(len(t)) for t in texts]
+
+
+class TestEmbeddingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _cache(self, model="qwen3-embedding:0.6b", max_mb=1.0) -> EmbeddingCache:
+        cache = EmbeddingCache(model, root=self.dir, max_mb=max_mb)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_miss_then_hit(self):
+        cache = self._cache()
+        self.assertIsNone(cache.get("bonjour"))
+        cache.put("bonjour", _vec(1))
+        self.assertEqual(cache.get("bonjour"), _vec(1))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["stores"]), (1, 1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_key_normalizes_whitespace_and_model(self):
+        self.assertEqual(cache_key("m", "recent  file\nchanges "), cache_key("m", "recent file changes"))
+        self.assertNotEqual(cache_key("m", "x"), cache_key("other", "x"))
+        self.assertNotEqual(cache_key("m", "Query"), cache_key("m", "query"))
+
+    def test_lru_eviction_at_size_cap(self):
+        cache = self._cache(max_mb=TINY_MB)
+        for i in range(16):
+            cache.put(f"t{i}", _vec(i))
+        self.assertEqual(cache.capacity, 16)
+        cache.get("t0")                                  # t0 redevient recent
+        cache.put("t16", _vec(16))
+        self.assertIsNone(cache.get("t1"))               # plus ancienne evincee
+        self.assertEqual(cache.get("t0"), _vec(0))
+        self.assertEqual(cache.get("t16"), _vec(16))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_persisted_across_instances(self):
+        cache = self._cache(max_mb=TINY_MB)
+        for i in range(16):
+            cache.put(f"t{i}", _vec(i))
+        cache.get("t0")
+        cache.close()
+        reopened = self._cache(max_mb=TINY_MB)
+        self.assertEqual(reopened.get("t5"), _vec(5))
+        reopened.put("t16", _vec(16))
+        # Ordre LRU relu de l'index : t1 reste la plus ancienne
+        self.assertIsNone(reopened.get("t1"))
+        self.assertEqual(reopened.get("t0"), _vec(0))
+
+    def test_shared_between_processes(self):
+        writer = self._cache()
+        reader = self._cache()
+        self.assertIsNone(reader.get("watcher query"))
+        writer.put("watcher query", _vec(3))
+        self.assertEqual(reader.get("watcher query"), _vec(3))
+        reader.put("from reader", _vec(4))
+        self.assertEqual(writer.get("from reader"), _vec(4))
+        self.assertEqual(writer.stats()["entries"], 2)
+
+    def test_embed_many_single_batch_for_misses(self):
+        cache = self._cache()
+        cache.put("a", _vec(1))
+        batches = []
+
+        def batch_fn(texts):
+            batches.append(texts)
+            return [_vec(len(t)) for t in texts]
+
+        vectors = cache.embed_many(["a", "bb", "ccc", "bb"], batch_fn)
+        self.assertEqual(batches, [["bb", "ccc"]])
+        self.assertEqual(vectors, [_vec(1), _vec(2), _vec(3), _vec(2)])
+
+    def test_dims_mismatch_not_stored(self):
+        cache = self._cache()
+        cache.put("a", _vec(1))
+        cache.put("b", [1.0, 2.0])
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["entries"], 1)
+
+
+class TestCachedEmbedder(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.cache = EmbeddingCache("m", root=self.dir)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_repeated_search_embedded_once(self):
+        inner = _Embedder()
+        embedder = CachedEmbedder(inner, self.cache)
+        for _ in range(3):
+            embedder.embed("recent file changes and project activity", "search")
+        self.assertEqual(len(inner.calls), 1)
+        self.assertEqual(embedder.config, "cfg")         # attributs delegues
+
+    def test_embed_batch_only_misses(self):
+        inner = _Embedder()
+        embedder = CachedEmbedder(inner, self.cache)
+        embedder.embed("deja vu", memory_action="add")
+        vectors = embedder.embed_batch(["deja vu", "nouveau"], "add")
+        self.assertEqual(inner.calls, ["deja vu", ["nouveau"]])
+        self.assertEqual(vectors, [_vec(7), _vec(7)])
+
+
+if __name__ == "__main__":
+    unittest.main()
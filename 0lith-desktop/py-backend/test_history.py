@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test chat history journal (olith_history.py)
+======================================================
+Ajouts JSONL, fsync groupé, réparation d'une ligne tronquée, compaction
+atomique, lecture et migration des anciennes sessions .json, chargement
+par fenêtres via l'index d'offsets.
+
+Usage:
+    python -m pytest test_history.py -v
+    python test_history.py
+"""
+
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import olith_history
+from olith_history import ChatHistory, build_offsets
+
+
+class TestChatHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.history = ChatHistory(self.dir)
+
+    def tearDown(self):
+        self.history.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _legacy(self, sid, messages, updated_at=123):
+        (self.dir / f"{sid}.json").write_text(json.dumps(
+            {"session_id": sid, "messages": messages, "updated_at": updated_at}, indent=2,
+        ), encoding="utf-8")
+
+    def test_append_and_load(self):
+        sid = self.history.save_message("s1", {"type": "user", "content": "bonjour"})
+        self.history.save_messages(sid, [
+            {"type": "user", "content": "ça va ?"},
+            {"type": "agent", "content": "oui", "agent_id": "monolith"},
+        ])
+        messages = self.history.load_session("s1")
+        self.assertEqual([m["content"] for m in messages], ["bonjour", "ça va ?", "oui"])
+        self.assertTrue(all("timestamp" in m for m in messages))
+        # Un message par ligne, fichier jamais réécrit
+        self.assertEqual(len((self.dir / "s1.jsonl").read_bytes().splitlines()), 3)
+
+    def test_fsync_batched(self):
+        with patch.object(olith_history, "FSYNC_BATCH", 4), patch.object(olith_history, "FSYNC_INTERVAL_S", 60):
+            for i in range(10):
+                self.history.save_message("s1", {"type": "user", "content": str(i)})
+            self.assertEqual(self.history.stats["fsyncs"], 2)
+            self.history.flush()
+            self.assertEqual(self.history.stats["fsyncs"], 3)
+
+    def test_partial_last_line_repaired(self):
+        self.history.save_message("s1", {"type": "user", "content": "ok"})
+        self.history.close()
+        with open(self.dir / "s1.jsonl", "ab") as f:
+            f.write(b'{"type": "agent", "cont')            # crash pendant l'écriture
+        self.assertEqual(len(self.history.load_session("s1")), 1)
+        self.history.save_message("s1", {"type": "user", "content": "suite"})
+        self.assertEqual([m["content"] for m in self.history.load_session("s1")], ["ok", "suite"])
+
+    def test_compact_is_atomic_rewrite(self):
+        for i in range(3):
+            self.history.save_message("s1", {"type": "user", "content": str(i)})
+        with open(self.dir / "s1.jsonl", "ab") as f:
+            f.write(b"garbage\n")
+        self.assertEqual(self.history.compact("s1"), 3)
+        self.assertEqual(len((self.dir / "s1.jsonl").read_bytes().splitlines()), 3)
+        self.assertFalse((self.dir / "s1.jsonl.tmp").exists())
+        self.history.save_message("s1", {"type": "user", "content": "3"})
+        self.assertEqual(len(self.history.load_session("s1")), 4)
+
+    def test_legacy_session_read_then_converted_on_append(self):
+        self._legacy("old", [{"type": "user", "content": "ancien", "timestamp": 1}])
+        self.assertEqual(self.history.load_session("old")[0]["content"], "ancien")
+        self.history.save_message("old", {"type": "agent", "content": "nouveau"})
+        self.assertFalse((self.dir / "old.json").exists())
+        self.assertEqual([m["content"] for m in self.history.load_session("old")], ["ancien", "nouveau"])
+
+    def test_migrate_legacy_sessions(self):
+        self._legacy("a", [{"type": "user", "content": "x", "timestamp": 5}])
+        self._legacy("b", [])
+        (self.dir / "broken.json").write_text("{", encoding="utf-8")
+        self.assertEqual(self.history.migrate_legacy_sessions(), 2)
+        self.assertEqual(self.history.migrate_legacy_sessions(), 0)
+        self.assertTrue((self.dir / "a.jsonl").exists())
+        self.assertTrue((self.dir / "broken.json").exists())     # laissé tel quel
+
+    def test_list_sessions_mixed_formats(self):
+        self._legacy("2026-01-01_10-00", [{"type": "user", "content": "vieux", "timestamp": 7}])
+        self.history.save_message("2026-02-01_10-00", {"type": "user", "content": "récent", "timestamp": 9})
+        sessions = self.history.list_sessions()
+        self.assertEqual([s["session_id"] for s in sessions], ["2026-02-01_10-00", "2026-01-01_10-00"])
+        self.assertEqual((sessions[0]["preview"], sessions[0]["updated_at"]), ("récent", 9))
+        self.assertEqual(sessions[1]["message_count"], 1)
+
+
+class TestPaging(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.history = ChatHistory(self.dir)
+        for i in range(0, 120, 2):
+            self.history.save_messages("s1", [
+                {"type": "user", "content": f"q{i}"},
+                {"type": "agent", "content": f"r{i + 1}\n```\ncode\n```", "agent_id": "monolith"},
+            ])
+
+    def tearDown(self):
+        self.history.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _contents(self, page):
+        return [m["content"].split("\n")[0] for m in page["messages"]]
+
+    def test_newest_first_windows(self):
+        page = self.history.load_page("s1", limit=50)
+        self.assertEqual((page["total"], page["cursor"]), (120, 70))
+        self.assertEqual(self._contents(page)[0], "q70")
+        self.assertEqual(self._contents(page)[-1], "r119")
+        older = self.history.load_page("s1", before=page["cursor"], limit=50)
+        self.assertEqual(self._contents(older)[-1], "r69")
+        last = self.history.load_page("s1", before=older["cursor"], limit=50)
+        self.assertEqual((len(last["messages"]), last["cursor"]), (20, None))
+
+    def test_iter_pages_covers_session(self):
+        pages = list(self.history.iter_pages("s1", limit=32))
+        self.assertEqual([len(p["messages"]) for p in pages], [32, 32, 32, 24])
+        merged = [m for p in reversed(pages) for m in p["messages"]]
+        self.assertEqual(merged, self.history.load_session("s1"))
+
+    def test_index_matches_file_and_rebuilt_when_stale(self):
+        path = self.dir / "s1.jsonl"
+        self.assertEqual((self.dir / "s1.idx").read_bytes(), build_offsets(path).tobytes())
+        self.history.close()
+        (self.dir / "s1.idx").write_bytes(b"")                  # index perdu
+        with open(path, "ab") as f:
+            f.write(b'{"type": "user", "content": "ajout externe"}\n')
+        page = self.history.load_page("s1", limit=1)
+        self.assertEqual((page["total"], self._contents(page)), (121, ["ajout externe"]))
+        self.history.compact("s1")
+        self.assertEqual(self.history.load_page("s1", limit=1)["total"], 121)
+
+    def test_legacy_session_paged(self):
+        (self.dir / "old.json").write_text(json.dumps({"messages": [
+            {"type": "user", "content": str(i)} for i in range(5)]}), encoding="utf-8")
+        page = self.history.load_page("old", limit=2)
+        self.assertEqual((self._contents(page), page["cursor"], page["total"]), (["3", "4"], 3, 5))
+
+
+if __name__ == "__main__":
+    unittest.main()
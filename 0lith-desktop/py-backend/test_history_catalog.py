@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test chat session catalog (olith_history_catalog.py)
+==============================================================
+Catalogue tenu a jour par ChatHistory, pagination de list_sessions,
+recherche plein texte (accents, prefixe, filtres agent / dates), reprise
+apres modification des journaux hors catalogue.
+
+Usage:
+    python -m pytest test_history_catalog.py -v
+    python test_history_catalog.py
+"""
+
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from olith_history import ChatHistory
+from olith_history_catalog import SessionCatalog, fts_query
+
+
+class TestFtsQuery(unittest.TestCase):
+
+    def test_words_quoted_last_prefixed(self):
+        self.assertEqual(fts_query('watcher "OR" crash'), '"watcher" "OR" "crash"*')
+        self.assertEqual(fts_query("  ?! "), "")
+
+
+class TestCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.history = ChatHistory(self.dir)
+
+    def tearDown(self):
+        self.history.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _exchange(self, sid, question, answer, agent="aerolith", ts=1000):
+        self.history.save_messages(sid, [
+            {"type": "user", "content": question, "timestamp": ts},
+            {"type": "agent", "content": answer, "agent_id": agent, "timestamp": ts + 1},
+        ])
+
+    def test_paginated_newest_first(self):
+        for day in range(1, 6):
+            self._exchange(f"2026-03-0{day}_10-00", f"question {day}", "ok")
+        page = self.history.list_sessions_page(offset=1, limit=2)
+        self.assertEqual(page["total"], 5)
+        self.assertEqual([s["session_id"] for s in page["sessions"]], ["2026-03-04_10-00", "2026-03-03_10-00"])
+        self.assertEqual(page["sessions"][0]["message_count"], 2)
+        self.assertEqual(page["sessions"][0]["preview"], "question 4")
+
+    def test_search_ranked_with_filters(self):
+        self._exchange("s1", "Le watcher plante au demarrage", "Relance le watcher apres la migration", ts=1000)
+        self._exchange("s2", "Comment écrire un test ?", "Utilise unittest", agent="monolith", ts=5000)
+        hits = self.history.search_history("watcher")
+        self.assertEqual({h["session_id"] for h in hits}, {"s1"})
+        self.assertIn("[watcher]", hits[0]["snippet"])
+        # Accents ignores, prefixe sur le dernier mot
+        self.assertEqual(self.history.search_history("ecrire")[0]["session_id"], "s2")
+        self.assertEqual(self.history.search_history("unit")[0]["agent_id"], "monolith")
+        self.assertEqual(self.history.search_history("watcher", agent_id="monolith"), [])
+        self.assertEqual(len(self.history.search_history("watcher", agent_id="aerolith")), 1)
+        self.assertEqual(self.history.search_history("watcher", since=2000), [])
+        self.assertEqual(len(self.history.search_history("test", since=2000, until=6000)), 1)
+
+    def test_catalog_persists_and_resyncs(self):
+        self._exchange("s1", "premiere question", "reponse")
+        self.history.close()
+        # Session ajoutee hors catalogue (copie manuelle) + session supprimee
+        (self.dir / "s2.jsonl").write_text(
+            json.dumps({"type": "user", "content": "copiee a la main", "timestamp": 1}) + "\n", encoding="utf-8")
+        history = ChatHistory(self.dir)
+        try:
+            self.assertEqual(history.list_sessions_page()["total"], 2)
+            self.assertEqual(history.search_history("copiee")[0]["session_id"], "s2")
+            history.close()
+            (self.dir / "s1.jsonl").unlink()
+            history = ChatHistory(self.dir)
+            self.assertEqual([s["session_id"] for s in history.list_sessions()], ["s2"])
+            self.assertEqual(history.search_history("premiere"), [])
+        finally:
+            history.close()
+
+    def test_migrated_and_compacted_sessions_reindexed(self):
+        (self.dir / "old.json").write_text(json.dumps(
+            {"session_id": "old", "messages": [{"type": "user", "content": "ancienne session", "timestamp": 1}]},
+        ), encoding="utf-8")
+        self.assertEqual(self.history.list_sessions()[0]["message_count"], 1)
+        self.history.save_message("old", {"type": "agent", "content": "nouvelle reponse", "timestamp": 2})
+        self.assertEqual(self.history.list_sessions()[0]["message_count"], 2)
+        self.assertEqual(len(self.history.search_history("ancienne")), 1)
+        with open(self.dir / "old.jsonl", "ab") as f:
+            f.write(b"garbage\n")
+        self.history.compact("old")
+        self.history.save_message("old", {"type": "user", "content": "encore", "timestamp": 3})
+        self.assertEqual(self.history.list_sessions()[0]["message_count"], 3)
+        self.assertEqual([h["seq"] for h in self.history.search_history("encore")], [2])
+
+    def test_direct_catalog_reindex_replaces_rows(self):
+        catalog = SessionCatalog(self.dir / "direct.sqlite3")
+        try:
+            catalog.add_messages("s", [{"type": "user", "content": "alpha", "timestamp": 1}], 10)
+            catalog.reindex("s", [{"type": "user", "content": "beta", "timestamp": 2}], 20)
+            self.assertEqual(catalog.search("alpha"), [])
+            self.assertEqual(catalog.log_size("s"), 20)
+            self.assertEqual(catalog.list_sessions(), ([{
+                "session_id": "s", "message_count": 1, "preview": "beta", "updated_at": 2,
+            }], 1))
+        finally:
+            catalog.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
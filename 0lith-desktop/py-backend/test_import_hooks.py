@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test import hooks (olith_shared.py)
+=============================================
+_Mem0PatchHook patches a stub mem0.llms.ollama as soon as it is imported;
+ImportProfiler keeps per-thread frames when two threads import at once
+(main thread + warm-up thread with --startup-profile).
+
+Usage:
+    python -m pytest test_import_hooks.py -v
+    python test_import_hooks.py
+"""
+
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from olith_shared import ImportProfiler, _Mem0PatchHook
+
+_STUB_OLLAMA = '''
+class OllamaLLM:
+    def generate_response(self, messages, **kwargs):
+        return [m["content"] for m in messages]
+'''
+
+
+class _StubTree(unittest.TestCase):
+    """Modules stub dans un dossier temporaire en tete de sys.path."""
+
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self._patches = [
+            patch.object(sys, "path", [str(self.root)] + sys.path),
+            patch.dict(sys.modules),
+        ]
+        for p in self._patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self._patches):
+            p.stop()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _write(self, rel: str, source: str = "") -> None:
+        path = self.root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(source, encoding="utf-8")
+
+
+class TestMem0PatchHook(_StubTree):
+
+    def setUp(self):
+        super().setUp()
+        self._write("mem0/__init__.py")
+        self._write("mem0/llms/__init__.py")
+        self._write("mem0/llms/ollama.py", _STUB_OLLAMA)
+        for name in [m for m in sys.modules if m == "mem0" or m.startswith("mem0.")]:
+            del sys.modules[name]
+        # Seul ce hook : celui installe a l'import d'olith_shared est ecarte
+        others = [f for f in sys.meta_path if not isinstance(f, _Mem0PatchHook)]
+        self._meta = patch.object(sys, "meta_path", [_Mem0PatchHook()] + others)
+        self._meta.start()
+
+    def tearDown(self):
+        self._meta.stop()
+        super().tearDown()
+
+    def _assert_patched(self, llm_cls):
+        self.assertTrue(getattr(llm_cls.generate_response, "_olith_no_think", False))
+        out = llm_cls().generate_response([
+            {"role": "system", "content": "sys"},
+            {"role": "user", "content": "hello"},
+        ])
+        self.assertEqual(out, ["sys", "hello /no_think"])
+
+    def test_patch_applied_through_memory_main(self):
+        self._write("mem0/memory/__init__.py")
+        self._write("mem0/memory/main.py", "from mem0.llms.ollama import OllamaLLM\n")
+        import mem0.memory.main
+        self._assert_patched(mem0.memory.main.OllamaLLM)
+
+    def test_reimport_patched(self):
+        from mem0.llms.ollama import OllamaLLM
+        self._assert_patched(OllamaLLM)
+        del sys.modules["mem0.llms.ollama"]
+        from mem0.llms.ollama import OllamaLLM as reloaded
+        self._assert_patched(reloaded)
+
+    def test_other_modules_untouched(self):
+        self._write("mem0/memory/__init__.py")
+        self._write("mem0/memory/main.py", "class Memory:\n    pass\n")
+        import mem0.memory.main
+        self.assertNotIn("mem0.llms.ollama", sys.modules)
+        self.assertNotIn("exec_module", vars(mem0.memory.main.__spec__.loader))
+
+
+class TestImportProfiler(_StubTree):
+
+    def test_nested_imports(self):
+        self._write("prof_outer.py", "import time\nimport prof_inner\ntime.sleep(0.05)\n")
+        self._write("prof_inner.py", "import time\ntime.sleep(0.05)\n")
+        profiler = ImportProfiler().install()
+        try:
+            import prof_outer  # noqa: F401
+        finally:
+            profiler.uninstall()
+        outer_cum, outer_self = profiler.records["prof_outer"]
+        inner_cum, _ = profiler.records["prof_inner"]
+        self.assertGreaterEqual(outer_cum, 0.1)
+        self.assertGreaterEqual(inner_cum, 0.05)
+        self.assertAlmostEqual(outer_self, outer_cum - inner_cum, places=6)
+
+    def test_concurrent_threads_keep_their_frames(self):
+        # A s'ouvre en premier et se ferme pendant que B est encore en cours :
+        # une pile partagee ferait depiler a A le cadre de B.
+        self._write("prof_thread_a.py", "import time\ntime.sleep(0.15)\n")
+        self._write("prof_thread_b.py", "import time\ntime.sleep(0.3)\n")
+        profiler = ImportProfiler().install()
+        errors = []
+
+        def _import(name):
+            try:
+                __import__(name)
+            except Exception as e:
+                errors.append(e)
+
+        try:
+            a = threading.Thread(target=_import, args=("prof_thread_a",))
+            b = threading.Thread(target=_import, args=("prof_thread_b",))
+            a.start()
+            time.sleep(0.05)
+            b.start()
+            a.join()
+            b.join()
+        finally:
+            profiler.uninstall()
+        self.assertEqual(errors, [])
+        a_cum, a_self = profiler.records["prof_thread_a"]
+        b_cum, b_self = profiler.records["prof_thread_b"]
+        self.assertGreaterEqual(a_cum, 0.15)
+        self.assertLess(a_cum, 0.3)
+        self.assertGreaterEqual(b_cum, 0.3)
+        self.assertEqual((a_self, b_self), (a_cum, b_cum))
+
+
+if __name__ == "__main__":
+    unittest.main()
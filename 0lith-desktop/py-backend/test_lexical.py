@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test lexical memory index (olith_lexical.py)
+======================================================
+Tokenisation des identifiants, classement BM25 par namespace, mise a jour
+incrementale via le vector store Mem0, synchronisation avec Qdrant
+embarque, persistance et fusion RRF avec la recherche vectorielle.
+
+Usage:
+    python -m pytest test_lexical.py -v
+    python test_lexical.py
+"""
+
+import shutil
+import tempfile
+import unittest
+import uuid
+from concurrent.futures import Future
+from pathlib import Path
+from types import SimpleNamespace
+
+from qdrant_client import QdrantClient, models
+
+from olith_agents import _search_namespace
+from olith_lexical import (
+    IndexedVectorStore, LexicalIndex, fuse_results, hybrid_hits, rrf_fuse, tokenize,
+)
+
+COLLECTION = "olith_memories"
+
+
+class TestTokenize(unittest.TestCase):
+
+    def test_identifiers_kept_whole_and_split(self):
+        tokens = tokenize("Patch CVE-2024-3094 dans olith_core.py")
+        for token in ("cve-2024-3094", "cve", "2024", "3094", "olith_core.py", "olith", "core", "py", "patch"):
+            self.assertIn(token, tokens)
+        self.assertNotIn("dans", tokens)
+
+    def test_accents_and_case_folded(self):
+        self.assertEqual(tokenize("Sécurité RÉSEAU"), ["securite", "reseau"])
+
+    def test_ports_and_urls(self):
+        tokens = tokenize("Ollama ecoute sur localhost:11434")
+        self.assertIn("localhost:11434", tokens)
+        self.assertIn("11434", tokens)
+
+
+class TestLexicalIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = LexicalIndex()
+        self.index.add("1", "pyrolith", "Scan nmap du port 8443 sur le serveur web")
+        self.index.add("2", "pyrolith", "Exploit de CVE-2024-3094 (xz backdoor)")
+        self.index.add("3", "pyrolith", "Rapport de pentest du serveur web")
+        self.index.add("4", "aerolith", "CVE-2024-3094 corrige dans le build")
+
+    def test_exact_identifier_ranked_first(self):
+        hits = self.index.search("que sait-on de CVE-2024-3094 ?", "pyrolith")
+        self.assertEqual(hits[0]["id"], "2")
+        self.assertEqual(hits[0]["memory"], "Exploit de CVE-2024-3094 (xz backdoor)")
+
+    def test_namespace_isolation(self):
+        self.assertEqual([h["id"] for h in self.index.search("CVE-2024-3094", "aerolith")], ["4"])
+        self.assertEqual(self.index.search("CVE-2024-3094", "monolith"), [])
+
+    def test_update_and_remove(self):
+        self.index.add("1", "pyrolith", "Scan du port 9000")
+        self.assertEqual(self.index.search("8443", "pyrolith"), [])
+        self.assertEqual([h["id"] for h in self.index.search("9000", "pyrolith")], ["1"])
+        self.index.remove("2")
+        self.assertEqual(self.index.search("xz", "pyrolith"), [])
+        self.assertEqual(len(self.index), 3)
+
+    def test_persisted(self):
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root, True)
+        index = LexicalIndex(root / "idx.json")
+        index.add("a", "monolith", "Le fichier olith_tasks.py gere les taches")
+        index.save()
+        reopened = LexicalIndex(root / "idx.json")
+        self.assertEqual([h["id"] for h in reopened.search("olith_tasks.py", "monolith")], ["a"])
+
+
+class TestFusion(unittest.TestCase):
+
+    def test_rrf_rewards_agreement(self):
+        self.assertEqual(rrf_fuse([["a", "b", "c"], ["b", "d"]])[0], "b")
+
+    def test_fuse_results_dedups_and_limits(self):
+        vector = [{"id": "1", "memory": "x"}, {"id": "2", "memory": "y"}]
+        lexical = [{"id": "3", "memory": "z", "score": 4.0}, {"id": "2", "memory": "y", "score": 1.0}]
+        fused = fuse_results(vector, lexical, 2)
+        self.assertEqual([h["id"] for h in fused], ["2", "1"])
+        self.assertNotIn("score", fused[0])             # version vectorielle conservee
+
+
+class _Store:
+    collection_name = COLLECTION
+
+    def __init__(self, client):
+        self.client = client
+
+    def insert(self, vectors, payloads=None, ids=None):
+        self.client.upsert(COLLECTION, [
+            models.PointStruct(id=i, vector=v, payload=p) for v, p, i in zip(vectors, payloads, ids)
+        ])
+
+    def update(self, vector_id, vector=None, payload=None):
+        self.client.set_payload(COLLECTION, payload=payload, points=[vector_id])
+
+    def delete(self, vector_id):
+        self.client.delete(COLLECTION, points_selector=models.PointIdsList(points=[vector_id]))
+
+    def search(self, query, vectors, limit, filters):
+        flt = models.Filter(must=[
+            models.FieldCondition(key="user_id", match=models.MatchValue(value=filters["user_id"]))
+        ])
+        return self.client.query_points(COLLECTION, query=vectors, query_filter=flt, limit=limit).points
+
+
+class TestQdrantIntegration(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.client = QdrantClient(path=self.dir)
+        self.client.create_collection(
+            COLLECTION, vectors_config=models.VectorParams(size=4, distance=models.Distance.COSINE),
+        )
+        self.index = LexicalIndex()
+        self.store = IndexedVectorStore(_Store(self.client), self.index)
+
+    def tearDown(self):
+        self.client.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _insert(self, text, vector, user_id="monolith") -> str:
+        pid = str(uuid.uuid4())
+        self.store.insert(vectors=[vector], payloads=[{"data": text, "user_id": user_id}], ids=[pid])
+        return pid
+
+    def test_writes_update_index(self):
+        pid = self._insert("Le watcher surveille olith_watcher.py", [1, 0, 0, 0])
+        self.assertEqual(self.index.search("olith_watcher.py", "monolith")[0]["id"], pid)
+        self.store.update(vector_id=pid, payload={"data": "Surveillance arretee", "user_id": "monolith"})
+        self.assertEqual(self.index.search("olith_watcher.py", "monolith"), [])
+        self.store.delete(vector_id=pid)
+        self.assertEqual(len(self.index), 0)
+        self.assertEqual(self.store.collection_name, COLLECTION)   # delegation
+
+    def test_sync_reconciles_with_qdrant(self):
+        kept = self._insert("port 11434 pour Ollama", [1, 0, 0, 0])
+        gone = self._insert("port 8080 pour le proxy", [0, 1, 0, 0])
+        # Ecrit hors de l'enveloppe (compacteur, autre processus)
+        outside = str(uuid.uuid4())
+        self.client.upsert(COLLECTION, [models.PointStruct(
+            id=outside, vector=[0, 0, 1, 0], payload={"data": "Qdrant sur 6333", "user_id": "monolith"},
+        )])
+        self.client.delete(COLLECTION, points_selector=models.PointIdsList(points=[gone]))
+        report = self.index.sync(self.client, COLLECTION)
+        self.assertEqual((report["added"], report["removed"], report["docs"]), (1, 1, 2))
+        self.assertEqual(self.index.search("6333", "monolith")[0]["id"], outside)
+        self.assertEqual(self.index.search("11434", "monolith")[0]["id"], kept)
+
+    def test_sync_keeps_inserts_made_during_scroll(self):
+        self._insert("port 11434 pour Ollama", [1, 0, 0, 0])
+        client, inserted = self.client, []
+
+        class _ScrollRace:
+            """Une insertion (file d'ecriture) arrive apres la page parcourue."""
+            def scroll(inner, **kw):
+                page = client.scroll(**kw)
+                if not inserted:
+                    inserted.append(self._insert("Qdrant sur 6333", [0, 0, 1, 0]))
+                return page
+
+            def __getattr__(inner, name):
+                return getattr(client, name)
+
+        report = self.index.sync(_ScrollRace(), COLLECTION)
+        self.assertEqual(report["removed"], 0)
+        self.assertEqual(self.index.search("6333", "monolith")[0]["id"], inserted[0])
+
+    def test_search_namespace_fuses_exact_match(self):
+        # Le vecteur de la requete est proche du bruit, pas du fait cherche
+        self._insert("Discussion generale sur la securite", [1, 0, 0, 0])
+        self._insert("Notes diverses du projet", [0.9, 0.1, 0, 0])
+        self._insert("Le bug vient de parse_config dans olith_tasks.py", [0, 0, 0, 1])
+        memory = SimpleNamespace(vector_store=self.store)
+        embedding = Future()
+        embedding.set_result([1, 0, 0, 0])
+        texts = _search_namespace(memory, "ou est parse_config ?", "monolith", 2, embedding)
+        self.assertIn("Le bug vient de parse_config dans olith_tasks.py", texts)
+        self.assertEqual(len(texts), 2)
+
+    def test_hybrid_hits_without_local_index(self):
+        memory = SimpleNamespace(vector_store=object())
+        hits = [{"id": str(i), "memory": str(i)} for i in range(5)]
+        self.assertEqual(hybrid_hits(memory, "q", "monolith", hits, 3), hits[:3])
+
+
+if __name__ == "__main__":
+    unittest.main()
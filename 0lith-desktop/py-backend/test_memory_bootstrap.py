@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test bulk memory bootstrap (olith_memory_init.bulk_load_memories)
+===========================================================================
+Faux vector store Qdrant : un seul appel d'embedding pour tout le lot,
+upsert direct sans LLM, relance sans effet (empreintes), relations
+envoyees au graphe une seule fois.
+
+Usage:
+    python -m pytest test_memory_bootstrap.py -v
+    python test_memory_bootstrap.py
+"""
+
+import unittest
+from types import SimpleNamespace
+
+from olith_memory_init import (
+    AGENT_RELATIONS, AGENTS, bulk_load_memories, canonical_memories, memory_fingerprint,
+)
+
+
+class _Client:
+    def __init__(self, points):
+        self.points = points
+
+    def retrieve(self, collection_name, ids, with_payload, with_vectors):
+        return [SimpleNamespace(id=i) for i in ids if i in self.points]
+
+
+class _VectorStore:
+    collection_name = "olith_memories"
+
+    def __init__(self):
+        self.points: dict[str, tuple[list, dict]] = {}
+        self.client = _Client(self.points)
+        self.inserts = 0
+
+    def insert(self, vectors, payloads, ids):
+        self.inserts += 1
+        for v, p, i in zip(vectors, payloads, ids):
+            self.points[i] = (v, p)
+
+
+class _Graph:
+    def __init__(self):
+        self.added = []
+
+    def add(self, data, filters):
+        self.added.append((data, filters["user_id"]))
+
+
+class _Memory:
+    def __init__(self, graph=None):
+        self.vector_store = _VectorStore()
+        self.graph = graph
+
+    def add(self, *args, **kwargs):
+        raise AssertionError("bootstrap must not go through LLM extraction")
+
+
+class TestMemoryBootstrap(unittest.TestCase):
+
+    def setUp(self):
+        self.embed_calls = []
+
+    def _embed(self, texts):
+        self.embed_calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+    def test_single_embed_call_and_direct_upsert(self):
+        memory = _Memory()
+        items = canonical_memories("2026-01-01T00:00:00")
+        report = bulk_load_memories(memory, items, embed_fn=self._embed)
+        self.assertEqual(len(self.embed_calls), 1)
+        self.assertEqual(memory.vector_store.inserts, 1)
+        self.assertEqual(report["added"], report["total"])
+        self.assertEqual(report["skipped"], 0)
+        # Le protocole de sparring est le meme texte pour 3 agents : 3 points distincts
+        self.assertEqual(report["total"], len(items))
+        self.assertGreaterEqual(report["total"], len(AGENTS) * 3 + len(AGENT_RELATIONS))
+        for key in ("lookup_ms", "embed_ms", "upsert_ms", "total_ms"):
+            self.assertIn(key, report)
+
+    def test_rerun_is_noop(self):
+        memory = _Memory()
+        bulk_load_memories(memory, canonical_memories("2026-01-01T00:00:00"), embed_fn=self._embed)
+        count = len(memory.vector_store.points)
+        report = bulk_load_memories(memory, canonical_memories("2026-06-01T00:00:00"), embed_fn=self._embed)
+        self.assertEqual(report["added"], 0)
+        self.assertEqual(report["skipped"], report["total"])
+        self.assertEqual(len(self.embed_calls), 1)
+        self.assertEqual(len(memory.vector_store.points), count)
+
+    def test_only_missing_memories_added(self):
+        memory = _Memory()
+        items = canonical_memories("t")
+        bulk_load_memories(memory, items[:5], embed_fn=self._embed)
+        report = bulk_load_memories(memory, items, embed_fn=self._embed)
+        self.assertEqual(report["skipped"], 5)
+        self.assertEqual(len(self.embed_calls[1]), len(items) - 5)
+
+    def test_payload_compatible_with_mem0(self):
+        memory = _Memory()
+        item = canonical_memories("t")[0]
+        bulk_load_memories(memory, [item], embed_fn=self._embed)
+        (_, payload), = memory.vector_store.points.values()
+        self.assertEqual(payload["data"], item["text"])
+        self.assertEqual(payload["user_id"], "hodolith")
+        self.assertEqual(payload["type"], "identity")
+        self.assertEqual(payload["fingerprint"], memory_fingerprint(item))
+        self.assertIn("hash", payload)
+
+    def test_fingerprint_ignores_timestamp_and_whitespace(self):
+        a = {"text": "Mon  nom est X.", "user_id": "x", "metadata": {"type": "identity", "created": "1"}}
+        b = {"text": "Mon nom est X. ", "user_id": "x", "metadata": {"type": "identity", "created": "2"}}
+        c = {"text": "Mon nom est X.", "user_id": "y", "metadata": {"type": "identity"}}
+        self.assertEqual(memory_fingerprint(a), memory_fingerprint(b))
+        self.assertNotEqual(memory_fingerprint(a), memory_fingerprint(c))
+
+    def test_new_relations_sent_to_graph_once(self):
+        graph = _Graph()
+        memory = _Memory(graph)
+        bulk_load_memories(memory, canonical_memories("t"), embed_fn=self._embed)
+        bulk_load_memories(memory, canonical_memories("t"), embed_fn=self._embed)
+        self.assertEqual(len(graph.added), len(AGENT_RELATIONS))
+
+
+if __name__ == "__main__":
+    unittest.main()
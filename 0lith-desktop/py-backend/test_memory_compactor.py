@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test memory compactor (olith_memory_compactor.py)
+===========================================================
+Qdrant embarque (dossier temporaire) : expiration par TTL selon le type,
+fusion des quasi-doublons par namespace, memoires canoniques intactes,
+vacuum et rapport.
+
+Usage:
+    python -m pytest test_memory_compactor.py -v
+    python test_memory_compactor.py
+"""
+
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+
+from qdrant_client import QdrantClient, models
+
+from olith_memory_compactor import MemoryCompactor, compact_memories
+
+DAY = 86400
+NOW = 1_800_000_000.0
+COLLECTION = "olith_memories"
+
+
+class _VectorStore:
+    """Sous-ensemble du vector store Qdrant de Mem0."""
+
+    def __init__(self, client):
+        self.client = client
+        self.collection_name = COLLECTION
+
+    def search(self, query, vectors, limit, filters):
+        flt = models.Filter(must=[
+            models.FieldCondition(key="user_id", match=models.MatchValue(value=filters["user_id"]))
+        ])
+        return self.client.query_points(COLLECTION, query=vectors, query_filter=flt, limit=limit).points
+
+
+class _Memory:
+    def __init__(self, client):
+        self.vector_store = _VectorStore(client)
+
+
+def _unit(i: int, dims: int = 8, jitter: float = 0.0) -> list[float]:
+    vec = [0.0] * dims
+    vec[i % dims] = 1.0
+    vec[(i + 1) % dims] = jitter
+    return vec
+
+
+class TestMemoryCompactor(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.client = QdrantClient(path=self.dir)
+        self.client.create_collection(
+            COLLECTION, vectors_config=models.VectorParams(size=8, distance=models.Distance.COSINE),
+        )
+        self.memory = _Memory(self.client)
+
+    def tearDown(self):
+        self.client.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _add(self, vector, **payload) -> str:
+        pid = str(uuid.uuid4())
+        self.client.upsert(COLLECTION, [models.PointStruct(id=pid, vector=vector, payload=payload)])
+        return pid
+
+    def _ids(self) -> set[str]:
+        points, _ = self.client.scroll(COLLECTION, limit=1000)
+        return {str(p.id) for p in points}
+
+    def test_ttl_by_type(self):
+        old_conv = self._add(_unit(0), user_id="monolith", type="conversation", timestamp=NOW - 31 * DAY)
+        new_conv = self._add(_unit(1), user_id="monolith", type="conversation", timestamp=NOW - 2 * DAY)
+        old_shadow = self._add(_unit(2), user_id="hodolith", type="shadow_thinking", timestamp=NOW - 8 * DAY)
+        old_fact = self._add(_unit(3), user_id="monolith", type="agent_learned", timestamp=NOW - 400 * DAY)
+        # Sans timestamp : created_at (Mem0)
+        old_feedback = self._add(_unit(4), user_id="hodolith", type="prediction_feedback",
+                                 created_at="2026-01-01T00:00:00+00:00")
+        report = compact_memories(self.memory, now=NOW)
+        remaining = self._ids()
+        self.assertNotIn(old_conv, remaining)
+        self.assertNotIn(old_shadow, remaining)
+        self.assertNotIn(old_feedback, remaining)
+        self.assertIn(new_conv, remaining)
+        self.assertIn(old_fact, remaining)
+        self.assertEqual(report["expired"], {"conversation": 1, "shadow_thinking": 1, "prediction_feedback": 1})
+        self.assertEqual((report["points_before"], report["points_after"], report["removed"]), (5, 2, 3))
+
+    def test_near_duplicates_collapsed_to_newest(self):
+        older = self._add(_unit(0, jitter=0.01), user_id="hodolith", type="shadow_thinking", timestamp=NOW - 3600)
+        newest = self._add(_unit(0), user_id="hodolith", type="shadow_thinking", timestamp=NOW - 60)
+        distinct = self._add(_unit(5), user_id="hodolith", type="shadow_thinking", timestamp=NOW - 30)
+        other_ns = self._add(_unit(0), user_id="monolith", type="shadow_thinking", timestamp=NOW - 60)
+        other_type = self._add(_unit(0), user_id="hodolith", type="prediction_feedback", timestamp=NOW - 60)
+        report = compact_memories(self.memory, now=NOW)
+        remaining = self._ids()
+        self.assertNotIn(older, remaining)
+        self.assertTrue({newest, distinct, other_ns, other_type} <= remaining)
+        self.assertEqual(report["merged"], 1)
+        kept = self.client.retrieve(COLLECTION, [newest])[0]
+        self.assertEqual(kept.payload["merged_count"], 1)
+
+    def test_bootstrap_memories_untouched(self):
+        a = self._add(_unit(0), user_id="pyrolith", type="protocol", source="bootstrap")
+        b = self._add(_unit(0), user_id="pyrolith", type="protocol", source="bootstrap")
+        compact_memories(self.memory, now=NOW)
+        self.assertEqual(self._ids(), {a, b})
+
+    def test_report_latency_and_vacuum(self):
+        for i in range(10):
+            self._add(_unit(i), user_id="monolith", type="conversation", timestamp=NOW - 40 * DAY)
+        report = compact_memories(self.memory, now=NOW)
+        self.assertIsNotNone(report["search_p95_ms_before"])
+        self.assertIsNotNone(report["search_p95_ms_after"])
+        self.assertEqual(report["vacuum"]["mode"], "embedded")
+        self.assertLessEqual(report["vacuum"]["bytes_after"], report["vacuum"]["bytes_before"])
+        self.assertEqual(report["points_after"], 0)
+
+
+class TestMemoryCompactorScheduler(unittest.TestCase):
+
+    def test_skipped_without_memory(self):
+        self.assertIsNone(MemoryCompactor(lambda: None).run_once())
+
+    def test_waits_while_busy_and_records_errors(self):
+        busy = threading.Event()
+        busy.set()
+        compactor = MemoryCompactor(lambda: object(), busy_fn=busy.is_set)
+        threading.Timer(0.3, busy.clear).start()
+        t0 = time.monotonic()
+        self.assertIsNone(compactor.run_once())         # object() n'a pas de client Qdrant
+        self.assertGreaterEqual(time.monotonic() - t0, 0.3)
+        self.assertIn("Qdrant", compactor.stats()["last_error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test payload indexes & filtered search (olith_memory_filters.py)
+=========================================================================
+Qdrant embarque (dossier temporaire) : filtres type / fichier / periode /
+confiance, recherche sans requete (plus recentes d'abord), suppression par
+periode, provisioning idempotent des index sur un client serveur simule,
+SearchParams du profil de stockage sur les recherches live.
+
+Usage:
+    python -m pytest test_memory_filters.py -v
+    python test_memory_filters.py
+"""
+
+import shutil
+import tempfile
+import unittest
+import uuid
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from qdrant_client import QdrantClient, models
+
+import olith_memory_init
+from olith_memory_filters import (
+    PAYLOAD_INDEXES, delete_filtered, ensure_payload_indexes, memory_filter, search_filtered,
+    vector_search,
+)
+
+COLLECTION = "olith_memories"
+NOW = 1_800_000_000
+HOUR = 3600
+
+
+class _Embedder:
+    def embed(self, text, memory_action=None):
+        return [1.0, 0.0, 0.0, 0.0]
+
+
+class _Memory:
+    def __init__(self, client):
+        self.vector_store = SimpleNamespace(client=client, collection_name=COLLECTION)
+        self.embedding_model = _Embedder()
+
+
+class TestFilteredSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.client = QdrantClient(path=self.dir)
+        self.client.create_collection(
+            COLLECTION, vectors_config=models.VectorParams(size=4, distance=models.Distance.COSINE),
+        )
+        self.memory = _Memory(self.client)
+        self._add("app.py modifie", type="shadow_thinking", file_path="src/app.py",
+                  timestamp=NOW - 2 * HOUR, confidence_score=0.8)
+        self._add("app.py ancien", type="shadow_thinking", file_path="src/app.py",
+                  timestamp=NOW - 48 * HOUR, confidence_score=0.9)
+        self._add("db.py modifie", type="shadow_thinking", file_path="src/db.py",
+                  timestamp=NOW - HOUR, confidence_score=0.3)
+        self._add("feedback", type="prediction_feedback", timestamp=NOW - HOUR)
+        self._add("Je suis Hodolith", type="identity", timestamp=NOW - 900 * HOUR)
+        self._add("Je route les requetes", type="capabilities", timestamp=NOW - 900 * HOUR)
+        self._add("Je suis Monolith", type="identity", user_id="monolith", timestamp=NOW)
+
+    def tearDown(self):
+        self.client.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _add(self, text, user_id="hodolith", **payload):
+        self.client.upsert(COLLECTION, [models.PointStruct(
+            id=str(uuid.uuid4()), vector=[1.0, 0.1, 0.0, 0.0],
+            payload={"data": text, "user_id": user_id, **payload},
+        )])
+
+    def _texts(self, query, **filters) -> set[str]:
+        return {r["memory"] for r in search_filtered(self.memory, query, limit=10, **filters)["results"]}
+
+    def test_type_file_and_period(self):
+        texts = self._texts("deploy", user_id="hodolith", types="shadow_thinking",
+                            file_path="src/app.py", since=NOW - 24 * HOUR)
+        self.assertEqual(texts, {"app.py modifie"})
+
+    def test_several_types_without_query(self):
+        results = search_filtered(self.memory, None, limit=10, user_id="hodolith",
+                                  types=["identity", "capabilities"])["results"]
+        self.assertEqual({r["memory"] for r in results}, {"Je suis Hodolith", "Je route les requetes"})
+        self.assertEqual(results[0]["metadata"]["user_id"], "hodolith")
+
+    def test_min_confidence(self):
+        self.assertEqual(self._texts("x", types="shadow_thinking", min_confidence=0.5),
+                         {"app.py modifie", "app.py ancien"})
+
+    def test_recent_first_without_query(self):
+        results = search_filtered(self.memory, None, limit=2, user_id="hodolith")["results"]
+        self.assertEqual([r["memory"] for r in results], ["db.py modifie", "feedback"])
+
+    def test_delete_time_range(self):
+        report = delete_filtered(self.memory, types="shadow_thinking", before=NOW - 24 * HOUR)
+        self.assertEqual(report["deleted"], 1)
+        self.assertNotIn("app.py ancien", self._texts("x", user_id="hodolith"))
+        self.assertEqual(self.client.count(COLLECTION).count, 6)
+
+    def test_vector_search_namespace(self):
+        points = vector_search(self.memory, "qui es-tu", [1.0, 0.0, 0.0, 0.0], 10, "monolith")
+        self.assertEqual([p.payload["data"] for p in points], ["Je suis Monolith"])
+
+    def test_delete_refuses_empty_filter(self):
+        with self.assertRaises(ValueError):
+            delete_filtered(self.memory)
+        self.assertIsNone(memory_filter())
+
+
+class _ServerClient:
+    """Client Qdrant serveur simule : payload_schema + create_payload_index."""
+
+    def __init__(self, existing=()):
+        self.schema = {field: object() for field in existing}
+        self.created = []
+
+    def get_collection(self, collection_name):
+        return SimpleNamespace(payload_schema=dict(self.schema))
+
+    def create_payload_index(self, collection_name, field_name, field_schema, wait):
+        self.created.append((field_name, field_schema))
+        self.schema[field_name] = field_schema
+
+
+class _RecordingClient:
+    """Client serveur simule : enregistre les query_points."""
+
+    def __init__(self):
+        self.calls = []
+
+    def query_points(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(points=[])
+
+
+class TestProfileSearchParams(unittest.TestCase):
+
+    def setUp(self):
+        self.client = _RecordingClient()
+        self.memory = _Memory(self.client)
+
+    def test_live_paths_use_profile_params(self):
+        with patch.object(olith_memory_init, "MEMORY_PROFILE", "binary"):
+            vector_search(self.memory, "q", [1.0, 0.0, 0.0, 0.0], 5, "monolith")
+            search_filtered(self.memory, "q", limit=5, user_id="monolith")
+        for call in self.client.calls:
+            params = call["search_params"]
+            self.assertEqual(params.hnsw_ef, olith_memory_init.HNSW_EF)
+            self.assertTrue(params.quantization.rescore)
+            self.assertGreater(params.quantization.oversampling, 1)
+        self.assertEqual(len(self.client.calls), 2)
+
+    def test_store_without_client_uses_mem0_search(self):
+        store = SimpleNamespace(search=lambda *args: [args])
+        memory = SimpleNamespace(vector_store=store)
+        self.assertEqual(vector_search(memory, "q", [1.0], 3, "shared"), [("q", [1.0], 3, {"user_id": "shared"})])
+
+
+class TestPayloadIndexes(unittest.TestCase):
+
+    def test_missing_indexes_created_once(self):
+        client = _ServerClient(existing=["user_id"])
+        report = ensure_payload_indexes(client, COLLECTION)
+        self.assertEqual(set(report["created"]), set(PAYLOAD_INDEXES) - {"user_id"})
+        self.assertIn(("timestamp", models.PayloadSchemaType.FLOAT), client.created)
+        self.assertEqual(ensure_payload_indexes(client, COLLECTION)["created"], [])
+
+    def test_embedded_is_noop(self):
+        client = QdrantClient(":memory:")
+        self.assertEqual(ensure_payload_indexes(client, COLLECTION), {"mode": "embedded", "created": []})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test memory retrieval overlapped with routing (olith_agents.MemoryPrefetch)
+====================================================================================
+A fake Mem0 (embedder + vector store with artificial latency) checks that
+the query is embedded once, namespaces are searched concurrently, and the
+results are ready by the time routing finishes.
+
+Usage:
+    python -m pytest test_memory_prefetch.py -v
+    python test_memory_prefetch.py
+"""
+
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from olith_agents import MemoryPrefetch, search_memories
+
+SEARCH_DELAY = 0.2
+
+
+class _Embedder:
+    def __init__(self):
+        self.calls = 0
+
+    def embed(self, text, action):
+        self.calls += 1
+        time.sleep(0.05)
+        return [0.1, 0.2]
+
+
+class _VectorStore:
+    def __init__(self, data):
+        self.data = data
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def search(self, query, vectors, limit, filters):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(SEARCH_DELAY)
+        with self._lock:
+            self.active -= 1
+        texts = self.data.get(filters["user_id"], [])[:limit]
+        return [SimpleNamespace(payload={"data": t}, score=0.9) for t in texts]
+
+
+class _Memory:
+    def __init__(self, data):
+        self.embedding_model = _Embedder()
+        self.vector_store = _VectorStore(data)
+
+
+DATA = {
+    "monolith": ["mono fact"],
+    "aerolith": ["aero fact", "common fact"],
+    "cryolith": ["cryo fact"],
+    "pyrolith": [],
+    "shared": ["common fact", "shared fact"],
+}
+CANDIDATES = ["monolith", "aerolith", "cryolith", "pyrolith"]
+
+
+class TestMemoryPrefetch(unittest.TestCase):
+
+    def test_single_embedding_for_all_namespaces(self):
+        memory = _Memory(DATA)
+        MemoryPrefetch(memory, "question", CANDIDATES).for_agent("aerolith")
+        self.assertEqual(memory.embedding_model.calls, 1)
+
+    def test_namespaces_searched_concurrently(self):
+        memory = _Memory(DATA)
+        t0 = time.perf_counter()
+        MemoryPrefetch(memory, "question", CANDIDATES).for_agent("monolith")
+        self.assertLess(time.perf_counter() - t0, 2 * SEARCH_DELAY + 0.1)
+        self.assertGreater(memory.vector_store.max_active, 1)
+
+    def test_agent_then_shared_deduplicated(self):
+        memories = MemoryPrefetch(_Memory(DATA), "question", CANDIDATES).for_agent("aerolith")
+        self.assertEqual(memories, ["aero fact", "common fact", "shared fact"])
+
+    def test_retrieval_off_critical_path(self):
+        prefetch = MemoryPrefetch(_Memory(DATA), "question", CANDIDATES)
+        time.sleep(SEARCH_DELAY + 0.15)              # routage pendant la recherche
+        prefetch.for_agent("cryolith")
+        stats = prefetch.stats()
+        self.assertLess(stats["wait_ms"], 50)
+        self.assertGreaterEqual(stats["retrieval_ms"], SEARCH_DELAY * 1000)
+        self.assertEqual(stats["namespaces"], 5)
+
+    def test_fallback_to_memory_search(self):
+        calls = []
+
+        class _Legacy:
+            def search(self, query, user_id, limit):
+                calls.append(user_id)
+                return {"results": [{"memory": f"{user_id} memo"}]}
+
+        self.assertEqual(search_memories(_Legacy(), "q", "monolith"), ["monolith memo", "shared memo"])
+        self.assertEqual(sorted(calls), ["monolith", "shared"])
+
+    def test_failing_namespace_is_not_fatal(self):
+        memory = _Memory(DATA)
+
+        def broken(query, vectors, limit, filters):
+            if filters["user_id"] == "shared":
+                raise RuntimeError("qdrant down")
+            return []
+
+        memory.vector_store.search = broken
+        self.assertEqual(MemoryPrefetch(memory, "q", ["monolith"]).for_agent("monolith"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test memory write queue (olith_memory_queue.py)
+=========================================================
+Single worker, coalescing, priority eviction, GPU-busy deferral and journal
+replay after a simulated crash, against a fake Mem0 and a temp journal.
+
+Usage:
+    python -m pytest test_memory_queue.py -v
+    python test_memory_queue.py
+"""
+
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from olith_memory_queue import MemoryWriteQueue, PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL
+
+
+class _FakeMemory:
+    def __init__(self, delay: float = 0.0):
+        self.adds: list[tuple[str, str, dict]] = []
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def add(self, text, user_id, metadata):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+            self.adds.append((text, user_id, metadata))
+
+
+class TestMemoryWriteQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.memory = _FakeMemory()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _queue(self, start=True, **kw) -> MemoryWriteQueue:
+        kw.setdefault("batch_window_s", 0.05)
+        queue = MemoryWriteQueue(lambda: self.memory, journal_dir=self.dir, **kw)
+        self.addCleanup(queue.stop)
+        return queue.start() if start else queue
+
+    def test_writes_are_serialized(self):
+        self.memory.delay = 0.02
+        queue = self._queue()
+        for aid in ("monolith", "aerolith", "cryolith"):
+            queue.submit(f"note {aid} /no_think", aid, {"type": "conversation"})
+        self.assertTrue(queue.flush(5))
+        self.assertEqual(len(self.memory.adds), 3)
+        self.assertEqual(self.memory.max_active, 1)
+
+    def test_shared_write_lock_held_during_add(self):
+        lock = threading.Lock()
+        queue = self._queue(write_lock=lock)
+        with lock:                                   # ex. compacteur en cours
+            queue.submit("note /no_think", "monolith", {"type": "conversation"})
+            time.sleep(0.2)
+            self.assertEqual(self.memory.adds, [])
+        self.assertTrue(queue.flush(5))
+        self.assertEqual(len(self.memory.adds), 1)
+
+    def test_same_agent_writes_coalesce(self):
+        queue = self._queue(start=False)
+        for i in range(3):
+            queue.submit(f"fait {i} /no_think", "monolith", {"type": "conversation", "timestamp": i})
+        queue.start()
+        self.assertTrue(queue.flush(5))
+        self.assertEqual(len(self.memory.adds), 1)
+        text, user_id, metadata = self.memory.adds[0]
+        self.assertEqual(text, "fait 0\n\nfait 1\n\nfait 2 /no_think")
+        # Date de la plus ancienne : TTL et filtres par date restent justes
+        self.assertEqual(metadata["timestamp"], 0)
+        self.assertEqual(queue.stats()["coalesced"], 2)
+
+    def test_writes_with_other_metadata_not_coalesced(self):
+        queue = self._queue(start=False)
+        queue.submit("fait /no_think", "monolith", {"type": "conversation", "timestamp": 1})
+        queue.submit("retour /no_think", "monolith", {"type": "chat_feedback", "timestamp": 2})
+        queue.start()
+        self.assertTrue(queue.flush(5))
+        self.assertEqual([(m["type"], m["timestamp"]) for _, _, m in self.memory.adds],
+                         [("conversation", 1), ("chat_feedback", 2)])
+
+    def test_priority_order_and_eviction_when_full(self):
+        queue = self._queue(start=False, max_depth=2)
+        self.assertTrue(queue.submit("low", "hodolith", {"type": "shadow_thinking"}, PRIORITY_LOW))
+        self.assertTrue(queue.submit("normal", "monolith", {"type": "conversation"}, PRIORITY_NORMAL))
+        self.assertTrue(queue.submit("high", "monolith", {"type": "chat_feedback"}, PRIORITY_HIGH))
+        self.assertFalse(queue.submit("low 2", "hodolith", {"type": "shadow_thinking"}, PRIORITY_LOW))
+        queue.start()
+        self.assertTrue(queue.flush(5))
+        self.assertEqual([t for t, _, _ in self.memory.adds], ["high", "normal"])
+        stats = queue.stats()
+        self.assertEqual((stats["dropped"], stats["rejected"]), (1, 1))
+
+    def test_deferred_while_gpu_busy(self):
+        busy = threading.Event()
+        busy.set()
+        queue = self._queue(busy_fn=busy.is_set)
+        queue.submit("x", "monolith")
+        time.sleep(0.3)
+        self.assertEqual(self.memory.adds, [])
+        self.assertEqual(queue.stats()["depth"], 1)
+        busy.clear()
+        self.assertTrue(queue.flush(5))
+        self.assertEqual(len(self.memory.adds), 1)
+
+    def test_journal_replayed_after_crash(self):
+        crashed = self._queue(start=False)
+        crashed.submit("survit", "monolith", {"type": "conversation"})
+        # Processus tue avant que le worker ne tourne : nouvelle instance
+        queue = self._queue()
+        self.assertEqual(queue.stats()["replayed"], 1)
+        self.assertTrue(queue.flush(5))
+        self.assertEqual(self.memory.adds[0][0], "survit")
+        # Fait => plus rien a rejouer
+        self.assertEqual(self._queue(start=False).stats()["replayed"], 0)
+
+    def test_waits_for_memory_availability(self):
+        available = threading.Event()
+        queue = MemoryWriteQueue(
+            lambda: self.memory if available.is_set() else None,
+            journal_dir=self.dir, batch_window_s=0.01,
+        ).start()
+        self.addCleanup(queue.stop)
+        queue.submit("plus tard", "monolith")
+        time.sleep(0.1)
+        self.assertEqual(queue.stats()["depth"], 1)
+        available.set()
+        self.assertTrue(queue.flush(10))
+        self.assertEqual(len(self.memory.adds), 1)
+        self.assertIsNotNone(queue.stats()["latency_ms_p95"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test memory service (olith_memory_service.py)
+=======================================================
+Service servi sur un port ephemere avec un faux Mem0 : recherches regroupees
+(un embedding par requete distincte), ecritures serialisees, erreurs
+remontees au client, ping, authentification par secret, ecritures jamais
+rejouees.
+
+Usage:
+    python -m pytest test_memory_service.py -v
+    python test_memory_service.py
+"""
+
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from olith_memory_service import MemoryClient, MemoryService, _Handler, _Server, service_token
+
+TOKEN = "test-secret"
+
+
+class _Embedder:
+    def __init__(self):
+        self.calls = 0
+
+    def embed(self, text, action):
+        self.calls += 1
+        return [float(len(text))]
+
+
+class _VectorStore:
+    def __init__(self, data):
+        self.data = data
+
+    def search(self, query, vectors, limit, filters):
+        time.sleep(0.02)
+        texts = self.data.get(filters["user_id"], [])[:limit]
+        return [SimpleNamespace(id=i, payload={"data": t, "type": "fact"}, score=0.5)
+                for i, t in enumerate(texts)]
+
+
+class _Memory:
+    def __init__(self):
+        self.embedding_model = _Embedder()
+        self.vector_store = _VectorStore({"monolith": ["mono fact"], "shared": ["shared fact"]})
+        self.adds = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def add(self, text, user_id, metadata=None):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.02)
+        with self._lock:
+            self.active -= 1
+            self.adds.append((text, user_id))
+        return {"results": [{"event": "ADD", "memory": text}]}
+
+    def delete_all(self, user_id):
+        raise ValueError(f"refuse {user_id}")
+
+
+class TestMemoryService(unittest.TestCase):
+
+    def setUp(self):
+        self.memory = _Memory()
+        self.batched = []
+
+        def embed_fn(texts):
+            self.batched.append(list(texts))
+            return [[float(len(t))] for t in texts]
+
+        self.service = MemoryService(lambda: self.memory, embed_fn=embed_fn)
+        self.service.start_init()
+        self.server = _Server(("127.0.0.1", 0), _Handler, token=TOKEN)
+        self.server.service = self.service
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = MemoryClient(port=self.server.server_address[1], timeout=5, token=TOKEN)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_ping(self):
+        self.service.memory()
+        info = self.client.ping()
+        self.assertTrue(info["ready"])
+        self.assertTrue(info["qdrant"])
+        self.assertIsNone(info["error"])
+
+    def test_search_result_shape(self):
+        result = self.client.search("question", user_id="monolith", limit=5)
+        self.assertEqual(result["results"][0]["memory"], "mono fact")
+        self.assertEqual(result["results"][0]["metadata"], {"type": "fact"})
+
+    def test_concurrent_searches_share_one_embedding(self):
+        results = {}
+
+        def _search(uid):
+            results[uid] = self.client.search("meme question", user_id=uid, limit=5)["results"]
+
+        threads = [threading.Thread(target=_search, args=(uid,)) for uid in ("monolith", "shared", "aerolith")]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual([r["memory"] for r in results["shared"]], ["shared fact"])
+        self.assertEqual(results["aerolith"], [])
+        stats = self.client.stats()["batching"]
+        self.assertEqual(stats["searches"], 3)
+        # Une seule requete distincte : embeddee une fois, quel que soit le regroupement
+        self.assertEqual(stats["embedded_queries"], stats["batches"])
+        self.assertLess(stats["batches"], 3)
+
+    def test_distinct_queries_batched_in_one_call(self):
+        barrier = threading.Barrier(2)
+
+        def _search(q):
+            barrier.wait()
+            self.client.search(q, user_id="monolith", limit=5)
+
+        self.service.memory()
+        threads = [threading.Thread(target=_search, args=(q,)) for q in ("alpha", "beta")]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if self.batched:                             # regroupees dans la meme fenetre
+            self.assertEqual(sorted(self.batched[0]), ["alpha", "beta"])
+            self.assertEqual(self.memory.embedding_model.calls, 0)
+
+    def test_writes_serialized_across_clients(self):
+        other = MemoryClient(port=self.server.server_address[1], timeout=5, token=TOKEN)
+        self.addCleanup(other.close)
+        threads = [
+            threading.Thread(target=c.add, args=(f"fait {i}",), kwargs={"user_id": "monolith"})
+            for i, c in enumerate((self.client, other, self.client, other))
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(self.memory.adds), 4)
+        self.assertEqual(self.memory.max_active, 1)
+
+    def test_error_raised_in_client(self):
+        with self.assertRaisesRegex(RuntimeError, "ValueError: refuse monolith"):
+            self.client.delete_all(user_id="monolith")
+        # La connexion reste utilisable
+        self.assertTrue(self.client.ping()["ready"])
+
+    def test_unknown_op_rejected(self):
+        with self.assertRaisesRegex(RuntimeError, "Unknown op"):
+            self.client.call("drop_everything")
+
+    def _raw(self, payload: bytes) -> bytes:
+        """Envoie des octets bruts, renvoie tout ce que le service repond."""
+        with socket.create_connection(self.server.server_address, timeout=5) as sock:
+            sock.sendall(payload)
+            sock.shutdown(socket.SHUT_WR)
+            chunks = []
+            while chunk := sock.recv(4096):
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    def test_unauthenticated_connections_closed(self):
+        add = json.dumps({"id": 1, "op": "add", "args": ["x"], "kwargs": {"user_id": "u"}}).encode()
+        self.assertEqual(self._raw(add + b"\n"), b"")
+        self.assertEqual(self._raw(b'{"auth": "wrong"}\n' + add + b"\n"), b"")
+        # POST navigateur : en-tetes HTTP puis corps JSON
+        self.assertEqual(self._raw(b"POST / HTTP/1.1\r\nHost: x\r\n\r\n" + add + b"\n"), b"")
+        auth = json.dumps({"auth": TOKEN}).encode() + b"\n"
+        self.assertEqual(self._raw(auth + b"GET / HTTP/1.1\r\n" + add + b"\n"), b"")
+        self.assertEqual(self.memory.adds, [])
+        self.assertIn(b'"result"', self._raw(auth + b'{"id": 1, "op": "ping"}\n'))
+
+    def test_reset_not_exposed(self):
+        self.memory.reset = lambda: self.fail("reset appele")
+        with self.assertRaisesRegex(RuntimeError, "Unknown op"):
+            self.client.call("reset")
+
+    def test_writes_not_retried(self):
+        self.client.ping()
+        sent = []
+        real = self.client._conn
+
+        def _flaky():
+            sock, reader = real()
+            sent.append(1)
+            self.client._drop()                      # coupure apres envoi
+            return sock, reader
+
+        with patch.object(self.client, "_conn", _flaky):
+            with self.assertRaises(OSError):
+                self.client.add("fait", user_id="monolith")
+        self.assertEqual(len(sent), 1)
+        with patch.object(self.client, "_conn", _flaky):
+            with self.assertRaises(OSError):
+                self.client.ping()
+        self.assertEqual(len(sent), 3)               # lecture rejouee une fois
+
+    def test_reconnects_after_service_closed_connection(self):
+        self.client.ping()
+        sock = self.client._local.conn[0]
+        self.server.shutdown()
+        self.server.server_close()
+        self.server = _Server(("127.0.0.1", 0), _Handler, token=TOKEN)
+        self.server.service = self.service
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        sock.shutdown(socket.SHUT_RD)                # vue client : fin de flux
+        self.client.port = self.server.server_address[1]
+        self.client.add("apres relance", user_id="monolith")
+        self.assertEqual(self.memory.adds, [("apres relance", "monolith")])
+
+    def test_failed_init_reported(self):
+        def _broken():
+            raise RuntimeError("qdrant locked")
+
+        service = MemoryService(_broken)
+        service.start_init()
+        response = service.handle({"id": 1, "op": "search", "args": ["q"], "kwargs": {"user_id": "x"}})
+        self.assertIn("qdrant locked", response["error"])
+        self.assertFalse(service.ping()["memory"])
+
+
+class TestServiceToken(unittest.TestCase):
+
+    def test_created_private_and_stable(self):
+        tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        path = tmp / "sub" / "memory_service.token"
+        token = service_token(path)
+        self.assertEqual(len(token), 64)
+        self.assertEqual(service_token(path), token)
+        if os.name == "posix":
+            self.assertEqual(path.stat().st_mode & 0o777, 0o600)
+        self.assertEqual(list(path.parent.iterdir()), [path])
+
+
+if __name__ == "__main__":
+    unittest.main()
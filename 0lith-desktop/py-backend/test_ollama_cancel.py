@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test hard cancellation (olith_ollama.py)
+=================================================
+A local fake Ollama server never answers (or streams forever); setting the
+cancel token must abort the in-flight call within about a second.
+
+Usage:
+    python -m pytest test_ollama_cancel.py -v
+    python test_ollama_cancel.py
+"""
+
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import olith_ollama
+from olith_ollama import CancelToken, GenerationCancelled, get_abort_stats
+
+
+class _HangingOllama(BaseHTTPRequestHandler):
+    """/api/chat : stream=false hangs before headers, stream=true emits tokens slowly."""
+
+    protocol_version = "HTTP/1.1"   # chunked streaming, like Ollama
+    disconnected = threading.Event()
+    received = 0
+
+    def do_POST(self):
+        _HangingOllama.received += 1
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        try:
+            if not body.get("stream"):
+                # Simule un prompt-eval tres long : aucun octet avant la deconnexion
+                while not self._client_gone():
+                    time.sleep(0.05)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            while True:
+                line = (json.dumps({"message": {"content": "tok "}, "done": False}) + "\n").encode()
+                self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+                time.sleep(0.05)
+        except OSError:
+            pass
+        finally:
+            _HangingOllama.disconnected.set()
+
+    def _client_gone(self) -> bool:
+        import select
+        readable, _, _ = select.select([self.connection], [], [], 0)
+        return bool(readable) and not self.connection.recv(1)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHardCancellation(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _HangingOllama)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls._orig_url = olith_ollama.OLLAMA_URL
+        olith_ollama.OLLAMA_URL = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        olith_ollama.OLLAMA_URL = cls._orig_url
+        cls.server.shutdown()
+
+    def setUp(self):
+        _HangingOllama.disconnected.clear()
+
+    def _cancel_after(self, token, delay: float):
+        threading.Timer(delay, token.set).start()
+
+    def test_non_streaming_call_aborted_before_headers(self):
+        token = CancelToken()
+        self._cancel_after(token, 0.3)
+        t0 = time.perf_counter()
+        with self.assertRaises(GenerationCancelled):
+            olith_ollama.chat_with_ollama("fake", [], timeout=30, cancel_event=token)
+        self.assertLess(time.perf_counter() - t0, 1.5)
+        self.assertTrue(_HangingOllama.disconnected.wait(2), "server never saw the disconnect")
+
+    def test_streaming_call_stops_and_disconnects(self):
+        token = CancelToken()
+        self._cancel_after(token, 0.3)
+        t0 = time.perf_counter()
+        chunks = list(olith_ollama.chat_with_ollama_stream("fake", [], timeout=30, cancel_event=token))
+        self.assertLess(time.perf_counter() - t0, 1.5)
+        self.assertTrue(chunks)
+        self.assertTrue(_HangingOllama.disconnected.wait(2), "server never saw the disconnect")
+
+    def test_model_load_aborted(self):
+        token = CancelToken()
+        self._cancel_after(token, 0.3)
+        t0 = time.perf_counter()
+        with self.assertRaises(GenerationCancelled):
+            olith_ollama.load_model("fake", timeout=30, cancel_event=token)
+        self.assertLess(time.perf_counter() - t0, 1.5)
+        self.assertTrue(_HangingOllama.disconnected.wait(2), "server never saw the disconnect")
+
+    def test_plain_event_is_polled(self):
+        event = threading.Event()
+        self._cancel_after(event, 0.3)
+        with self.assertRaises(GenerationCancelled):
+            olith_ollama.chat_with_ollama("fake", [], timeout=30, cancel_event=event)
+
+    def test_already_cancelled_skips_request(self):
+        token = CancelToken()
+        token.set()
+        before = _HangingOllama.received
+        with self.assertRaises(GenerationCancelled):
+            olith_ollama.chat_with_ollama("fake", [], timeout=30, cancel_event=token)
+        self.assertEqual(_HangingOllama.received, before)
+
+    def test_abort_stats_recorded(self):
+        before = get_abort_stats()["aborts"]
+        token = CancelToken()
+        self._cancel_after(token, 0.1)
+        with self.assertRaises(GenerationCancelled):
+            olith_ollama.chat_with_ollama("fake", [], timeout=30, cancel_event=token)
+        stats = get_abort_stats()
+        self.assertEqual(stats["aborts"], before + 1)
+        self.assertLess(stats["last_abort_ms"], 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test project file index (olith_project_index.py)
+==========================================================
+Construction (tailles, texte/binaire, lignes, dossiers ignores), memes
+resultats que le parcours direct pour list_files / search_files, mises a
+jour incrementales (dossier modifie, fichier modifie, write_file) et
+persistance sur disque.
+
+Usage:
+    python -m pytest test_project_index.py -v
+    python test_project_index.py
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import olith_project_index
+import olith_tools
+from olith_project_index import ProjectIndex, open_project_index, project_index_for
+from olith_tools import ToolResultCache, execute_tool, tool_list_files, tool_search_files
+
+
+def _bump(path: Path) -> None:
+    """mtime garanti different (granularite des systemes de fichiers)."""
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+class TestProjectIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.project = Path(tempfile.mkdtemp(prefix="olith_pi_", dir=str(Path.home())))
+        self.store = Path(tempfile.mkdtemp())
+        (self.project / "src" / "core").mkdir(parents=True)
+        (self.project / "node_modules" / "dep").mkdir(parents=True)
+        (self.project / "src" / "a.py").write_text("def alpha():\n    return 1\n", encoding="utf-8")
+        (self.project / "src" / "core" / "B.ts").write_text("export const beta = 2;\n", encoding="utf-8")
+        (self.project / "src" / "blob.json").write_bytes(b"\x00\x01binary")
+        (self.project / "logo.png").write_bytes(b"\x89PNG")
+        (self.project / "README.md").write_text("# Demo\nalpha beta\nfin", encoding="utf-8")
+        (self.project / "node_modules" / "dep" / "x.js").write_text("alpha\n", encoding="utf-8")
+        self.root = str(self.project)
+        self._patches = [
+            patch.object(olith_project_index, "PROJECT_INDEX_DIR", self.store),
+            patch.object(olith_project_index, "_active", None),
+            patch.object(olith_tools, "tool_cache", ToolResultCache()),
+        ]
+        for p in self._patches:
+            p.start()
+
+    def tearDown(self):
+        if olith_project_index._active is not None:
+            olith_project_index._active.close()
+        for p in reversed(self._patches):
+            p.stop()
+        shutil.rmtree(self.project, ignore_errors=True)
+        shutil.rmtree(self.store, ignore_errors=True)
+
+    def _open(self) -> ProjectIndex:
+        index = open_project_index(self.project, background=False)
+        self.assertIs(project_index_for(self.root, self.project / "src"), index)
+        return index
+
+    def test_build_metadata_and_stats(self):
+        index = self._open()
+        stats = index.stats()
+        self.assertEqual((stats["state"], stats["files"], stats["dirs"]), ("ready", 5, 3))
+        self.assertEqual(stats["text_files"], 3)                    # .png et .json binaire exclus
+        self.assertEqual(stats["lines"], 2 + 1 + 3)
+        self.assertGreater(stats["index_bytes"], 0)
+        self.assertGreaterEqual(stats["build_ms"], 0)
+        self.assertNotIn("node_modules/dep/x.js", index._files)
+
+    def test_same_results_as_direct_scan(self):
+        listed = tool_list_files(".", self.root, 3)
+        listed_src = tool_list_files("src", self.root, 0)
+        found = tool_search_files("alpha", self.root)
+        self._open()
+        self.assertEqual(tool_list_files(".", self.root, 3), listed)
+        self.assertEqual(tool_list_files("src", self.root, 0), listed_src)
+        indexed = tool_search_files("alpha", self.root)
+        key = lambda r: (r["file"], r["line"])
+        self.assertEqual(sorted(indexed["results"], key=key), sorted(found["results"], key=key))
+        self.assertEqual(tool_search_files("beta", self.root, glob_pattern="*.ts")["total"], 1)
+
+    def test_directory_changes_picked_up(self):
+        index = self._open()
+        (self.project / "src" / "core" / "new.py").write_text("gamma = 3\n", encoding="utf-8")
+        _bump(self.project / "src" / "core")
+        self.assertIn("src/core/new.py", tool_list_files(".", self.root, 3)["files"])
+        self.assertEqual(tool_search_files("gamma", self.root)["results"][0]["file"], "src/core/new.py")
+        shutil.rmtree(self.project / "src" / "core")
+        _bump(self.project / "src")
+        self.assertEqual(tool_list_files(".", self.root, 3)["dirs"], ["src/"])
+        self.assertNotIn("src/core/B.ts", index._files)
+
+    def test_modified_file_revalidated_on_search(self):
+        index = self._open()
+        path = self.project / "src" / "a.py"
+        path.write_text("def alpha():\n    return 1\n\ndelta = 4\n", encoding="utf-8")
+        _bump(path)
+        self.assertEqual(tool_search_files("delta", self.root)["results"][0]["line"], 4)
+        self.assertEqual(index._files["src/a.py"][olith_project_index.LINES], 4)
+
+    def test_write_file_updates_index(self):
+        index = self._open()
+        result = execute_tool("write_file", {"path": "src/c.py", "content": "x = 1\ny = 2\n"}, self.root)
+        self.assertNotIn("error", result)
+        self.assertEqual(index._files["src/c.py"][olith_project_index.LINES], 2)
+        self.assertIn("src/c.py", tool_list_files("src", self.root, 0)["files"])
+
+    def test_persisted_and_reloaded(self):
+        index = self._open()
+        reloaded = ProjectIndex(self.project, index.path)
+        self.assertTrue(reloaded.load())
+        self.assertEqual(reloaded._files, index._files)
+        self.assertEqual(reloaded._dirs, index._dirs)
+        self.assertFalse(ProjectIndex(self.project / "src", index.path).load())    # autre racine
+
+    def test_other_root_not_served(self):
+        self._open()
+        self.assertIsNone(project_index_for(str(self.project / "src")))
+        self.assertIsNone(project_index_for(self.root, Path.home()))
+
+
+if __name__ == "__main__":
+    unittest.main()
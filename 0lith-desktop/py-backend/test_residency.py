@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test model residency (olith_residency.py)
+===================================================
+Simulated Ollama (/api/ps, load, unload) to check pinning, LRU eviction
+under the VRAM budget, preload sharing and cold-load stats.
+
+Usage:
+    python -m pytest test_residency.py -v
+    python test_residency.py
+"""
+
+import threading
+import time
+import unittest
+
+from olith_ollama import CancelToken, GenerationCancelled
+from olith_residency import ModelResidency
+
+AGENTS = {
+    "hodolith": {"model": "hodo:1b", "location": "local"},
+    "monolith": {"model": "mono:14b", "location": "local"},
+    "aerolith": {"model": "aero:30b", "location": "local"},
+    "cryolith": {"model": "cryo:8b", "location": "local"},
+    "pyrolith": {"model": "pyro:7b", "location": "docker"},
+}
+SIZES_GB = {"hodo:1b": 2, "mono:14b": 10, "aero:30b": 12, "cryo:8b": 6}
+
+
+class _FakeOllama:
+    def __init__(self, load_delay: float = 0.0):
+        self.loaded: dict[str, int] = {}
+        self.loads: list[str] = []
+        self.load_ctx: list[int | None] = []
+        self.unloads: list[str] = []
+        self.load_delay = load_delay
+        self._lock = threading.Lock()
+
+    def running(self):
+        with self._lock:
+            return [{"name": m, "size_vram": SIZES_GB[m] * 1e9} for m in self.loaded]
+
+    def load(self, model, keep_alive, cancel_event=None, options=None):
+        if (cancel_event or threading.Event()).wait(self.load_delay):
+            raise GenerationCancelled(f"load {model}: cancelled")
+        with self._lock:
+            self.loads.append(model)
+            self.load_ctx.append((options or {}).get("num_ctx"))
+            self.loaded[model] = keep_alive
+
+    def unload(self, model):
+        with self._lock:
+            self.unloads.append(model)
+            self.loaded.pop(model, None)
+
+
+class TestModelResidency(unittest.TestCase):
+
+    def _manager(self, ollama, budget=16):
+        return ModelResidency(
+            agents=AGENTS, budget_gb=budget, pinned={"hodolith"},
+            running_fn=ollama.running, load_fn=ollama.load, unload_fn=ollama.unload,
+        )
+
+    def test_pinned_agent_keep_alive(self):
+        residency = self._manager(_FakeOllama())
+        self.assertEqual(residency.keep_alive("hodolith"), -1)
+        self.assertNotEqual(residency.keep_alive("monolith"), -1)
+
+    def test_lru_eviction_spares_pinned(self):
+        ollama = _FakeOllama()
+        residency = self._manager(ollama)
+        residency.preload_pinned()
+        residency.acquire("cryolith")
+        residency.acquire("monolith")           # 2 + 6 + 10 = 18 > 16 -> evict cryolith
+        self.assertEqual(ollama.unloads, ["cryo:8b"])
+        self.assertIn("hodo:1b", ollama.loaded)
+        self.assertEqual(ollama.loaded["hodo:1b"], -1)
+        self.assertEqual(residency.stats()["agents"]["cryolith"]["evictions"], 1)
+
+    def test_warm_hit_does_not_reload(self):
+        ollama = _FakeOllama()
+        residency = self._manager(ollama)
+        self.assertEqual(residency.acquire("monolith"), "cold")
+        self.assertEqual(residency.acquire("monolith"), "warm")
+        self.assertEqual(ollama.loads, ["mono:14b"])
+        stats = residency.stats()["agents"]["monolith"]
+        self.assertEqual((stats["cold_loads"], stats["warm_hits"]), (1, 1))
+
+    def test_acquire_waits_for_preload(self):
+        ollama = _FakeOllama(load_delay=0.2)
+        residency = self._manager(ollama)
+        t = residency.preload_async("aerolith")
+        time.sleep(0.05)
+        self.assertEqual(residency.acquire("aerolith"), "waited")
+        t.join()
+        self.assertEqual(ollama.loads, ["aero:30b"])
+        self.assertEqual(residency.stats()["agents"]["aerolith"]["preloads"], 1)
+
+    def test_warm_requires_same_num_ctx(self):
+        ollama = _FakeOllama()
+        residency = self._manager(ollama)
+        self.assertEqual(residency.acquire("monolith", num_ctx=8192), "cold")
+        self.assertEqual(residency.acquire("monolith", num_ctx=8192), "warm")
+        self.assertEqual(residency.acquire("monolith"), "warm")
+        self.assertEqual(residency.acquire("monolith", num_ctx=4096), "cold")   # Ollama rechargerait
+        self.assertEqual(ollama.load_ctx, [8192, 4096])
+        self.assertEqual(residency.loaded_num_ctx("monolith"), 4096)
+        stats = residency.stats()["agents"]["monolith"]
+        self.assertEqual((stats["cold_loads"], stats["num_ctx"]), (2, 4096))
+
+    def test_preload_num_ctx_shared(self):
+        ollama = _FakeOllama(load_delay=0.2)
+        residency = self._manager(ollama)
+        t = residency.preload_async("aerolith", num_ctx=16384)
+        time.sleep(0.05)
+        self.assertEqual(residency.loaded_num_ctx("aerolith"), 16384)
+        self.assertEqual(residency.acquire("aerolith", num_ctx=16384), "waited")
+        t.join()
+        self.assertEqual(ollama.load_ctx, [16384])
+
+    def test_preload_with_other_num_ctx_reloaded(self):
+        ollama = _FakeOllama(load_delay=0.1)
+        residency = self._manager(ollama)
+        t = residency.preload_async("aerolith", num_ctx=8192)
+        time.sleep(0.05)
+        self.assertEqual(residency.acquire("aerolith", num_ctx=16384), "cold")
+        t.join()
+        self.assertEqual(ollama.load_ctx, [8192, 16384])
+
+    def test_unloaded_model_forgets_num_ctx(self):
+        ollama = _FakeOllama()
+        residency = self._manager(ollama)
+        residency.acquire("cryolith", num_ctx=4096)
+        ollama.unload("cryo:8b")                    # keep_alive expire
+        self.assertEqual(residency.acquire("monolith"), "cold")
+        self.assertIsNone(residency.loaded_num_ctx("cryolith"))
+
+    def test_cancel_interrupts_preload_wait(self):
+        ollama = _FakeOllama(load_delay=2.0)
+        residency = self._manager(ollama)
+        t = residency.preload_async("aerolith")
+        time.sleep(0.05)
+        token = CancelToken()
+        threading.Timer(0.2, token.set).start()
+        t0 = time.perf_counter()
+        self.assertEqual(residency.acquire("aerolith", cancel_event=token), "cancelled")
+        self.assertLess(time.perf_counter() - t0, 1.0)
+        t.join()
+
+    def test_cancel_aborts_load(self):
+        ollama = _FakeOllama(load_delay=2.0)
+        residency = self._manager(ollama)
+        token = CancelToken()
+        threading.Timer(0.2, token.set).start()
+        t0 = time.perf_counter()
+        self.assertEqual(residency.acquire("monolith", cancel_event=token), "cancelled")
+        self.assertLess(time.perf_counter() - t0, 1.0)
+        self.assertEqual(ollama.loads, [])
+        self.assertEqual(residency.stats()["agents"]["monolith"]["cold_loads"], 0)
+        # Le verrou de chargement est libere : un nouvel appel recharge
+        ollama.load_delay = 0.0
+        self.assertEqual(residency.acquire("monolith"), "cold")
+
+    def test_docker_agent_not_managed(self):
+        ollama = _FakeOllama()
+        residency = self._manager(ollama)
+        self.assertEqual(residency.acquire("pyrolith"), "skipped")
+        self.assertIsNone(residency.preload_async("pyrolith"))
+        self.assertEqual(ollama.loads, [])
+
+    def test_ollama_down_is_not_fatal(self):
+        def down():
+            raise ConnectionError("refused")
+        residency = ModelResidency(agents=AGENTS, running_fn=down)
+        self.assertEqual(residency.acquire("monolith"), "error")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test persistent LLM response cache (olith_response_cache.py)
+======================================================================
+Storage (LRU / TTL / size cap / counters) on a temp SQLite file, and the
+opt-in cache=True path of chat_with_ollama against a local fake Ollama.
+
+Usage:
+    python -m pytest test_response_cache.py -v
+    python test_response_cache.py
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import olith_ollama
+import olith_response_cache
+from olith_response_cache import ResponseCache, make_key
+
+
+class TestResponseCacheStore(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _cache(self, **kw) -> ResponseCache:
+        cache = ResponseCache(path=self.dir / "llm.sqlite3", **kw)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_key_depends_on_digest_messages_options(self):
+        msgs = [{"role": "user", "content": "hi"}]
+        base = make_key("sha256:a", msgs, {"num_ctx": 2048})
+        self.assertEqual(base, make_key("sha256:a", [dict(msgs[0])], {"num_ctx": 2048}))
+        self.assertNotEqual(base, make_key("sha256:b", msgs, {"num_ctx": 2048}))
+        self.assertNotEqual(base, make_key("sha256:a", msgs, {"num_ctx": 4096}))
+
+    def test_hit_miss_counters(self):
+        cache = self._cache()
+        self.assertIsNone(cache.get("k"))
+        cache.put("k", "m", "réponse")
+        self.assertEqual(cache.get("k"), "réponse")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_ttl_expiry(self):
+        cache = self._cache(ttl_s=0.05)
+        cache.put("k", "m", "value")
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_lru_eviction_under_size_cap(self):
+        cache = self._cache(max_bytes=4000)
+        for i in range(3):
+            cache.put(f"k{i}", "m", os.urandom(1000).hex())  # ~1.1 KB compressed each
+            time.sleep(0.01)
+        cache.get("k0")                                       # k0 redevient recent
+        cache.put("k3", "m", os.urandom(1000).hex())
+        self.assertIsNotNone(cache.get("k0"))
+        self.assertIsNone(cache.get("k1"))
+        self.assertLessEqual(cache.stats()["bytes"], 4000)
+        self.assertGreater(cache.stats()["evictions"], 0)
+
+    def test_persists_across_instances(self):
+        self._cache().put("k", "m", "durable")
+        self.assertEqual(self._cache().get("k"), "durable")
+
+
+class _FakeOllama(BaseHTTPRequestHandler):
+    chats = 0
+
+    def do_GET(self):
+        body = json.dumps({"models": [{"name": "fake:1b", "digest": "sha256:feed"}]}).encode()
+        self._reply(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        _FakeOllama.chats += 1
+        self._reply(json.dumps({"message": {"content": f"answer {_FakeOllama.chats}"}}).encode())
+
+    def _reply(self, body: bytes):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestChatWithOllamaCache(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeOllama)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls._orig_url = olith_ollama.OLLAMA_URL
+        olith_ollama.OLLAMA_URL = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        olith_ollama.OLLAMA_URL = cls._orig_url
+        cls.server.shutdown()
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self._orig_cache = olith_response_cache._cache
+        olith_response_cache._cache = ResponseCache(path=self.dir / "llm.sqlite3")
+
+    def tearDown(self):
+        olith_response_cache._cache.close()
+        olith_response_cache._cache = self._orig_cache
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_cacheable_call_hits_disk_second_time(self):
+        msgs = [{"role": "user", "content": "route this"}]
+        before = _FakeOllama.chats
+        first = olith_ollama.chat_with_ollama("fake:1b", msgs, timeout=5, cache=True)
+        second = olith_ollama.chat_with_ollama("fake:1b", msgs, timeout=5, cache=True)
+        self.assertEqual(first, second)
+        self.assertEqual(_FakeOllama.chats, before + 1)
+
+    def test_default_call_not_cached(self):
+        msgs = [{"role": "user", "content": "chat"}]
+        before = _FakeOllama.chats
+        olith_ollama.chat_with_ollama("fake:1b", msgs, timeout=5)
+        olith_ollama.chat_with_ollama("fake:1b", msgs, timeout=5)
+        self.assertEqual(_FakeOllama.chats, before + 2)
+
+    def test_unknown_model_bypasses_cache(self):
+        msgs = [{"role": "user", "content": "x"}]
+        before = _FakeOllama.chats
+        olith_ollama.chat_with_ollama("missing:7b", msgs, timeout=5, cache=True)
+        olith_ollama.chat_with_ollama("missing:7b", msgs, timeout=5, cache=True)
+        self.assertEqual(_FakeOllama.chats, before + 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test fast router (olith_router.py)
+===========================================
+Uses a deterministic bag-of-words embedder instead of Ollama, so routing
+decisions, fallback, learning and persistence are checked offline.
+
+Usage:
+    python -m pytest test_router.py -v
+    python test_router.py
+"""
+
+import shutil
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+
+import olith_agents
+from olith_router import FastRouter, ROUTES
+
+
+class _BagOfWords:
+    """Hash each word into a fixed dimension — similar wording, similar vectors."""
+
+    def __init__(self, dims: int = 256):
+        self.dims = dims
+        self.calls = 0
+        self.texts = 0
+
+    def __call__(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        self.texts += len(texts)
+        out = []
+        for text in texts:
+            vec = np.zeros(self.dims, dtype=np.float32)
+            for word in text.lower().replace("?", " ").replace(",", " ").split():
+                vec[zlib.crc32(word.encode()) % self.dims] += 1.0
+            out.append(vec.tolist())
+        return out
+
+
+class TestFastRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = Path(tempfile.mkdtemp())
+        self.embed = _BagOfWords()
+        self.fallback_calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _router(self, **kw) -> FastRouter:
+        kw.setdefault("min_margin", 0.05)
+        kw.setdefault("min_similarity", 0.2)
+        return FastRouter(data_dir=self.dir, embed_fn=self.embed, model="fake-embed", **kw)
+
+    def _fallback(self, message: str) -> dict:
+        self.fallback_calls.append(message)
+        return {"route": "cryolith", "reason": "llm", "parsed": True}
+
+    def test_confident_route_skips_llm(self):
+        router = self._router()
+        route = router.route("Écris une règle YARA pour détecter ce malware", self._fallback)
+        self.assertEqual(route["route"], "cryolith")
+        self.assertEqual(route["method"], "knn")
+        self.assertEqual(self.fallback_calls, [])
+
+    def test_low_margin_falls_back_and_learns(self):
+        router = self._router()
+        msg = "zzz qqq unknown gibberish"
+        route = router.route(msg, self._fallback)
+        self.assertEqual(route["method"], "llm")
+        self.assertEqual(route["route"], "cryolith")
+        self.assertEqual(router.stats()["learned"], 1)
+
+        # Le meme message est maintenant connu : plus de repli
+        again = router.route(msg, self._fallback)
+        self.assertEqual(again["method"], "knn")
+        self.assertEqual(again["route"], "cryolith")
+        self.assertEqual(len(self.fallback_calls), 1)
+
+    def test_unparsed_fallback_not_learned(self):
+        router = self._router()
+        msg = "zzz qqq unknown gibberish"
+        route = router.route(msg, lambda m: {"route": "monolith", "reason": "Routage par défaut (parsing échoué)"})
+        self.assertEqual((route["route"], route["method"]), ("monolith", "llm"))
+        self.assertNotIn("parsed", route)
+        self.assertEqual(router.stats()["learned"], 0)
+        logged = router.read_route_log()[-1]
+        self.assertEqual(logged["method"], "llm_default")
+        self.assertEqual(router.benchmark([logged])["samples"], 0)
+        self.assertNotIn(msg, [e["text"] for e in self._router()._bootstrap_examples()])
+
+    def test_embed_failure_falls_back(self):
+        def broken(texts):
+            raise ConnectionError("ollama down")
+        router = FastRouter(data_dir=self.dir, embed_fn=broken, model="fake-embed")
+        route = router.route("bonjour", self._fallback)
+        self.assertEqual(route["method"], "llm")
+        self.assertEqual(router.stats()["embed_errors"], 1)
+
+    def test_persisted_vectors_reused(self):
+        self._router().route("zzz qqq", self._fallback)
+        texts_before = self.embed.texts
+
+        reloaded = self._router()
+        reloaded.warm()
+        self.assertEqual(self.embed.texts, texts_before)   # pas de re-embed
+        self.assertIn("zzz qqq", [e["text"] for e in reloaded._examples])
+
+    def test_model_change_reembeds(self):
+        self._router().warm()
+        texts_before = self.embed.texts
+        FastRouter(data_dir=self.dir, embed_fn=self.embed, model="other-embed").warm()
+        self.assertGreater(self.embed.texts, texts_before)
+
+    def test_stats_fallback_rate(self):
+        router = self._router()
+        router.route("Écris une règle YARA pour détecter ce malware", self._fallback)
+        router.route("zzz qqq", self._fallback)
+        stats = router.stats()
+        self.assertEqual(stats["requests"], 2)
+        self.assertEqual(stats["fallback_rate"], 0.5)
+        self.assertGreater(stats["examples"], 0)
+
+    def test_benchmark_leave_one_out(self):
+        router = self._router()
+        entries = [
+            {"message": "Corrige ce bug dans mon script Python", "route": "aerolith", "method": "llm"},
+            {"message": "Règle YARA pour ce malware", "route": "cryolith", "method": "llm"},
+            {"message": "ignored knn entry", "route": "monolith", "method": "knn"},
+        ]
+        report = router.benchmark(entries)
+        self.assertEqual(report["samples"], 2)
+        self.assertEqual(report["accuracy"], 1.0)
+        self.assertTrue(set(report["per_route"]) <= set(ROUTES))
+
+
+
+class TestHodolithParsed(unittest.TestCase):
+    """Seule une route lue dans le JSON de Hodolith est marquee "parsed"."""
+
+    def _route(self, raw: str) -> dict:
+        residency = SimpleNamespace(touch=lambda agent: None, keep_alive=lambda agent: "5m")
+        with patch.object(olith_agents, "chat_with_ollama", lambda *a, **k: raw), \
+                patch.object(olith_agents, "get_residency", lambda: residency):
+            return olith_agents.route_hodolith("bonjour")
+
+    def test_json_route_parsed(self):
+        self.assertTrue(self._route('{"route": "aerolith", "reason": "code"}')["parsed"])
+
+    def test_fallbacks_not_parsed(self):
+        self.assertNotIn("parsed", self._route("je pense aerolith"))
+        self.assertNotIn("parsed", self._route("???"))
+
+
+if __name__ == "__main__":
+    unittest.main()
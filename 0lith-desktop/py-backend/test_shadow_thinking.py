@@ -130,7 +130,7 @@ def test_call_hodolith_json_fallbacks(watcher):
     results = {}
 
     # ── Sub-case A: clean JSON ────────────────────────────────────────────────
-    def _mock_clean_json(prompt, timeout=25):
+    def _mock_clean_json(prompt, timeout=25, cache=False):
         return '{"prediction": "developer will add tests", "confidence_score": 0.85}'
 
     watcher._call_hodolith = _mock_clean_json
@@ -145,7 +145,7 @@ def test_call_hodolith_json_fallbacks(watcher):
     results["A"] = r
 
     # ── Sub-case B: JSON embedded in prose ───────────────────────────────────
-    def _mock_prose_json(prompt, timeout=25):
+    def _mock_prose_json(prompt, timeout=25, cache=False):
         return (
             'Sure! Here is my analysis:\n'
             '{"prediction": "add unit tests", "confidence_score": 0.7}\n'
@@ -164,7 +164,7 @@ def test_call_hodolith_json_fallbacks(watcher):
     results["B"] = r
 
     # ── Sub-case C: plain text → synthetic dict ───────────────────────────────
-    def _mock_plain_text(prompt, timeout=25):
+    def _mock_plain_text(prompt, timeout=25, cache=False):
         return "The developer will probably refactor the module next."
 
     watcher._call_hodolith = _mock_plain_text
@@ -182,7 +182,7 @@ def test_call_hodolith_json_fallbacks(watcher):
     del watcher._call_hodolith
 
     # ── Confidence clamping ───────────────────────────────────────────────────
-    def _mock_out_of_range(prompt, timeout=25):
+    def _mock_out_of_range(prompt, timeout=25, cache=False):
         return '{"prediction": "test", "confidence_score": 99.0}'
 
     watcher._call_hodolith = _mock_out_of_range
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test storage profiles (olith_memory_init : quantization / mmap / HNSW)
+================================================================================
+Parametres de collection et de recherche par profil, application en place
+sur un serveur Qdrant simule (idempotente), no-op en embarque, copie d'une
+collection Mem0 (dense + BM25 + payloads) vers une collection au profil,
+sonde de sante du serveur (sans ouvrir le dossier embarque).
+
+Usage:
+    python -m pytest test_storage_profile.py -v
+    python test_storage_profile.py
+"""
+
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from qdrant_client import QdrantClient, models
+
+import olith_memory_init
+from olith_memory_init import (
+    HNSW_EF, HNSW_EF_CONSTRUCT, HNSW_M, apply_storage_profile, check_qdrant, copy_collection,
+    profile_collection_params, profile_search_params, storage_profile,
+)
+
+COLLECTION = "olith_memories"
+
+
+class TestProfiles(unittest.TestCase):
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ValueError):
+            storage_profile("fp16")
+
+    def test_collection_params(self):
+        self.assertIsNone(profile_collection_params(storage_profile("default"))["quantization_config"])
+        self.assertFalse(profile_collection_params(storage_profile("default"))["on_disk"])
+        int8 = profile_collection_params(storage_profile("int8"))
+        self.assertTrue(int8["on_disk"])
+        self.assertEqual(int8["quantization_config"].scalar.type, models.ScalarType.INT8)
+        self.assertTrue(int8["quantization_config"].scalar.always_ram)
+        binary = profile_collection_params(storage_profile("binary"))
+        self.assertIsInstance(binary["quantization_config"], models.BinaryQuantization)
+        self.assertEqual((binary["hnsw_config"].m, binary["hnsw_config"].ef_construct), (HNSW_M, HNSW_EF_CONSTRUCT))
+
+    def test_search_params_rescore_quantized(self):
+        self.assertIsNone(profile_search_params(storage_profile("ondisk")).quantization)
+        params = profile_search_params(storage_profile("binary"))
+        self.assertEqual(params.hnsw_ef, HNSW_EF)
+        self.assertTrue(params.quantization.rescore)
+        self.assertEqual(params.quantization.oversampling, 4.0)
+
+
+class _ServerClient:
+    """Serveur Qdrant simule : get_collection / update_collection."""
+
+    def __init__(self):
+        self.on_disk, self.quant = False, None
+        self.updates = []
+
+    def get_collection(self, collection_name):
+        return SimpleNamespace(config=SimpleNamespace(
+            params=SimpleNamespace(vectors=models.VectorParams(
+                size=4, distance=models.Distance.COSINE, on_disk=self.on_disk)),
+            quantization_config=self.quant,
+            hnsw_config=SimpleNamespace(m=HNSW_M, ef_construct=HNSW_EF_CONSTRUCT),
+        ))
+
+    def update_collection(self, collection_name, vectors_config, hnsw_config, quantization_config):
+        self.updates.append((vectors_config, quantization_config))
+        self.on_disk = vectors_config[""].on_disk
+        self.quant = None if quantization_config == models.Disabled.DISABLED else quantization_config
+
+
+class TestApplyProfile(unittest.TestCase):
+
+    def test_applied_in_place_once(self):
+        client = _ServerClient()
+        report = apply_storage_profile(client, COLLECTION, storage_profile("int8"))
+        self.assertTrue(report["applied"])
+        self.assertTrue(client.on_disk)
+        self.assertEqual(client.quant.scalar.type, models.ScalarType.INT8)
+        self.assertFalse(apply_storage_profile(client, COLLECTION, storage_profile("int8"))["applied"])
+        self.assertEqual(len(client.updates), 1)
+
+    def test_back_to_default_disables_quantization(self):
+        client = _ServerClient()
+        apply_storage_profile(client, COLLECTION, storage_profile("binary"))
+        apply_storage_profile(client, COLLECTION, storage_profile("default"))
+        self.assertEqual(client.updates[-1][1], models.Disabled.DISABLED)
+        self.assertFalse(client.on_disk)
+
+    def test_embedded_is_noop(self):
+        report = apply_storage_profile(QdrantClient(":memory:"), COLLECTION, storage_profile("binary"))
+        self.assertEqual((report["mode"], report["applied"]), ("embedded", False))
+
+
+class TestCheckQdrant(unittest.TestCase):
+
+    def test_server_mode_pings_server_only(self):
+        pinged = []
+        with patch.object(olith_memory_init, "QDRANT_SERVER_URL", "http://qdrant:6333"), \
+                patch.object(olith_memory_init, "check_service", lambda name, url: pinged.append(url) or False), \
+                patch.object(olith_memory_init, "check_qdrant_embedded", lambda: self.fail("embarque ouvert")):
+            self.assertFalse(check_qdrant())
+        self.assertEqual(pinged, ["http://qdrant:6333/"])
+
+    def test_embedded_mode(self):
+        with patch.object(olith_memory_init, "QDRANT_SERVER_URL", ""), \
+                patch.object(olith_memory_init, "check_qdrant_embedded", lambda: True):
+            self.assertTrue(check_qdrant())
+
+
+class TestCopyCollection(unittest.TestCase):
+
+    def test_copy_keeps_dense_sparse_and_payload(self):
+        source, target = QdrantClient(":memory:"), QdrantClient(":memory:")
+        source.create_collection(
+            COLLECTION,
+            vectors_config=models.VectorParams(size=4, distance=models.Distance.COSINE),
+            sparse_vectors_config={"bm25": models.SparseVectorParams(modifier=models.Modifier.IDF)},
+        )
+        source.upsert(COLLECTION, [
+            models.PointStruct(
+                id=i,
+                vector={"": [1.0, float(i), 0.0, 0.0],
+                        "bm25": models.SparseVector(indices=[i], values=[1.0])},
+                payload={"data": f"memoire {i}", "user_id": "monolith"},
+            )
+            for i in range(600)
+        ])
+        copied = copy_collection(source, target, COLLECTION, storage_profile("ondisk"))
+        self.assertEqual(copied, 600)
+        self.assertEqual(target.count(COLLECTION).count, 600)
+        info = target.get_collection(COLLECTION)
+        self.assertTrue(info.config.params.vectors.on_disk)
+        self.assertIn("bm25", info.config.params.sparse_vectors)
+        record = target.retrieve(COLLECTION, [7], with_payload=True, with_vectors=True)[0]
+        self.assertEqual(record.payload["data"], "memoire 7")
+        self.assertEqual(record.vector["bm25"].indices, [7])
+
+
+if __name__ == "__main__":
+    unittest.main()
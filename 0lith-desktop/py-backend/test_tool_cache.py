@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test tool result memoization (olith_tools.ToolResultCache)
+====================================================================
+read_file / list_files / search_files hit the cache while the touched
+paths are unchanged, and miss after an external edit, a write_file /
+edit_file through the tools, or a new file in a listed directory.
+
+Usage:
+    python -m pytest test_tool_cache.py -v
+    python test_tool_cache.py
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import olith_tools
+from olith_tools import ToolResultCache, execute_tool
+
+
+class TestToolResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.project = Path(tempfile.mkdtemp(prefix="olith_tc_", dir=str(Path.home())))
+        (self.project / "src").mkdir()
+        (self.project / "src" / "a.py").write_text("def alpha():\n    return 1\n", encoding="utf-8")
+        (self.project / "src" / "b.py").write_text("def beta():\n    return 2\n", encoding="utf-8")
+        self._orig = olith_tools.tool_cache
+        olith_tools.tool_cache = ToolResultCache()
+        self.root = str(self.project)
+
+    def tearDown(self):
+        olith_tools.tool_cache = self._orig
+        shutil.rmtree(self.project, ignore_errors=True)
+
+    def _run(self, action, **args):
+        return execute_tool(action, {"action": action, **args}, self.root)
+
+    def _stats(self):
+        return olith_tools.tool_cache.stats()
+
+    def test_repeated_read_hits(self):
+        first = self._run("read_file", path="src/a.py")
+        second = self._run("read_file", path="./src/a.py")       # meme chemin normalise
+        self.assertEqual(first, second)
+        self.assertEqual((self._stats()["hits"], self._stats()["misses"]), (1, 1))
+
+    def test_external_edit_invalidates(self):
+        self._run("read_file", path="src/a.py")
+        path = self.project / "src" / "a.py"
+        path.write_text("def alpha():\n    return 42\n", encoding="utf-8")
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        self.assertIn("42", self._run("read_file", path="src/a.py")["content"])
+        self.assertEqual(self._stats()["stale"], 1)
+
+    def test_edit_tool_invalidates_read_and_search(self):
+        self._run("read_file", path="src/a.py")
+        self._run("search_files", pattern="return 1")
+        self._run("edit_file", path="src/a.py", old_string="return 1", new_string="return 9")
+        self.assertIn("return 9", self._run("read_file", path="src/a.py")["content"])
+        self.assertEqual(self._run("search_files", pattern="return 1")["total"], 0)
+        self.assertEqual(self._stats()["hits"], 0)
+        self.assertEqual(self._stats()["invalidations"], 2)
+
+    def test_new_file_invalidates_listing(self):
+        listing = self._run("list_files", path="src")
+        self._run("write_file", path="src/c.py", content="x = 3\n")
+        again = self._run("list_files", path="src")
+        self.assertNotEqual(listing, again)
+        self.assertIn("c.py", str(again))
+
+    def test_search_hit_without_changes(self):
+        self._run("search_files", pattern="def ")
+        result = self._run("search_files", pattern="def ")
+        self.assertEqual(result["total"], 2)
+        self.assertEqual(self._stats()["hits"], 1)
+
+    def test_errors_not_cached(self):
+        self._run("read_file", path="src/missing.py")
+        self._run("read_file", path="src/missing.py")
+        self.assertEqual(self._stats()["entries"], 0)
+
+    def test_lru_eviction_under_cap(self):
+        cache = ToolResultCache(max_bytes=3000)
+        for i in range(3):
+            cache.put(f"k{i}", {"content": "x" * 1000}, {})
+        self.assertIsNone(cache.get("k0"))
+        self.assertIsNotNone(cache.get("k2"))
+        self.assertLessEqual(cache.stats()["bytes"], 3000)
+        self.assertGreater(cache.stats()["evictions"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
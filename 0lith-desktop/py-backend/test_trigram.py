@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+0Lith — Test trigram index (olith_trigram.py)
+===============================================
+Decomposition regex -> trigrammes (ET / OU, repetitions, classes), candidats
+par intersection des listes, surcouche + fusion apres modifications,
+persistance, et search_files branche sur l'index (gros fichiers compris,
+mises a jour incrementales).
+
+Usage:
+    python -m pytest test_trigram.py -v
+    python test_trigram.py
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import olith_project_index
+import olith_tools
+import olith_trigram
+from olith_project_index import open_project_index
+from olith_tools import ToolResultCache, execute_tool, tool_search_files
+from olith_trigram import TrigramIndex, regex_query
+
+
+def _show(query):
+    """Requete lisible : trigrammes en texte."""
+    if query is None or isinstance(query, int):
+        return query if query is None else "".join(chr((query >> s) & 255) for s in (16, 8, 0))
+    return (query[0], [_show(q) for q in query[1]])
+
+
+class TestRegexQuery(unittest.TestCase):
+
+    def test_literals_and_breaks(self):
+        self.assertEqual(_show(regex_query("Foo\\w+bar", re.I)), ("and", ["foo", "bar"]))
+        self.assertEqual(_show(regex_query(r"\bclass\s+Abc", re.I)), ("and", ["cla", "las", "ass", "abc"]))
+        self.assertEqual(_show(regex_query("x(yz)w")), ("and", ["xyz", "yzw"]))
+        self.assertEqual(_show(regex_query("[abc]xyz")), "xyz")
+
+    def test_alternation_and_repeats(self):
+        self.assertEqual(_show(regex_query("(alpha|beta)_")), ("or", [("and", ["alp", "lph", "pha"]), ("and", ["bet", "eta"])]))
+        self.assertEqual(_show(regex_query("(?:abc)+")), "abc")
+        self.assertIsNone(regex_query("(?:abc)*"))
+        self.assertIsNone(regex_query("(abc|x)"))         # une branche sans trigramme
+        self.assertIsNone(regex_query("a.*b"))
+        self.assertEqual(_show(regex_query("é-abc")), ("and", ["-ab", "abc"]))
+
+
+class TestTrigramIndex(unittest.TestCase):
+
+    def _index(self, files: dict) -> TrigramIndex:
+        index = TrigramIndex()
+        index.begin_bulk()
+        for rel, text in files.items():
+            index.on_file(rel, [len(text), 0, 1, 1], text.encode("utf-8"))
+        index.end_bulk()
+        return index
+
+    def test_candidates_intersection(self):
+        index = self._index({"a.py": "def alpha(): pass", "b.py": "ALPHA = beta", "c.py": "gamma"})
+        self.assertEqual(index.candidates(regex_query("alpha", re.I)), ["a.py", "b.py"])
+        self.assertEqual(index.candidates(regex_query("alpha.*beta", re.I)), ["b.py"])
+        self.assertEqual(index.candidates(regex_query("(gamma|beta)", re.I)), ["b.py", "c.py"])
+        self.assertEqual(index.candidates(regex_query("delta")), [])
+        self.assertIsNone(index.candidates(regex_query("a.")))
+
+    def test_unicode_case_folds_kept(self):
+        index = self._index({"k.txt": "Kelvin"})         # K Kelvin == k sous re.I
+        self.assertTrue(re.search("kelvin", "Kelvin", re.I))
+        self.assertEqual(index.candidates(regex_query("kelvin", re.I)), ["k.txt"])
+
+    def test_overlay_merge_and_deletes(self):
+        index = self._index({"a.py": "alpha", "b.py": "beta"})
+        with patch.object(olith_trigram, "MERGE_THRESHOLD", 1):
+            index.on_file("a.py", [5, 1, 1, 1], b"gamma")
+            self.assertEqual(index.candidates(regex_query("alpha")), [])
+            self.assertEqual(index.candidates(regex_query("gamma")), ["a.py"])
+            index.on_file("c.py", [5, 1, 1, 1], b"gamma")          # 2 en surcouche : fusion
+            self.assertEqual(index.stats["merges"], 1)
+            self.assertEqual(index.candidates(regex_query("gamma")), ["a.py", "c.py"])
+        index.on_file("b.py", None, None)
+        self.assertEqual(index.candidates(regex_query("beta")), [])
+
+    def test_dirty_files_reread(self):
+        index = self._index({"a.py": "alpha"})
+        index.on_file("a.py", [5, 1, 1, 1], None)                  # modifie, contenu non lu
+        self.assertEqual(index.candidates(regex_query("delta"), lambda rel: b"delta"), ["a.py"])
+        self.assertEqual(index.candidates(regex_query("alpha"), lambda rel: b"delta"), [])
+
+    def test_save_load(self):
+        index = self._index({"a.py": "alpha", "b.py": "beta"})
+        index.on_file("c.py", [5, 1, 1, 1], b"alphabet")
+        path = Path(tempfile.mkdtemp()) / "t.trigrams.npz"
+        try:
+            index.save(path)
+            loaded = TrigramIndex()
+            self.assertTrue(loaded.load(path))
+            self.assertEqual(loaded.candidates(regex_query("alpha")), ["a.py", "c.py"])
+        finally:
+            shutil.rmtree(path.parent, ignore_errors=True)
+
+
+class TestIndexedSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.project = Path(tempfile.mkdtemp(prefix="olith_tg_", dir=str(Path.home())))
+        self.store = Path(tempfile.mkdtemp())
+        (self.project / "src").mkdir()
+        (self.project / "src" / "a.py").write_text("def alpha():\n    return 1\n", encoding="utf-8")
+        (self.project / "src" / "b.ts").write_text("export const beta = 2;\n", encoding="utf-8")
+        big = "x = 0\n" * 20000 + "needle_in_big_file = True\n"          # > 100 KB
+        (self.project / "big.py").write_text(big, encoding="utf-8")
+        self.root = str(self.project)
+        self._patches = [
+            patch.object(olith_project_index, "PROJECT_INDEX_DIR", self.store),
+            patch.object(olith_project_index, "_active", None),
+            patch.object(olith_tools, "tool_cache", ToolResultCache()),
+        ]
+        for p in self._patches:
+            p.start()
+        self.index = open_project_index(self.project, background=False)
+
+    def tearDown(self):
+        self.index.close()
+        for p in reversed(self._patches):
+            p.stop()
+        shutil.rmtree(self.project, ignore_errors=True)
+        shutil.rmtree(self.store, ignore_errors=True)
+
+    def _files(self, pattern, **kw):
+        return [(r["file"], r["line"]) for r in tool_search_files(pattern, self.root, **kw)["results"]]
+
+    def test_large_files_searched(self):
+        self.assertEqual(self._files("needle_in_big"), [("big.py", 20001)])
+
+    def test_only_candidates_read(self):
+        with patch("builtins.open", wraps=open) as spy:
+            self.assertEqual(self._files(r"def\s+alpha"), [("src/a.py", 1)])
+        read = [c.args[0] for c in spy.call_args_list if str(c.args[0]).startswith(self.root)]
+        self.assertEqual(read, [str(self.project / "src" / "a.py")])
+
+    def test_path_and_glob_filters(self):
+        self.assertEqual(self._files("beta", path="src", glob_pattern="*.ts"), [("src/b.ts", 1)])
+        self.assertEqual(self._files("alpha", path="src", glob_pattern="*.ts"), [])
+
+    def test_external_edit_seen_after_sweep(self):
+        path = self.project / "src" / "b.ts"
+        path.write_text("export const beta = 2;\nconst delta = 4;\n", encoding="utf-8")
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        self.index.sweep()
+        self.assertEqual(self._files("delta"), [("src/b.ts", 2)])
+
+    def test_external_edit_seen_through_watcher(self):
+        if not self.index.stats()["watching"]:
+            self.skipTest("watchdog indisponible")
+        (self.project / "src" / "new.py").write_text("epsilon = 5\n", encoding="utf-8")
+        deadline = time.monotonic() + 5
+        while not self.index._pending and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(self._files("epsilon"), [("src/new.py", 1)])
+
+    def test_write_file_indexed_and_not_cached(self):
+        execute_tool("write_file", {"path": "src/c.py", "content": "zeta = 6\n"}, self.root)
+        self.assertEqual(self._files("zeta"), [("src/c.py", 1)])
+        execute_tool("search_files", {"pattern": "zeta"}, self.root)
+        self.assertEqual(olith_tools.tool_cache.stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
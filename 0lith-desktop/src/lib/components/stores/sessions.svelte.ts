@@ -38,19 +38,33 @@ export async function fetchSessions(): Promise<void> {
   }
 }
 
+// Fenetres streamees par le backend (la plus recente d'abord) : evite une
+// seule ligne JSON de plusieurs Mo pour les longues sessions
+const LOAD_PAGE_SIZE = 200;
+
 export async function loadSession(
   sessionId: string,
 ): Promise<ChatMessage[] | null> {
   try {
-    const res = (await backend.send({
-      id: crypto.randomUUID(),
-      command: "load_session",
-      session_id: sessionId,
-    } as IPCRequest)) as LoadSessionResponse;
+    const pages: ChatMessage[][] = [];
+    const res = (await backend.send(
+      {
+        id: crypto.randomUUID(),
+        command: "load_session",
+        session_id: sessionId,
+        stream: true,
+        limit: LOAD_PAGE_SIZE,
+      } as IPCRequest,
+      30000,
+      (data) => {
+        const page = (data as LoadSessionResponse).messages;
+        if (page) pages.unshift(page);
+      },
+    )) as LoadSessionResponse;
 
     if (res.status === "ok" && res.messages) {
       currentSessionId = sessionId;
-      return res.messages;
+      return pages.length ? pages.flat() : res.messages;
     }
     return null;
   } catch {
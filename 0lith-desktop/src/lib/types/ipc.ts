@@ -53,6 +53,7 @@ export interface IPCRequest {
     | "list_sessions"
     | "load_session"
     | "new_session"
+    | "search_history"
     | "cancel"
     | "arena";
   [key: string]: unknown;
@@ -158,11 +159,32 @@ export interface SessionInfo {
 
 export interface ListSessionsResponse extends IPCResponse {
   sessions: SessionInfo[];
+  total?: number;
+  offset?: number;
+  limit?: number | null;
+}
+
+export interface HistorySearchHit {
+  session_id: string;
+  seq: number;
+  type: string;
+  agent_id: string | null;
+  timestamp: number | null;
+  snippet: string;
+  score: number;
+}
+
+export interface SearchHistoryResponse extends IPCResponse {
+  query: string;
+  results: HistorySearchHit[];
 }
 
 export interface LoadSessionResponse extends IPCResponse {
   session_id: string;
   messages: ChatMessage[];
+  total?: number;
+  cursor?: number | null;
+  streamed?: number;
 }
 
 export interface NewSessionResponse extends IPCResponse {
@@ -100,6 +100,7 @@ def health() -> dict:
             "available": ollama_ok,
             "model": MODEL_NAME,
             "loaded_models": ollama_client.get_loaded_models() if ollama_ok else [],
+            "embed_cache": ollama_client.embed_cache_stats(),
         },
         "vault": {
             "path": str(VAULT_PATH),
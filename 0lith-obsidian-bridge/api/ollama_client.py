@@ -6,20 +6,22 @@ Client HTTP vers Ollama. Réutilise les patterns de olith_ollama.py :
 - Retry 2x sur erreur réseau
 - Strip des blocs <think>...</think> (qwen3 spécifique)
 - generate() non-streaming via /api/chat
-- embed() via /api/embeddings (pour la recherche sémantique)
+- embed() via /api/embed (pour la recherche sémantique), avec le cache
+  d'embeddings partagé du backend (olith_embed_cache) s'il est trouvé
 """
 
 import re
 import sys
 import time
 import json
+import importlib.util
 from pathlib import Path
 from typing import Optional
 
 import requests
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from config import OLLAMA_URL, MODEL_NAME, OLLAMA_TIMEOUT, OLLAMA_NUM_CTX
+from config import OLLAMA_URL, MODEL_NAME, OLLAMA_TIMEOUT, OLLAMA_NUM_CTX, EMBEDDING_MODEL, OLITH_BACKEND_DIR
 
 
 # ── Session partagée ──────────────────────────────────────────────────────────
@@ -51,6 +53,23 @@ def _retry(fn, max_retries: int = 2, base_delay: float = 1.0):
     raise last_error
 
 
+def _load_embed_cache_module():
+    """olith_embed_cache du backend, chargé par chemin (None si absent)."""
+    path = OLITH_BACKEND_DIR / "olith_embed_cache.py"
+    if not path.exists():
+        return None
+    spec = importlib.util.spec_from_file_location("olith_embed_cache", path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        return None
+    return module
+
+
+_embed_cache_module = _load_embed_cache_module()
+
+
 # ── API publique ──────────────────────────────────────────────────────────────
 
 def generate(
@@ -99,9 +118,9 @@ def generate(
     return _retry(_call)
 
 
-def embed(text: str, model: str = "qwen3-embedding:0.6b") -> list[float]:
+def embed(text: str, model: str = EMBEDDING_MODEL) -> list[float]:
     """
-    Génère un embedding via Ollama.
+    Génère un embedding via Ollama, ou le relit du cache partagé.
 
     Args:
         text: Texte à encoder.
@@ -114,19 +133,30 @@ def embed(text: str, model: str = "qwen3-embedding:0.6b") -> list[float]:
         requests.RequestException: Si Ollama est inaccessible.
         RuntimeError: Si le modèle d'embedding n'est pas disponible.
     """
-    def _call() -> list[float]:
+    def _call(t: str) -> list[float]:
+        # /api/embed (vecteurs normalisés) : mêmes vecteurs que Mem0 côté backend
         resp = _session.post(
-            f"{OLLAMA_URL}/api/embeddings",
-            json={"model": model, "prompt": text},
+            f"{OLLAMA_URL}/api/embed",
+            json={"model": model, "input": t},
             timeout=60,
         )
         resp.raise_for_status()
         data = resp.json()
-        if "embedding" not in data:
+        if not data.get("embeddings"):
             raise RuntimeError(f"Ollama embedding response invalide : {data}")
-        return data["embedding"]
+        return data["embeddings"][0]
 
-    return _retry(_call)
+    cache = _embed_cache_module.get_embedding_cache(model) if _embed_cache_module else None
+    if cache is None:
+        return _retry(lambda: _call(text))
+    return cache.embed(text, lambda t: _retry(lambda: _call(t)))
+
+
+def embed_cache_stats() -> Optional[dict]:
+    """Compteurs du cache d'embeddings (hits, misses, hit_rate...), None si absent."""
+    if _embed_cache_module is None:
+        return None
+    return _embed_cache_module.get_embed_cache_stats()
 
 
 def is_available() -> bool:
@@ -58,6 +58,11 @@ QDRANT_COLLECTION: str = "arkhe_notes"
 EMBEDDING_MODEL: str = "qwen3-embedding:0.6b"
 EMBEDDING_DIMS: int = 1024
 
+# Backend 0Lith — son cache d'embeddings (~/.0lith/embed_cache) est partagé
+OLITH_BACKEND_DIR: Path = Path(
+    os.getenv("OLITH_BACKEND_DIR", str(Path(__file__).resolve().parent.parent / "0lith-desktop" / "py-backend"))
+)
+
 # ── Watcher ──────────────────────────────────────────────────────────────────
 # Délai d'inactivité avant déclenchement de l'action IA (en secondes)
 WATCHER_INACTIVITY_SECONDS: int = int(os.getenv("WATCHER_INACTIVITY_SECONDS", "60"))